@@ -0,0 +1,26 @@
+"""
+Script to export the MOVES output databases and the reference data to the Parquet
+MOVES output lake (ttierlt_v1.moves_lake). Databases exported earlier are skipped.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import functools
+import operator
+from ttierlt_v1.utils import get_db_nm_list
+from ttierlt_v1.moves_lake import export_moves_lake, PATH_MOVES_LAKE
+
+# True, to export the databases with an export marker again.
+OVERWRITE: bool = False
+
+if __name__ == "__main__":
+    district_abbs = ["elp", "aus", "bmt", "crp", "dal", "ftw", "hou", "wac", "sat"]
+    db_nms_list_temp = [
+        get_db_nm_list(district_abb=district_abb, db_type=db_type)
+        for district_abb in district_abbs
+        for db_type in ["county", "project"]
+    ]
+    db_nms_list = functools.reduce(operator.iconcat, db_nms_list_temp, [])
+    exported_db_nms = export_moves_lake(
+        db_nms_list, lake_dir=PATH_MOVES_LAKE, overwrite=OVERWRITE
+    )
+    print(f"Exported {len(exported_db_nms)} databases to {PATH_MOVES_LAKE}.")
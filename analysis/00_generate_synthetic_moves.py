@@ -0,0 +1,32 @@
+"""
+Script to generate the synthetic MOVES output databases and reference data
+(ttierlt_v1.synthetic_moves) in local SQLite files, for testing and benchmarking the
+pipeline without the MariaDB server.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+from ttierlt_v1.utils import PATH_INTERIM
+from ttierlt_v1.sql_backend import SqliteBackend
+from ttierlt_v1.synthetic_moves import generate_synthetic_moves, MONTH_IDS
+
+# Number of district-years: 1, 10, or 100 for the 1x, 10x, and 100x workloads.
+SCALE: int = 1
+# Directory of the SQLite files.
+PATH_SYNTHETIC_MOVES = os.path.join(PATH_INTERIM, "synthetic_moves", f"scale_{SCALE}")
+# Output pollutants whose MOVES pollutants are generated; None for all.
+POLLUTANTS = None
+MONTHS = MONTH_IDS
+
+if __name__ == "__main__":
+    n_rows = generate_synthetic_moves(
+        SqliteBackend(PATH_SYNTHETIC_MOVES),
+        scale=SCALE,
+        pollutants=POLLUTANTS,
+        months=MONTHS,
+    )
+    print(
+        f"Generated {len(n_rows)} databases with "
+        f"{sum(sum(tbl_rows.values()) for tbl_rows in n_rows.values())} rows in "
+        f"{PATH_SYNTHETIC_MOVES}."
+    )
@@ -0,0 +1,21 @@
+"""
+Script to refresh the catalog of the MOVES output databases on the server. Only new
+and changed databases are checksummed.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+from ttierlt_v1.db_catalog import DbCatalog
+
+# True, to checksum all the databases, including the unchanged ones.
+FORCE_REFRESH: bool = False
+
+if __name__ == "__main__":
+    db_catalog = DbCatalog()
+    changes = db_catalog.refresh(force=FORCE_REFRESH)
+    for change, db_nms in changes.items():
+        print(f"{change}: {len(db_nms)} databases")
+    print(
+        db_catalog.get_dbs()
+        .groupby(["level", "district_abb"])
+        .agg(n_dbs=("db_nm", "count"), size_bytes=("size_bytes", "sum"))
+    )
@@ -0,0 +1,116 @@
+"""
+Script to batch process the running, starts, idling, and extended idling emission rate
+data in one pass per MOVES output database. The processes of a database run
+concurrently, so the wall time of a database is close to that of its slowest process.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import logging
+import datetime
+import functools
+import operator
+from ttierlt_v1.utils import PATH_INTERIM, get_db_nm_list, connect_to_server_db
+from ttierlt_v1.batch_runner import (
+    batch_run_all,
+    parse_batch_run_args,
+    MANIFEST_FILE_NM,
+    DB_TYPE_PROCESSES,
+)
+from ttierlt_v1.run_manifest import RunManifest
+from ttierlt_v1.result_shards import clear_result_shards
+from ttierlt_v1.scheduler import get_batch_scheduler
+
+# Number of databases processed in parallel; each worker runs the processes of its
+# database in threads with one connection per process.
+N_WORKERS: int = 4
+# Write each database's output to a Parquet shard and bulk-load (REPLACE) the shards
+# into the output tables at the end of the run.
+USE_RESULT_SHARDS: bool = False
+# Record the wall time of every SQL statement and stage as JSON lines in the log
+# directory and print the slowest stages and databases after the run.
+COLLECT_METRICS: bool = True
+# Output pollutants, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS.
+POLLUTANTS = None
+# Execution mode of the running process: stepwise, fused, numpy, or weighted.
+RUNNING_MODE: str = "stepwise"
+# Submit the largest databases first (cost from the run manifest timings or the source
+# table row counts) and adapt the databases in flight to the server load.
+USE_SCHEDULER: bool = True
+# Output table columns used to find the databases already processed.
+PROCESSED_KEY_COLS = {
+    "running": "Area, yearid, monthid",
+    "starts": "Area, yearid, monthid",
+    "idling": "Area, yearid",
+    "extnidle": "Area, yearid, monthid",
+}
+
+if __name__ == "__main__":
+    args = parse_batch_run_args("running, starts, idling, and extended idling")
+    path_interim_all = os.path.join(PATH_INTERIM, "all_processes")
+    if not os.path.exists(path_interim_all):
+        os.mkdir(path_interim_all)
+    # Stage-level checkpoints of all the processes used to resume partially processed
+    # databases.
+    path_manifest = os.path.join(path_interim_all, MANIFEST_FILE_NM)
+    path_shard_dir = os.path.join(path_interim_all, "result_shards")
+    already_processed_db = {}
+    if args.rerun_from_scratch:
+        for process in PROCESSED_KEY_COLS:
+            RunManifest(path_manifest).reset(process)
+            # Databases with a shard are skipped and the shards are merged at the end.
+            clear_result_shards(os.path.join(path_shard_dir, process))
+    else:
+        # Get already processed db_nm:
+        conn = connect_to_server_db(database_nm="mvs2014b_erlt_out")
+        cur = conn.cursor()
+        for process, key_cols in PROCESSED_KEY_COLS.items():
+            cur.execute(f"SELECT DISTINCT {key_cols} FROM {process}_erlt_intermediate")
+            already_processed_db[process] = cur.fetchall()
+        conn.close()
+        del conn
+
+    # Set logging file details.
+    path_to_log_dir = os.path.join(path_interim_all, "Log Files")
+    if not os.path.exists(path_to_log_dir):
+        os.mkdir(path_to_log_dir)
+    logfilenm = datetime.datetime.now().strftime("all_processes_%H_%M_%d_%m_%Y.log")
+    path_log_file = os.path.join(path_to_log_dir, logfilenm)
+    logging.basicConfig(filename=path_log_file, filemode="w", level=logging.INFO)
+
+    # Get list of processed databases.
+    district_abbs = ["elp", "aus", "bmt", "crp", "dal", "ftw", "hou", "wac", "sat"]
+    db_nms_list_temp = [
+        get_db_nm_list(district_abb=district_abb, db_type=db_type)
+        for district_abb in district_abbs
+        for db_type in DB_TYPE_PROCESSES
+    ]
+    db_nms_list = functools.reduce(operator.iconcat, db_nms_list_temp, [])
+
+    batch_report = batch_run_all(
+        db_nms_list=db_nms_list,
+        n_workers=N_WORKERS,
+        already_processed_db=already_processed_db,
+        log_dir=path_to_log_dir,
+        running_mode=RUNNING_MODE,
+        manifest_path=path_manifest,
+        pollutants=POLLUTANTS,
+        scheduler=(
+            get_batch_scheduler(
+                db_nms_list, PROCESSED_KEY_COLS.keys(), manifest_path=path_manifest
+            )
+            if USE_SCHEDULER
+            else None
+        ),
+        metrics_dir=(
+            os.path.join(path_to_log_dir, logfilenm.replace(".log", "_metrics"))
+            if COLLECT_METRICS
+            else None
+        ),
+        shard_dir=path_shard_dir if USE_RESULT_SHARDS else None,
+    )
+    batch_report.to_csv(
+        os.path.join(path_to_log_dir, logfilenm.replace(".log", "_report.csv")),
+        index=False,
+    )
@@ -10,6 +10,18 @@ import pandas as pd
 
 from ttierlt_v1.utils import get_db_nm_list, connect_to_server_db
 from ttierlt_v1.running.running_batch_sql import RunningSqlCmds as erltRunning
+from ttierlt_v1.pollutants import POLLUTANT_COLS, get_pollutant_insert_cols_sql
+
+# Pollutants of aus_sum_2022_24.aus_sum_2022_24_running_erlt.
+AUS_SUM_POLLUTANT_COLS = [
+    "NH3",
+    "PM10_Brakewear",
+    "PM10_Tirewear",
+    "PM25_Brakewear",
+    "PM25_Tirewear",
+    "Organic_Carbon",
+    "CO2",
+] + list(POLLUTANT_COLS)
 
 
 def create_aus_sum_2022_24_running_table_in_db():
@@ -83,39 +95,12 @@ def agg_by_rdtype_funcls_avgspd_no_hour(erlt_running_obj_):
     no duplicate exists. Else, ask the user if they want a conflicted copy saved
     in mvs2014_erlt_conflicted schema.
     """
-    cmd_insert_agg = """
+    cmd_insert_agg = f"""
             INSERT INTO aus_sum_2022_24.aus_sum_2022_24_running_erlt(Area, 
-            yearid, monthid, hourid, funclass, avgspeed, NH3, PM10_Brakewear,
-            PM10_Tirewear, PM25_Brakewear, PM25_Tirewear, Organic_Carbon, CO2,
-            CO, NOX, SO2, NO2, VOC, CO2EQ, PM10, PM25, BENZ, NAPTH, BUTA, FORM, 
-            ACTE, ACROL, ETYB, DPM, POM)
+            yearid, monthid, hourid, funclass, avgspeed, 
+            {get_pollutant_insert_cols_sql(erlt_running_obj_.pollutants)})
             SELECT Area,yearid,monthid,hourid,funclass,avgspeed,
-            SUM(IF(pollutantid = 30, emisfact, 0)) AS NH3,
-            SUM(IF(pollutantid = 106, emisfact, 0)) AS PM10_Brakewear,
-            SUM(IF(pollutantid = 107, emisfact, 0)) AS PM10_Tirewear,
-            SUM(IF(pollutantid = 116, emisfact, 0)) AS PM25_Brakewear,
-            SUM(IF(pollutantid = 117, emisfact, 0)) AS PM25_Tirewear,
-            SUM(IF(pollutantid = 111, emisfact, 0)) AS Organic_Carbon,
-            SUM(IF(pollutantid = 90, emisfact, 0)) AS CO2,
-            SUM(IF(pollutantid = 2, emisfact, 0)) AS CO,
-            SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,
-            SUM(IF(pollutantid = 31, emisfact, 0)) AS SO2,
-            SUM(IF(pollutantid = 33, emisfact, 0)) AS NO2,
-            SUM(IF(pollutantid = 87, emisfact, 0)) AS VOC,
-            SUM(IF(pollutantid = 98, emisfact, 0)) AS CO2EQ,
-            SUM(IF(pollutantid = 100, emisfact, 0)) AS PM10,
-            SUM(IF(pollutantid = 110, emisfact, 0)) AS PM25,
-            SUM(IF(pollutantid = 20, emisfact, 0)) AS BENZ,
-            SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,
-            SUM(IF(pollutantid = 24, emisfact, 0)) AS BUTA,
-            SUM(IF(pollutantid = 25, emisfact, 0)) AS FORM,
-            SUM(IF(pollutantid = 26, emisfact, 0)) AS ACTE,
-            SUM(IF(pollutantid = 27, emisfact, 0)) AS ACROL,
-            SUM(IF(pollutantid = 41, emisfact, 0)) AS ETYB,
-            SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM,
-            SUM(IF(pollutantid IN (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78,
-            81, 82, 83, 84, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177,
-            178, 181, 182, 183, 184), emisfact, 0)) AS POM
+            {erlt_running_obj_.pollutant_pivot_sql}
             FROM emisrate
             GROUP BY Area,yearid,monthid,hourid,funclass,avgspeed
         
@@ -132,7 +117,7 @@ if __name__ == "__main__":
     ]
     db_nm = db_aus_sum_2022_2024[0]
     for db_nm in db_aus_sum_2022_2024:
-        erlt_running_obj = erltRunning(db_nm_=db_nm)
+        erlt_running_obj = erltRunning(db_nm_=db_nm, pollutants=AUS_SUM_POLLUTANT_COLS)
         erlt_running_obj.aggregate_emisrate_rateperdist()
         hourmix = erlt_running_obj.get_hourmix()
         vmt_mix = erlt_running_obj.get_vmtmix()
@@ -10,6 +10,12 @@ from ttierlt_v1.utils import (
 )
 from ttierlt_v1.extnidle.extnidle_batch_sql import create_extnidle_table_in_db
 
+# Type of the pollutant columns: decimal (DECIMAL(23,19)) or double (DOUBLE).
+RATE_COL_TYPE: str = "decimal"
+# Output pollutant columns, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS. Use the POLLUTANTS of the batch run script.
+POLLUTANTS = None
+
 conn = connect_to_server_db(database_nm=None)
 cur = conn.cursor()
 # Create Output database if not exist
@@ -26,4 +32,8 @@ if delete_if_exists_user_input.lower() == "y":
     delete_if_exists = True
 else:
     delete_if_exists = False
-create_extnidle_table_in_db(delete_if_exists=delete_if_exists)
+create_extnidle_table_in_db(
+    delete_if_exists=delete_if_exists,
+    rate_col_type=RATE_COL_TYPE,
+    pollutants=POLLUTANTS,
+)
@@ -12,6 +12,12 @@ from ttierlt_v1.utils import (
     PATH_PROCESSED_IDLING,
     PATH_PROCESSED_EXTNIDLE,
 )
+from ttierlt_v1.pollutants import get_pollutant_cols
+
+# Output pollutants, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS. Use the POLLUTANTS of the batch run script.
+POLLUTANTS = None
+POLLUTANT_COLS = get_pollutant_cols(POLLUTANTS)
 
 if __name__ == "__main__":
     path_out_running = os.path.join(PATH_PROCESSED_RUNNING, "running_erlt_2014b.xlsx")
@@ -123,23 +129,7 @@ if __name__ == "__main__":
                 "Road Type ID",
                 "Road Description",
                 "Average Speed",
-                "CO",
-                "NOX",
-                "SO2",
-                "NO2",
-                "CO2EQ",
-                "VOC",
-                "PM10",
-                "PM25",
-                "BENZ",
-                "NAPTH",
-                "BUTA",
-                "FORM",
-                "ACTE",
-                "ACROL",
-                "ETYB",
-                "DPM",
-                "POM",
+                *POLLUTANT_COLS,
             ]
         )
         .sort_values(
@@ -170,23 +160,7 @@ if __name__ == "__main__":
                 "Fuel Type ID",
                 "Source Type",
                 "Fuel Type",
-                "CO",
-                "NOX",
-                "SO2",
-                "NO2",
-                "CO2EQ",
-                "VOC",
-                "PM10",
-                "PM25",
-                "BENZ",
-                "NAPTH",
-                "BUTA",
-                "FORM",
-                "ACTE",
-                "ACROL",
-                "ETYB",
-                "DPM",
-                "POM",
+                *POLLUTANT_COLS,
             ]
         )
     )
@@ -222,23 +196,7 @@ if __name__ == "__main__":
                 "Year",
                 "Process Type ID",
                 "Process Type",
-                "CO",
-                "NOX",
-                "SO2",
-                "NO2",
-                "CO2EQ",
-                "VOC",
-                "PM10",
-                "PM25",
-                "BENZ",
-                "NAPTH",
-                "BUTA",
-                "FORM",
-                "ACTE",
-                "ACROL",
-                "ETYB",
-                "DPM",
-                "POM",
+                *POLLUTANT_COLS,
             ]
         )
     )
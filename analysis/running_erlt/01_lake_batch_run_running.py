@@ -0,0 +1,48 @@
+"""
+Script to compute the running emission rates from the Parquet MOVES output lake
+(see analysis/00_export_moves_lake.py) without the MariaDB server. The output rows are
+written to result shards; merge them into the output table with
+ttierlt_v1.result_shards.merge_result_shards.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import glob
+import logging
+import datetime
+from ttierlt_v1.utils import PATH_INTERIM_RUNNING
+from ttierlt_v1.moves_lake import PATH_MOVES_LAKE, get_export_marker_path
+from ttierlt_v1.running.running_lake_engine import lake_batch_run
+
+# Number of worker processes. None for all the cores.
+N_WORKERS = None
+# Output pollutants, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS.
+POLLUTANTS = None
+
+if __name__ == "__main__":
+    path_to_log_dir = os.path.join(PATH_INTERIM_RUNNING, "Log Files")
+    if not os.path.exists(path_to_log_dir):
+        os.mkdir(path_to_log_dir)
+    logfilenm = datetime.datetime.now().strftime("running_lake_%H_%M_%d_%m_%Y.log")
+    path_log_file = os.path.join(path_to_log_dir, logfilenm)
+    logging.basicConfig(filename=path_log_file, filemode="w", level=logging.INFO)
+
+    # County level databases exported to the lake.
+    db_nms_list = sorted(
+        os.path.basename(path)[: -len(".json")]
+        for path in glob.glob(
+            get_export_marker_path(PATH_MOVES_LAKE, "mvs14b_erlt_*_cer_out")
+        )
+    )
+    batch_report = lake_batch_run(
+        db_nms_list,
+        shard_dir=os.path.join(PATH_INTERIM_RUNNING, "lake_result_shards"),
+        lake_dir=PATH_MOVES_LAKE,
+        n_workers=N_WORKERS,
+        pollutants=POLLUTANTS,
+    )
+    batch_report.to_csv(
+        os.path.join(path_to_log_dir, logfilenm.replace(".log", "_report.csv")),
+        index=False,
+    )
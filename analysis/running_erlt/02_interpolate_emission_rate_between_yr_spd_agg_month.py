@@ -23,26 +23,13 @@ from ttierlt_v1.yr_spd_interpol import (
     out_yr_spd_interpolated,
     agg_rates_over_yr,
 )
+from ttierlt_v1.pollutants import get_pollutant_cols
+
+# Output pollutants, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS. Use the POLLUTANTS of the batch run script.
+POLLUTANTS = None
+POLLUTANT_COLS = get_pollutant_cols(POLLUTANTS)
 
-POLLUTANT_COLS = [
-    "CO",
-    "NOX",
-    "SO2",
-    "NO2",
-    "CO2EQ",
-    "VOC",
-    "PM10",
-    "PM25",
-    "BENZ",
-    "NAPTH",
-    "BUTA",
-    "FORM",
-    "ACTE",
-    "ACROL",
-    "ETYB",
-    "DPM",
-    "POM",
-]
 AVG_SPEED_LIST = [2.5] + list(range(3, 76))
 
 if __name__ == "__main__":
@@ -86,7 +73,9 @@ if __name__ == "__main__":
     else:
         DISTRICTS_PRCSD_SQL_SAFE = DISTRICTS_PRCSD
     erlt_df_2014b_py = pd.read_sql(
-        f"""SELECT * FROM running_erlt_intermediate 
+        f"""SELECT Area, yearid, monthid, funclass, avgspeed,
+        {", ".join(POLLUTANT_COLS)}
+        FROM running_erlt_intermediate 
         WHERE Area IN {DISTRICTS_PRCSD_SQL_SAFE}; """,
         conn,
     )
@@ -95,7 +84,9 @@ if __name__ == "__main__":
     ###################################################################################
     # Get pivot table to manually interpolate by year---emission rates in excel.
     qaqc_manual_yr_befor_interpol = pivot_df_reindex_for_qaqc(
-        data=erlt_df_2014b_py, pivot_index=["Area", "monthid", "funclass", "avgspeed"]
+        data=erlt_df_2014b_py,
+        pivot_index=["Area", "monthid", "funclass", "avgspeed"],
+        pollutant_cols=POLLUTANT_COLS,
     )
     qaqc_manual_yr_befor_interpol.to_excel(path_qaqc_manual_before_yr_interpol)
     # Get the linearly interpolated values for interpol_vals: year 2020 to 2050
@@ -123,6 +114,7 @@ if __name__ == "__main__":
     qaqc_data_yr_interpolated = pivot_df_reindex_for_qaqc(
         data=erlt_df_2014b_py_yr_iterpolated,
         pivot_index=["Area", "monthid", "funclass", "avgspeed"],
+        pollutant_cols=POLLUTANT_COLS,
     )
     qaqc_data_yr_interpolated.to_excel(path_qaqc_py_after_yr_interpol)
     # Speed Interpolation---Uses inverse of speed.
@@ -7,19 +7,44 @@ Date Created: 01/29/2021
 """
 import os
 import logging
-import time
 import datetime
 import functools
 import operator
 from ttierlt_v1.utils import PATH_INTERIM_STARTS, get_db_nm_list, connect_to_server_db
-from ttierlt_v1.starts.starts_batch_sql import StartSqlCmds as erltStarts
+from ttierlt_v1.batch_runner import batch_run, parse_batch_run_args, MANIFEST_FILE_NM
+from ttierlt_v1.run_manifest import RunManifest
+from ttierlt_v1.result_shards import clear_result_shards
+from ttierlt_v1.scheduler import get_batch_scheduler
 
-RERUN_FROM_SCRATCH: bool = False
+# Number of databases processed in parallel; each worker opens its own connection.
+N_WORKERS: int = 4
+# Share the VMT-mix, hour-mix, and TxLED data across databases.
+USE_REF_CACHE: bool = True
+# Write each database's output to a Parquet shard and bulk-load (REPLACE) the shards
+# into the output table at the end of the run.
+USE_RESULT_SHARDS: bool = False
+# Record the wall time of every SQL statement and stage as JSON lines in the log
+# directory and print the slowest stages and databases after the run.
+COLLECT_METRICS: bool = True
+# Output pollutants, e.g., ["NOX", "VOC"]. None for all the pollutants in
+# ttierlt_v1.pollutants.POLLUTANT_COLS. Only the MOVES pollutants of the subset are
+# read and only the subset columns are written to the output table.
+POLLUTANTS = None
+# Submit the largest databases first (cost from the run manifest timings or the source
+# table row counts) and adapt the databases in flight to the server load.
+USE_SCHEDULER: bool = True
 
 if __name__ == "__main__":
     # FixMe: Add the inventory creation to utility module
-    if RERUN_FROM_SCRATCH:
+    args = parse_batch_run_args("starts")
+    # Stage-level checkpoints used to resume partially processed databases.
+    path_manifest = os.path.join(PATH_INTERIM_STARTS, MANIFEST_FILE_NM)
+    path_shard_dir = os.path.join(PATH_INTERIM_STARTS, "result_shards")
+    if args.rerun_from_scratch:
         already_processed_db = []
+        RunManifest(path_manifest).reset("starts")
+        # Databases with a shard are skipped and the shards are merged at the end.
+        clear_result_shards(path_shard_dir)
     else:
         # Get already processed db_nm:
         conn = connect_to_server_db(database_nm="mvs2014b_erlt_out")
@@ -48,49 +73,28 @@ if __name__ == "__main__":
     ]
     db_nms_list = functools.reduce(operator.iconcat, db_nms_list_temp, [])
 
-    for db_nm in db_nms_list:
-        # Skip processed databases:
-        ########################################################
-        erlt_starts_obj = erltStarts(db_nm_=db_nm)
-        db_nm_key = (
-            erlt_starts_obj.area_district,
-            erlt_starts_obj.analysis_year,
-            erlt_starts_obj.anaylsis_month,
-        )
-        if db_nm_key in already_processed_db:
-            erlt_starts_obj.close_conn()
-            del erlt_starts_obj
-            continue
-        start_time = time.time()
-        # Run the SQL Commands on the database.
-        ########################################################
-        logging.info(f"# Start processing {db_nm}")
-        print(f"# Start processing {db_nm}")
-        print("-------------------------------------------------------------------")
-        query_start_time = time.time()
-        erlt_starts_obj = erltStarts(db_nm_=db_nm)
-        sample_startrate = erlt_starts_obj.aggregate_startrate_rateperstart()
-        hourmix_starts = erlt_starts_obj.get_hourmix_starts()
-        txled_elp_dict = erlt_starts_obj.get_txled()
-        erlt_starts_obj.create_indices_before_joins()
-        erlt_starts_obj.join_startrate_txled_hourmix()
-        erlt_starts_obj.compute_factored_startrate()
-        erlt_starts_obj.agg_by_vehtyp_fueltyp(
-            add_seperate_conflicted_copy=False,
-            conflicted_copy_suffix="drop_after_testing",
-        )
-        logging.info(
-            "---Query execution time:  %s seconds ---"
-            % (time.time() - query_start_time)
-        )
-        logging.info(f"# End processing {db_nm}")
-        print(
-            "---Query execution time:  %s seconds ---"
-            % (time.time() - query_start_time)
-        )
-        print(f"# End processing {db_nm}")
-        print(
-            "--------------------------------------------------------------------------"
-        )
-        erlt_starts_obj.close_conn()
-        del erlt_starts_obj
+    batch_report = batch_run(
+        process="starts",
+        db_nms_list=db_nms_list,
+        n_workers=N_WORKERS,
+        already_processed_db=already_processed_db,
+        log_dir=path_to_log_dir,
+        use_ref_cache=USE_REF_CACHE,
+        manifest_path=path_manifest,
+        pollutants=POLLUTANTS,
+        scheduler=(
+            get_batch_scheduler(db_nms_list, ["starts"], manifest_path=path_manifest)
+            if USE_SCHEDULER
+            else None
+        ),
+        metrics_dir=(
+            os.path.join(path_to_log_dir, logfilenm.replace(".log", "_metrics"))
+            if COLLECT_METRICS
+            else None
+        ),
+        shard_dir=path_shard_dir if USE_RESULT_SHARDS else None,
+    )
+    batch_report.to_csv(
+        os.path.join(path_to_log_dir, logfilenm.replace(".log", "_report.csv")),
+        index=False,
+    )
@@ -0,0 +1,42 @@
+"""
+Test the grouping of the MOVES output databases for the district-year modes.
+"""
+import pytest
+from ttierlt_v1.batch_runner import group_district_year_db_nms, get_db_processes
+
+
+def test_group_district_year_db_nms():
+    groups = group_district_year_db_nms(
+        [
+            "mvs14b_erlt_elp_48141_2020_10_cer_out",
+            "mvs14b_erlt_elp_48141_2020_7_cer_out",
+            "mvs14b_erlt_elp_48141_2022_1_cer_out",
+            "mvs14b_erlt_elp_48141_2020_1_cer_out",
+            "mvs14b_erlt_elp_48141_2020_per_out",
+        ]
+    )
+    assert groups == {
+        "mvs14b_erlt_elp_48141_2020_1_cer_out": [
+            "mvs14b_erlt_elp_48141_2020_1_cer_out",
+            "mvs14b_erlt_elp_48141_2020_7_cer_out",
+            "mvs14b_erlt_elp_48141_2020_10_cer_out",
+        ],
+        "mvs14b_erlt_elp_48141_2022_1_cer_out": [
+            "mvs14b_erlt_elp_48141_2022_1_cer_out"
+        ],
+        "mvs14b_erlt_elp_48141_2020_per_out": ["mvs14b_erlt_elp_48141_2020_per_out"],
+    }
+
+
+def test_get_db_processes():
+    assert get_db_processes("mvs14b_erlt_elp_48141_2020_1_cer_out") == (
+        "running",
+        "starts",
+        "extnidle",
+    )
+    assert get_db_processes("mvs14b_erlt_elp_48141_2020_per_out") == ("idling",)
+    assert get_db_processes(
+        "mvs14b_erlt_elp_48141_2020_1_cer_out", processes=["extnidle", "idling"]
+    ) == ("extnidle",)
+    with pytest.raises(ValueError):
+        get_db_processes("mvs14b_erlt_elp_48141_2020")
@@ -0,0 +1,67 @@
+"""
+Test the benchmark runner and the regression check of the benchmark comparison.
+"""
+import json
+from ttierlt_v1.benchmarks import (
+    run_benchmarks,
+    compare_benchmarks,
+    save_benchmark_results,
+    main,
+)
+
+
+def _results(times, cpu_count=8):
+    return {
+        "metadata": {"cpu_count": cpu_count, "size": "small"},
+        "benchmarks": {
+            nm: {"times_s": [time_s], "min_s": time_s, "median_s": time_s}
+            for nm, time_s in times.items()
+        },
+    }
+
+
+def test_compare_benchmarks():
+    baseline = _results({"a": 1.0, "b": 1.0, "c": 1.0, "d": 0.001, "e": 1.0})
+    current = _results({"a": 1.05, "b": 1.5, "c": 0.5, "d": 0.004, "f": 1.0})
+    comparison = compare_benchmarks(baseline, current, threshold=0.1).set_index(
+        "benchmark"
+    )
+    assert comparison.status.to_dict() == {
+        "a": "ok",
+        "b": "regression",
+        "c": "improvement",
+        "d": "ok",
+        "e": "missing",
+        "f": "new",
+    }
+    assert comparison.loc["b", "ratio"] == 1.5
+
+
+def test_compare_command_exit_code(tmp_path, capsys):
+    baseline_path = str(tmp_path / "baseline.json")
+    current_path = str(tmp_path / "current.json")
+    save_benchmark_results(_results({"a": 1.0}), baseline_path)
+    save_benchmark_results(_results({"a": 1.3}, cpu_count=4), current_path)
+    assert main(["compare", baseline_path, current_path]) == 1
+    assert main(["compare", baseline_path, current_path, "--threshold", "0.5"]) == 0
+    assert "cpu_count differs" in capsys.readouterr().out
+
+
+def test_run_benchmarks(tmp_path):
+    results = run_benchmarks(
+        size="small",
+        repeats=1,
+        data_dir=str(tmp_path),
+        process_modes=[
+            ("running", "fused", "county"),
+            ("idling", "stepwise", "project"),
+        ],
+    )
+    benchmarks = results["benchmarks"]
+    assert "running.fused.fused_agg_emisrate_to_output" in benchmarks
+    assert "idling.stepwise.join_idlerate_houridlemix_sutmix_txled" in benchmarks
+    assert "yr_spd_interpol.pivot_df_reindex_for_qaqc" in benchmarks
+    assert all(len(bm["times_s"]) == 1 for bm in benchmarks.values())
+    assert results["metadata"]["size"] == "small"
+    # JSON serializable.
+    json.dumps(results)
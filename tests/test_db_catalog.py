@@ -0,0 +1,90 @@
+"""
+Test the incremental refresh of the MOVES output database catalog.
+"""
+import pytest
+from ttierlt_v1.db_catalog import DbCatalog, parse_db_nm
+
+DB_NM_CER = "mvs14b_erlt_elp_48141_2020_1_cer_out"
+DB_NM_PER = "mvs14b_erlt_elp_48141_2020_per_out"
+
+
+class ServerCursor:
+    """Answers the information_schema, CHECKSUM TABLE, and movesrun queries."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.statements = []
+        self.rows = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        if "information_schema.tables" in statement:
+            self.rows = [
+                (db_nm, tbl, rows, 100 * rows, "2026-10-18 10:00:00")
+                for (db_nm, tbl), rows in self.tables.items()
+            ]
+        elif statement.startswith("CHECKSUM TABLE"):
+            tbl_nms = statement[len("CHECKSUM TABLE ") :].rstrip(";").split(", ")
+            self.rows = [
+                (tbl_nm, self.tables[tuple(tbl_nm.split("."))]) for tbl_nm in tbl_nms
+            ]
+        else:
+            self.rows = [("MOVES2014b-20181203",)]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+@pytest.fixture()
+def get_catalog(tmp_path):
+    return DbCatalog(str(tmp_path / "moves_db_catalog.sqlite"))
+
+
+def test_parse_db_nm():
+    assert parse_db_nm(DB_NM_CER) == {
+        "district_abb": "elp",
+        "fips": "48141",
+        "year": 2020,
+        "month": 1,
+        "level": "cer",
+    }
+    assert parse_db_nm(DB_NM_PER)["level"] == "per"
+    assert parse_db_nm("mvs2014b_erlt_out") is None
+
+
+def test_refresh_only_checksums_changed_dbs(get_catalog):
+    catalog = get_catalog
+    cur = ServerCursor(
+        {
+            (DB_NM_CER, "rateperdistance"): 10,
+            (DB_NM_CER, "movesrun"): 1,
+            (DB_NM_PER, "movesoutput"): 5,
+        }
+    )
+    assert catalog.refresh(cur) == {
+        "added": [DB_NM_CER, DB_NM_PER],
+        "updated": [],
+        "removed": [],
+    }
+    dbs = catalog.get_dbs().set_index("db_nm")
+    assert dbs.loc[DB_NM_CER, "row_count"] == 11
+    assert dbs.loc[DB_NM_CER, "moves_version"] == "MOVES2014b-20181203"
+    assert catalog.get_db_nm_list("elp", db_type="project") == [DB_NM_PER]
+    # Unchanged databases aren't checksummed again.
+    cur.statements = []
+    assert catalog.refresh(cur)["updated"] == []
+    assert not any(stmt.startswith("CHECKSUM") for stmt in cur.statements)
+    # Changed and dropped databases.
+    cur.tables[(DB_NM_CER, "rateperdistance")] = 12
+    del cur.tables[(DB_NM_PER, "movesoutput")]
+    assert catalog.refresh(cur) == {
+        "added": [],
+        "updated": [DB_NM_CER],
+        "removed": [DB_NM_PER],
+    }
+    db_tables = catalog.get_db_tables(DB_NM_CER).set_index("table_nm")
+    assert db_tables.loc["rateperdistance", "checksum"] == 12
+    assert catalog.get_db_nm_list(db_type="project") == []
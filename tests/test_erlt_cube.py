@@ -0,0 +1,96 @@
+"""
+Test ErltCube against the dataframe based functions in yr_spd_interpol.
+"""
+import itertools
+import pytest
+import pandas as pd
+import numpy as np
+from ttierlt_v1.erlt_cube import ErltCube, RUNNING_DIMS
+from ttierlt_v1.yr_spd_interpol import (
+    out_yr_spd_interpolated,
+    agg_rates_over_yr,
+    POLLUTANT_COLS,
+    AVG_SPEED_LIST,
+)
+
+
+@pytest.fixture(scope="module")
+def get_intermediate_data():
+    rng = np.random.default_rng(2021)
+    intermediate_data = pd.DataFrame(
+        itertools.product(
+            ["El Paso", "Austin"],
+            range(2020, 2051, 2),
+            [1, 7],
+            ["Rural-Freeway", "Urban-Arterial"],
+            [2.5] + list(range(5, 80, 5)),
+        ),
+        columns=list(RUNNING_DIMS),
+    ).loc[lambda df: ~((df.Area == "Austin") & (df.yearid == 2024))]
+    intermediate_data[list(POLLUTANT_COLS)] = rng.random(
+        (len(intermediate_data), len(POLLUTANT_COLS))
+    )
+    return intermediate_data.sample(frac=1, random_state=2021)
+
+
+def test_from_frame_to_frame_round_trip(get_intermediate_data):
+    erlt_cube = ErltCube.from_frame(get_intermediate_data)
+    pd.testing.assert_frame_equal(
+        get_intermediate_data.sort_values(list(RUNNING_DIMS)).reset_index(drop=True),
+        erlt_cube.to_frame(),
+        check_dtype=False,
+    )
+    assert erlt_cube.nbytes < get_intermediate_data.memory_usage(deep=True).sum()
+    # Modifying the rates of to_frame doesn't change values.
+    values = erlt_cube.values.copy()
+    for dropna in (True, False):
+        erlt_data = erlt_cube.to_frame(dropna=dropna)
+        erlt_data.iloc[:, len(RUNNING_DIMS)] = -1.0
+        np.testing.assert_array_equal(erlt_cube.values, values)
+
+
+def test_sel(get_intermediate_data):
+    erlt_cube = ErltCube.from_frame(get_intermediate_data)
+    erlt_cube_sel = erlt_cube.sel(
+        Area="El Paso", yearid=[2020, 2030], pollutants=["NOX"]
+    )
+    assert erlt_cube_sel.dims == ("yearid", "monthid", "funclass", "avgspeed")
+    expected = get_intermediate_data.loc[
+        lambda df: (df.Area == "El Paso") & df.yearid.isin([2020, 2030])
+    ].sort_values(["yearid", "monthid", "funclass", "avgspeed"])
+    assert np.array_equal(erlt_cube_sel.values.ravel(), expected.NOX.values)
+
+
+def test_interpolate_and_reduce_match_dataframe_functions(get_intermediate_data):
+    yr_interpolated = out_yr_spd_interpolated(
+        get_intermediate_data,
+        {
+            "interpol_col": "yearid",
+            "interpol_vals": list(np.arange(2020, 2051, 1)),
+            "grpby_cols": ["Area", "monthid", "funclass", "avgspeed"],
+        },
+    ).reset_index(drop=True)
+    yr_spd_interpolated = out_yr_spd_interpolated(
+        yr_interpolated,
+        {
+            "interpol_col": "avgspeed",
+            "interpol_vals": AVG_SPEED_LIST,
+            "grpby_cols": ["Area", "yearid", "monthid", "funclass"],
+        },
+    )
+    expected = (
+        agg_rates_over_yr(
+            yr_spd_interpolated, grpby_cols=["Area", "yearid", "funclass", "avgspeed"]
+        )
+        .sort_values(["Area", "yearid", "funclass", "avgspeed"])
+        .reset_index(drop=True)
+    )
+    erlt_cube = (
+        ErltCube.from_frame(get_intermediate_data)
+        .interpolate("yearid", list(np.arange(2020, 2051, 1)))
+        .interpolate("avgspeed", AVG_SPEED_LIST)
+        .reduce("monthid", agg_func="max")
+    )
+    pd.testing.assert_frame_equal(
+        expected, erlt_cube.to_frame(), check_dtype=False, check_exact=True
+    )
@@ -0,0 +1,157 @@
+"""
+Test the export of the MOVES output lake and the running process computed from it.
+"""
+import itertools
+import numpy as np
+import pandas as pd
+import ttierlt_v1.moves_lake as moves_lake
+from ttierlt_v1.moves_lake import export_moves_lake, read_lake_table, get_db_filter
+from ttierlt_v1.running.running_lake_engine import compute_running_erlt_from_lake
+from ttierlt_v1.running.running_numpy_engine import (
+    compute_running_erlt,
+    RUNNING_RATE_COLS,
+)
+from ttierlt_v1.movesdb import MovesDb
+
+DB_NM = "mvs14b_erlt_aus_48453_2020_7_cer_out"
+OTHER_DB_NM = "mvs14b_erlt_aus_48453_2020_1_cer_out"
+
+
+def _get_rateperdistance(monthid, seed):
+    rng = np.random.default_rng(seed)
+    rate_data = pd.DataFrame(
+        itertools.product(
+            [2020],
+            [monthid],
+            [1, 8, 17],
+            [2, 4],
+            [2, 3, 100],
+            [21, 62],
+            [1, 2],
+            [1, 9],
+            [1, 18],
+        ),
+        columns=list(RUNNING_RATE_COLS) + ["processid"],
+    )
+    rate_data["rateperdistance"] = rng.random(len(rate_data)).astype(np.float32)
+    return rate_data
+
+
+REF_DATA = {
+    "vmtmix_fy20.todmix": pd.DataFrame(
+        [
+            ("Austin", "Weekday", 2020, period, stcode, ftcode, rdcode, 0.1)
+            for period in ["AM", "MD", "PM", "ON"]
+            for stcode in [21, 62]
+            for ftcode in [1, 2]
+            for rdcode in [2, 4]
+        ],
+        columns=[
+            "TxDOT_Dist",
+            "Daytype",
+            "YearID",
+            "Period",
+            "MOVES_STcode",
+            "MOVES_FTcode",
+            "VMX_RDcode",
+            "VMTmix",
+        ],
+    ),
+    "vmtmix_fy20.hourmix": pd.DataFrame(
+        {"District": "Austin", "TOD": [1, 8, 17], "factor": [0.2, 0.5, 0.3]}
+    ),
+    "txled_db.txled_long": pd.DataFrame(
+        {
+            "yearid": [2020, 2021],
+            "pollutantid": [3, 3],
+            "sourcetypeid": [62, 62],
+            "fueltypeid": [2, 2],
+            "txled_fac": [0.93, 0.9],
+        }
+    ),
+}
+
+
+class LakeServer:
+    """Connection and cursor serving the MOVES output tables and reference data."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.db_nm = None
+        self.rows = []
+        self.description = None
+
+    def cursor(self, buffered=True):
+        return self
+
+    def close(self):
+        pass
+
+    def execute(self, statement):
+        if statement == "SHOW TABLES;":
+            self.rows = [("rateperdistance",), ("movesrun",)]
+            return
+        select_cols, table_nm = statement[len("SELECT ") :].rstrip(";").split(" FROM ")
+        data = REF_DATA.get(table_nm, self.tables.get((self.db_nm, table_nm)))
+        if select_cols != "*":
+            data = data[select_cols.split(", ")]
+        self.description = [(col,) for col in data.columns]
+        self.rows = list(data.itertuples(index=False, name=None))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+def test_running_from_lake_matches_numpy_engine(tmp_path, monkeypatch):
+    tables = {
+        (DB_NM, "rateperdistance"): _get_rateperdistance(7, 1),
+        (OTHER_DB_NM, "rateperdistance"): _get_rateperdistance(1, 2),
+    }
+    server = LakeServer(tables)
+
+    def connect_to_server_db(database_nm):
+        server.db_nm = database_nm
+        return server
+
+    monkeypatch.setattr(moves_lake, "connect_to_server_db", connect_to_server_db)
+    monkeypatch.setattr(moves_lake, "EXPORT_BATCH_ROWS", 50)
+    lake_dir = str(tmp_path / "moves_lake")
+    assert export_moves_lake([DB_NM, OTHER_DB_NM], lake_dir) == [DB_NM, OTHER_DB_NM]
+    # Databases with an export marker are skipped.
+    assert export_moves_lake([DB_NM], lake_dir) == []
+    lake_rows = read_lake_table(
+        lake_dir,
+        "rateperdistance",
+        ["monthid", "rateperdistance"],
+        get_db_filter(DB_NM),
+    )
+    assert lake_rows.num_rows == len(tables[(DB_NM, "rateperdistance")])
+    assert set(lake_rows["monthid"].to_pylist()) == {7}
+
+    rate_data = tables[(DB_NM, "rateperdistance")]
+    rate_data = rate_data.loc[
+        lambda df: df.pollutantid.isin([2, 3]) & ~df.processid.isin([18, 19])
+    ]
+    moves_db = MovesDb(DB_NM, connect=False)
+    # No connection to close.
+    moves_db.close_conn()
+    expected = compute_running_erlt(
+        rate_arr=rate_data[list(RUNNING_RATE_COLS) + ["rateperdistance"]].to_numpy(
+            dtype=np.float64
+        ),
+        vmtmix=REF_DATA["vmtmix_fy20.todmix"],
+        hourmix=REF_DATA["vmtmix_fy20.hourmix"],
+        txled=REF_DATA["txled_db.txled_long"].loc[lambda df: df.yearid == 2020],
+        area_district="Austin",
+        map_rd_type=moves_db.MAP_RD_TYPE,
+        map_period_hourid=moves_db.MAP_PERIOD_HOURID,
+        pollutants=["CO", "NOX"],
+    )
+    result = compute_running_erlt_from_lake(DB_NM, lake_dir, pollutants=["CO", "NOX"])
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,58 @@
+"""
+Test the pollutant registry: subsets, SQL pivot, and sparse aggregation matrix.
+"""
+import pytest
+import numpy as np
+from ttierlt_v1.pollutants import (
+    POLLUTANT_COLS,
+    get_pollutant_cols,
+    get_pollutant_ids,
+    get_pollutant_id_sql,
+    get_pollutant_pivot_sql,
+    get_pollutant_ddl_sql,
+    get_aggregation_matrix,
+)
+
+
+def test_pollutant_subset_is_in_registry_order():
+    assert get_pollutant_cols() == POLLUTANT_COLS
+    assert get_pollutant_cols(["POM", "NH3", "CO"]) == ("CO", "POM", "NH3")
+    with pytest.raises(ValueError):
+        get_pollutant_cols(["CO", "PM1"])
+
+
+def test_pollutant_subset_only_scans_needed_ids():
+    assert len(get_pollutant_ids()) == 46
+    assert get_pollutant_ids(["PM10", "DPM", "NAPTH"]) == (23, 100, 185)
+    assert get_pollutant_id_sql(["NOX", "CO"]) == "2, 3"
+
+
+def test_pollutant_pivot_sql():
+    pivot_sql = get_pollutant_pivot_sql(["NOX", "NAPTH", "DPM"])
+    assert [line.strip() for line in pivot_sql.splitlines()] == [
+        "SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,",
+        "SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,",
+        "SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM",
+    ]
+
+
+def test_aggregation_matrix_matches_pivot_conditions():
+    pollutantid = np.array([2, 100, 100, 23, 185, 168, 30])
+    fueltypeid = np.array([1, 1, 2, 1, 2, 1, 1])
+    agg_matrix = get_aggregation_matrix(pollutantid, fueltypeid)
+    assert agg_matrix.shape == (len(pollutantid), len(POLLUTANT_COLS))
+    agg_data = dict(zip(POLLUTANT_COLS, agg_matrix.toarray().T))
+    np.testing.assert_array_equal(agg_data["CO"], [1, 0, 0, 0, 0, 0, 0])
+    np.testing.assert_array_equal(agg_data["PM10"], [0, 1, 1, 0, 0, 0, 0])
+    np.testing.assert_array_equal(agg_data["DPM"], [0, 0, 1, 0, 0, 0, 0])
+    np.testing.assert_array_equal(agg_data["NAPTH"], [0, 0, 0, 1, 1, 0, 0])
+    np.testing.assert_array_equal(agg_data["POM"], [0, 0, 0, 0, 0, 1, 0])
+    # Pollutants outside the registry aren't part of any output pollutant.
+    assert agg_matrix.toarray()[-1].sum() == 0
+
+
+def test_pollutant_ddl_sql():
+    assert get_pollutant_ddl_sql("DOUBLE", ["VOC", "NOX"]).split(",\n        ") == [
+        "`NOX` DOUBLE NULL DEFAULT NULL",
+        "`VOC` DOUBLE NULL DEFAULT NULL",
+    ]
@@ -0,0 +1,157 @@
+"""
+Test the slice reuse, the checksum-driven invalidation, and the lock of the reference
+data cache.
+"""
+import time
+import threading
+import pytest
+import ttierlt_v1.ref_data_cache
+from ttierlt_v1.ref_data_cache import RefDataCache, REF_SOURCE_TABLES, REF_CACHE_SCHEMA
+
+# pd.read_sql warns for the DBAPI connections other than sqlite3.
+pytestmark = pytest.mark.filterwarnings("ignore:pandas only supports SQLAlchemy")
+
+
+class CacheServer:
+    """State of the server: the cached tables, the fingerprint, and the checksums of
+    the source tables."""
+
+    def __init__(self):
+        self.cached_tables = set()
+        self.fingerprint = {}
+        self.checksums = {src_table: 1 for src_table in REF_SOURCE_TABLES}
+        self.statements = []
+
+    def get_create_statements(self):
+        return [
+            statement
+            for statement in self.statements
+            if statement.startswith(f"CREATE TABLE IF NOT EXISTS {REF_CACHE_SCHEMA}")
+            and "ref_cache_fingerprint" not in statement
+        ]
+
+
+class CacheServerCursor:
+    """Answers the statements of RefDataCache and the pd.read_sql of the slices."""
+
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+        self.description = None
+
+    def execute(self, statement, *args):
+        statement = " ".join(statement.split())
+        self.server.statements.append(statement)
+        self.rows, self.description = [], None
+        if statement.startswith("CHECKSUM TABLE"):
+            self.rows = list(self.server.checksums.items())
+        elif statement.startswith("SELECT src_table, checksum"):
+            self.rows = list(self.server.fingerprint.items())
+        elif "information_schema.tables" in statement:
+            self.rows = [(table_nm,) for table_nm in sorted(self.server.cached_tables)]
+        elif statement.startswith("DROP TABLE IF EXISTS"):
+            table_nm = statement.split(".")[-1].rstrip(";")
+            self.server.cached_tables.discard(table_nm)
+        elif statement.startswith("DELETE FROM"):
+            self.server.fingerprint = {}
+        elif statement.startswith(f"CREATE TABLE IF NOT EXISTS {REF_CACHE_SCHEMA}."):
+            table_nm = statement.split(".")[1].split()[0]
+            if table_nm != "ref_cache_fingerprint":
+                # Widen the window between the check and the creation of a slice.
+                time.sleep(0.01)
+                self.server.cached_tables.add(table_nm)
+        elif statement.startswith("SELECT * FROM"):
+            self.description = [("table_nm", None, None, None, None, None, None)]
+            self.rows = [(statement.split(".")[-1],)]
+
+    def executemany(self, statement, rows):
+        self.server.fingerprint.update(dict(rows))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class CacheServerConn:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return CacheServerCursor(self.server)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def get_server(monkeypatch):
+    server = CacheServer()
+    monkeypatch.setattr(
+        ttierlt_v1.ref_data_cache,
+        "connect_to_server_db",
+        lambda **kwargs: CacheServerConn(server),
+    )
+    return server
+
+
+def test_slices_are_reused(get_server):
+    server = get_server
+    ref_data_cache = RefDataCache()
+    table_nm, hourmix = ref_data_cache.get_hourmix("El Paso")
+    assert table_nm == f"{REF_CACHE_SCHEMA}.hourmix_running_el_paso"
+    assert ref_data_cache.get_hourmix("El Paso")[1] is hourmix
+    ref_data_cache.get_hourmix("Austin")
+    assert len(server.get_create_statements()) == 2
+    # A new process reads the cached tables of the earlier process.
+    RefDataCache().get_hourmix("El Paso")
+    assert server.cached_tables == {"hourmix_running_el_paso", "hourmix_running_austin"}
+
+
+def test_source_change_invalidates_the_cache(get_server):
+    server = get_server
+    ref_data_cache = RefDataCache()
+    assert ref_data_cache.refresh_if_source_changed()
+    ref_data_cache.get_txled(2020)
+    assert not ref_data_cache.refresh_if_source_changed()
+    assert server.cached_tables == {"txled_long_2020"}
+    server.checksums["txled_db.txled_long"] = 2
+    assert ref_data_cache.refresh_if_source_changed()
+    assert server.cached_tables == set()
+    assert ref_data_cache.slices == {}
+    assert server.fingerprint["txled_db.txled_long"] == 2
+    ref_data_cache.get_txled(2020)
+    assert len(server.get_create_statements()) == 2
+
+
+def test_invalidate_without_connection(get_server):
+    server = get_server
+    RefDataCache().get_vmtmix("El Paso", 2020)
+    ref_data_cache = RefDataCache()
+    assert ref_data_cache.conn is None
+    ref_data_cache.invalidate()
+    assert server.cached_tables == set()
+    assert server.fingerprint == {}
+
+
+def test_threads_build_a_slice_once(get_server):
+    server = get_server
+    ref_data_cache = RefDataCache()
+    slices = []
+    threads = [
+        threading.Thread(
+            target=lambda: slices.append(ref_data_cache.get_hourmix("El Paso"))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(server.get_create_statements()) == 1
+    assert len(slices) == 4
+    assert all(slice_ is slices[0] for slice_ in slices)
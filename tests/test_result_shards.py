@@ -0,0 +1,83 @@
+"""
+Test writing, listing, and merging the result shards.
+"""
+import os
+import numpy as np
+import pandas as pd
+import ttierlt_v1.result_shards
+from ttierlt_v1.result_shards import (
+    write_shard,
+    get_sharded_db_nms,
+    get_shard_path,
+    merge_result_shards,
+    clear_result_shards,
+)
+
+
+def test_write_shard_round_trip(tmp_path):
+    result = pd.DataFrame(
+        {
+            "Area": ["El Paso", "El Paso"],
+            "yearid": [2020, 2020],
+            "monthid": [1, 1],
+            "funclass": ["Rural-Freeway", "Urban-Arterial"],
+            "avgspeed": [2.5, 5.0],
+            "CO": [0.1234567890123456789, 1e-13],
+        }
+    )
+    db_nm = "mvs14b_erlt_elp_48141_2020_1_cer_out"
+    shard_path = write_shard(result, str(tmp_path), db_nm)
+    assert shard_path == get_shard_path(str(tmp_path), db_nm)
+    assert get_sharded_db_nms(str(tmp_path)) == [db_nm]
+    pd.testing.assert_frame_equal(result, pd.read_parquet(shard_path))
+    assert clear_result_shards(str(tmp_path)) == 1
+    assert get_sharded_db_nms(str(tmp_path)) == []
+
+
+class LoadDataConn:
+    """Records the LOAD DATA statement and the bytes of the loaded file."""
+
+    def __init__(self):
+        self.statements = []
+        self.file_bytes = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        file_path = statement.split("INFILE '")[1].split("'")[0]
+        with open(file_path, "rb") as load_file:
+            self.file_bytes = load_file.read()
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_merge_result_shards(tmp_path, monkeypatch):
+    conn = LoadDataConn()
+    monkeypatch.setattr(
+        ttierlt_v1.result_shards,
+        "connect_to_server_db",
+        lambda database_nm=None, local_infile=False: conn,
+    )
+    # Line separator on Windows.
+    monkeypatch.setattr(os, "linesep", "\r\n")
+    for month, co in [(1, 0.5), (7, np.nan)]:
+        write_shard(
+            pd.DataFrame(
+                {"Area": ["El Paso"], "yearid": [2020], "monthid": [month], "CO": [co]}
+            ),
+            str(tmp_path),
+            f"mvs14b_erlt_elp_48141_2020_{month}_cer_out",
+        )
+    assert merge_result_shards("running", str(tmp_path)) == 2
+    assert "REPLACE INTO TABLE mvs2014b_erlt_out.running_erlt_intermediate" in (
+        conn.statements[0]
+    )
+    assert "(Area, yearid, monthid, CO)" in conn.statements[0]
+    # \n line ends on all platforms; NULL in the last column is \N without a \r.
+    assert conn.file_bytes == b"El Paso\t2020\t1\t0.5\nEl Paso\t2020\t7\t\\N\n"
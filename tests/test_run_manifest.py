@@ -0,0 +1,55 @@
+"""
+Test the stage checkpoints of the run manifest.
+"""
+import pytest
+from ttierlt_v1.run_manifest import RunManifest
+
+STAGES = ["aggregate_emisrate_rateperdist", "get_hourmix", "get_vmtmix"]
+DB_NM = "mvs14b_erlt_elp_48141_2020_1_cer_out"
+
+
+@pytest.fixture()
+def get_manifest(tmp_path):
+    return RunManifest(str(tmp_path / "run_manifest.sqlite"))
+
+
+def test_resume_at_first_incomplete_stage(get_manifest):
+    manifest = get_manifest
+    assert manifest.get_resume_stage_index("running", DB_NM, STAGES) == 0
+    assert not manifest.has_stage_runs("running", DB_NM)
+    manifest.start_stage("running", DB_NM, STAGES[0], 0)
+    manifest.end_stage("running", DB_NM, STAGES[0], "success", row_count=120)
+    manifest.start_stage("running", DB_NM, STAGES[1], 1)
+    manifest.end_stage("running", DB_NM, STAGES[1], "failed", error="Error: lost")
+    assert manifest.get_resume_stage_index("running", DB_NM, STAGES) == 1
+    # Other processes don't share the checkpoints.
+    assert manifest.get_resume_stage_index("starts", DB_NM, STAGES) == 0
+    assert manifest.has_stage_runs("running", DB_NM)
+    assert not manifest.has_stage_runs("starts", DB_NM)
+    stage_runs = manifest.get_stage_runs("running").set_index("stage")
+    assert stage_runs.loc[STAGES[0], "row_count"] == 120
+    assert stage_runs.loc[STAGES[1], "status"] == "failed"
+
+
+def test_reset_clears_the_process(get_manifest):
+    manifest = get_manifest
+    for stage_order, stage in enumerate(STAGES):
+        manifest.start_stage("running", DB_NM, stage, stage_order)
+        manifest.end_stage("running", DB_NM, stage, "success", row_count=1)
+    manifest.start_stage("running:fused", DB_NM, STAGES[0], 0)
+    manifest.end_stage("running:fused", DB_NM, STAGES[0], "success", row_count=1)
+    assert manifest.get_resume_stage_index("running", DB_NM, STAGES) == len(STAGES)
+    manifest.reset("running")
+    assert manifest.get_resume_stage_index("running", DB_NM, STAGES) == 0
+    assert manifest.get_resume_stage_index("running:fused", DB_NM, STAGES) == 0
+
+
+def test_db_wall_times(get_manifest):
+    manifest = get_manifest
+    for process in ["running", "running:fused"]:
+        manifest.start_stage(process, DB_NM, STAGES[0], 0)
+        manifest.end_stage(process, DB_NM, STAGES[0], "success", row_count=1)
+    wall_times = manifest.get_db_wall_times("running")
+    assert list(wall_times) == [DB_NM]
+    assert wall_times[DB_NM] >= 0
+    assert manifest.get_db_wall_times("starts") == {}
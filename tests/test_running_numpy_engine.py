@@ -0,0 +1,148 @@
+"""
+Test the NumPy engine of the running process against a pandas version of the
+stepwise SQL (emisrate aggregation, UPDATE-JOINs into FLOAT columns, and pivot).
+"""
+import itertools
+import pytest
+import numpy as np
+import pandas as pd
+from ttierlt_v1.running.running_numpy_engine import (
+    compute_running_erlt,
+    RUNNING_RATE_COLS,
+)
+from ttierlt_v1.pollutants import POLLUTANT_REGISTRY, POLLUTANT_COLS
+
+MAP_RD_TYPE = {2: "Rural-Freeway", 3: "Rural-Arterial", 4: "Urban-Freeway"}
+MAP_PERIOD_HOURID = {"AM": (7, 8, 9), "PM": (17, 18, 19), "ON": (1, 2, 3)}
+
+
+@pytest.fixture(scope="module")
+def get_inputs():
+    rng = np.random.default_rng(2021)
+    rate_data = pd.DataFrame(
+        itertools.product(
+            [2020],
+            [1, 7],
+            [1, 7, 8, 17],
+            [2, 3, 4],
+            [2, 3, 23, 100, 185],
+            [21, 62],
+            [1, 2],
+            [1, 2, 3],
+            [1, 9],  # processid; summed in emisrate.
+        ),
+        columns=list(RUNNING_RATE_COLS) + ["processid"],
+    ).drop(columns="processid")
+    rate_data["rateperdistance"] = rng.random(len(rate_data)).astype(np.float32)
+    vmtmix = pd.DataFrame(
+        itertools.product(["AM", "PM", "ON"], [21, 62], [1, 2], [2, 3, 4]),
+        columns=["Period", "MOVES_STcode", "MOVES_FTcode", "VMX_RDcode"],
+    )
+    vmtmix["VMTmix"] = rng.random(len(vmtmix))
+    hourmix = pd.DataFrame({"TOD": [1, 7, 8, 17], "factor": rng.random(4)})
+    txled = pd.DataFrame(
+        {
+            "pollutantid": [3, 3],
+            "sourcetypeid": [62, 21],
+            "fueltypeid": [2, 2],
+            "txled_fac": [0.93, 0.95],
+        }
+    )
+    return rate_data, vmtmix, hourmix, txled
+
+
+def _stepwise_reference(rate_data, vmtmix, hourmix, txled):
+    # SUM of the FLOAT rateperdistance column is in double precision.
+    emisrate = (
+        rate_data.astype({"rateperdistance": np.float64})
+        .groupby(list(RUNNING_RATE_COLS), as_index=False)
+        .agg(ERate=("rateperdistance", "sum"))
+    )
+    emisrate["Period"] = emisrate.hourid.map(
+        {hr: period for period, hrs in MAP_PERIOD_HOURID.items() for hr in hrs}
+    )
+    emisrate["funclass"] = emisrate.roadtypeid.map(MAP_RD_TYPE)
+    emisrate["avgspeed"] = np.where(
+        emisrate.avgSpeedBinID == 1, 2.5, (emisrate.avgSpeedBinID - 1) * 5.0
+    )
+    emisrate = emisrate.merge(
+        vmtmix,
+        left_on=["Period", "sourcetypeid", "fueltypeid", "roadtypeid"],
+        right_on=["Period", "MOVES_STcode", "MOVES_FTcode", "VMX_RDcode"],
+        how="left",
+    ).merge(hourmix, left_on="hourid", right_on="TOD", how="left")
+    emisrate = emisrate.merge(
+        txled, on=["pollutantid", "sourcetypeid", "fueltypeid"], how="left"
+    )
+    weights = (
+        emisrate[["VMTmix", "factor", "txled_fac"]]
+        .fillna({"txled_fac": 1.0})
+        .astype(np.float32)
+        .astype(np.float64)
+    )
+    emisrate["emisfact"] = (
+        (emisrate.ERate * weights.VMTmix * weights.factor * weights.txled_fac)
+        .astype(np.float32)
+        .astype(np.float64)
+    )
+    for pollutant in POLLUTANT_COLS:
+        pollutantids, fueltypeids = POLLUTANT_REGISTRY[pollutant]
+        is_pollutant = emisrate.pollutantid.isin(pollutantids)
+        if fueltypeids is not None:
+            is_pollutant &= emisrate.fueltypeid.isin(fueltypeids)
+        emisrate[pollutant] = np.where(is_pollutant, emisrate.emisfact, 0.0)
+    out_data = emisrate.groupby(
+        ["yearid", "monthid", "funclass", "avgspeed"], as_index=False
+    )[list(POLLUTANT_COLS)].sum()
+    out_data.insert(0, "Area", "El Paso")
+    return out_data
+
+
+@pytest.mark.parametrize("use_txled", [True, False])
+def test_numpy_engine_matches_stepwise_reference(get_inputs, use_txled):
+    rate_data, vmtmix, hourmix, txled = get_inputs
+    out_numpy = compute_running_erlt(
+        rate_arr=rate_data.values,
+        vmtmix=vmtmix,
+        hourmix=hourmix,
+        txled=txled if use_txled else None,
+        area_district="El Paso",
+        map_rd_type=MAP_RD_TYPE,
+        map_period_hourid=MAP_PERIOD_HOURID,
+    )
+    out_reference = _stepwise_reference(
+        rate_data,
+        vmtmix,
+        hourmix,
+        txled if use_txled else txled.iloc[:0],
+    )
+    pd.testing.assert_frame_equal(
+        out_numpy,
+        out_reference,
+        check_exact=False,
+        rtol=1e-12,
+        check_dtype=False,
+    )
+
+
+def test_numpy_engine_pollutant_subset(get_inputs):
+    rate_data, vmtmix, hourmix, txled = get_inputs
+    out_subset = compute_running_erlt(
+        rate_arr=rate_data.values,
+        vmtmix=vmtmix,
+        hourmix=hourmix,
+        txled=txled,
+        area_district="El Paso",
+        map_rd_type=MAP_RD_TYPE,
+        map_period_hourid=MAP_PERIOD_HOURID,
+        pollutants=["DPM", "NOX"],
+    )
+    out_reference = _stepwise_reference(rate_data, vmtmix, hourmix, txled)
+    assert list(out_subset.columns[5:]) == ["NOX", "DPM"]
+    pd.testing.assert_frame_equal(
+        out_subset,
+        out_reference[list(out_subset.columns)],
+        check_exact=False,
+        rtol=1e-12,
+        check_dtype=False,
+    )
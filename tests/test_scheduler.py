@@ -0,0 +1,67 @@
+"""
+Test the cost estimates and the longest-job-first submission of the batch scheduler.
+"""
+import threading
+import concurrent.futures
+from ttierlt_v1.scheduler import BatchScheduler, estimate_db_costs
+
+
+def test_estimate_db_costs():
+    costs = estimate_db_costs(
+        ["hou", "dal", "wac", "elp"],
+        wall_times={"hou": 200.0, "wac": 20.0},
+        row_counts={"hou": 1000, "dal": 800, "wac": 100},
+    )
+    # dal is scaled by 0.2 seconds per row; elp has neither and gets the median.
+    assert costs == {"hou": 200.0, "dal": 160.0, "wac": 20.0, "elp": 160.0}
+    assert estimate_db_costs(["hou", "wac"], {}, {"hou": 1000, "wac": 100}) == {
+        "hou": 1000,
+        "wac": 100,
+    }
+
+
+class FixedLimit:
+    poll_interval_s = 0.01
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def get_limit(self, limit, max_limit):
+        return self.limit
+
+    def close_conn(self):
+        pass
+
+
+def test_scheduler_submits_longest_first_within_limit():
+    scheduler = BatchScheduler(
+        {"wac": 1.0, "hou": 9.0, "dal": 5.0}, load_monitor=FixedLimit(2)
+    )
+    assert scheduler.order([("wac",), ("elp",), ("hou",), ("dal",)]) == [
+        ("hou",),
+        ("dal",),
+        ("wac",),
+        ("elp",),
+    ]
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+
+    def run_db(db_nm):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        threading.Event().wait(0.02)
+        with lock:
+            in_flight["now"] -= 1
+        return db_nm
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            scheduler.run(
+                lambda work_item: executor.submit(run_db, work_item[0]),
+                [("wac",), ("elp",), ("hou",), ("dal",)],
+                n_workers=4,
+            )
+        )
+    assert sorted(results) == ["dal", "elp", "hou", "wac"]
+    assert in_flight["max"] == 2
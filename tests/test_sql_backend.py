@@ -0,0 +1,281 @@
+"""
+Test the running process on the embedded SQLite backend: the stepwise SQL, the fused
+SQL, and the NumPy engine give the same output rows on a small MOVES output database.
+"""
+import itertools
+import sqlite3
+import pytest
+import numpy as np
+import pandas as pd
+from ttierlt_v1.sql_backend import SqliteBackend, set_sql_backend
+from ttierlt_v1.batch_runner import process_db
+from ttierlt_v1.run_manifest import RunManifest
+from ttierlt_v1.stage_metrics import read_metrics
+from ttierlt_v1.result_shards import get_shard_path
+from ttierlt_v1.utils import SCRATCH_SCHEMA
+from ttierlt_v1.running.running_batch_sql import (
+    RunningSqlCmds,
+    create_running_table_in_db,
+)
+
+DB_NM = "mvs14b_erlt_aus_48453_2020_7_cer_out"
+OUT_KEY_COLS = ["Area", "yearid", "monthid", "funclass", "avgspeed"]
+
+
+def _write_tables(backend, schema_nm, tables):
+    with sqlite3.connect(backend.get_schema_path(schema_nm)) as conn:
+        for tbl_nm, tbl_data in tables.items():
+            tbl_data.to_sql(tbl_nm, conn, index=False)
+
+
+@pytest.fixture()
+def get_backend(tmp_path):
+    backend = SqliteBackend(str(tmp_path))
+    rng = np.random.default_rng(2023)
+    rate_data = pd.DataFrame(
+        itertools.product(
+            [2020],
+            [7],
+            [1, 8, 17],
+            [2, 4, 5],
+            [2, 3, 100],
+            [21, 62],
+            [1, 2],
+            [1, 2, 3],
+            [1, 9, 18],
+        ),
+        columns=[
+            "yearid",
+            "monthid",
+            "hourid",
+            "roadtypeid",
+            "pollutantid",
+            "sourcetypeid",
+            "fueltypeid",
+            "avgSpeedBinID",
+            "processid",
+        ],
+    )
+    rate_data["rateperdistance"] = rng.random(len(rate_data)).astype(np.float32)
+    _write_tables(backend, DB_NM, {"rateperdistance": rate_data})
+    todmix = pd.DataFrame(
+        itertools.product(
+            ["Austin"], ["Weekday"], [2020], ["AM", "PM", "ON"], [21, 62], [1, 2]
+        ),
+        columns=[
+            "TxDOT_Dist",
+            "Daytype",
+            "YearID",
+            "Period",
+            "MOVES_STcode",
+            "MOVES_FTcode",
+        ],
+    ).merge(pd.DataFrame({"VMX_RDcode": [2, 4, 5]}), how="cross")
+    todmix["VMTmix"] = rng.random(len(todmix))
+    hourmix = pd.DataFrame(
+        {"District": "Austin", "TOD": [1, 8, 17], "factor": rng.random(3)}
+    )
+    _write_tables(backend, "vmtmix_fy20", {"todmix": todmix, "hourmix": hourmix})
+    txled = pd.DataFrame(
+        {
+            "yearid": [2020, 2020, 2025],
+            "pollutantid": [3, 3, 3],
+            "sourcetypeid": [62, 21, 62],
+            "fueltypeid": [2, 2, 2],
+            "txled_fac": [0.93, 0.95, 0.9],
+        }
+    )
+    _write_tables(backend, "txled_db", {"txled_long": txled})
+    create_running_table_in_db(rate_col_type="double", backend=backend)
+    return backend
+
+
+def _read_output(backend):
+    conn = backend.connect(database_nm=None)
+    out_data = pd.read_sql(
+        "SELECT * FROM mvs2014b_erlt_out.running_erlt_intermediate", conn
+    )
+    conn.close()
+    return out_data.sort_values(OUT_KEY_COLS).reset_index(drop=True)
+
+
+def test_sqlite_running_stepwise_matches_numpy(get_backend):
+    backend = get_backend
+    erlt_obj = RunningSqlCmds(db_nm_=DB_NM, backend=backend)
+    erlt_obj.aggregate_emisrate_rateperdist(debug=False)
+    erlt_obj.get_hourmix()
+    erlt_obj.get_vmtmix()
+    erlt_obj.get_txled()
+    erlt_obj.create_indices_before_joins()
+    erlt_obj.join_emisrate_vmt_tod_txled()
+    erlt_obj.compute_factored_emisrate()
+    erlt_obj.agg_by_rdtype_funcls_avgspd()
+    out_numpy = (
+        erlt_obj.compute_numpy_emisrate()
+        .sort_values(OUT_KEY_COLS)
+        .reset_index(drop=True)
+    )
+    erlt_obj.close_conn()
+    out_stepwise = _read_output(backend)
+    assert len(out_stepwise) == 3 * 3
+    # SQLite keeps the FLOAT columns of emisrate in double precision.
+    pd.testing.assert_frame_equal(
+        out_stepwise, out_numpy, check_exact=False, rtol=1e-6, check_dtype=False
+    )
+    conn = backend.connect(database_nm=None)
+    assert backend.get_tables(conn.cursor(), SCRATCH_SCHEMA) == []
+    conn.close()
+
+
+def test_sqlite_running_fused_matches_numpy(get_backend):
+    backend = get_backend
+    erlt_obj = RunningSqlCmds(db_nm_=DB_NM, backend=backend)
+    erlt_obj.fused_agg_emisrate_to_output()
+    erlt_obj.get_hourmix()
+    erlt_obj.get_vmtmix()
+    erlt_obj.get_txled()
+    out_numpy = (
+        erlt_obj.compute_numpy_emisrate()
+        .sort_values(OUT_KEY_COLS)
+        .reset_index(drop=True)
+    )
+    erlt_obj.close_conn()
+    # The fused SQL rounds the factors and emisfact to single precision like the
+    # NumPy engine, so only the summation order differs.
+    pd.testing.assert_frame_equal(
+        _read_output(backend),
+        out_numpy,
+        check_exact=False,
+        rtol=1e-12,
+        check_dtype=False,
+    )
+
+
+def test_sqlite_running_weighted_matches_numpy(get_backend):
+    backend = get_backend
+    erlt_obj = RunningSqlCmds(db_nm_=DB_NM, backend=backend)
+    erlt_obj.get_hourmix()
+    erlt_obj.get_vmtmix()
+    erlt_obj.get_txled()
+    erlt_obj.create_weight_table()
+    erlt_obj.weighted_agg_emisrate_to_output()
+    out_numpy = (
+        erlt_obj.compute_numpy_emisrate()
+        .sort_values(OUT_KEY_COLS)
+        .reset_index(drop=True)
+    )
+    pd.testing.assert_frame_equal(
+        _read_output(backend),
+        out_numpy,
+        check_exact=False,
+        rtol=1e-6,
+        check_dtype=False,
+    )
+    # weightidx1 is unique: one weight per hour, road type, source type, fuel type,
+    # and pollutant.
+    with pytest.raises(backend.integrity_errors):
+        erlt_obj.cur.execute(
+            f"INSERT INTO {erlt_obj.weights_tbl} "
+            f"SELECT * FROM {erlt_obj.weights_tbl} LIMIT 1;"
+        )
+    # Rows without a weight give NULL emisfact, which the pollutant pivot sums as 0.
+    erlt_obj.cur.execute(f"DELETE FROM {erlt_obj.weights_tbl} WHERE roadtypeid = 5;")
+    emisfact = pd.read_sql(erlt_obj.get_weighted_emisfact_sql(), erlt_obj.conn)
+    out_weighted = pd.read_sql(
+        erlt_obj.get_weighted_select_sql(), erlt_obj.conn
+    ).set_index("funclass")
+    erlt_obj.close_conn()
+    is_urban_arterial = emisfact.funclass == "Urban-Arterial"
+    assert emisfact.loc[is_urban_arterial, "emisfact"].isna().all()
+    assert emisfact.loc[~is_urban_arterial, "emisfact"].notna().all()
+    pollutant_cols = ["CO", "NOX", "PM10"]
+    assert (out_weighted.loc["Urban-Arterial", pollutant_cols] == 0).all().all()
+    assert (out_weighted.drop(index="Urban-Arterial")[pollutant_cols] > 0).all().all()
+
+
+def test_sqlite_running_stepwise_shard(get_backend, tmp_path):
+    backend = get_backend
+    shard_dir = str(tmp_path / "result_shards")
+    previous_backend = set_sql_backend(backend)
+    try:
+        db_report = process_db("running", DB_NM, shard_dir=shard_dir)
+        erlt_obj = RunningSqlCmds(db_nm_=DB_NM, backend=backend)
+        erlt_obj.get_hourmix()
+        erlt_obj.get_vmtmix()
+        erlt_obj.get_txled()
+        out_numpy = (
+            erlt_obj.compute_numpy_emisrate()
+            .sort_values(OUT_KEY_COLS)
+            .reset_index(drop=True)
+        )
+        erlt_obj.close_conn()
+    finally:
+        set_sql_backend(previous_backend)
+    assert db_report["status"] == "success", db_report["error"]
+    # The output rows go to the shard instead of the output table.
+    assert _read_output(backend).empty
+    # Column names keep the case of the emisrate table, e.g., Funclass; the merge
+    # loads them by name into the case-insensitive MariaDB columns.
+    out_shard = pd.read_parquet(get_shard_path(shard_dir, DB_NM))
+    out_shard.columns = [
+        {col.lower(): col for col in out_numpy.columns}[col.lower()]
+        for col in out_shard.columns
+    ]
+    out_shard = (
+        out_shard[out_numpy.columns].sort_values(OUT_KEY_COLS).reset_index(drop=True)
+    )
+    pd.testing.assert_frame_equal(
+        out_shard, out_numpy, check_exact=False, rtol=1e-6, check_dtype=False
+    )
+
+
+def test_sqlite_running_numpy_resume(get_backend, tmp_path):
+    """Resuming the numpy mode at numpy_agg_emisrate_to_output rereads the reference
+    data of the completed get_* stages. The failed output stage is resumed even if
+    the output table has rows of the database."""
+    backend = get_backend
+    manifest_path = str(tmp_path / "run_manifest.sqlite")
+    manifest = RunManifest(manifest_path)
+    for stage_index, stage in enumerate(
+        ["get_hourmix", "get_vmtmix", "get_txled", "numpy_agg_emisrate_to_output"]
+    ):
+        manifest.start_stage("running:numpy", DB_NM, stage, stage_index)
+        manifest.end_stage(
+            "running:numpy", DB_NM, stage, "failed" if stage_index == 3 else "success"
+        )
+    previous_backend = set_sql_backend(backend)
+    try:
+        db_report = process_db(
+            "running",
+            DB_NM,
+            already_processed_db=[("Austin", 2020, 7)],
+            mode="numpy",
+            manifest_path=manifest_path,
+            metrics_dir=str(tmp_path / "metrics"),
+        )
+        erlt_obj = RunningSqlCmds(db_nm_=DB_NM, backend=backend)
+        erlt_obj.get_hourmix()
+        erlt_obj.get_vmtmix()
+        erlt_obj.get_txled()
+        out_numpy = (
+            erlt_obj.compute_numpy_emisrate()
+            .sort_values(OUT_KEY_COLS)
+            .reset_index(drop=True)
+        )
+        erlt_obj.close_conn()
+    finally:
+        set_sql_backend(previous_backend)
+    assert db_report["status"] == "success", db_report["error"]
+    pd.testing.assert_frame_equal(
+        _read_output(backend),
+        out_numpy,
+        check_exact=False,
+        rtol=1e-6,
+        check_dtype=False,
+    )
+    # Only the resumed stage is recorded, with the process.
+    metrics = read_metrics(str(tmp_path / "metrics"))
+    assert metrics.loc[metrics.record_type == "stage"].stage.tolist() == [
+        "numpy_agg_emisrate_to_output"
+    ]
+    assert (metrics.process == "RunningSqlCmds").all()
@@ -0,0 +1,82 @@
+"""
+Test the statement labels and the metrics summary of the stage instrumentation.
+"""
+import sqlite3
+from ttierlt_v1.stage_metrics import (
+    get_statement_label,
+    MetricsSink,
+    InstrumentedCursor,
+    summarize_metrics,
+)
+
+
+def test_get_statement_label():
+    assert (
+        get_statement_label(
+            """FLUSH TABLES;
+            CREATE TABLE emisrate (
+            SELECT * FROM rateperdistance);"""
+        )
+        == "CREATE TABLE emisrate"
+    )
+    assert (
+        get_statement_label(
+            """FLUSH TABLES;
+            -- Comment
+            Update emisrate SET Area = @analysis_district;
+            FLUSH TABLES;
+            UPDATE emisrate SET Period = 'AM';"""
+        )
+        == "UPDATE emisrate (+1 statements)"
+    )
+    assert get_statement_label("SELECT @analysis_year;") == "SELECT @analysis_year"
+    # Scratch tables of different runs share a label.
+    assert (
+        get_statement_label(
+            "UPDATE mvs2014b_erlt_scratch.emisrate_0a1b2c3d4e5f a "
+            "JOIN mvs2014b_erlt_scratch.hourmix_running_elp_0a1b2c3d4e5f c"
+        )
+        == "UPDATE emisrate"
+    )
+
+
+def test_instrumented_cursor_records_statements(tmp_path):
+    metrics_sink = MetricsSink(str(tmp_path))
+    conn = sqlite3.connect(":memory:")
+    cur = InstrumentedCursor(
+        conn.cursor(), metrics_sink, db_nm="db_a", process="RunningSqlCmds"
+    )
+    cur.execute("CREATE TABLE emisrate (rate REAL);")
+    cur.stage = "aggregate"
+    cur.executemany("INSERT INTO emisrate VALUES (?);", [(1.0,), (2.0,)])
+    cur.execute("SELECT SUM(rate) FROM emisrate;")
+    assert cur.fetchone()[0] == 3.0
+    metrics_sink.record(
+        record_type="stage",
+        process="RunningSqlCmds",
+        db_nm="db_a",
+        stage="aggregate",
+        wall_time_s=2.0,
+    )
+    metrics_sink.record(
+        record_type="stage",
+        process="RunningSqlCmds",
+        db_nm="db_b",
+        stage="aggregate",
+        wall_time_s=5.0,
+    )
+    metrics_sink.record(
+        record_type="stage",
+        process="StartSqlCmds",
+        db_nm="db_b",
+        stage="aggregate",
+        wall_time_s=1.0,
+    )
+    summary = summarize_metrics(str(tmp_path))
+    assert summary["databases"].db_nm.tolist() == ["db_b", "db_a", "db_b"]
+    # Stages of the same name are summarized by process.
+    assert summary["stages"].process.tolist() == ["RunningSqlCmds", "StartSqlCmds"]
+    assert summary["stages"].total.tolist() == [7.0, 1.0]
+    statements = summary["statements"]
+    assert "INSERT INTO emisrate" in statements.label.tolist()
+    assert (statements.process == "RunningSqlCmds").all()
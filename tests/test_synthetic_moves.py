@@ -0,0 +1,88 @@
+"""
+Test the synthetic MOVES output databases: cardinalities, the sums the emission
+processes check, and the running process on a synthetic database.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from ttierlt_v1.sql_backend import MariaDbBackend, SqliteBackend
+from ttierlt_v1.synthetic_moves import (
+    generate_synthetic_moves,
+    get_synthetic_db_nms,
+)
+from ttierlt_v1.running.running_batch_sql import RunningSqlCmds
+
+POLLUTANTS = ["CO", "NOX", "VOC"]
+
+
+def test_get_synthetic_db_nms():
+    assert get_synthetic_db_nms(scale=2, months=(1, 7)) == [
+        "mvs14b_erlt_elp_48141_2020_1_cer_out",
+        "mvs14b_erlt_elp_48141_2020_7_cer_out",
+        "mvs14b_erlt_elp_48141_2020_per_out",
+        "mvs14b_erlt_aus_48453_2020_1_cer_out",
+        "mvs14b_erlt_aus_48453_2020_7_cer_out",
+        "mvs14b_erlt_aus_48453_2020_per_out",
+    ]
+    assert len(get_synthetic_db_nms(scale=100)) == 100 * 13
+    with pytest.raises(ValueError):
+        get_synthetic_db_nms(scale=0.5)
+
+
+def test_generate_synthetic_moves(tmp_path):
+    backend = SqliteBackend(str(tmp_path))
+    n_rows = generate_synthetic_moves(
+        backend, scale=2, pollutants=POLLUTANTS, months=(7,), seed=1
+    )
+    db_nm = "mvs14b_erlt_aus_48453_2020_7_cer_out"
+    # 24 hours x 4 road types x 3 pollutants x 13 source types x 2 fuels x 16 speed
+    # bins, and the refueling rows of VOC.
+    assert n_rows[db_nm]["rateperdistance"] == (
+        24 * 4 * 3 * 13 * 2 * 16 + 24 * 4 * 13 * 16 * 2
+    )
+    assert set(backend.get_schema_nms()) >= set(n_rows)
+    conn = backend.connect(database_nm="mvs14b_erlt_aus_48453_2020_per_out")
+    activity = pd.read_sql(
+        "SELECT * FROM movesactivityoutput WHERE activitytypeid = 4", conn
+    )
+    todmix = pd.read_sql(
+        "SELECT * FROM vmtmix_fy20.todmix WHERE TxDOT_Dist = 'Austin'", conn
+    )
+    conn.close()
+    assert np.allclose(
+        activity.groupby(["hourid", "linkid", "sourcetypeid"]).activity.sum(), 1
+    )
+    assert np.allclose(
+        todmix.groupby(["Daytype", "YearID", "Period", "VMX_RDcode"]).VMTmix.sum(), 1
+    )
+    # Same seed, same data.
+    backend_rerun = SqliteBackend(str(tmp_path / "rerun"))
+    generate_synthetic_moves(
+        backend_rerun,
+        scale=1,
+        pollutants=POLLUTANTS,
+        months=(7,),
+        db_types=("county",),
+        seed=1,
+    )
+    elp_db_nm = "mvs14b_erlt_elp_48141_2020_7_cer_out"
+    rates = []
+    for db_backend in (backend, backend_rerun):
+        conn = db_backend.connect(database_nm=elp_db_nm)
+        rates.append(pd.read_sql("SELECT * FROM rateperstart", conn))
+        conn.close()
+    pd.testing.assert_frame_equal(*rates)
+    erlt_obj = RunningSqlCmds(db_nm_=db_nm, pollutants=POLLUTANTS, backend=backend)
+    erlt_obj.get_hourmix()
+    erlt_obj.get_vmtmix()
+    erlt_obj.get_txled()
+    out_numpy = erlt_obj.compute_numpy_emisrate()
+    erlt_obj.close_conn()
+    # 4 road types (rural / urban, restricted / unrestricted) x 16 speed bins.
+    assert len(out_numpy) == 4 * 16
+    assert (out_numpy[POLLUTANTS] > 0).all().all()
+
+
+def test_generate_synthetic_moves_refuses_server():
+    with pytest.raises(ValueError):
+        generate_synthetic_moves(MariaDbBackend())
@@ -0,0 +1,154 @@
+"""
+Test the per-process MariaDB connection pools and the precision of the DECIMAL and
+DOUBLE pollutant columns.
+"""
+import time
+import threading
+from decimal import Decimal
+import pytest
+import numpy as np
+import pandas as pd
+import mariadb
+import ttierlt_v1.utils
+from ttierlt_v1.utils import (
+    get_connection_pool,
+    connect_to_server_db,
+    check_rate_col_type_precision,
+)
+
+
+class FakeConnectionPool:
+    """Raises like mariadb.ConnectionPool when a pool_name is created twice."""
+
+    pool_nms = []
+
+    def __init__(self, pool_name, **kwargs):
+        if pool_name in self.pool_nms:
+            raise mariadb.ProgrammingError(f"Pool '{pool_name}' already exists")
+        # Widen the window between the check and the creation.
+        time.sleep(0.05)
+        self.pool_nms.append(pool_name)
+
+
+def test_get_connection_pool_threads(monkeypatch):
+    monkeypatch.setattr(ttierlt_v1.utils, "_CONNECTION_POOLS", {})
+    monkeypatch.setattr(ttierlt_v1.utils.mariadb, "ConnectionPool", FakeConnectionPool)
+    monkeypatch.setattr(ttierlt_v1.utils, "get_maria_db_password", lambda: "")
+    pools = []
+    errors = []
+
+    def get_pool():
+        try:
+            pools.append(get_connection_pool("root"))
+        except mariadb.Error as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=get_pool) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(FakeConnectionPool.pool_nms) == 1
+    assert all(pool is pools[0] for pool in pools)
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.change_user_args = None
+
+    def change_user(self, user, password, database):
+        self.change_user_args = (user, password, database)
+        self.database = database or None
+
+
+class ExhaustedPool:
+    """Raises PoolError for the first n_busy get_connection calls."""
+
+    def __init__(self, conn, n_busy):
+        self.conn = conn
+        self.n_busy = n_busy
+
+    def get_connection(self):
+        if self.n_busy:
+            self.n_busy -= 1
+            raise mariadb.PoolError("No connection available")
+        return self.conn
+
+
+@pytest.fixture()
+def set_pool(monkeypatch):
+    monkeypatch.setattr(ttierlt_v1.utils, "POOL_WAIT_INTERVAL_S", 0.001)
+    monkeypatch.setattr(ttierlt_v1.utils, "get_maria_db_password", lambda: "pw")
+
+    def set_pool_(pool):
+        monkeypatch.setattr(
+            ttierlt_v1.utils, "get_connection_pool", lambda *args, **kwargs: pool
+        )
+
+    return set_pool_
+
+
+def test_connect_waits_for_pooled_connection(set_pool):
+    conn = FakeConnection("mvs14b_erlt_elp_48141_2020_1_cer_out")
+    pool = ExhaustedPool(conn, n_busy=3)
+    set_pool(pool)
+    # Waits for the pool, and clears the default database of the previous use.
+    assert connect_to_server_db(database_nm=None) is conn
+    assert pool.n_busy == 0
+    assert conn.change_user_args == ("root", "pw", "")
+    assert conn.database is None
+    assert connect_to_server_db(database_nm="mvs2014b_erlt_out") is conn
+    assert conn.database == "mvs2014b_erlt_out"
+
+
+def test_connect_times_out_on_exhausted_pool(set_pool, monkeypatch):
+    monkeypatch.setattr(ttierlt_v1.utils, "POOL_WAIT_TIMEOUT_S", 0.01)
+    set_pool(ExhaustedPool(FakeConnection(None), n_busy=10**9))
+    with pytest.raises(SystemExit):
+        connect_to_server_db(database_nm=None)
+
+
+def test_check_rate_col_type_precision(monkeypatch):
+    rng = np.random.default_rng(2023)
+    key_cols = ["Area", "avgspeed"]
+    # Rates from CO (~1) down to POM (~1e-14).
+    double_data = pd.DataFrame(
+        {
+            "Area": "El Paso",
+            "avgspeed": np.arange(2.5, 77.5, 5.0),
+            "CO": rng.random(15),
+            "POM": rng.random(15) * 1e-14,
+        }
+    )
+    # DECIMAL(23,19) rounds to 19 decimal places; read_erlt_table returns DOUBLE.
+    decimal_data = double_data.copy()
+    float_data = double_data.copy()
+    for pollutant in ["CO", "POM"]:
+        decimal_data[pollutant] = [
+            float(Decimal(val).quantize(Decimal("1e-19")))
+            for val in double_data[pollutant]
+        ]
+        float_data[pollutant] = double_data[pollutant].astype(np.float32)
+    tables = {
+        "erlt_decimal": decimal_data,
+        "erlt_double": double_data,
+        "erlt_float": float_data,
+    }
+    monkeypatch.setattr(
+        ttierlt_v1.utils,
+        "read_erlt_table",
+        lambda table_nm, **kwargs: tables[table_nm].copy(),
+    )
+    precision_check = check_rate_col_type_precision(
+        "erlt_decimal", "erlt_double", key_cols, ["CO", "POM"]
+    )
+    assert precision_check.within_tolerance.all()
+    # FLOAT keeps ~7 significant digits, outside the tolerance of CO. The error of POM
+    # is below atol, the DECIMAL(23,19) rounding.
+    precision_check = check_rate_col_type_precision(
+        "erlt_float", "erlt_double", key_cols, ["CO", "POM"]
+    ).set_index("pollutant")
+    assert not precision_check.loc["CO", "within_tolerance"]
+    assert precision_check.loc["CO", "max_rel_diff"] > 1e-9
@@ -0,0 +1,135 @@
+"""
+Test the numpy and operator engines of out_yr_spd_interpolated against the scipy
+engine.
+"""
+import itertools
+import pytest
+import pandas as pd
+import numpy as np
+from ttierlt_v1.yr_spd_interpol import (
+    out_yr_spd_interpolated,
+    out_yr_spd_interpolated_combined,
+    POLLUTANT_COLS,
+    AVG_SPEED_LIST,
+)
+
+INTERPOLATION_COL_DICTS = {
+    "yearid": {
+        "interpol_col": "yearid",
+        "interpol_vals": list(np.arange(2020, 2051, 1)),
+        "grpby_cols": ["Area", "monthid", "funclass", "avgspeed"],
+    },
+    "avgspeed": {
+        "interpol_col": "avgspeed",
+        "interpol_vals": AVG_SPEED_LIST,
+        "grpby_cols": ["Area", "yearid", "monthid", "funclass"],
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def get_intermediate_data():
+    """
+    Synthetic data similar to mvs2014b_erlt_out.running_erlt_intermediate: even
+    years and 5 mph speed bins. Some groups don't have data for 2024 and 2030.
+    """
+    rng = np.random.default_rng(2021)
+    intermediate_data = pd.DataFrame(
+        itertools.product(
+            ["El Paso", "Austin"],
+            [1, 7],
+            ["Rural-Freeway", "Urban-Arterial"],
+            [2.5] + list(range(5, 80, 5)),
+            range(2020, 2051, 2),
+        ),
+        columns=["Area", "monthid", "funclass", "avgspeed", "yearid"],
+    )
+    intermediate_data = intermediate_data.loc[
+        lambda df: ~(df.yearid.isin([2024, 2030]) & (rng.random(len(df)) < 0.3))
+    ]
+    intermediate_data[list(POLLUTANT_COLS)] = rng.random(
+        (len(intermediate_data), len(POLLUTANT_COLS))
+    ) * 10.0 ** rng.integers(-6, 3, (len(intermediate_data), len(POLLUTANT_COLS)))
+    return intermediate_data.sample(frac=1, random_state=2021)
+
+
+@pytest.mark.parametrize("interpol_col", ["yearid", "avgspeed"])
+def test_numpy_engine_matches_scipy_engine(get_intermediate_data, interpol_col):
+    intermediate_data = get_intermediate_data
+    if interpol_col == "avgspeed":
+        intermediate_data = out_yr_spd_interpolated(
+            intermediate_data, INTERPOLATION_COL_DICTS["yearid"]
+        ).reset_index(drop=True)
+    interpolated_scipy = out_yr_spd_interpolated(
+        intermediate_data, INTERPOLATION_COL_DICTS[interpol_col], engine="scipy"
+    )
+    interpolated_numpy = out_yr_spd_interpolated(
+        intermediate_data, INTERPOLATION_COL_DICTS[interpol_col], engine="numpy"
+    )
+    pd.testing.assert_frame_equal(
+        interpolated_scipy, interpolated_numpy, check_exact=True
+    )
+
+
+def test_numpy_engine_raises_outside_data_range(get_intermediate_data):
+    with pytest.raises(ValueError):
+        out_yr_spd_interpolated(
+            get_intermediate_data.loc[lambda df: df.yearid != 2050],
+            INTERPOLATION_COL_DICTS["yearid"],
+        )
+
+
+def test_operator_engine_matches_numpy_engine(get_intermediate_data):
+    interpolated_numpy = out_yr_spd_interpolated(
+        get_intermediate_data, INTERPOLATION_COL_DICTS["yearid"], engine="numpy"
+    )
+    interpolated_operator = out_yr_spd_interpolated(
+        get_intermediate_data, INTERPOLATION_COL_DICTS["yearid"], engine="operator"
+    )
+    pd.testing.assert_frame_equal(
+        interpolated_numpy, interpolated_operator, check_exact=False, rtol=1e-12
+    )
+
+
+def test_combined_yr_spd_operator_matches_two_step(get_intermediate_data):
+    # The combined operator needs data for all speeds in all years of a group.
+    intermediate_data = get_intermediate_data.loc[
+        lambda df: ~df.yearid.isin([2024, 2030])
+    ]
+    interpolated_two_step = out_yr_spd_interpolated(
+        out_yr_spd_interpolated(
+            intermediate_data, INTERPOLATION_COL_DICTS["yearid"]
+        ).reset_index(drop=True),
+        INTERPOLATION_COL_DICTS["avgspeed"],
+    )
+    interpolated_combined = out_yr_spd_interpolated_combined(intermediate_data)
+    key_cols = ["Area", "monthid", "funclass", "yearid", "avgspeed"]
+    interpolated_two_step = interpolated_two_step.set_index(key_cols).sort_index()
+    interpolated_combined = interpolated_combined.set_index(key_cols).sort_index()
+    pd.testing.assert_frame_equal(
+        interpolated_two_step[list(POLLUTANT_COLS)],
+        interpolated_combined[list(POLLUTANT_COLS)],
+        check_exact=False,
+        rtol=1e-12,
+        check_index_type=False,
+    )
+
+
+@pytest.mark.parametrize("engine", ["scipy", "numpy", "operator"])
+def test_pollutant_subset_matches_full_run(get_intermediate_data, engine):
+    pollutant_cols = ["NOX", "VOC"]
+    key_cols = ["Area", "monthid", "funclass", "avgspeed", "yearid"]
+    interpolated_full = out_yr_spd_interpolated(
+        get_intermediate_data, INTERPOLATION_COL_DICTS["yearid"], engine=engine
+    )
+    interpolated_subset = out_yr_spd_interpolated(
+        get_intermediate_data[key_cols + pollutant_cols],
+        INTERPOLATION_COL_DICTS["yearid"],
+        pollutant_cols=pollutant_cols,
+        engine=engine,
+    )
+    pd.testing.assert_frame_equal(
+        interpolated_full[key_cols + pollutant_cols].reset_index(drop=True),
+        interpolated_subset[key_cols + pollutant_cols].reset_index(drop=True),
+        check_exact=True,
+    )
@@ -0,0 +1,915 @@
+"""
+Run the SQL commands for an emission process on many MOVES output databases in
+parallel. Each database is handled by a worker process with its own connection to the
+MariaDB server.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import re
+import time
+import logging
+import argparse
+import datetime
+import functools
+import itertools
+import concurrent.futures
+import pandas as pd
+from ttierlt_v1.running.running_batch_sql import RunningSqlCmds
+from ttierlt_v1.starts.starts_batch_sql import StartSqlCmds
+from ttierlt_v1.idling.idling_batch_sql import IdlingSqlCmds
+from ttierlt_v1.extnidle.extnidle_batch_sql import ExtnidleSqlCmds
+from ttierlt_v1.movesdb import MovesDb, get_run_id
+from ttierlt_v1.ref_data_cache import REF_DATA_CACHE
+from ttierlt_v1.result_shards import get_shard_path, merge_result_shards
+from ttierlt_v1.run_manifest import RunManifest
+from ttierlt_v1.stage_metrics import MetricsSink, print_metrics_summary
+from ttierlt_v1.pollutants import get_pollutant_cols
+
+PROCESS_STAGES = {
+    "running": (
+        RunningSqlCmds,
+        (
+            ("aggregate_emisrate_rateperdist", {"debug": False}),
+            ("get_hourmix", {}),
+            ("get_vmtmix", {}),
+            ("get_txled", {}),
+            ("create_indices_before_joins", {}),
+            ("join_emisrate_vmt_tod_txled", {}),
+            ("compute_factored_emisrate", {}),
+            ("agg_by_rdtype_funcls_avgspd", {}),
+        ),
+    ),
+    "starts": (
+        StartSqlCmds,
+        (
+            ("aggregate_startrate_rateperstart", {"debug": False}),
+            ("get_hourmix_starts", {}),
+            ("get_txled", {}),
+            ("create_indices_before_joins", {}),
+            ("join_startrate_txled_hourmix", {}),
+            ("compute_factored_startrate", {}),
+            ("agg_by_vehtyp_fueltyp", {}),
+        ),
+    ),
+    "idling": (
+        IdlingSqlCmds,
+        (
+            ("aggregate_idlerate_movesoutput", {"debug": False}),
+            ("get_houridlemix", {}),
+            ("get_sutmix", {}),
+            ("get_txled", {}),
+            ("create_indices_before_joins", {}),
+            ("join_idlerate_houridlemix_sutmix_txled", {}),
+            ("compute_factored_emisrate", {}),
+            ("agg_by_hourid_period", {}),
+        ),
+    ),
+    "extnidle": (
+        ExtnidleSqlCmds,
+        (
+            ("aggregate_extnidlerate_rateperhour", {"debug": False}),
+            ("get_hourmix_extidle", {}),
+            ("get_txled", {}),
+            ("create_indices_before_joins", {}),
+            ("join_extnidlerate_txled_hourmix", {}),
+            ("compute_factored_extnidlerate", {}),
+            ("agg_by_processtype", {}),
+        ),
+    ),
+}
+"""
+Stages (method name, keyword arguments) executed in order on each database for the
+different emission processes.
+"""
+MODE_STAGES = {
+    ("running", "fused"): (
+        RunningSqlCmds,
+        (("fused_agg_emisrate_to_output", {}),),
+    ),
+    ("running", "weighted"): (
+        RunningSqlCmds,
+        (
+            ("get_hourmix", {}),
+            ("get_vmtmix", {}),
+            ("get_txled", {}),
+            ("create_weight_table", {}),
+            ("weighted_agg_emisrate_to_output", {}),
+        ),
+    ),
+    ("running", "numpy"): (
+        RunningSqlCmds,
+        (
+            ("get_hourmix", {}),
+            ("get_vmtmix", {}),
+            ("get_txled", {}),
+            ("numpy_agg_emisrate_to_output", {}),
+        ),
+    ),
+    ("running", "district_year"): (
+        RunningSqlCmds,
+        (("create_district_year_rateperdistance", {}),)
+        + PROCESS_STAGES["running"][1]
+        + (("drop_district_year_rateperdistance", {}),),
+    ),
+    ("running", "district_year_fused"): (
+        RunningSqlCmds,
+        (
+            ("create_district_year_rateperdistance", {}),
+            ("fused_agg_emisrate_to_output", {}),
+            ("drop_district_year_rateperdistance", {}),
+        ),
+    ),
+}
+"""
+Stages for the execution modes other than the default stepwise mode, keyed by
+(process, mode).
+"""
+DISTRICT_YEAR_MODES = ("district_year", "district_year_fused")
+"""
+Modes that process the month databases of a district-year together, over a MERGE
+table (or view) of their rateperdistance tables created in SCRATCH_SCHEMA under the
+run id of the first month database and dropped by drop_district_year_rateperdistance.
+"""
+REF_CACHE_STAGES = ("get_hourmix", "get_vmtmix", "get_sutmix", "get_txled")
+"""Stages that can read the reference data from REF_DATA_CACHE (use_cache=True)."""
+SHARD_STAGES = {
+    "agg_by_rdtype_funcls_avgspd": "agg_by_rdtype_funcls_avgspd_to_shard",
+    "agg_by_vehtyp_fueltyp": "agg_by_vehtyp_fueltyp_to_shard",
+    "agg_by_hourid_period": "agg_by_hourid_period_to_shard",
+    "agg_by_processtype": "agg_by_processtype_to_shard",
+    "fused_agg_emisrate_to_output": "fused_agg_emisrate_to_shard",
+    "numpy_agg_emisrate_to_output": "numpy_agg_emisrate_to_shard",
+    "weighted_agg_emisrate_to_output": "weighted_agg_emisrate_to_shard",
+}
+"""Stages that write a result shard instead of inserting into the output table."""
+MANIFEST_FILE_NM = "run_manifest.sqlite"
+"""File name of the run manifest in the interim data directory of a process."""
+DB_TYPE_PROCESSES = {
+    "county": ("running", "starts", "extnidle"),
+    "project": ("idling",),
+}
+"""
+Emission processes run on the county level (cer_out) and project level (per_out)
+MOVES output databases by process_db_all. The processes of a database read disjoint
+source tables (rateperdistance, rateperstart, and rateperhour for the county level
+databases; movesoutput for the project level databases).
+"""
+
+
+def get_process_stages(process, mode="stepwise"):
+    """
+    Get the *SqlCmds class and the stages for an emission process and execution mode.
+    """
+    if mode == "stepwise" and process in PROCESS_STAGES:
+        return PROCESS_STAGES[process]
+    if (process, mode) in MODE_STAGES:
+        return MODE_STAGES[(process, mode)]
+    raise ValueError(
+        f"Execution mode {mode} is not available for the {process} process. "
+        f"Available modes: "
+        f"{[(nm, 'stepwise') for nm in PROCESS_STAGES] + list(MODE_STAGES.keys())}."
+    )
+
+
+def get_processed_key(erlt_obj):
+    """
+    Key used to check if a database is already present in the output table.
+    (Area, yearid, monthid) for county level databases and (Area, yearid) for project
+    level databases.
+    """
+    if erlt_obj.db_nm_county_year_month_dict["month_id"] is None:
+        return erlt_obj.area_district, erlt_obj.analysis_year
+    return (
+        erlt_obj.area_district,
+        erlt_obj.analysis_year,
+        erlt_obj.anaylsis_month,
+    )
+
+
+def group_district_year_db_nms(db_nms_list):
+    """
+    Group the county level MOVES output databases by district and year.
+    Returns
+    -------
+    dict
+        {first month database: month databases of the district-year sorted by month}.
+        Other databases (e.g., project level) form their own group.
+    """
+    district_year_db_nms = {}
+    for db_nm in db_nms_list:
+        if re.match(MovesDb.county_level_db, db_nm):
+            district_year = tuple(db_nm.split("_")[2:5])
+        else:
+            district_year = (db_nm,)
+        district_year_db_nms.setdefault(district_year, []).append(db_nm)
+    groups = {}
+    for db_nms in district_year_db_nms.values():
+        if re.match(MovesDb.county_level_db, db_nms[0]):
+            db_nms = sorted(db_nms, key=lambda db_nm: int(db_nm.split("_")[5]))
+        groups[db_nms[0]] = db_nms
+    return groups
+
+
+def _restore_skipped_stage(erlt_obj, stage, stage_kwargs):
+    """
+    Restore the object state set by a stage completed in an earlier run. The scratch
+    tables created by the completed stages persist under the run id derived from the
+    manifest key, but the table names, flags, and reference data frames set on the
+    *SqlCmds object don't.
+    """
+    if stage == "create_indices_before_joins":
+        erlt_obj.created_all_indices = True
+    elif stage in ("create_district_year_rateperdistance",) + REF_CACHE_STAGES:
+        # Recreating the MERGE table and rereading the reference data are cheap and
+        # idempotent; they set the table names and the hourmix, vmtmix, and txled_df
+        # data frames used by later stages (e.g., numpy_agg_emisrate_to_output).
+        getattr(erlt_obj, stage)(**stage_kwargs)
+
+
+def process_db(
+    process,
+    db_nm,
+    already_processed_db=(),
+    mode="stepwise",
+    use_ref_cache=False,
+    shard_dir=None,
+    manifest_path=None,
+    metrics_dir=None,
+    district_year_db_nms=None,
+    pollutants=None,
+):
+    """
+    Run all stages of the emission process on one MOVES output database.
+    Parameters
+    ----------
+    process: str
+        Emission process: running, starts, idling, or extnidle.
+    db_nm: str
+        MOVES output database name.
+    already_processed_db: iterable
+        Keys (see get_processed_key) of the databases already present in the output
+        table. These databases are skipped, unless the run manifest has stage runs
+        of the database; the manifest then decides which stages to skip.
+    mode: str
+        Execution mode: stepwise (default) or one of the modes in MODE_STAGES.
+    use_ref_cache: bool
+        True, to read the VMT-mix, hour-mix, and TxLED data from the process-wide
+        reference data cache in the REF_CACHE_STAGES.
+    shard_dir: str
+        Directory for the result shards. If set, the output rows are written to a
+        result shard instead of the output table (SHARD_STAGES), and databases with
+        a result shard are skipped.
+    manifest_path: str
+        Path to the run manifest (SQLite). If set, the start and end time, row count
+        (affected rows of the last statement), and status of each stage are recorded,
+        and the stages completed in an earlier run are skipped, so the database
+        resumes at its first incomplete stage. The database is skipped only if all
+        its stages are complete. The scratch tables are named by a run
+        id derived from the manifest key and kept when a stage fails. Without a
+        manifest, each run uses a random run id and drops its scratch tables.
+    metrics_dir: str
+        Directory for the statement and stage timings (JSON lines). Metrics aren't
+        recorded when metrics_dir is None.
+    district_year_db_nms: list
+        Month databases of the district-year of db_nm for the DISTRICT_YEAR_MODES.
+        The months already present in the output table are left out of the merge;
+        the district-year is skipped if all months are present.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS. Only
+        the MOVES pollutants of the subset are read, and only the subset columns are
+        written to the output table.
+    Returns
+    -------
+    dict
+        db_nm, process, status (success, skipped, or failed), wall time in seconds,
+        and the error message for failed databases.
+    """
+    sql_cmds_class, stages = get_process_stages(process, mode)
+    manifest_process = get_manifest_process(process, mode, pollutants)
+    manifest, run_id = None, None
+    if manifest_path is not None:
+        manifest = RunManifest(manifest_path)
+        run_id = get_run_id(f"{manifest_process}:{db_nm}")
+    start_time = time.time()
+    status = "success"
+    error = None
+    erlt_obj = None
+    try:
+        if shard_dir is not None and os.path.exists(get_shard_path(shard_dir, db_nm)):
+            # Result shard from a previous run.
+            status = "skipped"
+        else:
+            erlt_obj = sql_cmds_class(
+                db_nm_=db_nm, pollutants=pollutants, run_id=run_id
+            )
+            if metrics_dir is not None:
+                erlt_obj.enable_metrics(MetricsSink(metrics_dir))
+            if manifest is not None and manifest.has_stage_runs(
+                manifest_process, db_nm
+            ):
+                # The manifest decides for the databases it has seen: a failed
+                # INSERT into the MyISAM output table can leave some of the rows.
+                already_processed_db = ()
+            is_processed, district_year_db_nms = _is_processed(
+                erlt_obj, already_processed_db, district_year_db_nms
+            )
+            if is_processed:
+                status = "skipped"
+            else:
+                logging.info(f"# Start processing {db_nm}")
+                run_stages = _get_run_stages(
+                    stages, use_ref_cache, shard_dir, district_year_db_nms
+                )
+                status = _run_stages(erlt_obj, run_stages, manifest, manifest_process)
+                logging.info(f"# End processing {db_nm}")
+    # connect_to_server_db calls sys.exit on connection errors. Catch SystemExit so
+    # that one unreachable database doesn't bring down the worker pool.
+    except (Exception, SystemExit) as err:
+        status = "failed"
+        error = f"{type(err).__name__}: {err}"
+        logging.exception(f"# Failed processing {db_nm}")
+    finally:
+        if erlt_obj is not None:
+            # Keep the scratch tables of failed stages to resume from the manifest.
+            erlt_obj.close_conn(drop_scratch=manifest is None or status != "failed")
+    wall_time = time.time() - start_time
+    logging.info("---%s %s %s in %s seconds---" % (process, db_nm, status, wall_time))
+    return {
+        "db_nm": db_nm,
+        "process": process,
+        "status": status,
+        "wall_time_s": wall_time,
+        "error": error,
+    }
+
+
+def get_manifest_process(process, mode="stepwise", pollutants=None):
+    """
+    Process key of the run manifest: process, process:mode for the modes other than
+    stepwise, and the pollutant subset, if given, e.g., running:fused:NOX+VOC.
+    Modes have different stages and pollutant subsets have different scratch tables;
+    don't resume one mode or subset from another's checkpoints.
+    """
+    manifest_process = process if mode == "stepwise" else f"{process}:{mode}"
+    if pollutants is not None:
+        manifest_process += f":{'+'.join(get_pollutant_cols(pollutants))}"
+    return manifest_process
+
+
+def _is_processed(erlt_obj, already_processed_db, district_year_db_nms=None):
+    """
+    Check the keys of the database (see get_processed_key) against the keys already
+    present in the output table. For the DISTRICT_YEAR_MODES, the months already
+    present are left out of district_year_db_nms and the district-year is processed
+    if any month is left.
+    Returns
+    -------
+    tuple
+        is_processed (bool), district_year_db_nms.
+    """
+    already_processed_db = set(already_processed_db)
+    if district_year_db_nms is None:
+        return get_processed_key(erlt_obj) in already_processed_db, None
+    district_year_db_nms = [
+        month_db_nm
+        for month_db_nm in district_year_db_nms
+        if (
+            erlt_obj.area_district,
+            erlt_obj.analysis_year,
+            int(month_db_nm.split("_")[5]),
+        )
+        not in already_processed_db
+    ]
+    return not district_year_db_nms, district_year_db_nms
+
+
+def _get_run_stages(stages, use_ref_cache=False, shard_dir=None, db_nms=None):
+    """
+    Stages (method name, keyword arguments) of a database with the keyword arguments
+    of the run: use_cache for the REF_CACHE_STAGES, the SHARD_STAGES writing to
+    shard_dir, and the month databases db_nms of create_district_year_rateperdistance.
+    """
+    run_stages = []
+    for stage, stage_kwargs in stages:
+        if use_ref_cache and stage in REF_CACHE_STAGES:
+            stage_kwargs = {**stage_kwargs, "use_cache": True}
+        if shard_dir is not None and stage in SHARD_STAGES:
+            stage = SHARD_STAGES[stage]
+            stage_kwargs = {"shard_dir": shard_dir}
+        if stage == "create_district_year_rateperdistance":
+            stage_kwargs = {**stage_kwargs, "db_nms": db_nms}
+        run_stages.append((stage, stage_kwargs))
+    return run_stages
+
+
+def _run_stages(erlt_obj, run_stages, manifest=None, manifest_process=None):
+    """
+    Run the stages on erlt_obj. With a manifest, the stages completed in an earlier
+    run are restored instead of rerun (see _restore_skipped_stage), and the start and
+    end of the other stages are recorded.
+    Returns
+    -------
+    str
+        skipped, if all stages completed in an earlier run; success otherwise.
+    """
+    resume_stage_index = 0
+    if manifest is not None:
+        resume_stage_index = manifest.get_resume_stage_index(
+            manifest_process, erlt_obj.db_nm, [stage for stage, _ in run_stages]
+        )
+        if resume_stage_index > 0:
+            logging.info(
+                f"# Resume {erlt_obj.db_nm} at stage "
+                f"{resume_stage_index}/{len(run_stages)}"
+            )
+    for stage_index, (stage, stage_kwargs) in enumerate(run_stages):
+        if stage_index < resume_stage_index:
+            _restore_skipped_stage(erlt_obj, stage, stage_kwargs)
+        elif manifest is None:
+            erlt_obj.run_stage(stage, **stage_kwargs)
+        else:
+            _run_manifest_stage(
+                erlt_obj, manifest, manifest_process, stage, stage_kwargs, stage_index
+            )
+    # All stages completed in an earlier run.
+    return "skipped" if resume_stage_index == len(run_stages) else "success"
+
+
+def _run_manifest_stage(
+    erlt_obj, manifest, manifest_process, stage, stage_kwargs, stage_index
+):
+    """Run a stage and record its start, end, row count, and status in the manifest."""
+    manifest.start_stage(manifest_process, erlt_obj.db_nm, stage, stage_index)
+    try:
+        erlt_obj.run_stage(stage, **stage_kwargs)
+    except (Exception, SystemExit) as err:
+        manifest.end_stage(
+            manifest_process,
+            erlt_obj.db_nm,
+            stage,
+            "failed",
+            error=f"{type(err).__name__}: {err}",
+        )
+        raise
+    manifest.end_stage(
+        manifest_process, erlt_obj.db_nm, stage, "success", erlt_obj.cur.rowcount
+    )
+
+
+def _init_worker_logging(path_to_log_dir, process):
+    """Give each worker process its own log file in path_to_log_dir."""
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    logfilenm = datetime.datetime.now().strftime(
+        f"{process}_worker_{os.getpid()}_%H_%M_%d_%m_%Y.log"
+    )
+    logging.basicConfig(
+        filename=os.path.join(path_to_log_dir, logfilenm),
+        filemode="w",
+        level=logging.INFO,
+    )
+
+
+def batch_run(
+    process,
+    db_nms_list,
+    n_workers=4,
+    already_processed_db=(),
+    log_dir=None,
+    mode="stepwise",
+    use_ref_cache=False,
+    shard_dir=None,
+    manifest_path=None,
+    metrics_dir=None,
+    pollutants=None,
+    scheduler=None,
+):
+    """
+    Fan the MOVES output databases out over a pool of worker processes. Each worker
+    creates its own connection through the *SqlCmds class of the emission process.
+    Parameters
+    ----------
+    process: str
+        Emission process: running, starts, idling, or extnidle.
+    db_nms_list: list
+        MOVES output database names.
+    n_workers: int
+        Number of worker processes. n_workers = 1 runs the databases serially in the
+        current process.
+    already_processed_db: iterable
+        Keys of the databases already present in the output table. These databases
+        are skipped, unless they have stage runs in the run manifest. See process_db.
+    log_dir: str
+        Directory for the worker log files. Workers log to the root logger of the
+        current process when log_dir is None.
+    mode: str
+        Execution mode: stepwise (default) or one of the modes in MODE_STAGES, e.g.
+        fused for the running process. In the DISTRICT_YEAR_MODES, the month
+        databases of each district-year are processed together by one worker, and the
+        report has one row per district-year (first month database).
+    use_ref_cache: bool
+        True, to share the VMT-mix, hour-mix, and TxLED data across the databases
+        through the reference data cache. The cache is invalidated before the run if
+        the source tables changed since it was built.
+    shard_dir: str
+        Directory for the result shards. If set, each worker writes the output rows
+        of its databases to result shards, and the shards are bulk-loaded into the
+        output table (REPLACE) after all databases are processed.
+    manifest_path: str
+        Path to the run manifest (SQLite) used to record the stages and resume the
+        databases at their first incomplete stage. See process_db.
+    metrics_dir: str
+        Directory for the statement and stage timings (JSON lines). A summary of the
+        slowest stages, databases, and statements is printed after the run.
+    pollutants: list-like
+        Output pollutants, e.g., ["NOX", "VOC"]. None for POLLUTANT_COLS. The run
+        time scales with the number of MOVES pollutants of the subset. See
+        process_db.
+    scheduler: ttierlt_v1.scheduler.BatchScheduler
+        Scheduler submitting the databases to the worker pool longest first, with
+        the number of databases in flight adapted to the server load. None to submit
+        the databases in the order of db_nms_list. Not used with n_workers = 1.
+    Returns
+    -------
+    pd.DataFrame()
+        Per-database report with db_nm, process, status, wall_time_s, and error.
+    """
+    _validate_batch_run_args([(process, mode)], pollutants)
+    already_processed_db = list(already_processed_db)
+    batch_start_time = time.time()
+    if use_ref_cache:
+        _refresh_ref_data_cache()
+    if mode in DISTRICT_YEAR_MODES:
+        work_items = list(group_district_year_db_nms(db_nms_list).items())
+    else:
+        work_items = [(db_nm, None) for db_nm in db_nms_list]
+    run_work_item = functools.partial(
+        _process_db_work_item,
+        process=process,
+        already_processed_db=already_processed_db,
+        mode=mode,
+        use_ref_cache=use_ref_cache,
+        shard_dir=shard_dir,
+        manifest_path=manifest_path,
+        metrics_dir=metrics_dir,
+        pollutants=pollutants,
+    )
+    report = []
+    for db_report in _run_batch(
+        run_work_item, work_items, n_workers, log_dir, process, scheduler
+    ):
+        report.append(db_report)
+        _print_db_status(report[-1], len(report), len(work_items))
+    return _finish_batch_run(
+        report,
+        n_workers,
+        batch_start_time,
+        shard_dirs=None if shard_dir is None else {process: shard_dir},
+        metrics_dir=metrics_dir,
+    )
+
+
+def get_db_processes(db_nm, processes=None):
+    """
+    Emission processes of DB_TYPE_PROCESSES run on the MOVES output database,
+    optionally limited to processes.
+    """
+    if re.match(MovesDb.county_level_db, db_nm):
+        db_processes = DB_TYPE_PROCESSES["county"]
+    elif re.match(MovesDb.project_level_db, db_nm):
+        db_processes = DB_TYPE_PROCESSES["project"]
+    else:
+        raise ValueError(f"{db_nm} is neither a county nor a project level database.")
+    if processes is None:
+        return db_processes
+    return tuple(process for process in db_processes if process in processes)
+
+
+def process_db_all(
+    db_nm,
+    processes=None,
+    already_processed_db=None,
+    running_mode="stepwise",
+    shard_dir=None,
+    manifest_path=None,
+    metrics_dir=None,
+    pollutants=None,
+):
+    """
+    Run all the emission processes of a MOVES output database (see get_db_processes)
+    concurrently, one thread per process. Each process reads its own source table and
+    uses its own connection from the connection pool of the worker. The VMT-mix,
+    hour-mix, and TxLED data are read from the reference data cache, so they are
+    built once and shared by the processes instead of being copied into the database
+    by each process.
+    Parameters
+    ----------
+    db_nm: str
+        MOVES output database name.
+    processes: list-like
+        Emission processes to run. None for all the processes of the database type.
+    already_processed_db: dict
+        {process: keys of the databases already present in the output table}.
+    running_mode: str
+        Execution mode of the running process. The DISTRICT_YEAR_MODES aren't
+        supported.
+    shard_dir: str
+        Directory for the result shards. The shards of each process are written to
+        the sub-directory of the process.
+    manifest_path: str
+        Path to the run manifest (SQLite) shared by the processes. See process_db.
+    metrics_dir: str
+        Directory for the statement and stage timings (JSON lines).
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS.
+    Returns
+    -------
+    list
+        process_db reports of the processes of the database.
+    """
+    if already_processed_db is None:
+        already_processed_db = {}
+    db_processes = get_db_processes(db_nm, processes)
+    if not db_processes:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(db_processes)
+    ) as executor:
+        futures = [
+            executor.submit(
+                process_db,
+                process,
+                db_nm,
+                already_processed_db.get(process, ()),
+                running_mode if process == "running" else "stepwise",
+                True,
+                None if shard_dir is None else os.path.join(shard_dir, process),
+                manifest_path,
+                metrics_dir,
+                None,
+                pollutants,
+            )
+            for process in db_processes
+        ]
+        return [future.result() for future in futures]
+
+
+def batch_run_all(
+    db_nms_list,
+    n_workers=4,
+    processes=None,
+    already_processed_db=None,
+    log_dir=None,
+    running_mode="stepwise",
+    shard_dir=None,
+    manifest_path=None,
+    metrics_dir=None,
+    pollutants=None,
+    scheduler=None,
+):
+    """
+    Fan the MOVES output databases out over a pool of worker processes and run all
+    the emission processes of each database in one pass with process_db_all. The
+    wall time of a database is close to that of its slowest process rather than the
+    sum over the processes.
+    Parameters
+    ----------
+    db_nms_list: list
+        County and project level MOVES output database names.
+    n_workers: int
+        Number of worker processes. n_workers = 1 runs the databases serially in the
+        current process. Each worker runs up to len(DB_TYPE_PROCESSES["county"])
+        connections at a time.
+    processes: list-like
+        Emission processes to run. None for all the processes in DB_TYPE_PROCESSES.
+    already_processed_db: dict
+        {process: keys of the databases already present in the output table}. These
+        databases are skipped for the process.
+    log_dir: str
+        Directory for the worker log files. Workers log to the root logger of the
+        current process when log_dir is None.
+    running_mode: str
+        Execution mode of the running process: stepwise (default) or one of the
+        running modes in MODE_STAGES other than the DISTRICT_YEAR_MODES.
+    shard_dir: str
+        Directory for the result shards. If set, the output rows are written to the
+        result shards in the sub-directory of each process and bulk-loaded into the
+        output tables (REPLACE) after all databases are processed.
+    manifest_path: str
+        Path to the run manifest (SQLite) shared by the processes. See process_db.
+    metrics_dir: str
+        Directory for the statement and stage timings (JSON lines).
+    pollutants: list-like
+        Output pollutants, e.g., ["NOX", "VOC"]. None for POLLUTANT_COLS.
+    scheduler: ttierlt_v1.scheduler.BatchScheduler
+        Scheduler submitting the databases longest first; see batch_run. The cost
+        of a database is the cost of its slowest process.
+    Returns
+    -------
+    pd.DataFrame()
+        Per-database and process report with db_nm, process, status, wall_time_s,
+        and error.
+    """
+    all_processes = _get_batch_run_all_processes(processes, running_mode, pollutants)
+    if already_processed_db is None:
+        already_processed_db = {}
+    already_processed_db = {
+        process: list(keys) for process, keys in already_processed_db.items()
+    }
+    n_reports = sum(len(get_db_processes(db_nm, processes)) for db_nm in db_nms_list)
+    batch_start_time = time.time()
+    _refresh_ref_data_cache()
+    run_work_item = functools.partial(
+        process_db_all,
+        processes=processes,
+        already_processed_db=already_processed_db,
+        running_mode=running_mode,
+        shard_dir=shard_dir,
+        manifest_path=manifest_path,
+        metrics_dir=metrics_dir,
+        pollutants=pollutants,
+    )
+    report = []
+    for db_reports in _run_batch(
+        run_work_item,
+        [(db_nm,) for db_nm in db_nms_list],
+        n_workers,
+        log_dir,
+        "all",
+        scheduler,
+    ):
+        for db_report in db_reports:
+            report.append(db_report)
+            _print_db_status(db_report, len(report), n_reports)
+    return _finish_batch_run(
+        report,
+        n_workers,
+        batch_start_time,
+        shard_dirs=(
+            None
+            if shard_dir is None
+            else {
+                process: os.path.join(shard_dir, process) for process in all_processes
+            }
+        ),
+        metrics_dir=metrics_dir,
+    )
+
+
+def _validate_batch_run_args(process_modes, pollutants=None):
+    """
+    Validate the (process, execution mode) pairs and the pollutants before starting
+    the workers.
+    """
+    for process, mode in process_modes:
+        get_process_stages(process, mode)
+    get_pollutant_cols(pollutants)
+
+
+def _get_batch_run_all_processes(
+    processes=None, running_mode="stepwise", pollutants=None
+):
+    """
+    Validate the arguments of batch_run_all and get the emission processes of
+    DB_TYPE_PROCESSES to run, limited to processes, if given.
+    """
+    if running_mode in DISTRICT_YEAR_MODES:
+        raise ValueError(
+            f"Execution mode {running_mode} isn't supported by batch_run_all. Use "
+            f"batch_run for the district-year modes."
+        )
+    all_processes = [
+        process
+        for db_processes in DB_TYPE_PROCESSES.values()
+        for process in db_processes
+        if processes is None or process in processes
+    ]
+    if processes is not None and set(processes) - set(all_processes):
+        raise ValueError(
+            f"Unknown emission processes: {set(processes) - set(all_processes)}."
+        )
+    _validate_batch_run_args([("running", running_mode)], pollutants)
+    return all_processes
+
+
+def _refresh_ref_data_cache():
+    """
+    Check the source tables of the reference data cache once in the parent and
+    rebuild the cache if they changed; workers build the missing slices on first
+    use.
+    """
+    if REF_DATA_CACHE.refresh_if_source_changed():
+        print("Reference data source tables changed. Rebuilding the cache.")
+        logging.info("Reference data source tables changed. Rebuilding the cache.")
+    REF_DATA_CACHE.close_conn()
+
+
+def _finish_batch_run(
+    report, n_workers, batch_start_time, shard_dirs=None, metrics_dir=None
+):
+    """
+    Merge the result shards ({process: shard_dir}) into the output tables, print the
+    metrics summary and the batch execution time, and return the report dataframe.
+    """
+    report_df = pd.DataFrame(
+        report, columns=["db_nm", "process", "status", "wall_time_s", "error"]
+    )
+    for process, shard_dir in (shard_dirs or {}).items():
+        if os.path.isdir(shard_dir):
+            merge_result_shards(process, shard_dir)
+    if metrics_dir is not None and os.path.isdir(metrics_dir):
+        print_metrics_summary(metrics_dir)
+    print(
+        "---Batch execution time with %s workers:  %s seconds ---"
+        % (n_workers, time.time() - batch_start_time)
+    )
+    logging.info(
+        "---Batch execution time with %s workers:  %s seconds ---"
+        % (n_workers, time.time() - batch_start_time)
+    )
+    return report_df
+
+
+def _process_db_work_item(db_nm, district_year_db_nms, process, **process_db_kwargs):
+    """process_db on a work item (db_nm, district_year_db_nms) of batch_run."""
+    return process_db(
+        process, db_nm, district_year_db_nms=district_year_db_nms, **process_db_kwargs
+    )
+
+
+def _run_batch(
+    run_work_item, work_items, n_workers, log_dir=None, log_process="", scheduler=None
+):
+    """
+    Run run_work_item(*work_item) on the work items (db_nm first) and yield the
+    results: serially in the current process for n_workers = 1, else in a pool of
+    n_workers worker processes as they complete, through the scheduler, if given.
+    run_work_item is pickled to the workers, e.g., a functools.partial of a
+    module-level function. The workers log to log_dir (see _init_worker_logging).
+    """
+    if n_workers == 1:
+        yield from itertools.starmap(run_work_item, work_items)
+        return
+    initializer, initargs = None, ()
+    if log_dir is not None:
+        initializer, initargs = _init_worker_logging, (log_dir, log_process)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers, initializer=initializer, initargs=initargs
+    ) as executor:
+
+        def submit(work_item):
+            return executor.submit(run_work_item, *work_item)
+
+        yield from _run_work_items(submit, work_items, n_workers, scheduler)
+
+
+def _run_work_items(submit, work_items, n_workers, scheduler=None):
+    """
+    Submit the work items (db_nm first) to the worker pool and yield the results as
+    they complete; through the scheduler, if given.
+    """
+    if scheduler is not None:
+        yield from scheduler.run(submit, work_items, n_workers)
+        return
+    futures = [submit(work_item) for work_item in work_items]
+    for future in concurrent.futures.as_completed(futures):
+        yield future.result()
+
+
+def parse_batch_run_args(process, argv=None):
+    """
+    Parse the command line options of the batch run scripts.
+    Parameters
+    ----------
+    process: str
+        Emission process: running, starts, idling, or extnidle.
+    argv: list
+        Command line arguments. sys.argv[1:] by default.
+    Returns
+    -------
+    argparse.Namespace
+        rerun_from_scratch: bool
+    """
+    parser = argparse.ArgumentParser(
+        description=f"Batch process the {process} emission rate data."
+    )
+    parser.add_argument(
+        "--rerun-from-scratch",
+        action="store_true",
+        help=(
+            "Process all databases, including the ones already present in the "
+            "output table, and clear the run manifest and the result shards."
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def _print_db_status(db_report, n_done, n_total):
+    print(
+        f"[{n_done}/{n_total}] {db_report['process']} {db_report['db_nm']}: "
+        f"{db_report['status']} in "
+        f"{db_report['wall_time_s']:.1f} seconds"
+    )
+    if db_report["error"] is not None:
+        print(f"    {db_report['error']}")
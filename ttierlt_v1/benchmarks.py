@@ -0,0 +1,497 @@
+"""
+Benchmarks of the SQL stages of the emission processes and of the year/ speed
+interpolation (ttierlt_v1.yr_spd_interpol) on fixed-size synthetic inputs. The SQL
+stages run on synthetic MOVES output databases (ttierlt_v1.synthetic_moves) in an
+embedded SQLite backend, so no MariaDB server is needed. Results are saved as JSON
+with the machine metadata, and compared against a saved baseline to flag regressions:
+    python -m ttierlt_v1.benchmarks run --output current.json
+    python -m ttierlt_v1.benchmarks compare baseline.json current.json
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import platform
+import itertools
+import subprocess
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+import scipy
+from ttierlt_v1.utils import PATH_INTERIM
+from ttierlt_v1.sql_backend import SqliteBackend
+from ttierlt_v1.pollutants import POLLUTANT_COLS
+from ttierlt_v1.batch_runner import get_process_stages
+from ttierlt_v1.synthetic_moves import (
+    generate_synthetic_db,
+    generate_synthetic_ref_data,
+)
+from ttierlt_v1.running.running_batch_sql import create_running_table_in_db
+from ttierlt_v1.starts.starts_batch_sql import create_starts_table_in_db
+from ttierlt_v1.idling.idling_batch_sql import create_idling_table_in_db
+from ttierlt_v1.extnidle.extnidle_batch_sql import create_extnidle_table_in_db
+from ttierlt_v1.yr_spd_interpol import (
+    out_yr_spd_interpolated,
+    agg_rates_over_yr,
+    pivot_df_reindex_for_qaqc,
+    AVG_SPEED_LIST,
+)
+
+PATH_BENCHMARKS = os.path.join(PATH_INTERIM, "benchmarks")
+"""Default directory of the benchmark results."""
+BENCHMARK_SIZES = {
+    "small": {
+        "pollutants": ("CO", "NOX", "VOC"),
+        "areas": ("El Paso", "Austin"),
+        "months": (1, 7),
+        "funclasses": ("Rural-Freeway", "Urban-Arterial"),
+    },
+    "full": {
+        "pollutants": None,
+        "areas": (
+            "El Paso",
+            "Austin",
+            "Beaumont",
+            "Corpus Christi",
+            "Dallas",
+            "Fort Worth",
+            "Houston",
+            "Waco",
+            "San Antonio",
+        ),
+        "months": tuple(range(1, 13)),
+        "funclasses": (
+            "Rural-Freeway",
+            "Rural-Arterial",
+            "Urban-Freeway",
+            "Urban-Arterial",
+        ),
+    },
+}
+"""
+Fixed input sizes. pollutants: output pollutants whose MOVES pollutants are in the
+synthetic databases (None for all). areas, months, funclasses: groups of the
+synthetic running_erlt_intermediate data of the interpolation benchmarks.
+"""
+BENCHMARK_DB_NMS = {
+    "county": "mvs14b_erlt_aus_48453_2020_7_cer_out",
+    "project": "mvs14b_erlt_aus_48453_2020_per_out",
+}
+"""Synthetic databases of the SQL stage benchmarks (Austin has TxLED)."""
+BENCHMARK_PROCESS_MODES = (
+    ("running", "stepwise", "county"),
+    ("running", "fused", "county"),
+    ("running", "weighted", "county"),
+    ("running", "numpy", "county"),
+    ("starts", "stepwise", "county"),
+    ("extnidle", "stepwise", "county"),
+    ("idling", "stepwise", "project"),
+)
+"""(process, mode, database level) of the SQL stage benchmarks."""
+CREATE_OUTPUT_TABLE_FUNCS = {
+    "running": create_running_table_in_db,
+    "starts": create_starts_table_in_db,
+    "idling": create_idling_table_in_db,
+    "extnidle": create_extnidle_table_in_db,
+}
+INTERPOLATION_ENGINES = ("numpy", "operator")
+BENCHMARK_SEED = 2026
+DEFAULT_THRESHOLD = 0.1
+"""Relative slowdown flagged as a regression (0.1: 10% slower than the baseline)."""
+DEFAULT_MIN_TIME_S = 0.01
+"""Benchmarks faster than this in the baseline and current results aren't flagged;
+their timings are mostly noise."""
+
+
+def get_machine_metadata():
+    """Machine, Python, library versions, and git commit of a benchmark run."""
+    try:
+        git_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_commit = None
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "pandas_version": pd.__version__,
+        "scipy_version": scipy.__version__,
+        "sqlite_version": sqlite3.sqlite_version,
+        "git_commit": git_commit,
+    }
+
+
+def _summarize_times(times_s):
+    return {
+        "times_s": times_s,
+        "min_s": min(times_s),
+        "median_s": float(np.median(times_s)),
+        "mean_s": float(np.mean(times_s)),
+    }
+
+
+def generate_benchmark_data(backend, size="small", seed=BENCHMARK_SEED):
+    """Create the reference data and the BENCHMARK_DB_NMS synthetic databases."""
+    generate_synthetic_ref_data(backend, seed)
+    for db_nm in BENCHMARK_DB_NMS.values():
+        generate_synthetic_db(
+            backend,
+            db_nm,
+            pollutants=BENCHMARK_SIZES[size]["pollutants"],
+            months=(7,),
+            seed=seed,
+        )
+
+
+def time_process_stages(backend, process, mode, db_nm, pollutants=None, repeats=3):
+    """
+    Time the stages of an emission process and mode (see
+    ttierlt_v1.batch_runner.get_process_stages) on db_nm. Each repeat recreates the
+    output table and runs all stages in order with a new run id.
+    Returns
+    -------
+    dict
+        {"<process>.<mode>.<stage>": [wall time in seconds per repeat]}, and the
+        total of the stages as "<process>.<mode>.total".
+    """
+    sql_cmds_class, stages = get_process_stages(process, mode)
+    stage_times = {}
+    for _ in range(repeats):
+        CREATE_OUTPUT_TABLE_FUNCS[process](
+            delete_if_exists=True, pollutants=pollutants, backend=backend
+        )
+        erlt_obj = sql_cmds_class(db_nm, pollutants=pollutants, backend=backend)
+        try:
+            total_time = 0
+            for stage, stage_kwargs in stages:
+                start_time = time.perf_counter()
+                erlt_obj.run_stage(stage, **stage_kwargs)
+                stage_time = time.perf_counter() - start_time
+                total_time += stage_time
+                stage_times.setdefault(f"{process}.{mode}.{stage}", []).append(
+                    stage_time
+                )
+            stage_times.setdefault(f"{process}.{mode}.total", []).append(total_time)
+        finally:
+            erlt_obj.close_conn()
+    return stage_times
+
+
+def get_intermediate_data(size="small", seed=BENCHMARK_SEED):
+    """
+    Synthetic data like mvs2014b_erlt_out.running_erlt_intermediate: even years from
+    2020 to 2050, 2.5 mph and the 5 mph speed bins, and the areas, months, and
+    functional classes of BENCHMARK_SIZES[size].
+    """
+    rng = np.random.default_rng(seed)
+    size_params = BENCHMARK_SIZES[size]
+    intermediate_data = pd.DataFrame(
+        itertools.product(
+            size_params["areas"],
+            size_params["months"],
+            size_params["funclasses"],
+            [2.5] + list(range(5, 80, 5)),
+            range(2020, 2051, 2),
+        ),
+        columns=["Area", "monthid", "funclass", "avgspeed", "yearid"],
+    )
+    intermediate_data[list(POLLUTANT_COLS)] = rng.random(
+        (len(intermediate_data), len(POLLUTANT_COLS))
+    )
+    return intermediate_data
+
+
+def time_interpolation(size="small", repeats=3):
+    """
+    Time the steps of ttierlt_v1.yr_spd_interpol on get_intermediate_data(size): the
+    year and speed interpolation with each of the INTERPOLATION_ENGINES,
+    agg_rates_over_yr, and pivot_df_reindex_for_qaqc.
+    Returns
+    -------
+    dict
+        {"yr_spd_interpol.<step>": [wall time in seconds per repeat]}.
+    """
+    intermediate_data = get_intermediate_data(size)
+    step_times = {}
+
+    def timed(step, func, **kwargs):
+        start_time = time.perf_counter()
+        result = func(**kwargs)
+        step_times.setdefault(f"yr_spd_interpol.{step}", []).append(
+            time.perf_counter() - start_time
+        )
+        return result
+
+    for _ in range(repeats):
+        for engine in INTERPOLATION_ENGINES:
+            data_yr_interpolated = timed(
+                f"out_yr_spd_interpolated.yearid.{engine}",
+                out_yr_spd_interpolated,
+                intermediate_data=intermediate_data,
+                interpolation_col_dict={
+                    "interpol_col": "yearid",
+                    "interpol_vals": list(np.arange(2020, 2051, 1)),
+                    "grpby_cols": ["Area", "monthid", "funclass", "avgspeed"],
+                },
+                engine=engine,
+            )
+            data_spd_interpolated = timed(
+                f"out_yr_spd_interpolated.avgspeed.{engine}",
+                out_yr_spd_interpolated,
+                intermediate_data=data_yr_interpolated,
+                interpolation_col_dict={
+                    "interpol_col": "avgspeed",
+                    "interpol_vals": AVG_SPEED_LIST,
+                    "grpby_cols": ["Area", "yearid", "monthid", "funclass"],
+                },
+                engine=engine,
+            )
+        timed(
+            "agg_rates_over_yr",
+            agg_rates_over_yr,
+            data=data_spd_interpolated,
+            grpby_cols=["Area", "yearid", "funclass", "avgspeed"],
+        )
+        timed(
+            "pivot_df_reindex_for_qaqc",
+            pivot_df_reindex_for_qaqc,
+            data=data_yr_interpolated,
+            pivot_index=["Area", "monthid", "funclass", "avgspeed"],
+        )
+    return step_times
+
+
+def run_benchmarks(size="small", repeats=3, data_dir=None, process_modes=None):
+    """
+    Run the SQL stage and interpolation benchmarks.
+    Parameters
+    ----------
+    size: str
+        Input size; see BENCHMARK_SIZES.
+    repeats: int
+        Number of timed repeats of each benchmark.
+    data_dir: str
+        Directory for the SQLite files of the synthetic databases. A temporary
+        directory (removed afterwards) by default.
+    process_modes: list-like
+        (process, mode, database level) to run; BENCHMARK_PROCESS_MODES by default.
+    Returns
+    -------
+    dict
+        metadata: get_machine_metadata, and the size, repeats, backend, and start
+        time of the run. benchmarks: {benchmark name: times_s (per repeat), min_s,
+        median_s, and mean_s}.
+    """
+    if size not in BENCHMARK_SIZES:
+        raise ValueError(f"size needs to be one of {list(BENCHMARK_SIZES)}.")
+    start_time = time.time()
+    metadata = {
+        **get_machine_metadata(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "size": size,
+        "repeats": repeats,
+        "backend": SqliteBackend.name,
+    }
+    pollutants = BENCHMARK_SIZES[size]["pollutants"]
+    benchmark_times = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        backend = SqliteBackend(tmp_dir if data_dir is None else data_dir)
+        generate_benchmark_data(backend, size)
+        for process, mode, db_level in (
+            BENCHMARK_PROCESS_MODES if process_modes is None else process_modes
+        ):
+            benchmark_times.update(
+                time_process_stages(
+                    backend,
+                    process,
+                    mode,
+                    BENCHMARK_DB_NMS[db_level],
+                    pollutants,
+                    repeats,
+                )
+            )
+    benchmark_times.update(time_interpolation(size, repeats))
+    print(
+        "---run_benchmarks execution time:  %s seconds---" % (time.time() - start_time)
+    )
+    logging.info(
+        "---run_benchmarks execution time:  %s seconds---" % (time.time() - start_time)
+    )
+    return {
+        "metadata": metadata,
+        "benchmarks": {
+            benchmark_nm: _summarize_times(times_s)
+            for benchmark_nm, times_s in benchmark_times.items()
+        },
+    }
+
+
+def save_benchmark_results(results, path):
+    """Save the run_benchmarks results as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+def load_benchmark_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def compare_benchmarks(
+    baseline,
+    current,
+    threshold=DEFAULT_THRESHOLD,
+    stat="median_s",
+    min_time_s=DEFAULT_MIN_TIME_S,
+):
+    """
+    Compare the benchmark times of current against baseline.
+    Parameters
+    ----------
+    baseline, current: dict
+        Results of run_benchmarks (see load_benchmark_results).
+    threshold: float
+        Relative change flagged as a regression (current slower than
+        baseline * (1 + threshold)) or an improvement (faster than
+        baseline * (1 - threshold)).
+    stat: str
+        Statistic compared: min_s, median_s, or mean_s.
+    min_time_s: float
+        Benchmarks with baseline and current times below min_time_s are ok.
+    Returns
+    -------
+    pd.DataFrame()
+        benchmark, baseline_s, current_s, ratio (current / baseline), and status:
+        regression, improvement, ok, new (not in baseline), or missing (not in
+        current).
+    """
+    comparison = pd.DataFrame(
+        {
+            "baseline_s": pd.Series(
+                {nm: bm[stat] for nm, bm in baseline["benchmarks"].items()},
+                dtype=float,
+            ),
+            "current_s": pd.Series(
+                {nm: bm[stat] for nm, bm in current["benchmarks"].items()},
+                dtype=float,
+            ),
+        }
+    )
+    comparison["ratio"] = comparison.current_s / comparison.baseline_s
+    comparison["status"] = np.select(
+        [
+            comparison.baseline_s.isna(),
+            comparison.current_s.isna(),
+            (comparison.baseline_s < min_time_s) & (comparison.current_s < min_time_s),
+            comparison.ratio > 1 + threshold,
+            comparison.ratio < 1 - threshold,
+        ],
+        ["new", "missing", "ok", "regression", "improvement"],
+        default="ok",
+    )
+    return comparison.rename_axis("benchmark").reset_index()
+
+
+def get_metadata_differences(baseline, current):
+    """Machine metadata (see get_machine_metadata) that differ between two runs:
+    {key: (baseline value, current value)}."""
+    keys = ("platform", "machine", "processor", "cpu_count", "python_version", "size")
+    return {
+        key: (baseline["metadata"].get(key), current["metadata"].get(key))
+        for key in keys
+        if baseline["metadata"].get(key) != current["metadata"].get(key)
+    }
+
+
+def parse_benchmark_args(argv=None):
+    """Parse the command line options of the run and compare commands."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the SQL stages and the year/ speed interpolation."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks.")
+    run_parser.add_argument(
+        "--size", choices=list(BENCHMARK_SIZES), default="small", help="Input size."
+    )
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument(
+        "--output",
+        default=None,
+        help="Results file. PATH_BENCHMARKS/benchmarks_<timestamp>.json by default.",
+    )
+    run_parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="Directory for the synthetic SQLite databases; temporary by default.",
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Flag the regressions of current against baseline."
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.add_argument(
+        "--stat", choices=["min_s", "median_s", "mean_s"], default="median_s"
+    )
+    compare_parser.add_argument(
+        "--min-time", type=float, default=DEFAULT_MIN_TIME_S, dest="min_time_s"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    Returns
+    -------
+    int
+        Exit code: 1 if compare finds regressions, else 0.
+    """
+    args = parse_benchmark_args(argv)
+    if args.command == "run":
+        output = args.output
+        if output is None:
+            output = os.path.join(
+                PATH_BENCHMARKS,
+                f"benchmarks_{datetime.datetime.now():%Y%m%d_%H%M%S}.json",
+            )
+        results = run_benchmarks(
+            size=args.size, repeats=args.repeats, data_dir=args.data_dir
+        )
+        save_benchmark_results(results, output)
+        print(f"Saved the benchmark results to {output}.")
+        return 0
+    baseline = load_benchmark_results(args.baseline)
+    current = load_benchmark_results(args.current)
+    for key, (baseline_val, current_val) in get_metadata_differences(
+        baseline, current
+    ).items():
+        print(f"Warning: {key} differs: {baseline_val} (baseline), {current_val}.")
+    comparison = compare_benchmarks(
+        baseline, current, args.threshold, args.stat, args.min_time_s
+    )
+    with pd.option_context("display.width", 160, "display.max_rows", None):
+        print(comparison.to_string(index=False))
+    n_regressions = (comparison.status == "regression").sum()
+    print(f"{n_regressions} regressions over {args.threshold:.0%}.")
+    return int(n_regressions > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Catalog of the MOVES output databases on the MariaDB server. Discovers the databases
+through information_schema and records the district, FIPS code, year, month, level
+(cer/ per), MOVES version, table row counts, on-disk size, and a CHECKSUM TABLE
+fingerprint of the emission rate tables of each database in a local SQLite file.
+Refreshes are incremental: only new databases and databases whose tables changed
+since the last refresh are checksummed again.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import sqlite3
+import pandas as pd
+from ttierlt_v1.utils import PATH_INTERIM, connect_to_server_db
+
+PATH_DB_CATALOG = os.path.join(PATH_INTERIM, "moves_db_catalog.sqlite")
+"""Default path of the catalog SQLite file."""
+MOVES_DB_PATTERNS = {
+    "cer": re.compile(
+        r"mvs14b_erlt_(?P<district_abb>\S{3})_(?P<fips>\d{5})_(?P<year>20\d{2})_"
+        r"(?P<month>\d{1,2})_cer_out"
+    ),
+    "per": re.compile(
+        r"mvs14b_erlt_(?P<district_abb>\S{3})_(?P<fips>\d{5})_(?P<year>20\d{2})_"
+        r"per_out"
+    ),
+}
+"""
+Database name patterns of the county level (cer) and project level (per) MOVES output
+databases; same as MovesDb.county_level_db and MovesDb.project_level_db.
+"""
+CHECKSUM_TABLES = ("rateperdistance", "rateperstart", "rateperhour", "movesoutput")
+"""Emission rate tables read by the batch runs. Fingerprinted with CHECKSUM TABLE."""
+DB_LEVELS = {"county": "cer", "project": "per"}
+"""get_db_nm_list db_type to catalog level."""
+
+
+def parse_db_nm(db_nm):
+    """
+    District abbreviation, FIPS code, year, month, and level of a MOVES output
+    database name. None if db_nm isn't a MOVES output database name.
+    """
+    for level, pattern in MOVES_DB_PATTERNS.items():
+        db_nm_match = re.fullmatch(pattern, db_nm)
+        if db_nm_match is not None:
+            month = db_nm_match.groupdict().get("month")
+            return {
+                "district_abb": db_nm_match["district_abb"],
+                "fips": db_nm_match["fips"],
+                "year": int(db_nm_match["year"]),
+                "month": None if month is None else int(month),
+                "level": level,
+            }
+    return None
+
+
+def get_server_tables(cur):
+    """
+    Tables of the MOVES output databases on the server from information_schema.
+    Returns
+    -------
+    pd.DataFrame()
+        db_nm, table_nm, row_count, size_bytes (data and index length), and
+        update_time (str).
+    """
+    cur.execute(
+        """
+        SELECT table_schema, table_name, table_rows, data_length + index_length,
+        update_time
+        FROM information_schema.tables
+        WHERE table_schema LIKE 'mvs14b_erlt_%_out' AND table_type = 'BASE TABLE';
+    """
+    )
+    server_tables = pd.DataFrame(
+        cur.fetchall(),
+        columns=["db_nm", "table_nm", "row_count", "size_bytes", "update_time"],
+    )
+    server_tables = server_tables.loc[
+        lambda df: df.db_nm.map(lambda db_nm: parse_db_nm(db_nm) is not None)
+    ]
+    return server_tables.assign(
+        update_time=lambda df: df.update_time.map(
+            lambda update_time: None if update_time is None else str(update_time)
+        )
+    ).reset_index(drop=True)
+
+
+def get_table_signature(db_tables):
+    """
+    Signature of the tables of a database from information_schema: number of tables,
+    total rows, total size, and last update time. A database is checksummed again
+    when its signature changes.
+    """
+    update_times = db_tables.update_time.dropna()
+    return (
+        f"{len(db_tables)}:{int(db_tables.row_count.fillna(0).sum())}:"
+        f"{int(db_tables.size_bytes.fillna(0).sum())}:"
+        f"{update_times.max() if len(update_times) else ''}"
+    )
+
+
+class DbCatalog:
+    """
+    SQLite store of the MOVES output databases and their tables. Each method opens its
+    own short-lived connection, like ttierlt_v1.run_manifest.RunManifest.
+    Parameters
+    ----------
+    path_catalog: str
+        Path to the SQLite file. Created if it doesn't exist.
+    """
+
+    def __init__(self, path_catalog=PATH_DB_CATALOG):
+        self.path_catalog = path_catalog
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS moves_dbs (
+                db_nm TEXT NOT NULL PRIMARY KEY,
+                district_abb TEXT,
+                fips TEXT,
+                year INTEGER,
+                month INTEGER,
+                level TEXT,
+                moves_version TEXT,
+                n_tables INTEGER,
+                row_count INTEGER,
+                size_bytes INTEGER,
+                update_time TEXT,
+                checksum TEXT,
+                signature TEXT,
+                refreshed_at REAL
+                );
+            """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS moves_db_tables (
+                db_nm TEXT NOT NULL,
+                table_nm TEXT NOT NULL,
+                row_count INTEGER,
+                size_bytes INTEGER,
+                update_time TEXT,
+                checksum INTEGER,
+                PRIMARY KEY (db_nm, table_nm)
+                );
+            """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path_catalog, timeout=60)
+
+    def get_signatures(self):
+        """{db_nm: table signature} recorded at the last refresh."""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT db_nm, signature FROM moves_dbs;"))
+
+    def refresh(self, cur=None, force=False):
+        """
+        Discover the MOVES output databases on the server and update the catalog.
+        New databases and databases whose table signature (see get_table_signature)
+        changed are checksummed; the others keep their recorded entry. Databases no
+        longer on the server are removed from the catalog.
+        Parameters
+        ----------
+        cur: mariadb.cursor
+            Cursor connected to the server. A connection is opened if None.
+        force: bool
+            True, to checksum all the databases.
+        Returns
+        -------
+        dict
+            Database names that were added, updated, and removed.
+        """
+        start_time = time.time()
+        conn = None
+        if cur is None:
+            conn = connect_to_server_db(database_nm=None)
+            cur = conn.cursor()
+        try:
+            server_tables = get_server_tables(cur)
+            recorded_signatures = self.get_signatures()
+            changes = {"added": [], "updated": [], "removed": []}
+            for db_nm, db_tables in server_tables.groupby("db_nm", sort=True):
+                signature = get_table_signature(db_tables)
+                if not force and recorded_signatures.get(db_nm) == signature:
+                    continue
+                self._record_db(cur, db_nm, db_tables, signature)
+                changes[
+                    "added" if db_nm not in recorded_signatures else "updated"
+                ].append(db_nm)
+            changes["removed"] = sorted(
+                set(recorded_signatures) - set(server_tables.db_nm)
+            )
+            with self._connect() as catalog_conn:
+                for db_nm in changes["removed"]:
+                    catalog_conn.execute(
+                        "DELETE FROM moves_dbs WHERE db_nm = ?;", (db_nm,)
+                    )
+                    catalog_conn.execute(
+                        "DELETE FROM moves_db_tables WHERE db_nm = ?;", (db_nm,)
+                    )
+        finally:
+            if conn is not None:
+                conn.close()
+        print("---refresh execution time:  %s seconds---" % (time.time() - start_time))
+        logging.info(
+            "---refresh execution time:  %s seconds---" % (time.time() - start_time)
+        )
+        return changes
+
+    def _record_db(self, cur, db_nm, db_tables, signature):
+        """Checksum the emission rate tables of db_nm and replace its entry."""
+        table_nms = set(db_tables.table_nm.str.lower())
+        checksums = {}
+        checksum_tables = [tbl for tbl in CHECKSUM_TABLES if tbl in table_nms]
+        if checksum_tables:
+            cur.execute(
+                f"CHECKSUM TABLE "
+                f"{', '.join(f'{db_nm}.{tbl}' for tbl in checksum_tables)};"
+            )
+            checksums = {
+                tbl_nm.split(".")[-1].lower(): checksum
+                for tbl_nm, checksum in cur.fetchall()
+            }
+        moves_version = None
+        if "movesrun" in table_nms:
+            cur.execute(f"SELECT MOVESVersion FROM {db_nm}.movesrun LIMIT 1;")
+            moves_version_row = cur.fetchone()
+            if moves_version_row is not None:
+                moves_version = moves_version_row[0]
+        # Fingerprint of the database: hash of the checksums of its emission rate
+        # tables.
+        fingerprint = hashlib.sha1(
+            ";".join(f"{tbl}:{checksums[tbl]}" for tbl in sorted(checksums)).encode()
+        ).hexdigest()
+        update_times = db_tables.update_time.dropna()
+        with self._connect() as catalog_conn:
+            catalog_conn.execute(
+                """
+                INSERT OR REPLACE INTO moves_dbs
+                (db_nm, district_abb, fips, year, month, level, moves_version,
+                n_tables, row_count, size_bytes, update_time, checksum, signature,
+                refreshed_at)
+                VALUES (:db_nm, :district_abb, :fips, :year, :month, :level,
+                :moves_version, :n_tables, :row_count, :size_bytes, :update_time,
+                :checksum, :signature, :refreshed_at);
+            """,
+                {
+                    "db_nm": db_nm,
+                    **parse_db_nm(db_nm),
+                    "moves_version": moves_version,
+                    "n_tables": len(db_tables),
+                    "row_count": int(db_tables.row_count.fillna(0).sum()),
+                    "size_bytes": int(db_tables.size_bytes.fillna(0).sum()),
+                    "update_time": update_times.max() if len(update_times) else None,
+                    "checksum": fingerprint,
+                    "signature": signature,
+                    "refreshed_at": time.time(),
+                },
+            )
+            catalog_conn.execute(
+                "DELETE FROM moves_db_tables WHERE db_nm = ?;", (db_nm,)
+            )
+            catalog_conn.executemany(
+                """
+                INSERT INTO moves_db_tables
+                (db_nm, table_nm, row_count, size_bytes, update_time, checksum)
+                VALUES (?, ?, ?, ?, ?, ?);
+            """,
+                [
+                    (
+                        db_nm,
+                        row.table_nm,
+                        None if pd.isna(row.row_count) else int(row.row_count),
+                        None if pd.isna(row.size_bytes) else int(row.size_bytes),
+                        row.update_time,
+                        checksums.get(row.table_nm.lower()),
+                    )
+                    for row in db_tables.itertuples()
+                ],
+            )
+
+    def get_dbs(self, level=None):
+        """Catalog entries (of the level cer or per, if given) as a dataframe."""
+        with self._connect() as conn:
+            if level is None:
+                return pd.read_sql("SELECT * FROM moves_dbs ORDER BY db_nm", conn)
+            return pd.read_sql(
+                "SELECT * FROM moves_dbs WHERE level = ? ORDER BY db_nm",
+                conn,
+                params=(level,),
+            )
+
+    def get_db_tables(self, db_nm=None):
+        """Table entries (of the database, if given) as a dataframe."""
+        with self._connect() as conn:
+            if db_nm is None:
+                return pd.read_sql("SELECT * FROM moves_db_tables", conn)
+            return pd.read_sql(
+                "SELECT * FROM moves_db_tables WHERE db_nm = ?", conn, params=(db_nm,)
+            )
+
+    def get_db_nm_list(self, district_abb="*", db_type="county"):
+        """
+        Catalog counterpart of ttierlt_v1.utils.get_db_nm_list. Doesn't touch the file
+        system or the server.
+        Parameters
+        ----------
+        district_abb: str
+            District abbreviation used while naming the MOVES output database. "*"
+            for all districts.
+        db_type: str
+            Database type: county or project
+        Returns
+        -------
+        list
+            Database names.
+        """
+        if db_type.lower() not in DB_LEVELS:
+            raise ValueError("db_type can be either 'project' or 'county'")
+        dbs = self.get_dbs(level=DB_LEVELS[db_type.lower()])
+        if district_abb != "*":
+            dbs = dbs.loc[lambda df: df.district_abb == district_abb]
+        return dbs.db_nm.tolist()
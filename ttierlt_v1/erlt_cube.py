@@ -0,0 +1,257 @@
+"""
+Dense array representation of the emission rate look-up tables. The rates are stored
+in a contiguous float64 array with one axis per dimension (e.g., Area, yearid,
+monthid, funclass, avgspeed) and a last axis for the pollutants.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import warnings
+import pandas as pd
+import numpy as np
+from ttierlt_v1.yr_spd_interpol import POLLUTANT_COLS, _interp_like_np_interp
+
+RUNNING_DIMS = ("Area", "yearid", "monthid", "funclass", "avgspeed")
+
+
+class ErltCube:
+    """
+    Emission rates as a dense float64 array with labelled axes. Combinations without
+    data are NaN.
+    Parameters
+    ----------
+    values: np.array
+        Emission rates with shape [len(coords[dim]) for dim in dims] +
+        [len(pollutant_cols)].
+    coords: dict
+        {dim: np.array of labels along dim}.
+    dims: tuple
+        Dimension names in the order of the axes of values.
+    pollutant_cols: tuple
+        Pollutant names along the last axis of values.
+    """
+
+    def __init__(self, values, coords, dims, pollutant_cols=POLLUTANT_COLS):
+        self.dims = tuple(dims)
+        self.pollutant_cols = tuple(pollutant_cols)
+        self.coords = {dim: np.asarray(coords[dim]) for dim in self.dims}
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        expected_shape = tuple(len(self.coords[dim]) for dim in self.dims) + (
+            len(self.pollutant_cols),
+        )
+        if self.values.shape != expected_shape:
+            raise ValueError(
+                f"values shape {self.values.shape} doesn't match the coords and "
+                f"pollutant_cols shape {expected_shape}."
+            )
+
+    @classmethod
+    def from_frame(cls, data, dims=RUNNING_DIMS, pollutant_cols=POLLUTANT_COLS):
+        """
+        Create the cube from a long dataframe similar to
+        mvs2014b_erlt_out.running_erlt_intermediate. Labels along each dimension are
+        sorted.
+        Parameters
+        ----------
+        data: pd.DataFrame()
+            Long data with dims and pollutant_cols columns. (dims) should be unique.
+        dims: tuple
+            Columns that form the axes of the cube.
+        pollutant_cols: tuple
+            Columns with emission rates by pollutants.
+        Returns
+        -------
+        ErltCube
+        """
+        codes, coords = [], {}
+        for dim in dims:
+            dim_codes, dim_labels = pd.factorize(data[dim], sort=True)
+            if (dim_codes == -1).any():
+                raise ValueError(f"{dim} has missing values.")
+            codes.append(dim_codes)
+            coords[dim] = np.asarray(dim_labels)
+        shape = tuple(len(coords[dim]) for dim in dims)
+        flat_codes = np.ravel_multi_index(codes, shape)
+        if len(np.unique(flat_codes)) != len(flat_codes):
+            raise ValueError(f"Data has duplicate rows for {list(dims)}.")
+        values = np.full((np.prod(shape, dtype=int), len(pollutant_cols)), np.nan)
+        values[flat_codes] = np.asarray(
+            data[list(pollutant_cols)].values, dtype=np.float64
+        )
+        return cls(
+            values.reshape(shape + (len(pollutant_cols),)),
+            coords,
+            dims,
+            pollutant_cols,
+        )
+
+    def to_frame(self, dropna=True):
+        """
+        Convert the cube to the long dataframe layout: dims columns followed by
+        pollutant_cols columns. The rates are copied, so modifying the dataframe
+        doesn't change values.
+        Parameters
+        ----------
+        dropna: bool
+            True, to drop the rows without data for any pollutant.
+        Returns
+        -------
+        pd.DataFrame()
+        """
+        shape = self.values.shape[:-1]
+        num_rows = int(np.prod(shape, dtype=int))
+        rates = self.values.reshape(num_rows, len(self.pollutant_cols))
+        dim_cols = {}
+        for axis, dim in enumerate(self.dims):
+            num_repeat = int(np.prod(shape[axis + 1 :], dtype=int))
+            num_tile = int(np.prod(shape[:axis], dtype=int))
+            dim_cols[dim] = np.tile(np.repeat(self.coords[dim], num_repeat), num_tile)
+        # The dict constructor copies the rates.
+        data = pd.DataFrame(
+            {
+                **dim_cols,
+                **{
+                    pollutant: rates[:, pollutant_idx]
+                    for pollutant_idx, pollutant in enumerate(self.pollutant_cols)
+                },
+            }
+        )
+        if dropna:
+            data = data.loc[~np.isnan(rates).all(axis=1)].reset_index(drop=True)
+        return data
+
+    @property
+    def nbytes(self):
+        """Memory used by the rates and the labels in bytes."""
+        return self.values.nbytes + sum(
+            labels.nbytes for labels in self.coords.values()
+        )
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def _label_positions(self, dim, labels):
+        positions = pd.Index(self.coords[dim]).get_indexer(np.atleast_1d(labels))
+        if (positions == -1).any():
+            raise KeyError(
+                f"{np.atleast_1d(labels)[positions == -1]} not in the {dim} labels."
+            )
+        return positions
+
+    def sel(self, pollutants=None, **labels):
+        """
+        Select by labels, e.g., cube.sel(Area="El Paso", yearid=[2020, 2022]). A scalar
+        label drops the dimension; a list of labels keeps it.
+        Parameters
+        ----------
+        pollutants: list
+            Subset of pollutant_cols. All pollutants are kept by default.
+        labels:
+            {dim: label or list of labels}.
+        Returns
+        -------
+        ErltCube
+        """
+        unknown_dims = set(labels) - set(self.dims)
+        if unknown_dims:
+            raise KeyError(f"{unknown_dims} not in the cube dims {self.dims}.")
+        index, dims, coords = [], [], {}
+        for dim in self.dims:
+            if dim not in labels:
+                index.append(slice(None))
+                dims.append(dim)
+                coords[dim] = self.coords[dim]
+            elif np.ndim(labels[dim]) == 0:
+                index.append(self._label_positions(dim, labels[dim])[0])
+            else:
+                positions = self._label_positions(dim, labels[dim])
+                index.append(positions)
+                dims.append(dim)
+                coords[dim] = self.coords[dim][positions]
+        pollutant_cols = self.pollutant_cols
+        if pollutants is not None:
+            pollutant_cols = tuple(pollutants)
+            index.append(
+                pd.Index(self.pollutant_cols).get_indexer(list(pollutant_cols))
+            )
+        values = self.values
+        # Index one axis at a time so that lists of labels select along each axis
+        # independently (outer indexing).
+        for axis, axis_index in reversed(list(enumerate(index))):
+            values = values[(slice(None),) * axis + (axis_index,)]
+        return ErltCube(values, coords, dims, pollutant_cols)
+
+    def reduce(self, dim, agg_func="max"):
+        """
+        Reduce over a dimension, e.g., max over monthid like agg_rates_over_yr.
+        Missing combinations are skipped.
+        Parameters
+        ----------
+        dim: str
+            Dimension to aggregate over.
+        agg_func: str
+            max or mean.
+        Returns
+        -------
+        ErltCube
+        """
+        agg_funcs = {"max": np.nanmax, "mean": np.nanmean}
+        if agg_func not in agg_funcs:
+            raise ValueError(f"agg_func only handles {list(agg_funcs)}.")
+        axis = self.dims.index(dim)
+        # All-NaN slices (combinations without data) stay NaN.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            values = agg_funcs[agg_func](self.values, axis=axis)
+        dims = tuple(dim_ for dim_ in self.dims if dim_ != dim)
+        return ErltCube(values, self.coords, dims, self.pollutant_cols)
+
+    def interpolate(self, dim, interpol_vals):
+        """
+        Linearly interpolate along yearid or avgspeed (using the inverse of average
+        speed) to interpol_vals. Same results as out_yr_spd_interpolated.
+        Parameters
+        ----------
+        dim: str
+            yearid or avgspeed.
+        interpol_vals: list
+            Labels along dim in the output.
+        Returns
+        -------
+        ErltCube
+        """
+        if dim == "yearid":
+            xp_all = np.asarray(self.coords[dim], dtype=np.float64)
+            x_new = np.asarray(interpol_vals, dtype=np.float64)
+        elif dim == "avgspeed":
+            xp_all = 1 / np.asarray(self.coords[dim], dtype=np.float64)
+            x_new = 1 / np.asarray(interpol_vals, dtype=np.float64)
+        else:
+            raise ValueError("interpolate only handles yearid and avgspeed.")
+        axis = self.dims.index(dim)
+        sort_order = np.argsort(xp_all, kind="mergesort")
+        xp_all = xp_all[sort_order]
+        values = np.moveaxis(self.values, axis, -2)[..., sort_order, :]
+        other_shape = values.shape[:-2]
+        values = values.reshape(-1, len(xp_all), len(self.pollutant_cols))
+        has_x_arr = ~np.isnan(values).all(axis=2)
+        interpolated = np.full(
+            (len(values), len(x_new), len(self.pollutant_cols)), np.nan
+        )
+        has_x_patterns, pattern_codes = np.unique(
+            has_x_arr, axis=0, return_inverse=True
+        )
+        for pattern_code, has_x in enumerate(has_x_patterns):
+            if not has_x.any():
+                continue
+            grp_idx = np.flatnonzero(pattern_codes.ravel() == pattern_code)
+            interpolated[grp_idx] = _interp_like_np_interp(
+                x_new=x_new, xp=xp_all[has_x], fp=values[grp_idx][:, has_x, :]
+            )
+        interpolated = np.moveaxis(
+            interpolated.reshape(other_shape + (len(x_new), len(self.pollutant_cols))),
+            -2,
+            axis,
+        )
+        coords = {**self.coords, dim: np.asarray(interpol_vals)}
+        return ErltCube(interpolated, coords, self.dims, self.pollutant_cols)
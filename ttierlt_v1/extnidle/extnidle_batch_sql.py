@@ -5,58 +5,81 @@ Created on: 01/29/2021
 """
 import time
 import pandas as pd
-import mariadb
 import os
 import numpy as np
 import logging
 from ttierlt_v1.movesdb import MovesDb
-from ttierlt_v1.utils import connect_to_server_db, get_db_nm_list, PATH_INTERIM_EXTNIDLE
+from ttierlt_v1.sql_backend import get_sql_backend
+from ttierlt_v1.pollutants import (
+    get_pollutant_cols,
+    get_pollutant_id_sql,
+    get_pollutant_pivot_sql,
+    get_pollutant_insert_cols_sql,
+    get_pollutant_ddl_sql,
+)
+from ttierlt_v1.utils import (
+    get_db_nm_list,
+    get_rate_col_type,
+    PATH_INTERIM_EXTNIDLE,
+)
 
+# Final schema of the Extnidlerate table. Area and Processtype are filled by
+# aggregate_extnidlerate_rateperhour; Hourmix, txledfac, and emisFact by the
+# UPDATE-JOIN passes.
+EXTNIDLERATE_COL_DEFS = {
+    "yearID": "SMALLINT UNSIGNED",
+    "monthid": "TINYINT UNSIGNED",
+    "hourID": "TINYINT UNSIGNED",
+    "pollutantID": "SMALLINT UNSIGNED",
+    "sourceTypeID": "TINYINT UNSIGNED",
+    "fuelTypeID": "TINYINT UNSIGNED",
+    "processid": "TINYINT UNSIGNED",
+    "rateperhour": "DOUBLE",
+    "Hourmix": "FLOAT",
+    "Area": "CHAR(25)",
+    "Processtype": "CHAR(25)",
+    "txledfac": "FLOAT(6)",
+    "emisFact": "FLOAT",
+}
 
-def create_extnidle_table_in_db(delete_if_exists=False):
+
+def create_extnidle_table_in_db(
+    delete_if_exists=False, rate_col_type="decimal", pollutants=None, backend=None
+):
     """
     Create  mvs2014b_erlt_out.extnidle_erlt_intermediate table for storing output.
     Parameters
     ----------
     delete_if_exists: Delete the existing mvs2014b_erlt_out.extnidle_erlt_intermediate
     table (if it exists).
+    rate_col_type: Type of the pollutant columns: decimal (DECIMAL(23,19)) or double
+    (DOUBLE). See ttierlt_v1.utils.check_rate_col_type_precision.
+    pollutants: Output pollutant columns; see ttierlt_v1.pollutants. None for
+    POLLUTANT_COLS.
+    backend: SQL backend; see ttierlt_v1.sql_backend. None for get_sql_backend().
     """
     # delete_if_exists: Check if we want to delete the previous stored table
-    conn = connect_to_server_db(database_nm=None)
+    rate_col = get_rate_col_type(rate_col_type)
+    if backend is None:
+        backend = get_sql_backend()
+    conn = backend.connect(database_nm=None)
     cur = conn.cursor()
     if delete_if_exists:
         cur.execute(
             "DROP TABLE  IF EXISTS mvs2014b_erlt_out.extnidle_erlt_intermediate"
         )
     cur.execute(
-        """
+        f"""
         CREATE TABLE mvs2014b_erlt_out.extnidle_erlt_intermediate (
-        `Area` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-        `yearid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `monthid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `Processtype` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-        `CO` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NOX` DECIMAL(23,19) NULL DEFAULT NULL,
-        `SO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `VOC` DECIMAL(23,19) NULL DEFAULT NULL,
-        `CO2EQ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM10` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM25` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BENZ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NAPTH` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BUTA` DECIMAL(23,19) NULL DEFAULT NULL,
-        `FORM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACTE` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACROL` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ETYB` DECIMAL(23,19) NULL DEFAULT NULL,
-        `DPM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `POM` DECIMAL(23,19) NULL DEFAULT NULL,
+        `Area` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
+        `yearid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `monthid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `Processtype` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
+        {get_pollutant_ddl_sql(rate_col, pollutants)},
         CONSTRAINT extnidle_erlt_intermediate_pk PRIMARY KEY (Area, yearid, monthid, 
         Processtype)
         )
-        COLLATE='utf8_unicode_ci'
-        ENGINE=MyISAM;
+        {backend.output_table_options_sql};
     """
     )
     conn.close()
@@ -66,14 +89,31 @@ def create_extnidle_table_in_db(delete_if_exists=False):
 class ExtnidleSqlCmds(MovesDb):
     """
     Class to execute SQL commands for extended idling emission process.
+    Parameters
+    ----------
+    db_nm_: str
+        MOVES output database name.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS. Only
+        the MOVES pollutants of the subset are read from rateperhour.
+    run_id: str
+        Suffix of the scratch tables of this run in the scratch schema; see
+        ttierlt_v1.movesdb.get_run_id. None for a random run id.
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        SQL backend. None for ttierlt_v1.sql_backend.get_sql_backend().
     """
 
     sourcetypedict = {"Combination Long-haul Truck": 62}
 
-    def __init__(self, db_nm_):
-        super().__init__(db_nm_=db_nm_)
+    def __init__(self, db_nm_, pollutants=None, run_id=None, backend=None):
+        super().__init__(db_nm_=db_nm_, run_id=run_id, backend=backend)
+        self.pollutants = get_pollutant_cols(pollutants)
+        self.pollutant_id_sql = get_pollutant_id_sql(self.pollutants)
+        self.pollutant_pivot_sql = get_pollutant_pivot_sql(self.pollutants)
         self.head_extnidlerate_df = pd.DataFrame()
         self.hourmix_extidle = pd.DataFrame()
+        self.extnidlerate_tbl = self.get_scratch_tbl("Extnidlerate")
+        self.hourmix_extidle_tbl = self.get_scratch_tbl("hourmix_extidle")
         self.created_all_indices = False
 
     def aggregate_extnidlerate_rateperhour(self, debug=True):
@@ -81,7 +121,9 @@ class ExtnidleSqlCmds(MovesDb):
         Script creates the required extended idling rate table from MOVES output
         databases. Only required pollutants are selected based on the rateperhour
         output table. Emission rates are summed yearID,monthid,hourID, pollutantID,
-        sourceTypeID, fuelTypeID, processid.
+        sourceTypeID, fuelTypeID, processid. The table is created with its final
+        schema (EXTNIDLERATE_COL_DEFS) and Area and Processtype are added in the same
+        INSERT ... SELECT.
         Parameters
         ----------
         debug: bool
@@ -93,75 +135,50 @@ class ExtnidleSqlCmds(MovesDb):
             extnidlerate if debug=True.
         """
         start_time = time.time()
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute("DROP TABLE  IF EXISTS Extnidlerate;")
-        cmd_agg_extnidlerate = f"""
-                CREATE TABLE Extnidlerate
+        self.create_scratch_table(
+            tbl_nm=self.extnidlerate_tbl,
+            col_defs=EXTNIDLERATE_COL_DEFS,
+            insert_cols=(
+                "yearID",
+                "monthid",
+                "hourID",
+                "pollutantID",
+                "sourceTypeID",
+                "fuelTypeID",
+                "processid",
+                "rateperhour",
+                "Area",
+                "Processtype",
+            ),
+            select_sql=f"""
                 SELECT yearID, monthid, hourID, pollutantID, sourceTypeID, fuelTypeID, 
-                processid,sum(ratePerHour) as rateperhour 
+                processid,sum(ratePerHour) as rateperhour,
+                {self.sql_var("analysis_district")} AS Area,
+                CASE WHEN processid IN (17,90) THEN 'Extnd_Exhaust'
+                WHEN processid = 91 THEN 'APU' END AS Processtype
                 FROM rateperhour
-                WHERE pollutantid in (2,3,31,33,87,98,100,110,20, 23, 185,24,25,26,27,
-                41,68,69,70,71, 72, 73, 74, 75, 76, 77, 78, 81, 82, 83, 84, 168, 169, 
-                170, 171,172, 173, 174, 175, 176, 177,178, 181, 182, 183, 184) 
+                WHERE pollutantid in ({self.pollutant_id_sql}) 
                 and sourceTypeID = {self.sourcetypedict["Combination Long-haul Truck"]}
                 group by yearID,monthid,hourID, pollutantID, sourceTypeID, fuelTypeID, 
                 processid;
-            """
-        try:
-            # FixMe: Make the pollutants a user entered parameter for the class
-            self.cur.execute(cmd_agg_extnidlerate)
-        except mariadb.InternalError as intererr:
-            self.cur.execute("REPAIR TABLE rateperhour")
-            self.cur.execute(cmd_agg_extnidlerate)
-
-        except mariadb.OperationalError as operr:
-            self.cur.execute("REPAIR TABLE rateperhour")
-            self.cur.execute(cmd_agg_extnidlerate)
-
-        self._update_extnidlerate_rateperhour()
+            """,
+            repair_tbls=("rateperhour",),
+        )
         logging.info(
-            "---aggregate_extnidlerate_rateperhour and _update_extnidlerate_rateperhour"
-            " execution time:  %s seconds "
+            "---aggregate_extnidlerate_rateperhour execution time:  %s seconds "
             "---" % (time.time() - start_time)
         )
         if debug:
             self.head_extnidlerate_df = pd.read_sql(
-                f"SELECT * FROM Extnidlerate LIMIT 5", self.conn
+                f"SELECT * FROM {self.extnidlerate_tbl} LIMIT 5", self.conn
             )
             print(
-                "---aggregate_extnidlerate_rateperhour and "
-                "_update_extnidlerate_rateperhour execution time:  %s seconds "
+                "---aggregate_extnidlerate_rateperhour execution time:  %s seconds "
                 "---" % (time.time() - start_time)
             )
             return self.head_extnidlerate_df
         return pd.DataFrame()
 
-    def _update_extnidlerate_rateperhour(self):
-        """
-        Function to add necessary fields to the rate table and populate it with
-        apprropriate data.
-        """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(
-            """
-            ALTER TABLE Extnidlerate
-            ADD COLUMN Hourmix float,
-            ADD COLUMN Area char(25),
-            ADD COLUMN Processtype char(25),
-            ADD COLUMN txledfac float(6),
-            ADD COLUMN emisFact float;
-        """
-        )
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute("""Update Extnidlerate SET Area = @analysis_district;""")
-        self.cur.execute(
-            "UPDATE Extnidlerate "
-            "SET Processtype = 'Extnd_Exhaust' WHERE Processid in (17,90);"
-        )
-        self.cur.execute(
-            "UPDATE Extnidlerate SET Processtype = 'APU' WHERE Processid = 91;"
-        )
-
     def get_hourmix_extidle(self):
         """
         -- Function creates the hour-mix table from the MOVES default database
@@ -170,18 +187,22 @@ class ExtnidleSqlCmds(MovesDb):
         -- If MOVES model version is updated by EPA, MOVES default schema referenced
         here need to be changed.
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute("DROP TABLE  IF EXISTS hourmix_extidle;")
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE  IF EXISTS {self.hourmix_extidle_tbl};")
         self.cur.execute(
-            f"""
-            CREATE TABLE hourmix_extidle
+            self.backend.create_table_as_sql(
+                self.hourmix_extidle_tbl,
+                f"""
             SELECT a.hourID,b.hotellingdist from {self.moves2014b_db_nm}.hourday a
             JOIN {self.moves2014b_db_nm}.sourcetypehour b on 
             a.hourdayid = b.hourdayid
             where a.dayid = '5';
-        """
+        """,
+            )
+        )
+        self.hourmix_extidle = pd.read_sql(
+            f"SELECT * FROM {self.hourmix_extidle_tbl}", self.conn
         )
-        self.hourmix_extidle = pd.read_sql(f"SELECT * FROM hourmix_extidle", self.conn)
         self.test_hourmix_extidle()
         return self.hourmix_extidle
 
@@ -194,27 +215,27 @@ class ExtnidleSqlCmds(MovesDb):
     def create_indices_before_joins(self):
         """Create indices for all tables before join to speed-up the join."""
         try:
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS extnidleidx1 ON Extnidlerate (hourID);"""
+            self.backend.create_index(
+                self.cur, "extnidleidx1", self.extnidlerate_tbl, "hourID"
             )
-            self.cur.execute(
-                """
-            CREATE INDEX IF NOT EXISTS hrmix_extidx1 ON hourmix_extidle (hourID);"""
+            self.backend.create_index(
+                self.cur, "hrmix_extidx1", self.hourmix_extidle_tbl, "hourID"
             )
             if self.use_txled:
-                self.cur.execute(
-                    "CREATE INDEX IF NOT EXISTS extnidleidx2 "
-                    "ON Extnidlerate (pollutantid, sourcetypeid, fueltypeid);"
+                self.backend.create_index(
+                    self.cur,
+                    "extnidleidx2",
+                    self.extnidlerate_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
-                self.cur.execute(
-                    f"""
-                    CREATE INDEX IF NOT EXISTS txledidx1 
-                    ON txled_long_{self.analysis_year} 
-                    (pollutantid, sourcetypeid, fueltypeid);
-                """
+                self.backend.create_index(
+                    self.cur,
+                    "txledidx1",
+                    self.txled_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
             self.created_all_indices = True
-        except mariadb.ProgrammingError as mdberr:
+        except self.backend.programming_errors as mdberr:
             print(mdberr)
             print(
                 "Run aggregate_extnidlerate_rateperhour, get_hourmix_extidle, "
@@ -230,34 +251,42 @@ class ExtnidleSqlCmds(MovesDb):
         """
         start_time = time.time()
         if self.created_all_indices:
-            self.cur.execute("FLUSH TABLES;")
+            self.backend.flush_tables(self.cur)
             self.cur.execute(
-                """
-                UPDATE Extnidlerate a
-                JOIN hourmix_extidle b
-                ON a.hourID = b.hourID
-                SET a.Hourmix = b.hotellingdist;
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.extnidlerate_tbl,
+                    alias="a",
+                    join_tbl_nm=self.hourmix_extidle_tbl,
+                    join_alias="b",
+                    on_sql="a.hourID = b.hourID",
+                    set_cols={"Hourmix": "b.hotellingdist"},
+                )
             )
             if self.use_txled:
                 self.cur.execute(
-                    f"""
-                    UPDATE Extnidlerate a
-                    LEFT JOIN txled_long_{self.analysis_year}  d  ON
-                    a.pollutantid = d.pollutantid AND
-                    a.sourcetypeid = d.sourcetypeid AND
-                    a.fueltypeid = d.fueltypeid
-                    SET a.txledfac = d.txled_fac;
-                """
+                    self.backend.update_join_sql(
+                        tbl_nm=self.extnidlerate_tbl,
+                        alias="a",
+                        join_tbl_nm=self.txled_tbl,
+                        join_alias="d",
+                        on_sql="""
+                        a.pollutantid = d.pollutantid AND
+                        a.sourcetypeid = d.sourcetypeid AND
+                        a.fueltypeid = d.fueltypeid""",
+                        set_cols={"txledfac": "d.txled_fac"},
+                        left_join=True,
+                    )
                 )
                 self.cur.execute(
                     f"""
-                    UPDATE Extnidlerate
+                    UPDATE {self.extnidlerate_tbl}
                     SET txledfac = 1.0 WHERE txledfac IS NULL;
                 """
                 )
             else:
-                self.cur.execute(f"""UPDATE Extnidlerate SET txledfac = 1.0;""")
+                self.cur.execute(
+                    f"""UPDATE {self.extnidlerate_tbl} SET txledfac = 1.0;"""
+                )
         else:
             print(
                 "Run create_indices_before_joins to speed-up joins. Will not run this "
@@ -278,9 +307,23 @@ class ExtnidleSqlCmds(MovesDb):
         TxLED factor for counties where TxLED
         program is active in a county (or majority of county of a district.)"""
         self.cur.execute(
-            """UPDATE Extnidlerate SET emisFact = rateperhour*HourMix*txledfac;"""
+            f"UPDATE {self.extnidlerate_tbl} "
+            f"SET emisFact = rateperhour*HourMix*txledfac;"
         )
 
+    def get_agg_select_sql(self):
+        """
+        SELECT statement that aggregates (sums) the Extnidlerate table to the rows of
+        mvs2014b_erlt_out.extnidle_erlt_intermediate. Used by agg_by_processtype and
+        agg_by_processtype_to_shard.
+        """
+        return f"""
+            SELECT Area, yearid, monthid, Processtype,
+            {self.pollutant_pivot_sql}
+            FROM {self.extnidlerate_tbl}
+            GROUP BY yearid, monthid, Processtype;
+        """
+
     def agg_by_processtype(
         self, add_seperate_conflicted_copy=False, conflicted_copy_suffix=""
     ):
@@ -291,41 +334,17 @@ class ExtnidleSqlCmds(MovesDb):
         mvs2014_erlt_conflicted schema.
         """
         start_time = time.time()
-        cmd_insert = """
+        cmd_insert = f"""
                 INSERT INTO mvs2014b_erlt_out.extnidle_erlt_intermediate( Area, yearid, 
                 monthid, Processtype, 
-                CO, NOX, SO2, NO2, VOC, CO2EQ, PM10, PM25, BENZ, NAPTH, BUTA, FORM, 
-                ACTE, ACROL, ETYB, DPM, POM)
+                {get_pollutant_insert_cols_sql(self.pollutants)})
         """
-        cmd_create_conflicted = (
-            f"CREATE TABLE mvs2014b_erlt_conflicted.extnidle"
+        conflicted_tbl = (
+            f"mvs2014b_erlt_conflicted.extnidle"
             f"_{self.district_abb}_{self.analysis_year}_"
             f"{self.anaylsis_month}_{conflicted_copy_suffix}"
         )
-        cmd_common = """
-            SELECT Area, yearid, monthid, Processtype,
-            SUM(IF(pollutantid = 2, emisfact, 0)) AS CO,
-            SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,
-            SUM(IF(pollutantid = 31, emisfact, 0)) AS SO2,
-            SUM(IF(pollutantid = 33, emisfact, 0)) AS NO2,
-            SUM(IF(pollutantid = 87, emisfact, 0)) AS VOC,
-            SUM(IF(pollutantid = 98, emisfact, 0)) AS CO2EQ,
-            SUM(IF(pollutantid = 100, emisfact, 0)) AS PM10,
-            SUM(IF(pollutantid = 110, emisfact, 0)) AS PM25,
-            SUM(IF(pollutantid = 20, emisfact, 0)) AS BENZ,
-            SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,
-            SUM(IF(pollutantid = 24, emisfact, 0)) AS BUTA,
-            SUM(IF(pollutantid = 25, emisfact, 0)) AS FORM,
-            SUM(IF(pollutantid = 26, emisfact, 0)) AS ACTE,
-            SUM(IF(pollutantid = 27, emisfact, 0)) AS ACROL,
-            SUM(IF(pollutantid = 41, emisfact, 0)) AS ETYB,
-            SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM,
-            SUM(IF(pollutantid IN (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78,
-            81, 82, 83, 84, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177,
-            178, 181, 182, 183, 184), emisfact, 0)) AS POM
-            FROM Extnidlerate
-            GROUP BY yearid, monthid, Processtype;
-        """
+        cmd_common = self.get_agg_select_sql()
         try:
             cmd_insert_agg = cmd_insert + cmd_common
             if not add_seperate_conflicted_copy:
@@ -336,7 +355,9 @@ class ExtnidleSqlCmds(MovesDb):
                     f"{self.analysis_year}, "
                     f"{self.anaylsis_month} in mvs2014b_erlt_conflicted for review."
                 )
-                cmd_create_agg = cmd_create_conflicted + cmd_common
+                cmd_create_agg = self.backend.create_table_as_sql(
+                    conflicted_tbl, cmd_common
+                )
                 self.cur.execute(
                     f"DROP TABLE IF EXISTS mvs2014b_erlt_conflicted.extnidle"
                     f"_{self.district_abb}_{self.analysis_year}"
@@ -351,7 +372,7 @@ class ExtnidleSqlCmds(MovesDb):
                 "---agg_by_processtype execution time:  %s seconds---"
                 % (time.time() - start_time)
             )
-        except mariadb.IntegrityError as integerityrr:
+        except self.backend.integrity_errors as integerityrr:
             print(integerityrr)
             print(
                 "Re-create the mvs2014b_erlt_out.extnidle_erlt_intermediate "
@@ -363,10 +384,19 @@ class ExtnidleSqlCmds(MovesDb):
                 f"you are trying to overwrite"
             )
             raise
-        except mariadb.ProgrammingError as programmingerr:
+        except self.backend.programming_errors as programmingerr:
             print(programmingerr)
             raise
 
+    def agg_by_processtype_to_shard(self, shard_dir):
+        """
+        Write the rows of agg_by_processtype to a result shard in shard_dir instead of
+        mvs2014b_erlt_out.extnidle_erlt_intermediate. See ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_agg_select_sql()
+        )
+
 
 if __name__ == "__main__":
     path_to_log_dir = os.path.join(PATH_INTERIM_EXTNIDLE, "Log Files")
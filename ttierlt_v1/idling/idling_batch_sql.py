@@ -5,58 +5,85 @@ Created on: 01/31/2021
 """
 import time
 import pandas as pd
-import mariadb
 import os
 import numpy as np
 import logging
 from ttierlt_v1.movesdb import MovesDb
-from ttierlt_v1.utils import connect_to_server_db, get_db_nm_list, PATH_INTERIM_IDLING
+from ttierlt_v1.sql_backend import get_sql_backend
+from ttierlt_v1.pollutants import (
+    get_pollutant_cols,
+    get_pollutant_id_sql,
+    get_pollutant_pivot_sql,
+    get_pollutant_insert_cols_sql,
+    get_pollutant_ddl_sql,
+)
+from ttierlt_v1.ref_data_cache import REF_DATA_CACHE
+from ttierlt_v1.utils import (
+    get_db_nm_list,
+    get_rate_col_type,
+    PATH_INTERIM_IDLING,
+)
 
+# Final schema of the idlerate table. period and Area are filled by
+# aggregate_idlerate_movesoutput; stypemix, idlerate, VMTmix, txledfac, and emisfact by
+# the UPDATE-JOIN passes.
+IDLERATE_COL_DEFS = {
+    "yearid": "SMALLINT UNSIGNED",
+    "monthid": "TINYINT UNSIGNED",
+    "hourid": "TINYINT UNSIGNED",
+    "countyid": "INT UNSIGNED",
+    "linkid": "INT UNSIGNED",
+    "pollutantid": "SMALLINT UNSIGNED",
+    "sourcetypeid": "TINYINT UNSIGNED",
+    "fueltypeid": "TINYINT UNSIGNED",
+    "emission": "DOUBLE",
+    "stypemix": "FLOAT",
+    "idlerate": "FLOAT",
+    "period": "CHAR(2)",
+    "Area": "CHAR(25)",
+    "VMTmix": "FLOAT",
+    "txledfac": "FLOAT(6)",
+    "emisfact": "FLOAT",
+}
 
-def create_idling_table_in_db(delete_if_exists=False):
+
+def create_idling_table_in_db(
+    delete_if_exists=False, rate_col_type="decimal", pollutants=None, backend=None
+):
     """
     Create  mvs2014b_erlt_out.idling_erlt_intermediate table for storing output.
     Parameters
     ----------
     delete_if_exists: Delete the existing mvs2014b_erlt_out.idling_erlt_intermediate
     table (if it exists).
+    rate_col_type: Type of the pollutant columns: decimal (DECIMAL(23,19)) or double
+    (DOUBLE). See ttierlt_v1.utils.check_rate_col_type_precision.
+    pollutants: Output pollutant columns; see ttierlt_v1.pollutants. None for
+    POLLUTANT_COLS.
+    backend: SQL backend; see ttierlt_v1.sql_backend. None for get_sql_backend().
     """
     # delete_if_exists: Check if we want to delete the previous stored table
-    conn = connect_to_server_db(database_nm=None)
+    rate_col = get_rate_col_type(rate_col_type)
+    if backend is None:
+        backend = get_sql_backend()
+    conn = backend.connect(database_nm=None)
     cur = conn.cursor()
     if delete_if_exists:
         cur.execute("DROP TABLE  IF EXISTS mvs2014b_erlt_out.idling_erlt_intermediate")
         # TODO: Add code to create output table
     cur.execute(
-        """
+        f"""
         CREATE TABLE mvs2014b_erlt_out.idling_erlt_intermediate (
-        `Area` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-        `yearid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `monthid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `hourid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `period` CHAR(2) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-        `CO` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NOX` DECIMAL(23,19) NULL DEFAULT NULL,
-        `SO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `VOC` DECIMAL(23,19) NULL DEFAULT NULL,
-        `CO2EQ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM10` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM25` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BENZ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NAPTH` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BUTA` DECIMAL(23,19) NULL DEFAULT NULL,
-        `FORM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACTE` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACROL` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ETYB` DECIMAL(23,19) NULL DEFAULT NULL,
-        `DPM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `POM` DECIMAL(23,19) NULL DEFAULT NULL,
+        `Area` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
+        `yearid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `monthid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `hourid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `period` CHAR(2) NULL DEFAULT NULL{backend.collate_sql},
+        {get_pollutant_ddl_sql(rate_col, pollutants)},
         CONSTRAINT idling_erlt_intermediate_pk PRIMARY KEY (Area, yearid, monthid, 
         hourid, period)
         )
-        COLLATE='utf8_unicode_ci'
-        ENGINE=MyISAM; 
+        {backend.output_table_options_sql}; 
         """
     )
     conn.close()
@@ -66,14 +93,35 @@ def create_idling_table_in_db(delete_if_exists=False):
 class IdlingSqlCmds(MovesDb):
     """
     Class to execute SQL commands for idling emission process.
+    Parameters
+    ----------
+    db_nm_: str
+        MOVES output database name.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS. Only
+        the MOVES pollutants of the subset are read from movesoutput.
+    run_id: str
+        Suffix of the scratch tables of this run in the scratch schema; see
+        ttierlt_v1.movesdb.get_run_id. None for a random run id.
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        SQL backend. None for ttierlt_v1.sql_backend.get_sql_backend().
     """
 
-    def __init__(self, db_nm_):
-        super().__init__(db_nm_=db_nm_)
+    def __init__(self, db_nm_, pollutants=None, run_id=None, backend=None):
+        super().__init__(db_nm_=db_nm_, run_id=run_id, backend=backend)
+        self.pollutants = get_pollutant_cols(pollutants)
+        self.pollutant_id_sql = get_pollutant_id_sql(self.pollutants)
+        self.pollutant_pivot_sql = get_pollutant_pivot_sql(self.pollutants)
         self.moves2014b_db_nm = "movesdb20181022"
         self.head_idlerate_df = pd.DataFrame()
         self.houridlemix = pd.DataFrame()
         self.sutmix = pd.DataFrame()
+        # SUT-mix table and the filter used in the join. Point to the cached VMT-mix
+        # table when get_sutmix is called with use_cache=True.
+        self.sutmix_tbl = self.get_scratch_tbl("SUTmix")
+        self.sutmix_join_filter = ""
+        self.idlerate_tbl = self.get_scratch_tbl("idlerate")
+        self.houridlemix_tbl = self.get_scratch_tbl("houridlemix")
         self.created_all_indices = False
         self.PROJECT_HOUR_PERIOD_MAP = {"AM": 8, "PM": 18, "MD": 15, "ON": 23}
 
@@ -84,7 +132,8 @@ class IdlingSqlCmds(MovesDb):
         Emission are summed overyearid,monthid,hourid,pollutantid,sourcetypeid,
         fueltypeid. Note: Emission are initially not in rates. E.g. NOX is still
         in grams. We will use houridlemix to convert the emission quantity into
-        rates.
+        rates. The table is created with its final schema (IDLERATE_COL_DEFS) and
+        period and Area are added in the same INSERT ... SELECT.
         Parameters
         ----------
         debug: bool
@@ -96,70 +145,53 @@ class IdlingSqlCmds(MovesDb):
             idlerate if debug=True.
         """
         start_time = time.time()
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(f"DROP TABLE  IF EXISTS idlerate;")
-        cmd_agg_idlerate = """--
-            CREATE TABLE idlerate (SELECT yearid, monthid,hourid,countyid,
-            linkid,pollutantid,sourcetypeid,fueltypeid,sum(emissionquant)as emission 
+        period_case = " ".join(
+            f"WHEN {hourid} THEN '{period_val}'"
+            for period_val, hourid in self.PROJECT_HOUR_PERIOD_MAP.items()
+        )
+        self.create_scratch_table(
+            tbl_nm=self.idlerate_tbl,
+            col_defs=IDLERATE_COL_DEFS,
+            insert_cols=(
+                "yearid",
+                "monthid",
+                "hourid",
+                "countyid",
+                "linkid",
+                "pollutantid",
+                "sourcetypeid",
+                "fueltypeid",
+                "emission",
+                "period",
+                "Area",
+            ),
+            select_sql=f"""
+            SELECT yearid, monthid,hourid,countyid,
+            linkid,pollutantid,sourcetypeid,fueltypeid,sum(emissionquant)as emission,
+            CASE hourid {period_case} END AS period,
+            {self.sql_var("analysis_district")} AS Area
             FROM movesoutput
+            WHERE pollutantid in ({self.pollutant_id_sql})
             GROUP BY yearid,monthid,hourid,countyid,roadtypeid,linkid,pollutantid,
-            sourcetypeid,fueltypeid);
-            """
-        try:
-            # FixMe: Make the pollutants a user entered parameter for the class
-            self.cur.execute(cmd_agg_idlerate)
-        except mariadb.InternalError as intererr:
-            self.cur.execute("REPAIR TABLE movesoutput")
-            self.cur.execute(cmd_agg_idlerate)
-
-        except mariadb.OperationalError as operr:
-            self.cur.execute("REPAIR TABLE movesoutput")
-            self.cur.execute(cmd_agg_idlerate)
-
-        self._update_idlerate_movesoutput()
+            sourcetypeid,fueltypeid;
+            """,
+            repair_tbls=("movesoutput",),
+        )
         logging.info(
-            "---aggregate_idlerate_movesoutput and _update_idlerate_movesoutput "
-            "execution time:  %s seconds "
+            "---aggregate_idlerate_movesoutput execution time:  %s seconds "
             "---" % (time.time() - start_time)
         )
         if debug:
             self.head_idlerate_df = pd.read_sql(
-                f"SELECT * FROM idlerate LIMIT 5", self.conn
+                f"SELECT * FROM {self.idlerate_tbl} LIMIT 5", self.conn
             )
             print(
-                "---aggregate_idlerate_movesoutput and _update_idlerate_movesoutput "
-                "execution time:  %s seconds "
+                "---aggregate_idlerate_movesoutput execution time:  %s seconds "
                 "---" % (time.time() - start_time)
             )
             return self.head_idlerate_df
         return pd.DataFrame()
 
-    def _update_idlerate_movesoutput(self):
-        """
-        Function to add necessary fields to the rate table and populate it with
-        apprropriate data.
-        """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(
-            """
-            ALTER TABLE idlerate
-            ADD COLUMN stypemix float,
-            ADD COLUMN idlerate float,
-            ADD COLUMN period char(2),
-            ADD COLUMN Area char(25),
-            ADD COLUMN VMTmix float,
-            ADD COLUMN txledfac float(6),
-            ADD COLUMN emisfact float;
-        """
-        )
-        self.cur.execute("UPDATE idlerate SET Area =  @analysis_district;")
-        for period_val, hourid in self.PROJECT_HOUR_PERIOD_MAP.items():
-            cmd_period_hourid = f"""
-                UPDATE idlerate SET period = '{period_val}' 
-                WHERE hourid = {hourid};
-            """
-            self.cur.execute(cmd_period_hourid)
-
     def get_houridlemix(self):
         """
         Get the fraction of an hour idling for different fuel type for all vehicle
@@ -172,18 +204,23 @@ class IdlingSqlCmds(MovesDb):
         for 1 hour = X / 0.9 grams / hour
         Note: Activity type id = 4 is source operating hour.
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(f"DROP TABLE IF EXISTS houridlemix;")
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {self.houridlemix_tbl};")
         self.cur.execute(
-            """
-            CREATE TABLE houridlemix (SELECT yearid,monthid,hourid,
+            self.backend.create_table_as_sql(
+                self.houridlemix_tbl,
+                """
+            SELECT yearid,monthid,hourid,
             linkid,sourcetypeid,fueltypeid,sum(activity)as vmx 
             FROM movesactivityoutput
             WHERE activitytypeid = 4 AND activity > 0
-            GROUP BY yearid,monthid,hourid,countyid,linkid,sourcetypeid,fueltypeid);
-        """
+            GROUP BY yearid,monthid,hourid,countyid,linkid,sourcetypeid,fueltypeid;
+        """,
+            )
+        )
+        self.houridlemix = pd.read_sql(
+            f"SELECT * FROM {self.houridlemix_tbl}", self.conn
         )
-        self.houridlemix = pd.read_sql(f"SELECT * FROM houridlemix", self.conn)
         self.test_houridlemix()
         return self.houridlemix
 
@@ -197,24 +234,43 @@ class IdlingSqlCmds(MovesDb):
             1,
         )
 
-    def get_sutmix(self):
+    def get_sutmix(self, use_cache=False):
         # TODO: Check why did we filter to  vmx_rdcode = 5 (Urban unrestricted)
         """
         Get the fraction of different vehicle/ source types based on the
         vmtmix_fy20.todmix vmx_rdcode = 5 (Urban unrestricted)
+        Parameters
+        ----------
+        use_cache: bool
+            True, to join to the VMT-mix table in the process-wide reference data
+            cache (filtered to vmx_rdcode = 5 in the join) instead of creating
+            SUTmix in the scratch schema.
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(f"DROP TABLE IF EXISTS SUTmix;")
+        if use_cache:
+            self.sutmix_tbl, vmtmix = REF_DATA_CACHE.get_vmtmix(
+                self.area_district, self.analysis_year_todmix
+            )
+            self.sutmix_join_filter = "AND b.VMX_RDcode = 5"
+            self.sutmix = vmtmix.loc[vmtmix.VMX_RDcode == 5].reset_index(drop=True)
+            self.test_sutmix()
+            return self.sutmix
+        self.sutmix_tbl = self.get_scratch_tbl("SUTmix")
+        self.sutmix_join_filter = ""
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {self.sutmix_tbl};")
         self.cur.execute(
-            """
-            CREATE TABLE SUTmix 
+            self.backend.create_table_as_sql(
+                self.sutmix_tbl,
+                f"""
             SELECT * FROM vmtmix_fy20.todmix 
-            WHERE TxDOT_Dist = @analysis_district  
-            AND Daytype = "Weekday" AND YearID = @analysis_year_todmix 
+            WHERE TxDOT_Dist = {self.sql_var("analysis_district")}  
+            AND Daytype = 'Weekday' 
+            AND YearID = {self.sql_var("analysis_year_todmix")} 
             AND VMX_RDcode = 5;
-        """
+        """,
+            )
         )
-        self.sutmix = pd.read_sql(f"SELECT * FROM SUTmix", self.conn)
+        self.sutmix = pd.read_sql(f"SELECT * FROM {self.sutmix_tbl}", self.conn)
         self.test_sutmix()
         return self.sutmix
 
@@ -227,36 +283,47 @@ class IdlingSqlCmds(MovesDb):
     def create_indices_before_joins(self):
         """Create indices for all tables before join to speed-up the join."""
         try:
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS idleidx1
-                ON idlerate (monthid, hourid, linkid, sourcetypeid, fueltypeid);"""
+            self.backend.create_index(
+                self.cur,
+                "idleidx1",
+                self.idlerate_tbl,
+                "monthid, hourid, linkid, sourcetypeid, fueltypeid",
             )
-            self.cur.execute(
-                f"""CREATE INDEX IF NOT EXISTS  houridlemix_idx1 
-                ON houridlemix (monthid, hourid, linkid, sourcetypeid, fueltypeid);"""
+            self.backend.create_index(
+                self.cur,
+                "houridlemix_idx1",
+                self.houridlemix_tbl,
+                "monthid, hourid, linkid, sourcetypeid, fueltypeid",
             )
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS idleidx2 
-                ON idlerate (period, sourcetypeID, fueltypeID);"""
-            )
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS sutmixidx1 
-                ON SUTmix (period, MOVES_STcode, MOVES_FTcode);"""
+            self.backend.create_index(
+                self.cur,
+                "idleidx2",
+                self.idlerate_tbl,
+                "period, sourcetypeID, fueltypeID",
             )
+            if self.sutmix_tbl == self.get_scratch_tbl("SUTmix"):
+                # The cached VMT-mix table already has an index on these columns.
+                self.backend.create_index(
+                    self.cur,
+                    "sutmixidx1",
+                    self.sutmix_tbl,
+                    "period, MOVES_STcode, MOVES_FTcode",
+                )
             if self.use_txled:
-                self.cur.execute(
-                    """CREATE INDEX IF NOT EXISTS  idleidx3 
-                    ON idlerate (pollutantid, sourcetypeid, fueltypeid);"""
+                self.backend.create_index(
+                    self.cur,
+                    "idleidx3",
+                    self.idlerate_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
-                self.cur.execute(
-                    f"""
-                    CREATE INDEX IF NOT EXISTS txledidx1 
-                    ON txled_long_{self.analysis_year}
-                    (pollutantid, sourcetypeid, fueltypeid);
-                """
+                self.backend.create_index(
+                    self.cur,
+                    "txledidx1",
+                    self.txled_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
             self.created_all_indices = True
-        except mariadb.ProgrammingError as mdberr:
+        except self.backend.programming_errors as mdberr:
             print(mdberr)
             print(
                 "Run aggregate_idlerate_movesoutput, get_houridlemix, "
@@ -272,48 +339,59 @@ class IdlingSqlCmds(MovesDb):
         """
         start_time = time.time()
         if self.created_all_indices:
-            self.cur.execute("FLUSH TABLES;")
+            self.backend.flush_tables(self.cur)
             self.cur.execute(
-                f"""
-                UPDATE idlerate A
-                JOIN houridlemix B ON
-                (A.monthid = B.monthid AND
-                A.hourid = B.hourid AND
-                A.linkid = B.linkid AND
-                A.sourcetypeid = B.sourcetypeid AND
-                A.fueltypeid = B.fueltypeid)
-                SET A.stypemix = B.vmx;
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.idlerate_tbl,
+                    alias="A",
+                    join_tbl_nm=self.houridlemix_tbl,
+                    join_alias="B",
+                    on_sql="""
+                    (A.monthid = B.monthid AND
+                    A.hourid = B.hourid AND
+                    A.linkid = B.linkid AND
+                    A.sourcetypeid = B.sourcetypeid AND
+                    A.fueltypeid = B.fueltypeid)""",
+                    set_cols={"stypemix": "B.vmx"},
+                )
             )
             self.cur.execute(
-                f"""
-                UPDATE idlerate a
-                JOIN SUTmix  b ON
-                a.period = b.period AND
-                a.sourcetypeID = b.MOVES_STcode AND
-                a.fueltypeID = b.MOVES_FTcode 
-                SET a.VMTmix = b.VMTmix;
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.idlerate_tbl,
+                    alias="a",
+                    join_tbl_nm=self.sutmix_tbl,
+                    join_alias="b",
+                    on_sql=f"""
+                    a.period = b.period AND
+                    a.sourcetypeID = b.MOVES_STcode AND
+                    a.fueltypeID = b.MOVES_FTcode 
+                    {self.sutmix_join_filter}""",
+                    set_cols={"VMTmix": "b.VMTmix"},
+                )
             )
             if self.use_txled:
                 self.cur.execute(
-                    f"""
-                    UPDATE idlerate a
-                    LEFT JOIN txled_long_{self.analysis_year} d  ON
-                    a.pollutantid = d.pollutantid AND
-                    a.sourcetypeid = d.sourcetypeid AND
-                    a.fueltypeid = d.fueltypeid
-                    SET a.txledfac = d.txled_fac;
-                """
+                    self.backend.update_join_sql(
+                        tbl_nm=self.idlerate_tbl,
+                        alias="a",
+                        join_tbl_nm=self.txled_tbl,
+                        join_alias="d",
+                        on_sql="""
+                        a.pollutantid = d.pollutantid AND
+                        a.sourcetypeid = d.sourcetypeid AND
+                        a.fueltypeid = d.fueltypeid""",
+                        set_cols={"txledfac": "d.txled_fac"},
+                        left_join=True,
+                    )
                 )
                 self.cur.execute(
                     f"""
-                    UPDATE idlerate
+                    UPDATE {self.idlerate_tbl}
                     SET txledfac = 1.0 WHERE txledfac IS NULL;
                 """
                 )
             else:
-                self.cur.execute(f"""UPDATE idlerate SET txledfac = 1.0;""")
+                self.cur.execute(f"""UPDATE {self.idlerate_tbl} SET txledfac = 1.0;""")
         else:
             print(
                 "Run create_indices_before_joins to speed-up joins. Will not run this "
@@ -346,8 +424,25 @@ class IdlingSqlCmds(MovesDb):
         in if the TxLED program is active in a county (or majority of county of a
         district
         """
-        self.cur.execute("UPDATE idlerate SET idlerate = emission / stypemix ;")
-        self.cur.execute("UPDATE idlerate SET emisfact = idlerate * VMTmix * txledfac;")
+        self.cur.execute(
+            f"UPDATE {self.idlerate_tbl} SET idlerate = emission / stypemix ;"
+        )
+        self.cur.execute(
+            f"UPDATE {self.idlerate_tbl} SET emisfact = idlerate * VMTmix * txledfac;"
+        )
+
+    def get_agg_select_sql(self):
+        """
+        SELECT statement that aggregates (sums) the idlerate table to the rows of
+        mvs2014b_erlt_out.idling_erlt_intermediate. Used by agg_by_hourid_period and
+        agg_by_hourid_period_to_shard.
+        """
+        return f"""
+                SELECT Area,yearid,monthid,hourid,period,
+                {self.pollutant_pivot_sql}
+                FROM {self.idlerate_tbl}
+                GROUP BY Area,yearid,monthid,hourid,period;
+        """
 
     def agg_by_hourid_period(
         self, add_seperate_conflicted_copy=False, conflicted_copy_suffix=""
@@ -359,41 +454,17 @@ class IdlingSqlCmds(MovesDb):
         in mvs2014_erlt_conflicted schema.
         """
         start_time = time.time()
-        cmd_insert = """
+        cmd_insert = f"""
                 INSERT INTO mvs2014b_erlt_out.idling_erlt_intermediate(Area, yearid, 
                 monthid,hourid,period,
-                CO, NOX, SO2, NO2, VOC, CO2EQ, PM10, PM25, BENZ, NAPTH, BUTA, FORM, 
-                ACTE, ACROL, ETYB, DPM, POM)
+                {get_pollutant_insert_cols_sql(self.pollutants)})
         """
-        cmd_create_conflicted = (
-            f"CREATE TABLE mvs2014b_erlt_conflicted.idling"
+        conflicted_tbl = (
+            f"mvs2014b_erlt_conflicted.idling"
             f"_{self.district_abb}_{self.analysis_year}_"
             f"{conflicted_copy_suffix}"
         )
-        cmd_common = """
-                SELECT Area,yearid,monthid,hourid,period,
-                SUM(IF(pollutantid = 2, emisfact, 0)) AS CO,
-                SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,
-                SUM(IF(pollutantid = 31, emisfact, 0)) AS SO2,
-                SUM(IF(pollutantid = 33, emisfact, 0)) AS NO2,
-                SUM(IF(pollutantid = 87, emisfact, 0)) AS VOC,
-                SUM(IF(pollutantid = 98, emisfact, 0)) AS CO2EQ,
-                SUM(IF(pollutantid = 100, emisfact, 0)) AS PM10,
-                SUM(IF(pollutantid = 110, emisfact, 0)) AS PM25,
-                SUM(IF(pollutantid = 20, emisfact, 0)) AS BENZ,
-                SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,
-                SUM(IF(pollutantid = 24, emisfact, 0)) AS BUTA,
-                SUM(IF(pollutantid = 25, emisfact, 0)) AS FORM,
-                SUM(IF(pollutantid = 26, emisfact, 0)) AS ACTE,
-                SUM(IF(pollutantid = 27, emisfact, 0)) AS ACROL,
-                SUM(IF(pollutantid = 41, emisfact, 0)) AS ETYB,
-                SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM,
-                SUM(IF(pollutantid IN (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78,
-                81, 82, 83, 84, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177,
-                178, 181, 182, 183, 184), emisfact, 0)) AS POM
-                FROM idlerate
-                GROUP BY Area,yearid,monthid,hourid,period;
-        """
+        cmd_common = self.get_agg_select_sql()
         try:
             cmd_insert_agg = cmd_insert + cmd_common
             if not add_seperate_conflicted_copy:
@@ -404,7 +475,9 @@ class IdlingSqlCmds(MovesDb):
                     f"{self.district_abb}, {self.analysis_year}, "
                     f" in mvs2014b_erlt_conflicted for review."
                 )
-                cmd_create_agg = cmd_create_conflicted + cmd_common
+                cmd_create_agg = self.backend.create_table_as_sql(
+                    conflicted_tbl, cmd_common
+                )
                 self.cur.execute(
                     f"DROP TABLE IF EXISTS mvs2014b_erlt_conflicted.idling"
                     f"_{self.district_abb}_{self.analysis_year}"
@@ -419,7 +492,7 @@ class IdlingSqlCmds(MovesDb):
                 "---agg_by_hourid_period execution time:  %s seconds---"
                 % (time.time() - start_time)
             )
-        except mariadb.IntegrityError as integerityrr:
+        except self.backend.integrity_errors as integerityrr:
             print(integerityrr)
             print(
                 "Re-create the mvs2014b_erlt_out.idling_erlt_intermediate table if you"
@@ -432,6 +505,15 @@ class IdlingSqlCmds(MovesDb):
             )
             raise
 
+    def agg_by_hourid_period_to_shard(self, shard_dir):
+        """
+        Write the rows of agg_by_hourid_period to a result shard in shard_dir instead of
+        mvs2014b_erlt_out.idling_erlt_intermediate. See ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_agg_select_sql()
+        )
+
 
 if __name__ == "__main__":
     path_to_log_dir = os.path.join(PATH_INTERIM_IDLING, "Log Files")
@@ -0,0 +1,321 @@
+"""
+MOVES output lake: the columns of the MOVES output tables used by the emission
+processes, exported once from the MariaDB server to zstd-compressed Parquet files
+partitioned by level (cer/ per), district, year, and month, together with the
+reference data (VMT-mix, hour-mix, and TxLED factors). Reruns and what-if analyses
+read the lake with column pruning and predicate pushdown (pyarrow.dataset) instead
+of re-reading the MyISAM tables through the server; see
+ttierlt_v1.running.running_lake_engine.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import json
+import time
+import logging
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from ttierlt_v1.utils import PATH_INTERIM, connect_to_server_db
+from ttierlt_v1.movesdb import MovesDb
+
+PATH_MOVES_LAKE = os.path.join(PATH_INTERIM, "moves_lake")
+"""Default directory of the MOVES output lake."""
+LAKE_TABLE_SCHEMAS = {
+    "rateperdistance": pa.schema(
+        [
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+            ("hourid", pa.int16()),
+            ("roadtypeid", pa.int16()),
+            ("pollutantid", pa.int16()),
+            ("sourcetypeid", pa.int16()),
+            ("fueltypeid", pa.int16()),
+            ("avgSpeedBinID", pa.int16()),
+            ("processid", pa.int16()),
+            ("rateperdistance", pa.float32()),
+        ]
+    ),
+    "rateperstart": pa.schema(
+        [
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+            ("hourid", pa.int16()),
+            ("pollutantid", pa.int16()),
+            ("sourcetypeid", pa.int16()),
+            ("fueltypeid", pa.int16()),
+            ("processid", pa.int16()),
+            ("rateperstart", pa.float32()),
+        ]
+    ),
+    "rateperhour": pa.schema(
+        [
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+            ("hourid", pa.int16()),
+            ("pollutantid", pa.int16()),
+            ("sourcetypeid", pa.int16()),
+            ("fueltypeid", pa.int16()),
+            ("processid", pa.int16()),
+            ("rateperhour", pa.float32()),
+        ]
+    ),
+    "movesoutput": pa.schema(
+        [
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+            ("hourid", pa.int16()),
+            ("countyid", pa.int32()),
+            ("roadtypeid", pa.int16()),
+            ("linkid", pa.int32()),
+            ("pollutantid", pa.int16()),
+            ("sourcetypeid", pa.int16()),
+            ("fueltypeid", pa.int16()),
+            ("processid", pa.int16()),
+            ("emissionquant", pa.float32()),
+        ]
+    ),
+    "movesactivityoutput": pa.schema(
+        [
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+            ("hourid", pa.int16()),
+            ("countyid", pa.int32()),
+            ("linkid", pa.int32()),
+            ("sourcetypeid", pa.int16()),
+            ("fueltypeid", pa.int16()),
+            ("activitytypeid", pa.int16()),
+            ("activity", pa.float32()),
+        ]
+    ),
+}
+"""Columns (and Parquet types) of the MOVES output tables exported to the lake."""
+LAKE_PARTITIONING = ds.partitioning(
+    pa.schema(
+        [
+            ("level", pa.string()),
+            ("district", pa.string()),
+            ("fips", pa.string()),
+            ("yearid", pa.int16()),
+            ("monthid", pa.int16()),
+        ]
+    ),
+    flavor="hive",
+)
+"""
+Partitions of the lake tables, e.g., rateperdistance/level=cer/district=elp/
+fips=48141/yearid=2020/monthid=1. yearid and monthid are the columns of the MOVES
+output tables, so the project level databases are split by month.
+"""
+LAKE_REF_TABLES = {
+    "todmix": "vmtmix_fy20.todmix",
+    "hourmix": "vmtmix_fy20.hourmix",
+    "txled_long": "txled_db.txled_long",
+}
+"""Reference data tables exported to the ref directory of the lake."""
+EXPORT_BATCH_ROWS = 500_000
+"""Rows fetched from the server and written per record batch."""
+
+
+def get_lake_table_dir(lake_dir, table_nm):
+    """Directory of the partitioned lake table table_nm."""
+    return os.path.join(lake_dir, table_nm)
+
+
+def get_export_marker_path(lake_dir, db_nm):
+    """Marker written after all the tables of db_nm are exported."""
+    return os.path.join(lake_dir, "_exported", f"{db_nm}.json")
+
+
+def get_export_schema(table_nm):
+    """Schema of the record batches exported from table_nm: the table columns and
+    the level, district, and fips partition columns."""
+    return pa.schema(
+        list(LAKE_TABLE_SCHEMAS[table_nm])
+        + [
+            pa.field("level", pa.string()),
+            pa.field("district", pa.string()),
+            pa.field("fips", pa.string()),
+        ]
+    )
+
+
+def _fetch_record_batches(cur, table_nm, partition_vals, batch_rows, row_counter):
+    """Record batches of the rows of the last SELECT with the partition columns."""
+    export_schema = get_export_schema(table_nm)
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            return
+        row_counter[table_nm] += len(rows)
+        arrays = [
+            pa.array(column, type=field.type)
+            for column, field in zip(zip(*rows), LAKE_TABLE_SCHEMAS[table_nm])
+        ]
+        arrays += [
+            pa.array([partition_val] * len(rows), type=pa.string())
+            for partition_val in partition_vals
+        ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=export_schema)
+
+
+def export_db_to_lake(db_nm, lake_dir=PATH_MOVES_LAKE, table_nms=None):
+    """
+    Stream the LAKE_TABLE_SCHEMAS columns of the MOVES output tables of db_nm into the
+    lake. Existing files of the database are overwritten, so the export can be
+    rerun.
+    Parameters
+    ----------
+    db_nm: str
+        MOVES output database name.
+    lake_dir: str
+        Lake directory.
+    table_nms: list-like
+        Tables to export. All tables of LAKE_TABLE_SCHEMAS present in the database by
+        default.
+    Returns
+    -------
+    dict
+        {table name: rows exported}.
+    """
+    start_time = time.time()
+    moves_db = MovesDb(db_nm, connect=False)
+    level = "cer" if moves_db.db_nm_county_year_month_dict["month_id"] else "per"
+    partition_vals = (
+        level,
+        moves_db.district_abb,
+        moves_db.db_nm_county_year_month_dict["fips"],
+    )
+    conn = connect_to_server_db(database_nm=db_nm)
+    try:
+        cur = conn.cursor()
+        cur.execute("SHOW TABLES;")
+        db_table_nms = {table_nm.lower() for (table_nm,) in cur.fetchall()}
+        if table_nms is None:
+            table_nms = [tbl for tbl in LAKE_TABLE_SCHEMAS if tbl in db_table_nms]
+        exported_rows = {table_nm: 0 for table_nm in table_nms}
+        for table_nm in table_nms:
+            schema = LAKE_TABLE_SCHEMAS[table_nm]
+            # Unbuffered cursor: the rows are streamed in record batches instead of
+            # being held in memory.
+            cur = conn.cursor(buffered=False)
+            cur.execute(f"SELECT {', '.join(schema.names)} FROM {table_nm};")
+            ds.write_dataset(
+                _fetch_record_batches(
+                    cur, table_nm, partition_vals, EXPORT_BATCH_ROWS, exported_rows
+                ),
+                base_dir=get_lake_table_dir(lake_dir, table_nm),
+                schema=get_export_schema(table_nm),
+                format="parquet",
+                partitioning=LAKE_PARTITIONING,
+                basename_template=f"{db_nm}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                file_options=ds.ParquetFileFormat().make_write_options(
+                    compression="zstd"
+                ),
+            )
+    finally:
+        conn.close()
+    marker_path = get_export_marker_path(lake_dir, db_nm)
+    os.makedirs(os.path.dirname(marker_path), exist_ok=True)
+    with open(marker_path, "w") as marker_file:
+        json.dump({"exported_at": time.time(), "rows": exported_rows}, marker_file)
+    print(
+        "---export_db_to_lake %s execution time:  %s seconds---"
+        % (db_nm, time.time() - start_time)
+    )
+    logging.info(
+        "---export_db_to_lake %s execution time:  %s seconds---"
+        % (db_nm, time.time() - start_time)
+    )
+    return exported_rows
+
+
+def export_ref_data_to_lake(lake_dir=PATH_MOVES_LAKE):
+    """Export the LAKE_REF_TABLES to lake_dir/ref/<name>.parquet (zstd)."""
+    conn = connect_to_server_db(database_nm=None)
+    try:
+        os.makedirs(os.path.join(lake_dir, "ref"), exist_ok=True)
+        for ref_nm, ref_table in LAKE_REF_TABLES.items():
+            cur = conn.cursor()
+            cur.execute(f"SELECT * FROM {ref_table};")
+            columns = [desc[0] for desc in cur.description]
+            ref_data = pa.Table.from_pylist(
+                [dict(zip(columns, row)) for row in cur.fetchall()]
+            )
+            pq.write_table(
+                ref_data,
+                os.path.join(lake_dir, "ref", f"{ref_nm}.parquet"),
+                compression="zstd",
+            )
+    finally:
+        conn.close()
+
+
+def export_moves_lake(db_nms, lake_dir=PATH_MOVES_LAKE, overwrite=False):
+    """
+    Export the reference data and the MOVES output databases to the lake. Databases
+    with an export marker are skipped unless overwrite is True.
+    Returns
+    -------
+    list
+        Exported database names.
+    """
+    export_ref_data_to_lake(lake_dir)
+    exported_db_nms = []
+    for db_nm in db_nms:
+        if not overwrite and os.path.exists(get_export_marker_path(lake_dir, db_nm)):
+            continue
+        export_db_to_lake(db_nm, lake_dir)
+        exported_db_nms.append(db_nm)
+    return exported_db_nms
+
+
+def read_lake_table(lake_dir, table_nm, columns, filter_expr=None):
+    """
+    Read the columns of a lake table with column pruning and predicate pushdown.
+    Parameters
+    ----------
+    lake_dir: str
+        Lake directory.
+    table_nm: str
+        Table of LAKE_TABLE_SCHEMAS.
+    columns: list-like
+        Columns to read; partition columns (level, district, fips, yearid, monthid)
+        are allowed.
+    filter_expr: pyarrow.dataset.Expression
+        Row filter, e.g., get_db_filter(db_nm) & (ds.field("pollutantid") == 2).
+        Filters on the partition columns skip the files of other partitions.
+    Returns
+    -------
+    pyarrow.Table
+    """
+    return ds.dataset(
+        get_lake_table_dir(lake_dir, table_nm),
+        format="parquet",
+        partitioning=LAKE_PARTITIONING,
+    ).to_table(columns=list(columns), filter=filter_expr)
+
+
+def get_db_filter(db_nm):
+    """Partition filter selecting the rows of the MOVES output database db_nm."""
+    moves_db = MovesDb(db_nm, connect=False)
+    month_id = moves_db.db_nm_county_year_month_dict["month_id"]
+    filter_expr = (
+        (ds.field("level") == ("cer" if month_id else "per"))
+        & (ds.field("district") == moves_db.district_abb)
+        & (ds.field("fips") == moves_db.db_nm_county_year_month_dict["fips"])
+        & (ds.field("yearid") == moves_db.analysis_year)
+    )
+    if month_id:
+        filter_expr &= ds.field("monthid") == int(month_id)
+    return filter_expr
+
+
+def read_lake_ref_data(lake_dir, ref_nm, filter_expr=None):
+    """Reference data ref_nm (see LAKE_REF_TABLES) as a pd.DataFrame()."""
+    return (
+        ds.dataset(os.path.join(lake_dir, "ref", f"{ref_nm}.parquet"), format="parquet")
+        .to_table(filter=filter_expr)
+        .to_pandas()
+    )
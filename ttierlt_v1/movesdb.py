@@ -2,13 +2,71 @@
 Common MOVES output database attributes and function.
 """
 import re
+import time
+import uuid
+import hashlib
+import logging
 import pandas as pd
-from ttierlt_v1.utils import connect_to_server_db
+from ttierlt_v1.utils import SCRATCH_SCHEMA, RUN_ID_LEN
+from ttierlt_v1.sql_backend import get_sql_backend
+from ttierlt_v1.ref_data_cache import REF_DATA_CACHE
+from ttierlt_v1.result_shards import write_shard
+from ttierlt_v1.stage_metrics import InstrumentedCursor
+
+# Columns of the TxLED table of get_txled; same types as the cached TxLED table of
+# ttierlt_v1.ref_data_cache.
+TXLED_COL_DEFS = {
+    "pollutantid": "SMALLINT",
+    "sourcetypeid": "SMALLINT",
+    "fueltypeid": "SMALLINT",
+    "txled_fac": "FLOAT(6)",
+}
+
+
+def get_run_id(run_key=None):
+    """
+    Run id used to suffix the scratch tables of a run. A random id if run_key is None;
+    otherwise an id derived from run_key (e.g., the run manifest key and database
+    name), so that a resumed run finds the scratch tables of the earlier run.
+    """
+    if run_key is None:
+        return uuid.uuid4().hex[:RUN_ID_LEN]
+    return hashlib.sha1(run_key.encode()).hexdigest()[:RUN_ID_LEN]
+
+
+def drop_scratch_tbls(cur, run_id=None, backend=None):
+    """
+    Drop the scratch tables and views of run_id from SCRATCH_SCHEMA. Drop all the
+    scratch tables (e.g., left behind by killed runs) if run_id is None. backend is
+    the SQL backend of cur (ttierlt_v1.sql_backend); None for get_sql_backend().
+    """
+    if backend is None:
+        backend = get_sql_backend()
+    scratch_tbls = [
+        (tbl_nm, is_view)
+        for tbl_nm, is_view in backend.get_tables(cur, SCRATCH_SCHEMA)
+        if run_id is None or tbl_nm.endswith(f"_{run_id}")
+    ]
+    backend.flush_tables(cur)
+    for tbl_nm, is_view in scratch_tbls:
+        tbl_kind = "VIEW" if is_view else "TABLE"
+        cur.execute(f"DROP {tbl_kind} IF EXISTS {SCRATCH_SCHEMA}.{tbl_nm};")
 
 
 class MovesDb:
     """
     Common MOVES output database attributes and function.
+    Parameters
+    ----------
+    db_nm_: str
+        MOVES output database name.
+    run_id: str
+        Suffix of the scratch tables of this run; see get_run_id. None for a random
+        run id.
+    connect: bool
+        False, to only parse the database name.
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        SQL backend (connection and dialect hooks). None for get_sql_backend().
     """
 
     county_level_db = re.compile(r"mvs14b_erlt_\S{3}_\d{5}_20\d{2}_\d{1,2}_cer_out")
@@ -37,7 +95,7 @@ class MovesDb:
         out: Output database
     """
 
-    def __init__(self, db_nm_):
+    def __init__(self, db_nm_, run_id=None, connect=True, backend=None):
         self.moves2014b_db_nm = "movesdb20181022"
         # ref: https://www.tceq.texas.gov/assets/public/implementation/air/sip/texled/TXLED_Map.pdf
         self.MAP_DISTRICT_ABB_FULL_NM_TXLED = {
@@ -105,12 +163,38 @@ class MovesDb:
         ]
         self.analysis_year_todmix = None
         self.get_tdmix_year()
-        # Connect to sql.
-        self.conn = connect_to_server_db(database_nm=self.db_nm)
-        self.cur = self.conn.cursor()
-        # SQL Housekeeping. Set DB specific variables in SQL.
-        self.sql_housekeeping()
+        # Session variables of the SQL statements; see sql_var.
+        self.session_vars = {
+            "analysis_year": self.analysis_year,
+            "analysis_year_todmix": self.analysis_year_todmix,
+            "analysis_district": self.area_district,
+        }
+        self.backend = get_sql_backend() if backend is None else backend
+        # Scratch tables of this run are created in SCRATCH_SCHEMA with the run id
+        # suffix; see get_scratch_tbl.
+        self.run_id = get_run_id() if run_id is None else run_id
+        self.conn = None
+        self.cur = None
+        # connect=False only parses the database name, e.g., for the engines reading
+        # the MOVES output lake (ttierlt_v1.moves_lake).
+        if connect:
+            # Connect to sql.
+            self.conn = self.backend.connect(database_nm=self.db_nm)
+            self.cur = self.conn.cursor()
+            # SQL Housekeeping. Set DB specific variables in SQL.
+            self.sql_housekeeping()
+            self.backend.create_schema(self.cur, SCRATCH_SCHEMA)
         self.txled_df = pd.DataFrame()
+        # TxLED table used in the joins. Points to the reference data cache schema
+        # when get_txled is called with use_cache=True.
+        self.txled_tbl = self.get_scratch_tbl(f"txled_long_{self.analysis_year}")
+        # Set by enable_metrics.
+        self.metrics_sink = None
+
+    def get_scratch_tbl(self, tbl_nm):
+        """Name of the scratch table tbl_nm of this run, e.g.,
+        mvs2014b_erlt_scratch.emisrate_<run id>."""
+        return f"{SCRATCH_SCHEMA}.{tbl_nm}_{self.run_id}"
 
     def get_tdmix_year(self):
         if self.analysis_year > 2017:
@@ -134,18 +218,21 @@ class MovesDb:
             raise ValueError("Analysis year is out of bounds; under 2017.")
 
     def sql_housekeeping(self):
-        self.cur.execute("SET SQL_SAFE_UPDATES = 0;")
-        self.cur.execute(f"SET @analysis_year = {self.analysis_year};")
-        self.cur.execute(f"SET @analysis_year_todmix = {self.analysis_year_todmix};")
-        self.cur.execute(f"SET @analysis_district = '{self.area_district}';")
+        self.backend.sql_housekeeping(self.cur)
+        self.backend.set_session_vars(self.cur, self.session_vars)
         self.test_sql_housekeeping()
 
+    def sql_var(self, var_nm):
+        """SQL for the session variable var_nm (e.g., analysis_year): @analysis_year
+        on MariaDB, the literal value on backends without session variables."""
+        return self.backend.session_var_sql(var_nm, self.session_vars[var_nm])
+
     def test_sql_housekeeping(self):
-        self.cur.execute(f"SELECT @analysis_year;")
+        self.cur.execute(f"SELECT {self.sql_var('analysis_year')};")
         test_analysis_yr = self.cur.fetchone()[0]
-        self.cur.execute(f"SELECT @analysis_year_todmix;")
+        self.cur.execute(f"SELECT {self.sql_var('analysis_year_todmix')};")
         test_analysis_yr_todmix = self.cur.fetchone()[0]
-        self.cur.execute(f"SELECT @analysis_district;")
+        self.cur.execute(f"SELECT {self.sql_var('analysis_district')};")
         test_analysis_district = self.cur.fetchone()[0]
         assert (
             test_analysis_yr == self.analysis_year
@@ -159,46 +246,48 @@ class MovesDb:
             "@analysis_district variable is not correctly set " "in MariaDB."
         )
 
-    def get_txled(self):
+    def get_txled(self, use_cache=False):
         """
         Get the TxLED factors by year from the txled_db.txled_long table. Use use_txled
         to determine if a county/ district has TxLED program. Use @analysis_year to
         filter TxLed factor years to only the analysis year.
         Parameters
         ----------
+        use_cache: bool
+            True, to use the TxLED table in the process-wide reference data cache
+            instead of creating a copy in the MOVES output database.
         Returns
         -------
         dict
             Returns dict with { entire txled data and the year in the sql table.
         """
+        if self.use_txled and use_cache:
+            self.txled_tbl, self.txled_df = REF_DATA_CACHE.get_txled(self.analysis_year)
+            self.test_txled_df_is_read()
+            return {"txled_df": self.txled_df, "txled_yr": self.analysis_year}
         if self.use_txled:
-            self.cur.execute("FLUSH TABLES;")
-            self.cur.execute(f"DROP TABLE  IF EXISTS txled_long_{self.analysis_year};")
+            self.txled_tbl = self.get_scratch_tbl(f"txled_long_{self.analysis_year}")
             self.cur.execute(
                 f"""
-                CREATE TABLE txled_long_{self.analysis_year} 
-                SELECT * FROM txled_db.txled_long
-                WHERE yearid = @analysis_year;
+                SELECT DISTINCT yearid FROM txled_db.txled_long
+                WHERE yearid = {self.sql_var('analysis_year')};
             """
             )
-            self.cur.execute(
-                f"SELECT DISTINCT yearid FROM txled_long_{self.analysis_year};"
-            )
             txled_yearid_from_sql_table = self.cur.fetchone()[0]
             self.test_txled_cor_year_pulled(txled_yearid_from_sql_table)
-            # Reduce the TxLed table size.
-            self.cur.execute(
-                f"""
-                ALTER TABLE txled_long_{self.analysis_year}
-                DROP yearid,
-                MODIFY pollutantid SMALLINT,
-                MODIFY sourcetypeid SMALLINT,
-                MODIFY fueltypeid SMALLINT,
-                MODIFY txled_fac FLOAT(6);
-            """
+            # Reduced TxLed table: created with the small column types instead of
+            # being altered after a CREATE TABLE ... SELECT *.
+            self.create_scratch_table(
+                tbl_nm=self.txled_tbl,
+                col_defs=TXLED_COL_DEFS,
+                insert_cols=TXLED_COL_DEFS.keys(),
+                select_sql=f"""
+                    SELECT {", ".join(TXLED_COL_DEFS)} FROM txled_db.txled_long
+                    WHERE yearid = {self.sql_var('analysis_year')};
+                """,
             )
             self.txled_df = pd.read_sql(
-                f"SELECT * FROM  txled_long_{self.analysis_year} ",
+                f"SELECT * FROM  {self.txled_tbl} ",
                 self.conn,
             )
             self.test_txled_df_is_read()
@@ -219,5 +308,147 @@ class MovesDb:
             "in self.txled"
         )
 
-    def close_conn(self):
+    def create_scratch_table(
+        self, tbl_nm, col_defs, insert_cols, select_sql, repair_tbls=()
+    ):
+        """
+        Create the scratch table tbl_nm with its final column set and fill it with one
+        INSERT ... SELECT. The columns filled by the later UPDATE-JOIN passes are
+        created up front (NULL), so the table is never rebuilt by an ALTER TABLE
+        ... ADD COLUMN.
+        Parameters
+        ----------
+        tbl_nm: str
+            Scratch table name. An existing table is dropped.
+        col_defs: dict
+            {column: SQL type} in the column order of the table.
+        insert_cols: list-like
+            Columns filled by select_sql, in the order of the select list.
+        select_sql: str
+            SELECT statement producing the rows of tbl_nm.
+        repair_tbls: list-like
+            Source tables repaired before retrying the INSERT on MyISAM errors.
+        """
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {tbl_nm};")
+        col_defs_sql = ",\n            ".join(
+            f"`{col}` {col_type}" for col, col_type in col_defs.items()
+        )
+        self.cur.execute(
+            f"""
+            CREATE TABLE {tbl_nm} (
+            {col_defs_sql}
+            )
+            {self.backend.table_options_sql};
+        """
+        )
+        cmd_insert = f"INSERT INTO {tbl_nm} ({', '.join(insert_cols)}) {select_sql}"
+        try:
+            self.cur.execute(cmd_insert)
+        except self.backend.repair_errors:
+            if not repair_tbls:
+                raise
+            self.backend.repair_tables(self.cur, repair_tbls)
+            self.cur.execute(cmd_insert)
+
+    def write_result_shard(self, shard_dir, select_sql):
+        """
+        Write the output rows of this database to a Parquet result shard in shard_dir
+        instead of inserting them into the mvs2014b_erlt_out table. Merge the shards
+        into the output table with ttierlt_v1.result_shards.merge_result_shards.
+        Parameters
+        ----------
+        shard_dir: str
+            Directory for the result shards of the emission process.
+        select_sql: str
+            SELECT statement producing the output rows, e.g., get_agg_select_sql() of
+            the *SqlCmds classes.
+        Returns
+        -------
+        str
+            Shard path.
+        """
+        start_time = time.time()
+        self.backend.flush_tables(self.cur)
+        result = pd.read_sql(select_sql, self.conn)
+        shard_path = write_shard(result, shard_dir, self.db_nm)
+        print(
+            "---write_result_shard execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---write_result_shard execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        return shard_path
+
+    def enable_metrics(self, metrics_sink):
+        """
+        Record the wall time, rows affected, and label of every SQL statement run
+        through self.cur, and the wall time of the stages run with run_stage. The
+        records are tagged with the process, type(self).__name__. The pd.read_sql
+        calls (e.g., get_hourmix, get_vmtmix, compute_numpy_emisrate) bypass self.cur
+        and are only timed as part of their stage.
+        Parameters
+        ----------
+        metrics_sink: ttierlt_v1.stage_metrics.MetricsSink
+            Sink for the statement and stage records.
+        """
+        self.metrics_sink = metrics_sink
+        self.cur = InstrumentedCursor(
+            self.cur, metrics_sink, self.db_nm, process=type(self).__name__
+        )
+
+    def run_stage(self, stage, **stage_kwargs):
+        """
+        Run the method stage with stage_kwargs. The stage and its statements are
+        recorded when metrics are enabled.
+        """
+        if self.metrics_sink is None:
+            return getattr(self, stage)(**stage_kwargs)
+        start_time = time.time()
+        status = "success"
+        self.cur.stage = stage
+        try:
+            return getattr(self, stage)(**stage_kwargs)
+        except (Exception, SystemExit):
+            status = "failed"
+            raise
+        finally:
+            self.cur.stage = None
+            self.metrics_sink.record(
+                record_type="stage",
+                process=self.cur.process,
+                db_nm=self.db_nm,
+                stage=stage,
+                label=stage,
+                wall_time_s=time.time() - start_time,
+                rowcount=self.cur.rowcount,
+                status=status,
+            )
+
+    def drop_scratch_tbls(self):
+        """Drop the scratch tables of this run."""
+        drop_scratch_tbls(self.cur, self.run_id, self.backend)
+
+    def close_conn(self, drop_scratch=True):
+        """
+        Close the connection.
+        Parameters
+        ----------
+        drop_scratch: bool
+            True, to drop the scratch tables of this run first. Keep them (False) to
+            resume the run later with the same run id.
+        """
+        if self.conn is None:
+            # Created with connect=False.
+            return
+        if drop_scratch:
+            try:
+                self.drop_scratch_tbls()
+            except self.backend.error:
+                # Stale scratch tables can be dropped later with drop_scratch_tbls.
+                logging.exception(
+                    f"# Failed dropping the scratch tables of {self.db_nm}"
+                )
         self.conn.close()
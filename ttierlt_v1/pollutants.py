@@ -0,0 +1,208 @@
+"""
+Registry of the output pollutants of the emission rate look-up tables. Each output
+pollutant is a group of MOVES pollutants, optionally limited to some fuel types (e.g.,
+POM sums 30 polycyclic organic matter pollutants and DPM is PM10 from diesel). The
+registry generates the pollutant filter, pivot, and insert column list of the SQL
+aggregations and the sparse aggregation matrix of the NumPy engine, so a subset of
+the output pollutants only scans the MOVES pollutants it needs.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import numpy as np
+import scipy.sparse
+
+POLLUTANT_REGISTRY = {
+    "CO": ((2,), None),
+    "NOX": ((3,), None),
+    "SO2": ((31,), None),
+    "NO2": ((33,), None),
+    "CO2EQ": ((98,), None),
+    "VOC": ((87,), None),
+    "PM10": ((100,), None),
+    "PM25": ((110,), None),
+    "BENZ": ((20,), None),
+    "NAPTH": ((23, 185), None),
+    "BUTA": ((24,), None),
+    "FORM": ((25,), None),
+    "ACTE": ((26,), None),
+    "ACROL": ((27,), None),
+    "ETYB": ((41,), None),
+    "DPM": ((100,), (2,)),
+    "POM": (
+        (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 81, 82, 83, 84)
+        + (168, 169, 170, 171, 172, 173, 174, 175, 176, 177, 178, 181, 182, 183, 184),
+        None,
+    ),
+    "NH3": ((30,), None),
+    "PM10_Brakewear": ((106,), None),
+    "PM10_Tirewear": ((107,), None),
+    "PM25_Brakewear": ((116,), None),
+    "PM25_Tirewear": ((117,), None),
+    "Organic_Carbon": ((111,), None),
+    "CO2": ((90,), None),
+}
+"""
+{output pollutant: (MOVES pollutantids, fueltypeids or None for all fuels)}.
+"""
+POLLUTANT_COLS = (
+    "CO",
+    "NOX",
+    "SO2",
+    "NO2",
+    "CO2EQ",
+    "VOC",
+    "PM10",
+    "PM25",
+    "BENZ",
+    "NAPTH",
+    "BUTA",
+    "FORM",
+    "ACTE",
+    "ACROL",
+    "ETYB",
+    "DPM",
+    "POM",
+)
+"""
+Default output pollutants in the column order of the output and the formatted look-up
+tables. The other pollutants of the registry are only computed when requested.
+"""
+
+
+def get_pollutant_cols(pollutants=None):
+    """
+    Output pollutants of a subset in registry order.
+    Parameters
+    ----------
+    pollutants: list-like
+        Output pollutants, e.g., ["CO", "NOX"]. None for POLLUTANT_COLS.
+    Returns
+    -------
+    tuple
+        Output pollutants ordered like POLLUTANT_REGISTRY.
+    """
+    if pollutants is None:
+        return POLLUTANT_COLS
+    if isinstance(pollutants, str):
+        pollutants = [pollutants]
+    unknown_pollutants = sorted(set(pollutants) - set(POLLUTANT_REGISTRY))
+    if unknown_pollutants:
+        raise ValueError(
+            f"{unknown_pollutants} are not in the pollutant registry. Use a subset of "
+            f"{list(POLLUTANT_REGISTRY)}."
+        )
+    if not pollutants:
+        raise ValueError("Select at least one pollutant.")
+    return tuple(
+        pollutant for pollutant in POLLUTANT_REGISTRY if pollutant in pollutants
+    )
+
+
+def get_pollutant_ids(pollutants=None):
+    """Sorted MOVES pollutantids needed to compute the output pollutants."""
+    return tuple(
+        sorted(
+            {
+                pollutantid
+                for pollutant in get_pollutant_cols(pollutants)
+                for pollutantid in POLLUTANT_REGISTRY[pollutant][0]
+            }
+        )
+    )
+
+
+def get_pollutant_id_sql(pollutants=None):
+    """
+    Comma-separated MOVES pollutantids of the output pollutants for the
+    "WHERE pollutantid in (...)" filters.
+    """
+    return ", ".join(str(pollutantid) for pollutantid in get_pollutant_ids(pollutants))
+
+
+def get_pollutant_condition_sql(
+    pollutant, pollutant_col="pollutantid", fueltype_col="fueltypeid"
+):
+    """SQL condition that selects the rows of a MOVES pollutant group, e.g. DPM."""
+    pollutantids, fueltypeids = POLLUTANT_REGISTRY[pollutant]
+    if len(pollutantids) == 1:
+        condition = f"{pollutant_col} = {pollutantids[0]}"
+    else:
+        condition = f"{pollutant_col} IN ({', '.join(map(str, pollutantids))})"
+    if fueltypeids is not None:
+        if len(fueltypeids) == 1:
+            condition += f" AND {fueltype_col} = {fueltypeids[0]}"
+        else:
+            condition += f" AND {fueltype_col} IN ({', '.join(map(str, fueltypeids))})"
+    return condition
+
+
+def get_pollutant_pivot_sql(
+    pollutants=None,
+    value_col="emisfact",
+    pollutant_col="pollutantid",
+    fueltype_col="fueltypeid",
+):
+    """
+    Pivot of the MOVES pollutants (rows) to the output pollutants (columns):
+    "SUM(IF(<pollutant condition>, emisfact, 0)) AS <pollutant>" for each output
+    pollutant.
+    """
+    return ",\n                ".join(
+        f"SUM(IF({get_pollutant_condition_sql(pollutant, pollutant_col, fueltype_col)}"
+        f", {value_col}, 0)) AS {pollutant}"
+        for pollutant in get_pollutant_cols(pollutants)
+    )
+
+
+def get_pollutant_insert_cols_sql(pollutants=None):
+    """Comma-separated output pollutant columns for the INSERT column lists."""
+    return ", ".join(get_pollutant_cols(pollutants))
+
+
+def get_pollutant_ddl_sql(rate_col, pollutants=None):
+    """
+    Column definitions of the output pollutants for the CREATE TABLE statements of the
+    output tables, e.g., "`CO` DECIMAL(23,19) NULL DEFAULT NULL".
+    """
+    return ",\n        ".join(
+        f"`{pollutant}` {rate_col} NULL DEFAULT NULL"
+        for pollutant in get_pollutant_cols(pollutants)
+    )
+
+
+def get_aggregation_matrix(pollutantid, fueltypeid, pollutants=None):
+    """
+    Sparse 0/1 matrix that maps the rows of a rate table to the output pollutants:
+    element (i, j) is 1 if row i is part of the MOVES pollutant group of output
+    pollutant j. A row can be part of more than one output pollutant (e.g., PM10
+    and DPM).
+    Parameters
+    ----------
+    pollutantid: np.array
+        MOVES pollutantid of the rows.
+    fueltypeid: np.array
+        MOVES fueltypeid of the rows.
+    pollutants: list-like
+        Output pollutants. None for POLLUTANT_COLS.
+    Returns
+    -------
+    scipy.sparse.csc_matrix
+        len(pollutantid) x len(get_pollutant_cols(pollutants)) matrix.
+    """
+    pollutantid = np.asarray(pollutantid)
+    fueltypeid = np.asarray(fueltypeid)
+    row_idx = []
+    col_idx = []
+    for col, pollutant in enumerate(get_pollutant_cols(pollutants)):
+        pollutantids, fueltypeids = POLLUTANT_REGISTRY[pollutant]
+        is_pollutant = np.isin(pollutantid, pollutantids)
+        if fueltypeids is not None:
+            is_pollutant &= np.isin(fueltypeid, fueltypeids)
+        rows = np.flatnonzero(is_pollutant)
+        row_idx.append(rows)
+        col_idx.append(np.full(len(rows), col))
+    row_idx = np.concatenate(row_idx)
+    return scipy.sparse.csc_matrix(
+        (np.ones(len(row_idx)), (row_idx, np.concatenate(col_idx))),
+        shape=(len(pollutantid), len(col_idx)),
+    )
@@ -0,0 +1,192 @@
+"""
+Process-wide cache of the reference data shared by all the MOVES output databases:
+the weekday VMT-mix by district and todmix year (vmtmix_fy20.todmix), the hour-mix by
+district (vmtmix_fy20.hourmix), and the TxLED factors by year (txled_db.txled_long).
+Each slice is materialized once in the mvs2014b_erlt_ref_cache schema (with the
+indices used by the joins) and read once per process. The *SqlCmds classes join to
+the cached tables instead of creating a copy of the slice in every MOVES output
+database.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import re
+import threading
+import pandas as pd
+from ttierlt_v1.utils import connect_to_server_db
+
+REF_CACHE_SCHEMA = "mvs2014b_erlt_ref_cache"
+REF_SOURCE_TABLES = ("vmtmix_fy20.todmix", "vmtmix_fy20.hourmix", "txled_db.txled_long")
+FINGERPRINT_TABLE = "ref_cache_fingerprint"
+
+
+class RefDataCache:
+    """
+    Cache of the reference data slices keyed by (district, todmix year) for the
+    VMT-mix, district for the hour-mix, and year for the TxLED factors. Use
+    refresh_if_source_changed to invalidate the cache when the source tables change
+    and invalidate to force a reload. Slices are built under a lock, so the threads
+    of a worker (see batch_runner.process_db_all) build each slice once.
+    """
+
+    def __init__(self, cache_schema=REF_CACHE_SCHEMA):
+        self.cache_schema = cache_schema
+        self.conn = None
+        self.cur = None
+        self.checked_source_tables = False
+        # {(slice name, key): (cached table name, pd.DataFrame())}
+        self.slices = {}
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = connect_to_server_db(database_nm=None)
+            self.cur = self.conn.cursor()
+            self.cur.execute(f"CREATE SCHEMA IF NOT EXISTS {self.cache_schema};")
+            self.cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.cache_schema}.{FINGERPRINT_TABLE} (
+                src_table CHAR(64) NOT NULL PRIMARY KEY,
+                checksum BIGINT UNSIGNED NULL DEFAULT NULL
+                );
+            """
+            )
+
+    def close_conn(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+        self.cur = None
+
+    def get_source_checksums(self):
+        """CHECKSUM TABLE fingerprint of the reference data source tables."""
+        self.cur.execute(f"CHECKSUM TABLE {', '.join(REF_SOURCE_TABLES)};")
+        return {src_table: checksum for src_table, checksum in self.cur.fetchall()}
+
+    def refresh_if_source_changed(self):
+        """
+        Compare the checksums of the source tables with the ones recorded when the
+        cache was built. Invalidate the cache if any source table changed.
+        Returns
+        -------
+        bool
+            True, if the cache was invalidated.
+        """
+        self._connect()
+        self.checked_source_tables = True
+        current_checksums = self.get_source_checksums()
+        self.cur.execute(
+            f"SELECT src_table, checksum FROM {self.cache_schema}.{FINGERPRINT_TABLE};"
+        )
+        cached_checksums = dict(self.cur.fetchall())
+        if cached_checksums == current_checksums:
+            return False
+        self.invalidate()
+        self.cur.executemany(
+            f"INSERT INTO {self.cache_schema}.{FINGERPRINT_TABLE} VALUES (?, ?);",
+            list(current_checksums.items()),
+        )
+        return True
+
+    def invalidate(self):
+        """Drop the cached tables, the recorded checksums, and the in-memory slices."""
+        self.slices = {}
+        # The cached tables of earlier processes persist on the server; connect to
+        # drop them even if this process hasn't used the cache yet.
+        self._connect()
+        self.cur.execute(
+            f"""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = '{self.cache_schema}'
+            AND table_name != '{FINGERPRINT_TABLE}';
+        """
+        )
+        for (table_nm,) in self.cur.fetchall():
+            self.cur.execute(f"DROP TABLE IF EXISTS {self.cache_schema}.{table_nm};")
+        self.cur.execute(f"DELETE FROM {self.cache_schema}.{FINGERPRINT_TABLE};")
+
+    def _get_slice(self, slice_key, table_nm, cmd_create):
+        with self.lock:
+            if slice_key not in self.slices:
+                self._connect()
+                if not self.checked_source_tables:
+                    self.refresh_if_source_changed()
+                cached_table_nm = f"{self.cache_schema}.{table_nm}"
+                self.cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {cached_table_nm} " + cmd_create
+                )
+                self.slices[slice_key] = (
+                    cached_table_nm,
+                    pd.read_sql(f"SELECT * FROM {cached_table_nm}", self.conn),
+                )
+            return self.slices[slice_key]
+
+    def get_vmtmix(self, area_district, analysis_year_todmix):
+        """
+        Weekday VMT-mix for the district and todmix year from vmtmix_fy20.todmix.
+        Returns
+        -------
+        (str, pd.DataFrame())
+            Cached table name (schema.table) and the VMT-mix data.
+        """
+        return self._get_slice(
+            slice_key=("vmtmix", area_district, analysis_year_todmix),
+            table_nm=(
+                f"vmtmix_weekday_{_table_safe_nm(area_district)}_"
+                f"{analysis_year_todmix}"
+            ),
+            cmd_create=f"""
+                (INDEX vmtidx1 (Period, MOVES_STcode, MOVES_FTcode, VMX_RDcode))
+                SELECT * FROM vmtmix_fy20.todmix
+                WHERE TxDOT_Dist = '{area_district}'
+                AND Daytype = "Weekday" AND YearID = {analysis_year_todmix};
+            """,
+        )
+
+    def get_hourmix(self, area_district):
+        """
+        Hour-mix for the district from vmtmix_fy20.hourmix.
+        Returns
+        -------
+        (str, pd.DataFrame())
+            Cached table name (schema.table) and the hour-mix data.
+        """
+        return self._get_slice(
+            slice_key=("hourmix", area_district),
+            table_nm=f"hourmix_running_{_table_safe_nm(area_district)}",
+            cmd_create=f"""
+                (INDEX houridx1 (TOD))
+                SELECT * FROM vmtmix_fy20.hourmix
+                WHERE District = '{area_district}';
+            """,
+        )
+
+    def get_txled(self, analysis_year):
+        """
+        TxLED factors for the year from txled_db.txled_long. Uses the same column
+        types as MovesDb.get_txled.
+        Returns
+        -------
+        (str, pd.DataFrame())
+            Cached table name (schema.table) and the TxLED data.
+        """
+        return self._get_slice(
+            slice_key=("txled", analysis_year),
+            table_nm=f"txled_long_{analysis_year}",
+            cmd_create=f"""
+                (pollutantid SMALLINT, sourcetypeid SMALLINT, fueltypeid SMALLINT,
+                txled_fac FLOAT(6),
+                INDEX txledidx1 (pollutantid, sourcetypeid, fueltypeid))
+                SELECT pollutantid, sourcetypeid, fueltypeid, txled_fac
+                FROM txled_db.txled_long
+                WHERE yearid = {analysis_year};
+            """,
+        )
+
+
+def _table_safe_nm(area_district):
+    """El Paso -> el_paso"""
+    return re.sub(r"\W+", "_", area_district).lower()
+
+
+REF_DATA_CACHE = RefDataCache()
+"""Process-wide reference data cache used by the *SqlCmds classes."""
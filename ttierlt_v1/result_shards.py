@@ -0,0 +1,146 @@
+"""
+Stage the aggregated output of each MOVES output database as a Parquet shard and
+bulk-load the shards into the mvs2014b_erlt_out tables in one pass. Workers write to
+their own shard files, so they don't wait on the MyISAM table locks of the output
+tables, and the merge uses REPLACE, so reruns overwrite the existing rows instead of
+failing on duplicate keys.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import glob
+import time
+import logging
+import tempfile
+import pandas as pd
+from ttierlt_v1.utils import connect_to_server_db
+
+OUTPUT_TABLES = {
+    "running": "mvs2014b_erlt_out.running_erlt_intermediate",
+    "starts": "mvs2014b_erlt_out.starts_erlt_intermediate",
+    "idling": "mvs2014b_erlt_out.idling_erlt_intermediate",
+    "extnidle": "mvs2014b_erlt_out.extnidle_erlt_intermediate",
+}
+
+
+def get_shard_path(shard_dir, db_nm):
+    """Path of the result shard of the MOVES output database db_nm."""
+    return os.path.join(shard_dir, f"{db_nm}.parquet")
+
+
+def get_sharded_db_nms(shard_dir):
+    """MOVES output databases with a result shard in shard_dir."""
+    return sorted(
+        os.path.basename(path)[: -len(".parquet")]
+        for path in glob.glob(os.path.join(shard_dir, "*.parquet"))
+    )
+
+
+def clear_result_shards(shard_dir):
+    """
+    Remove the result shards (and the temporary files of crashed workers) in
+    shard_dir, e.g., before rerunning all databases from scratch. process_db skips the
+    databases with a shard and merge_result_shards reloads all shards, so stale
+    shards would stand in for the rerun.
+    Returns
+    -------
+    int
+        Number of shards removed.
+    """
+    shard_paths = glob.glob(os.path.join(shard_dir, "*.parquet"))
+    for path in shard_paths + glob.glob(os.path.join(shard_dir, "*.parquet.*.tmp")):
+        os.remove(path)
+    return len(shard_paths)
+
+
+def write_shard(data, shard_dir, db_nm):
+    """
+    Write the aggregated output of db_nm to shard_dir. The shard is written to a
+    temporary file first and renamed, so a crashed worker doesn't leave a partial
+    shard behind.
+    Returns
+    -------
+    str
+        Shard path.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_path = get_shard_path(shard_dir, db_nm)
+    tmp_shard_path = f"{shard_path}.{os.getpid()}.tmp"
+    data.to_parquet(tmp_shard_path, index=False)
+    os.replace(tmp_shard_path, shard_path)
+    return shard_path
+
+
+def merge_result_shards(process, shard_dir, output_table=None, db_nms=None):
+    """
+    Bulk-load the result shards into the output table with LOAD DATA LOCAL INFILE ...
+    REPLACE. Rows with the same primary key as existing rows replace them, so the merge
+    can be rerun.
+    Parameters
+    ----------
+    process: str
+        Emission process: running, starts, idling, or extnidle.
+    shard_dir: str
+        Directory with the result shards.
+    output_table: str
+        Output table (schema.table). Defaults to OUTPUT_TABLES[process].
+    db_nms: list
+        Merge only the shards of these databases. All shards in shard_dir are merged
+        by default.
+    Returns
+    -------
+    int
+        Number of rows loaded.
+    """
+    start_time = time.time()
+    if output_table is None:
+        output_table = OUTPUT_TABLES[process]
+    if db_nms is None:
+        db_nms = get_sharded_db_nms(shard_dir)
+    if not db_nms:
+        print(f"No result shards to merge in {shard_dir}.")
+        return 0
+    merged_data = pd.concat(
+        [pd.read_parquet(get_shard_path(shard_dir, db_nm)) for db_nm in db_nms],
+        ignore_index=True,
+    )
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".tsv", delete=False, newline=""
+    ) as tmp_file:
+        # Floats are written with repr, so no precision is lost in the text file.
+        # Lines end with \n on Windows too, as declared in LINES TERMINATED BY;
+        # os.linesep would leave a \r in the last column.
+        merged_data.to_csv(
+            tmp_file,
+            sep="\t",
+            na_rep="\\N",
+            header=False,
+            index=False,
+            lineterminator="\n",
+        )
+        tmp_file_path = tmp_file.name
+    conn = connect_to_server_db(database_nm=None, local_infile=True)
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            f"""
+            LOAD DATA LOCAL INFILE '{tmp_file_path.replace(os.sep, "/")}'
+            REPLACE INTO TABLE {output_table}
+            FIELDS TERMINATED BY '\\t'
+            LINES TERMINATED BY '\\n'
+            ({", ".join(merged_data.columns)});
+        """
+        )
+        conn.commit()
+    finally:
+        conn.close()
+        os.remove(tmp_file_path)
+    print(
+        "---merge_result_shards loaded %s rows from %s shards in %s seconds---"
+        % (len(merged_data), len(db_nms), time.time() - start_time)
+    )
+    logging.info(
+        "---merge_result_shards loaded %s rows from %s shards in %s seconds---"
+        % (len(merged_data), len(db_nms), time.time() - start_time)
+    )
+    return len(merged_data)
@@ -0,0 +1,149 @@
+"""
+Persistent run manifest for the batch runs. Records each (process, database, stage)
+with the start and end time, the row count, and the status in a local SQLite file,
+so a batch run can resume a database at its first incomplete stage.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import time
+import sqlite3
+import pandas as pd
+
+
+class RunManifest:
+    """
+    SQLite store of the stage runs. Each method opens its own short-lived
+    connection, so the manifest can be shared by the worker processes of a batch run.
+    Parameters
+    ----------
+    path_manifest: str
+        Path to the SQLite file. Created if it doesn't exist.
+    """
+
+    def __init__(self, path_manifest):
+        self.path_manifest = path_manifest
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stage_runs (
+                process TEXT NOT NULL,
+                db_nm TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                stage_order INTEGER,
+                start_time REAL,
+                end_time REAL,
+                row_count INTEGER,
+                status TEXT,
+                error TEXT,
+                PRIMARY KEY (process, db_nm, stage)
+                );
+            """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path_manifest, timeout=60)
+
+    def start_stage(self, process, db_nm, stage, stage_order):
+        """Record the start of a stage. Overwrites the earlier run of the stage."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO stage_runs
+                (process, db_nm, stage, stage_order, start_time, status)
+                VALUES (?, ?, ?, ?, ?, 'running');
+            """,
+                (process, db_nm, stage, stage_order, time.time()),
+            )
+
+    def end_stage(self, process, db_nm, stage, status, row_count=None, error=None):
+        """Record the end of a stage with status success or failed."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE stage_runs SET end_time = ?, status = ?, row_count = ?,
+                error = ?
+                WHERE process = ? AND db_nm = ? AND stage = ?;
+            """,
+                (time.time(), status, row_count, error, process, db_nm, stage),
+            )
+
+    def get_completed_stages(self, process, db_nm):
+        """Stages of the database that ended with status success."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT stage FROM stage_runs
+                WHERE process = ? AND db_nm = ? AND status = 'success';
+            """,
+                (process, db_nm),
+            ).fetchall()
+        return {stage for (stage,) in rows}
+
+    def has_stage_runs(self, process, db_nm):
+        """True if any stage of the database was started, whatever its status."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM stage_runs WHERE process = ? AND db_nm = ? LIMIT 1;",
+                (process, db_nm),
+            ).fetchone()
+        return row is not None
+
+    def get_resume_stage_index(self, process, db_nm, stage_nms):
+        """
+        Index of the first stage in stage_nms that isn't complete;
+        len(stage_nms) if all stages are complete.
+        """
+        completed_stages = self.get_completed_stages(process, db_nm)
+        for stage_index, stage in enumerate(stage_nms):
+            if stage not in completed_stages:
+                return stage_index
+        return len(stage_nms)
+
+    def reset(self, process, db_nm=None):
+        """
+        Remove the stage runs of the process in all execution modes (process and
+        process:mode entries), and of the database, if given.
+        """
+        process_filter = "(process = ? OR process LIKE ? || ':%')"
+        with self._connect() as conn:
+            if db_nm is None:
+                conn.execute(
+                    f"DELETE FROM stage_runs WHERE {process_filter};",
+                    (process, process),
+                )
+            else:
+                conn.execute(
+                    f"DELETE FROM stage_runs WHERE {process_filter} AND db_nm = ?;",
+                    (process, process, db_nm),
+                )
+
+    def get_stage_runs(self, process=None):
+        """All stage runs (of the process, if given) as a dataframe."""
+        with self._connect() as conn:
+            if process is None:
+                return pd.read_sql("SELECT * FROM stage_runs", conn)
+            return pd.read_sql(
+                "SELECT * FROM stage_runs WHERE process = ?", conn, params=(process,)
+            )
+
+    def get_db_wall_times(self, process):
+        """
+        {db_nm: total wall time in seconds of the successful stages} of the process.
+        The largest total over the execution modes is used for databases run in
+        several modes. Used to estimate the cost of the databases in later runs.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT db_nm, MAX(wall_time) FROM (
+                SELECT process, db_nm, SUM(end_time - start_time) AS wall_time
+                FROM stage_runs
+                WHERE (process = ? OR process LIKE ? || ':%') AND status = 'success'
+                GROUP BY process, db_nm
+                )
+                GROUP BY db_nm;
+            """,
+                (process, process),
+            ).fetchall()
+        return dict(rows)
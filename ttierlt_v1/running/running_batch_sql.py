@@ -4,57 +4,97 @@ Created by: Apoorba Bibeka
 Created on: 01/26/2021
 """
 import time
+import numpy as np
 import pandas as pd
-import mariadb
 import os
 import logging
-from ttierlt_v1.utils import connect_to_server_db, get_db_nm_list, PATH_INTERIM_RUNNING
+from ttierlt_v1.utils import (
+    get_db_nm_list,
+    get_rate_col_type,
+    PATH_INTERIM_RUNNING,
+)
 from ttierlt_v1.movesdb import MovesDb
+from ttierlt_v1.sql_backend import get_sql_backend
+from ttierlt_v1.ref_data_cache import REF_DATA_CACHE
+from ttierlt_v1.result_shards import write_shard
+from ttierlt_v1.pollutants import (
+    get_pollutant_cols,
+    get_pollutant_ids,
+    get_pollutant_id_sql,
+    get_pollutant_pivot_sql,
+    get_pollutant_insert_cols_sql,
+    get_pollutant_ddl_sql,
+)
+from ttierlt_v1.running.running_numpy_engine import (
+    RUNNING_RATE_COLS,
+    compute_running_erlt,
+)
 
+# Tables over the rateperdistance tables of the month databases of a district-year.
+DISTRICT_YEAR_RATE_TBLS = {
+    "merge": "rateperdistance_district_year_merge",
+    "view": "rateperdistance_district_year_view",
+}
+# Final schema of the emisrate table. Area, avgspeed, Funclass, and Period are filled
+# by aggregate_emisrate_rateperdist; Hourmix, stypemix, txledfac, and emisFact by the
+# UPDATE-JOIN passes.
+EMISRATE_COL_DEFS = {
+    "yearid": "SMALLINT UNSIGNED",
+    "monthid": "TINYINT UNSIGNED",
+    "hourid": "TINYINT UNSIGNED",
+    "roadtypeid": "TINYINT UNSIGNED",
+    "pollutantid": "SMALLINT UNSIGNED",
+    "sourcetypeid": "TINYINT UNSIGNED",
+    "fueltypeid": "TINYINT UNSIGNED",
+    "avgSpeedBinID": "TINYINT UNSIGNED",
+    "ERate": "DOUBLE",
+    "avgspeed": "FLOAT(3,1)",
+    "Hourmix": "FLOAT",
+    "stypemix": "FLOAT",
+    "emisFact": "FLOAT",
+    "Funclass": "CHAR(25)",
+    "Period": "CHAR(2)",
+    "Area": "CHAR(25)",
+    "txledfac": "FLOAT(6)",
+}
 
-def create_running_table_in_db(delete_if_exists=False):
+
+def create_running_table_in_db(
+    delete_if_exists=False, rate_col_type="decimal", pollutants=None, backend=None
+):
     """
     Create  mvs2014b_erlt_out.running_erlt_intermediate table for storing output.
     Parameters
     ----------
     delete_if_exists: Delete the existing mvs2014b_erlt_out.running_erlt_intermediate
     table (if it exists).
+    rate_col_type: Type of the pollutant columns: decimal (DECIMAL(23,19)) or double
+    (DOUBLE). See ttierlt_v1.utils.check_rate_col_type_precision.
+    pollutants: Output pollutant columns; see ttierlt_v1.pollutants. None for
+    POLLUTANT_COLS.
+    backend: SQL backend; see ttierlt_v1.sql_backend. None for get_sql_backend().
     """
     # delete_if_exists: Check if we want to delete the previous stored table
-    conn = connect_to_server_db(database_nm=None)
+    rate_col = get_rate_col_type(rate_col_type)
+    if backend is None:
+        backend = get_sql_backend()
+    conn = backend.connect(database_nm=None)
     cur = conn.cursor()
     if delete_if_exists:
         cur.execute("DROP TABLE  IF EXISTS mvs2014b_erlt_out.running_erlt_intermediate")
     cur.execute(
-        """
+        f"""
         CREATE TABLE mvs2014b_erlt_out.running_erlt_intermediate (
-        `Area` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-        `yearid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `monthid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-        `funclass` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
+        `Area` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
+        `yearid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `monthid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+        `funclass` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
         `avgspeed` FLOAT(3,1) NULL DEFAULT NULL,
-        `CO` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NOX` DECIMAL(23,19) NULL DEFAULT NULL,
-        `SO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NO2` DECIMAL(23,19) NULL DEFAULT NULL,
-        `VOC` DECIMAL(23,19) NULL DEFAULT NULL,
-        `CO2EQ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM10` DECIMAL(23,19) NULL DEFAULT NULL,
-        `PM25` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BENZ` DECIMAL(23,19) NULL DEFAULT NULL,
-        `NAPTH` DECIMAL(23,19) NULL DEFAULT NULL,
-        `BUTA` DECIMAL(23,19) NULL DEFAULT NULL,
-        `FORM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACTE` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ACROL` DECIMAL(23,19) NULL DEFAULT NULL,
-        `ETYB` DECIMAL(23,19) NULL DEFAULT NULL,
-        `DPM` DECIMAL(23,19) NULL DEFAULT NULL,
-        `POM` DECIMAL(23,19) NULL DEFAULT NULL,
+        {get_pollutant_ddl_sql(rate_col, pollutants)},
         CONSTRAINT running_erlt_intermediate_pk PRIMARY KEY (Area, yearid, monthid, 
         funclass, avgspeed)
         )
-        COLLATE='utf8_unicode_ci'
-        ENGINE=MyISAM;
+        {backend.output_table_options_sql};
     """
     )
     conn.close()
@@ -63,21 +103,145 @@ def create_running_table_in_db(delete_if_exists=False):
 class RunningSqlCmds(MovesDb):
     """
     Class to execute SQL commands for running emission process.
+    Parameters
+    ----------
+    db_nm_: str
+        MOVES output database name.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS. Only
+        the MOVES pollutants of the subset are read from rateperdistance.
+    run_id: str
+        Suffix of the scratch tables of this run in the scratch schema; see
+        ttierlt_v1.movesdb.get_run_id. None for a random run id.
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        SQL backend. None for ttierlt_v1.sql_backend.get_sql_backend().
     """
 
-    def __init__(self, db_nm_):
-        super().__init__(db_nm_=db_nm_)
+    def __init__(self, db_nm_, pollutants=None, run_id=None, backend=None):
+        super().__init__(db_nm_=db_nm_, run_id=run_id, backend=backend)
+        self.pollutants = get_pollutant_cols(pollutants)
+        # MOVES pollutants used to compute the output pollutants, and the insert
+        # statement and pivot of the MOVES pollutants (rows) to the output pollutants
+        # (columns) of mvs2014b_erlt_out.running_erlt_intermediate.
+        self.pollutant_id_sql = get_pollutant_id_sql(self.pollutants)
+        self.pollutant_pivot_sql = get_pollutant_pivot_sql(self.pollutants)
+        self.insert_sql = f"""
+                INSERT INTO mvs2014b_erlt_out.running_erlt_intermediate(Area, yearid, 
+                monthid, funclass, avgspeed, 
+                {get_pollutant_insert_cols_sql(self.pollutants)})
+        """
         self.head_emisrate_df = pd.DataFrame()
         self.hourmix = pd.DataFrame()
         self.vmtmix = pd.DataFrame()
+        # Hour-mix and VMT-mix tables used in the joins. Point to the reference data
+        # cache schema when get_hourmix and get_vmtmix are called with use_cache=True.
+        self.hourmix_tbl = self.get_scratch_tbl(f"hourmix_running_{self.district_abb}")
+        self.vmtmix_tbl = self.get_scratch_tbl(
+            f"vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix}"
+        )
+        self.emisrate_tbl = self.get_scratch_tbl("emisrate")
+        self.weights_tbl = self.get_scratch_tbl("running_weights")
         self.created_all_indices = False
+        # Rate table aggregated by aggregate_emisrate_rateperdist and the fused mode,
+        # and its source tables (repaired on MyISAM errors). Point to the merged
+        # district-year table after create_district_year_rateperdistance.
+        self.rateperdistance_tbl = "rateperdistance"
+        self.rateperdistance_src_tbls = ("rateperdistance",)
+
+    def create_district_year_rateperdistance(self, db_nms, merge_type="merge"):
+        """
+        Create a table over the rateperdistance tables of the month databases db_nms
+        of the district-year of this database, so that the aggregation, joins, and
+        pivot run once for the district-year instead of once per month. The output
+        rows keep the monthid of the source rows. The table is created in the scratch
+        schema and replaces rateperdistance in the later stages.
+        Parameters
+        ----------
+        db_nms: list
+            County level MOVES output databases of the same district and year as this
+            database.
+        merge_type: str
+            merge: MyISAM MERGE table. view: UNION ALL view.
+        """
+        if not self.backend.supports_district_year_tables:
+            raise ValueError(
+                f"The {self.backend.name} backend doesn't support the district-year "
+                f"tables."
+            )
+        if merge_type not in DISTRICT_YEAR_RATE_TBLS:
+            raise ValueError(
+                f"merge_type can be either of {list(DISTRICT_YEAR_RATE_TBLS)}; got "
+                f"{merge_type}."
+            )
+        other_district_year_db_nms = [
+            db_nm
+            for db_nm in db_nms
+            if db_nm.split("_")[2:5] != self.db_nm.split("_")[2:5]
+        ]
+        if other_district_year_db_nms:
+            raise ValueError(
+                f"{other_district_year_db_nms} aren't from the district and year of "
+                f"{self.db_nm}."
+            )
+        start_time = time.time()
+        self.drop_district_year_rateperdistance()
+        src_tbls = tuple(f"{db_nm}.rateperdistance" for db_nm in db_nms)
+        district_year_rate_tbl = self.get_scratch_tbl(
+            DISTRICT_YEAR_RATE_TBLS[merge_type]
+        )
+        if merge_type == "merge":
+            # MERGE tables need MyISAM source tables with identical definitions; the
+            # MOVES output databases share the rateperdistance definition.
+            self.cur.execute(
+                f"CREATE TABLE {district_year_rate_tbl} LIKE rateperdistance;"
+            )
+            self.cur.execute(
+                f"""
+                ALTER TABLE {district_year_rate_tbl}
+                ENGINE=MERGE UNION=({", ".join(src_tbls)}) INSERT_METHOD=NO;
+            """
+            )
+        else:
+            self.cur.execute(
+                f"CREATE VIEW {district_year_rate_tbl} AS "
+                + " UNION ALL ".join(f"SELECT * FROM {tbl}" for tbl in src_tbls)
+            )
+        self.rateperdistance_tbl = district_year_rate_tbl
+        self.rateperdistance_src_tbls = src_tbls
+        print(
+            "---create_district_year_rateperdistance execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---create_district_year_rateperdistance execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+
+    def drop_district_year_rateperdistance(self):
+        """Drop the district-year tables and point back to rateperdistance."""
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(
+            f"DROP TABLE IF EXISTS "
+            f"{self.get_scratch_tbl(DISTRICT_YEAR_RATE_TBLS['merge'])};"
+        )
+        self.cur.execute(
+            f"DROP VIEW IF EXISTS "
+            f"{self.get_scratch_tbl(DISTRICT_YEAR_RATE_TBLS['view'])};"
+        )
+        self.rateperdistance_tbl = "rateperdistance"
+        self.rateperdistance_src_tbls = ("rateperdistance",)
+
+    def _repair_rateperdistance(self):
+        self.backend.repair_tables(self.cur, self.rateperdistance_src_tbls)
 
     def aggregate_emisrate_rateperdist(self, debug=True):
         """
         Script creates the required base rate table from MOVES output databases
         Only required pollutants are selected based on the emissionrate output table
         Emission rates are summed over different processes under running emission
-        category.
+        category. The table is created with its final schema (EMISRATE_COL_DEFS) and
+        Area, avgspeed, Funclass, and Period are computed in the same INSERT ...
+        SELECT.
         Parameters
         ----------
         debug: bool
@@ -89,117 +253,88 @@ class RunningSqlCmds(MovesDb):
             emisrate if debug=True.
         """
         start_time = time.time()
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(f"DROP TABLE  IF EXISTS emisrate;")
-        agg_emisrate_cmd = f"""
-                CREATE TABLE emisrate (SELECT yearid,monthid,hourid,
+        self.create_scratch_table(
+            tbl_nm=self.emisrate_tbl,
+            col_defs=EMISRATE_COL_DEFS,
+            insert_cols=(
+                "yearid",
+                "monthid",
+                "hourid",
+                "roadtypeid",
+                "pollutantid",
+                "sourcetypeid",
+                "fueltypeid",
+                "avgSpeedBinID",
+                "ERate",
+                "avgspeed",
+                "Funclass",
+                "Period",
+                "Area",
+            ),
+            select_sql=f"""
+                SELECT yearid,monthid,hourid,
                 roadtypeid,pollutantid,sourcetypeid,fueltypeid,avgSpeedBinID,
-                SUM(rateperdistance) as ERate 
-                FROM rateperdistance
-                WHERE pollutantid in (30, 106, 107, 116, 117, 111, 90, 2,3,
-                31,33,87,98,100,110,20, 23, 185,24,25,26,27,
-                41,68, 69,70,71, 72, 73, 74, 75, 76, 77, 78, 81, 82, 83, 84, 168, 169, 
-                170, 171, 172, 173, 174, 175, 176, 177,178, 181, 182, 183, 184) 
+                SUM(rateperdistance) as ERate,
+                {self._sql_avgspeed_expr()} AS avgspeed,
+                {self._sql_funclass_case()} AS Funclass,
+                {self._sql_period_case()} AS Period,
+                {self.sql_var("analysis_district")} AS Area
+                FROM {self.rateperdistance_tbl}
+                WHERE pollutantid in ({self.pollutant_id_sql}) 
                 and processid not in (18,19)
                 GROUP BY yearid,monthid,hourid,roadtypeid,pollutantid,sourcetypeid,
-                fueltypeid,avgSpeedBinID);
-                """
-        try:
-            # FixMe: Make the pollutants a user entered parameter for the class
-            self.cur.execute(agg_emisrate_cmd)
-        except mariadb.InternalError as intererr:
-            self.cur.execute("REPAIR TABLE rateperdistance")
-            self.cur.execute(agg_emisrate_cmd)
-        except mariadb.OperationalError as operr:
-            self.cur.execute("REPAIR TABLE rateperdistance")
-            self.cur.execute(agg_emisrate_cmd)
-
-        self._update_emisrate_rateperdist()
+                fueltypeid,avgSpeedBinID;
+                """,
+            repair_tbls=self.rateperdistance_src_tbls,
+        )
         logging.info(
-            "---aggregate_emisrate_rateperdist and _update_emisrate_rateperdist "
-            "execution time:  %s seconds "
+            "---aggregate_emisrate_rateperdist execution time:  %s seconds "
             "---" % (time.time() - start_time)
         )
         if debug:
             self.head_emisrate_df = pd.read_sql(
-                f"SELECT * FROM emisrate LIMIT 5", self.conn
+                f"SELECT * FROM {self.emisrate_tbl} LIMIT 5", self.conn
             )
             print(
-                "---aggregate_emisrate_rateperdist and _update_emisrate_rateperdist "
-                "execution time:  %s seconds "
+                "---aggregate_emisrate_rateperdist execution time:  %s seconds "
                 "---" % (time.time() - start_time)
             )
             return self.head_emisrate_df
         return pd.DataFrame()
 
-    def _update_emisrate_rateperdist(self):
-        """-- Script to add necessary fields to the rate table and populate it with
-        appropriate data"""
-        alter_table_avg_spd_cmds = """FLUSH TABLES;
-            ALTER TABLE emisrate
-            ADD COLUMN avgspeed float(3,1),
-            ADD COLUMN Hourmix float,
-            ADD COLUMN stypemix float,
-            ADD COLUMN emisFact float,
-            ADD COLUMN Funclass char(25),
-            ADD COLUMN Period char(2),
-            ADD COLUMN Area char(25),
-            ADD COLUMN txledfac FLOAT(6);
-            -- Empty line
-            FLUSH TABLES;
-            Update emisrate
-            SET Area = @analysis_district;
-            -- Script to add speeds to each MOVES avgspeedbinid
-            FLUSH TABLES;
-            UPDATE emisrate
-            SET avgspeed = (avgSpeedBinID - 1) * 5;
-            FLUSH TABLES;
-            UPDATE emisrate
-            SET avgspeed = 2.5
-            WHERE avgSpeedBinID = 1;   
-            FLUSH TABLES;
-            -- End Code with comment.
-        """
-        for cmds in alter_table_avg_spd_cmds.split(";"):
-            self.cur.execute(cmds)
-        # Add roadtype description to each MOVES roadtypeid
-        for rdtype, rdtypedesc in self.MAP_RD_TYPE.items():
-            cmd_rd_type = f"""
-                UPDATE emisrate SET Funclass = '{rdtypedesc}' 
-                WHERE roadtypeid = {rdtype};
-            """
-            self.cur.execute(cmd_rd_type)
-        # Add period description to each MOVES hourid
-        for period_val, hourid_tuple in self.MAP_PERIOD_HOURID.items():
-            cmd_period_hourid = f"""
-                UPDATE emisrate SET period = '{period_val}' 
-                WHERE hourid in {hourid_tuple};
-            """
-            self.cur.execute(cmd_period_hourid)
-
-    def get_hourmix(self):
+    def get_hourmix(self, use_cache=False):
         """
         Script creates the hour-mix table from the MOVES database.table
         vmtmix_fy20.todmix.
         Parameters
         ----------
+        use_cache: bool
+            True, to use the hour-mix table in the process-wide reference data cache
+            instead of creating a copy in the MOVES output database.
         Returns
         -------
         pd.DataFrame()
             Returns entire hourmix table.
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(f"DROP TABLE IF EXISTS hourmix_running_{self.district_abb};")
+        if use_cache:
+            self.hourmix_tbl, self.hourmix = REF_DATA_CACHE.get_hourmix(
+                self.area_district
+            )
+            self.test_hourmix_df_is_read()
+            return self.hourmix
+        self.hourmix_tbl = self.get_scratch_tbl(f"hourmix_running_{self.district_abb}")
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {self.hourmix_tbl};")
         self.cur.execute(
-            f"""
-            CREATE TABLE hourmix_running_{self.district_abb}
+            self.backend.create_table_as_sql(
+                self.hourmix_tbl,
+                f"""
             SELECT * FROM vmtmix_fy20.hourmix
-            WHERE District = @analysis_district;
-            """
-        )
-        self.hourmix = pd.read_sql(
-            f"SELECT * FROM hourmix_running_{self.district_abb}", self.conn
+            WHERE District = {self.sql_var("analysis_district")};
+            """,
+            )
         )
+        self.hourmix = pd.read_sql(f"SELECT * FROM {self.hourmix_tbl}", self.conn)
         self.test_hourmix_df_is_read()
         return self.hourmix
 
@@ -211,7 +346,7 @@ class RunningSqlCmds(MovesDb):
             "present in District column of vmtmix_fy20.hourmix"
         )
 
-    def get_vmtmix(self):
+    def get_vmtmix(self, use_cache=False):
         """
         Script creates the VMT-mix table from the movesactivity output table available
         in the MOVES output databse used for rate development. The input table is
@@ -220,29 +355,39 @@ class RunningSqlCmds(MovesDb):
         the correct year in vmtmix_fy20.todmix for the analysis_year of this database.
         E.g. if the analysis year of the database is 2022 then the year in
         vmtmix_fy20.todmix table is 2020.
+        Parameters
+        ----------
+        use_cache: bool
+            True, to use the VMT-mix table in the process-wide reference data cache
+            instead of creating a copy in the MOVES output database.
         Returns
         -------
         pd.DataFrame()
             Returns entire vmtmix table.
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute(
-            f"""DROP TABLE  
-            IF EXISTS vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix};"""
+        if use_cache:
+            self.vmtmix_tbl, self.vmtmix = REF_DATA_CACHE.get_vmtmix(
+                self.area_district, self.analysis_year_todmix
+            )
+            self.test_todmix_df_is_read()
+            return self.vmtmix
+        self.vmtmix_tbl = self.get_scratch_tbl(
+            f"vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix}"
         )
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {self.vmtmix_tbl};")
         self.cur.execute(
-            f"""
-            CREATE TABLE vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix} 
+            self.backend.create_table_as_sql(
+                self.vmtmix_tbl,
+                f"""
             SELECT * FROM vmtmix_fy20.todmix 
-            WHERE TxDOT_Dist = @analysis_district 
-            AND Daytype = "Weekday" AND YearID =  @analysis_year_todmix;
-            """
-        )
-        self.vmtmix = pd.read_sql(
-            f"""SELECT * 
-            FROM  vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix}""",
-            self.conn,
+            WHERE TxDOT_Dist = {self.sql_var("analysis_district")} 
+            AND Daytype = 'Weekday' 
+            AND YearID = {self.sql_var("analysis_year_todmix")};
+            """,
+            )
         )
+        self.vmtmix = pd.read_sql(f"SELECT * FROM {self.vmtmix_tbl}", self.conn)
         self.test_todmix_df_is_read()
         return self.vmtmix
 
@@ -257,36 +402,35 @@ class RunningSqlCmds(MovesDb):
     def create_indices_before_joins(self):
         """Create indices for all tables before join to speed-up the join."""
         try:
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS efidx1 
-                ON emisrate (Period, sourcetypeid, fueltypeid, roadtypeid);"""
-            )
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS  efidx2 ON emisrate (hourid);"""
-            )
-            self.cur.execute(
-                f"""CREATE INDEX IF NOT EXISTS  houridx1 
-                ON hourmix_running_{self.district_abb} (TOD);"""
+            self.backend.create_index(
+                self.cur,
+                "efidx1",
+                self.emisrate_tbl,
+                "Period, sourcetypeid, fueltypeid, roadtypeid",
             )
-            self.cur.execute(
-                f"""CREATE INDEX IF NOT EXISTS  vmtidx1 
-                ON vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix}
-                (Period, MOVES_STcode, MOVES_FTcode, VMX_RDcode);"""
+            self.backend.create_index(self.cur, "efidx2", self.emisrate_tbl, "hourid")
+            self.backend.create_index(self.cur, "houridx1", self.hourmix_tbl, "TOD")
+            self.backend.create_index(
+                self.cur,
+                "vmtidx1",
+                self.vmtmix_tbl,
+                "Period, MOVES_STcode, MOVES_FTcode, VMX_RDcode",
             )
             if self.use_txled:
-                self.cur.execute(
-                    """CREATE INDEX IF NOT EXISTS  efidx3 
-                    ON emisrate (pollutantid, sourcetypeid, fueltypeid);"""
+                self.backend.create_index(
+                    self.cur,
+                    "efidx3",
+                    self.emisrate_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
-                self.cur.execute(
-                    f"""
-                    CREATE INDEX IF NOT EXISTS  txledidx1 
-                    ON txled_long_{self.analysis_year}
-                    (pollutantid, sourcetypeid, fueltypeid);
-                """
+                self.backend.create_index(
+                    self.cur,
+                    "txledidx1",
+                    self.txled_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
             self.created_all_indices = True
-        except mariadb.ProgrammingError as mdberr:
+        except self.backend.programming_errors as mdberr:
             print(mdberr)
             print(
                 "Run aggregate_emisrate_rateperdist, get_hour_mix_for_db_district, "
@@ -302,46 +446,54 @@ class RunningSqlCmds(MovesDb):
         """
         start_time = time.time()
         if self.created_all_indices:
-            self.cur.execute("FLUSH TABLES;")
+            self.backend.flush_tables(self.cur)
             self.cur.execute(
-                f"""
-                UPDATE emisrate a
-                JOIN vmtmix_weekday_{self.district_abb}_{self.analysis_year_todmix}  b  
-                ON
-                a.period = b.period AND
-                a.sourcetypeID = b.MOVES_STcode AND
-                a.fueltypeID = b.MOVES_FTcode AND
-                a.roadtypeID = b.VMX_RDcode
-                SET a.stypemix = b.VMTmix;
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.emisrate_tbl,
+                    alias="a",
+                    join_tbl_nm=self.vmtmix_tbl,
+                    join_alias="b",
+                    on_sql="""
+                    a.period = b.period AND
+                    a.sourcetypeID = b.MOVES_STcode AND
+                    a.fueltypeID = b.MOVES_FTcode AND
+                    a.roadtypeID = b.VMX_RDcode""",
+                    set_cols={"stypemix": "b.VMTmix"},
+                )
             )
             self.cur.execute(
-                f"""
-                UPDATE emisrate a
-                JOIN hourmix_running_{self.district_abb} c ON
-                a.hourid = c.TOD
-                SET a.HourMix = c.factor;
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.emisrate_tbl,
+                    alias="a",
+                    join_tbl_nm=self.hourmix_tbl,
+                    join_alias="c",
+                    on_sql="a.hourid = c.TOD",
+                    set_cols={"HourMix": "c.factor"},
+                )
             )
             if self.use_txled:
                 self.cur.execute(
-                    f"""
-                    UPDATE emisrate a
-                    LEFT JOIN txled_long_{self.analysis_year} d  ON
-                    a.pollutantid = d.pollutantid AND
-                    a.sourcetypeid = d.sourcetypeid AND
-                    a.fueltypeid = d.fueltypeid
-                    SET a.txledfac = d.txled_fac;
-                """
+                    self.backend.update_join_sql(
+                        tbl_nm=self.emisrate_tbl,
+                        alias="a",
+                        join_tbl_nm=self.txled_tbl,
+                        join_alias="d",
+                        on_sql="""
+                        a.pollutantid = d.pollutantid AND
+                        a.sourcetypeid = d.sourcetypeid AND
+                        a.fueltypeid = d.fueltypeid""",
+                        set_cols={"txledfac": "d.txled_fac"},
+                        left_join=True,
+                    )
                 )
                 self.cur.execute(
                     f"""
-                    UPDATE emisrate
+                    UPDATE {self.emisrate_tbl}
                     SET txledfac = 1.0 WHERE txledfac IS NULL;
                 """
                 )
             else:
-                self.cur.execute(f"""UPDATE emisrate SET txledfac = 1.0;""")
+                self.cur.execute(f"""UPDATE {self.emisrate_tbl} SET txledfac = 1.0;""")
         else:
             print(
                 "Run create_indices_before_joins to speed-up joins. Will not run this "
@@ -362,9 +514,402 @@ class RunningSqlCmds(MovesDb):
         proportion of vehicles in different time of day and if the TxLED program is
         active in a county (or majority of county of a district."""
         self.cur.execute(
-            """UPDATE emisrate SET emisFact = ERate*stypemix*HourMix*txledfac;"""
+            f"""UPDATE {self.emisrate_tbl} 
+            SET emisFact = ERate*stypemix*HourMix*txledfac;"""
         )
 
+    def _sql_funclass_case(self, roadtype_col="roadtypeid"):
+        """SQL CASE expression mapping MOVES roadtypeid to the road type
+        description in self.MAP_RD_TYPE."""
+        when_clauses = " ".join(
+            f"WHEN {rdtype} THEN '{rdtypedesc}'"
+            for rdtype, rdtypedesc in self.MAP_RD_TYPE.items()
+        )
+        return f"CASE {roadtype_col} {when_clauses} END"
+
+    def _sql_period_case(self, hour_col="hourid"):
+        """SQL CASE expression mapping MOVES hourid to the period in
+        self.MAP_PERIOD_HOURID."""
+        when_clauses = " ".join(
+            f"WHEN {hour_col} IN {hourid_tuple} THEN '{period_val}'"
+            for period_val, hourid_tuple in self.MAP_PERIOD_HOURID.items()
+        )
+        return f"CASE {when_clauses} END"
+
+    @staticmethod
+    def _sql_avgspeed_expr(avgspeedbin_col="avgSpeedBinID"):
+        """SQL expression for the average speed of each MOVES avgspeedbinid."""
+        return f"IF({avgspeedbin_col} = 1, 2.5, ({avgspeedbin_col} - 1) * 5)"
+
+    def get_fused_select_sql(self):
+        """
+        SELECT statement of the fused execution mode: rateperdistance aggregated
+        directly to the rows of mvs2014b_erlt_out.running_erlt_intermediate. Used by
+        fused_agg_emisrate_to_output and fused_agg_emisrate_to_shard.
+        """
+        float_sql = self.backend.float_sql
+        if self.use_txled:
+            txled_factor = f"COALESCE({float_sql('d.txled_fac')}, 1.0)"
+            txled_join = f"""
+                    LEFT JOIN txled_db.txled_long d ON
+                    d.yearid = {self.sql_var("analysis_year")} AND
+                    d.pollutantid = a.pollutantid AND
+                    d.sourcetypeid = a.sourcetypeid AND
+                    d.fueltypeid = a.fueltypeid"""
+        else:
+            txled_factor = "1.0"
+            txled_join = ""
+        # Same single precision rounding as the FLOAT columns of emisrate in the
+        # stepwise mode.
+        emisfact_expr = (
+            f"a.ERate * {float_sql('b.VMTmix')} * {float_sql('c.factor')} * "
+            f"{txled_factor}"
+        )
+        return f"""
+                SELECT Area,yearid,monthid,funclass,avgspeed,
+                {self.pollutant_pivot_sql}
+                FROM (
+                    SELECT {self.sql_var("analysis_district")} AS Area, a.yearid,
+                    a.monthid, a.pollutantid, a.fueltypeid,
+                    {self._sql_funclass_case("a.roadtypeid")} AS funclass,
+                    {self._sql_avgspeed_expr("a.avgSpeedBinID")} AS avgspeed,
+                    {float_sql(emisfact_expr)} AS emisfact
+                    FROM (
+                        SELECT yearid,monthid,hourid,roadtypeid,pollutantid,
+                        sourcetypeid,fueltypeid,avgSpeedBinID,
+                        SUM(rateperdistance) as ERate 
+                        FROM {self.rateperdistance_tbl}
+                        WHERE pollutantid in ({self.pollutant_id_sql}) 
+                        and processid not in (18,19)
+                        GROUP BY yearid,monthid,hourid,roadtypeid,pollutantid,
+                        sourcetypeid,fueltypeid,avgSpeedBinID
+                    ) a
+                    LEFT JOIN vmtmix_fy20.todmix b ON
+                    b.TxDOT_Dist = {self.sql_var("analysis_district")} AND
+                    b.Daytype = 'Weekday' AND
+                    b.YearID = {self.sql_var("analysis_year_todmix")} AND
+                    b.Period = {self._sql_period_case("a.hourid")} AND
+                    b.MOVES_STcode = a.sourcetypeid AND
+                    b.MOVES_FTcode = a.fueltypeid AND
+                    b.VMX_RDcode = a.roadtypeid
+                    LEFT JOIN vmtmix_fy20.hourmix c ON
+                    c.District = {self.sql_var("analysis_district")} AND
+                    c.TOD = a.hourid{txled_join}
+                ) f
+                GROUP BY Area,yearid,monthid,funclass,avgspeed
+        """
+
+    def fused_agg_emisrate_to_output(
+        self, add_seperate_conflicted_copy=False, conflicted_copy_suffix=""
+    ):
+        """
+        Fused execution mode for the running process. Produce the
+        mvs2014b_erlt_out.running_erlt_intermediate rows with one INSERT ... SELECT
+        instead of aggregate_emisrate_rateperdist, get_hourmix, get_vmtmix,
+        get_txled, create_indices_before_joins, join_emisrate_vmt_tod_txled,
+        compute_factored_emisrate, and agg_by_rdtype_funcls_avgspd. The VMT-mix,
+        hour-mix, and TxLED factors are joined directly from vmtmix_fy20.todmix,
+        vmtmix_fy20.hourmix, and txled_db.txled_long, and Area, funclass, period, and
+        avgspeed are computed inline. The emisrate table is not created.
+        Note: VMTmix, factor, txled_fac, and the product are rounded to single
+        precision (backend.float_sql), like the FLOAT stypemix, HourMix, txledfac, and
+        emisFact columns of emisrate in the stepwise mode.
+        Parameters
+        ----------
+        add_seperate_conflicted_copy: bool
+            True, to save the output in mvs2014b_erlt_conflicted instead of
+            mvs2014b_erlt_out.running_erlt_intermediate.
+        conflicted_copy_suffix: str
+            Suffix for the conflicted copy table name.
+        """
+        start_time = time.time()
+        cmd_common = self.get_fused_select_sql()
+        if not add_seperate_conflicted_copy:
+            cmd_fused = self.insert_sql + cmd_common
+        else:
+            print(
+                f"Saving running emission rate for "
+                f"{self.district_abb}, {self.analysis_year}, "
+                f"{self.anaylsis_month} in mvs2014b_erlt_conflicted for review."
+            )
+            self.cur.execute(
+                f"DROP TABLE IF EXISTS mvs2014b_erlt_conflicted.running"
+                f"_{self.district_abb}_{self.analysis_year}"
+                f"_{self.anaylsis_month}_{conflicted_copy_suffix};"
+            )
+            cmd_fused = self.backend.create_table_as_sql(
+                f"mvs2014b_erlt_conflicted.running"
+                f"_{self.district_abb}_{self.analysis_year}_"
+                f"{self.anaylsis_month}_{conflicted_copy_suffix}",
+                cmd_common,
+            )
+        self.backend.flush_tables(self.cur)
+        try:
+            self.cur.execute(cmd_fused)
+        except self.backend.repair_errors:
+            self._repair_rateperdistance()
+            self.cur.execute(cmd_fused)
+        except self.backend.integrity_errors as integerityrr:
+            print(integerityrr)
+            print(
+                "Re-create the mvs2014b_erlt_out.running_erlt_intermediate table if you"
+                " want to overwrite it."
+            )
+            raise
+        print(
+            "---fused_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---fused_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+
+    def fused_agg_emisrate_to_shard(self, shard_dir):
+        """
+        Fused execution mode writing the output rows to a result shard in shard_dir
+        instead of mvs2014b_erlt_out.running_erlt_intermediate. See
+        fused_agg_emisrate_to_output and ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_fused_select_sql()
+        )
+
+    def create_weight_table(self):
+        """
+        Precompute the combined weight VMTmix * hour-mix factor * TxLED factor by
+        (hourid, roadtypeid, sourcetypeid, fueltypeid, pollutantid) in the
+        running_weights table. The weights don't depend on the speed bin, so the
+        weighted mode joins rateperdistance to this table once instead of writing
+        stypemix, HourMix, and txledfac to every emisrate row. Run get_hourmix,
+        get_vmtmix, and get_txled first.
+        """
+        start_time = time.time()
+        pollutantid_rows = " UNION ALL ".join(
+            f"SELECT {pollutantid} AS pollutantid"
+            for pollutantid in get_pollutant_ids(self.pollutants)
+        )
+        if self.use_txled:
+            txled_factor = "COALESCE(d.txled_fac, 1.0)"
+            txled_join = f"""
+                LEFT JOIN {self.txled_tbl} d ON
+                d.pollutantid = p.pollutantid AND
+                d.sourcetypeid = b.MOVES_STcode AND
+                d.fueltypeid = b.MOVES_FTcode"""
+        else:
+            txled_factor = "1.0"
+            txled_join = ""
+        self.backend.flush_tables(self.cur)
+        self.cur.execute(f"DROP TABLE IF EXISTS {self.weights_tbl};")
+        self.cur.execute(
+            self.backend.create_table_as_sql(
+                self.weights_tbl,
+                f"""
+            SELECT c.TOD AS hourid, b.VMX_RDcode AS roadtypeid,
+            b.MOVES_STcode AS sourcetypeid, b.MOVES_FTcode AS fueltypeid,
+            p.pollutantid, b.VMTmix * c.factor * {txled_factor} AS weight
+            FROM {self.vmtmix_tbl} b
+            JOIN {self.hourmix_tbl} c ON
+            b.Period = {self._sql_period_case("c.TOD")}
+            JOIN ({pollutantid_rows}) p{txled_join};
+        """,
+            )
+        )
+        self.backend.create_index(
+            self.cur,
+            "weightidx1",
+            self.weights_tbl,
+            "hourid, roadtypeid, sourcetypeid, fueltypeid, pollutantid",
+            unique=True,
+        )
+        print(
+            "---create_weight_table execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---create_weight_table execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+
+    def get_weighted_emisfact_sql(self):
+        """
+        SELECT statement of the weighted emission factors: rateperdistance joined to
+        running_weights. Rows without a weight give NULL emisfact, like the NULL
+        stypemix or HourMix of the stepwise mode; the pollutant pivot of
+        get_weighted_select_sql sums them as 0.
+        """
+        return f"""
+                    SELECT {self.sql_var("analysis_district")} AS Area, a.yearid,
+                    a.monthid, a.pollutantid, a.fueltypeid,
+                    {self._sql_funclass_case("a.roadtypeid")} AS funclass,
+                    {self._sql_avgspeed_expr("a.avgSpeedBinID")} AS avgspeed,
+                    a.rateperdistance * w.weight AS emisfact
+                    FROM {self.rateperdistance_tbl} a
+                    LEFT JOIN {self.weights_tbl} w ON
+                    w.hourid = a.hourid AND
+                    w.roadtypeid = a.roadtypeid AND
+                    w.sourcetypeid = a.sourcetypeid AND
+                    w.fueltypeid = a.fueltypeid AND
+                    w.pollutantid = a.pollutantid
+                    WHERE a.pollutantid in ({self.pollutant_id_sql}) 
+                    and a.processid not in (18,19)
+        """
+
+    def get_weighted_select_sql(self):
+        """
+        SELECT statement of the weighted execution mode: the emission factors of
+        get_weighted_emisfact_sql aggregated directly to the rows of
+        mvs2014b_erlt_out.running_erlt_intermediate.
+        """
+        return f"""
+                SELECT Area,yearid,monthid,funclass,avgspeed,
+                {self.pollutant_pivot_sql}
+                FROM ({self.get_weighted_emisfact_sql()}) f
+                GROUP BY Area,yearid,monthid,funclass,avgspeed
+        """
+
+    def weighted_agg_emisrate_to_output(self):
+        """
+        Weighted execution mode for the running process. Insert the
+        mvs2014b_erlt_out.running_erlt_intermediate rows with one INSERT ... SELECT
+        over rateperdistance and running_weights (see create_weight_table) instead
+        of aggregate_emisrate_rateperdist, create_indices_before_joins,
+        join_emisrate_vmt_tod_txled, compute_factored_emisrate, and
+        agg_by_rdtype_funcls_avgspd.
+        Note: The factors are multiplied in double precision, so the weighted and
+        stepwise modes agree to single precision (see fused_agg_emisrate_to_output).
+        """
+        start_time = time.time()
+        cmd_weighted = self.insert_sql + self.get_weighted_select_sql()
+        self.backend.flush_tables(self.cur)
+        try:
+            self.cur.execute(cmd_weighted)
+        except self.backend.repair_errors:
+            self._repair_rateperdistance()
+            self.cur.execute(cmd_weighted)
+        except self.backend.integrity_errors as integerityrr:
+            print(integerityrr)
+            print(
+                "Re-create the mvs2014b_erlt_out.running_erlt_intermediate table if you"
+                " want to overwrite it."
+            )
+            raise
+        print(
+            "---weighted_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---weighted_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+
+    def weighted_agg_emisrate_to_shard(self, shard_dir):
+        """
+        Weighted execution mode writing the output rows to a result shard in shard_dir
+        instead of mvs2014b_erlt_out.running_erlt_intermediate. See
+        weighted_agg_emisrate_to_output and ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_weighted_select_sql()
+        )
+
+    def get_rateperdistance_arr(self):
+        """
+        Filtered rateperdistance rows (RUNNING_RATE_COLS and rateperdistance) as a
+        float64 array for the NumPy engine. NULL rates are NaN.
+        """
+        cmd_rate = f"""
+                SELECT {", ".join(RUNNING_RATE_COLS)}, rateperdistance
+                FROM {self.rateperdistance_tbl}
+                WHERE pollutantid in ({self.pollutant_id_sql}) 
+                and processid not in (18,19);
+        """
+        self.backend.flush_tables(self.cur)
+        try:
+            self.cur.execute(cmd_rate)
+        except self.backend.repair_errors:
+            self._repair_rateperdistance()
+            self.cur.execute(cmd_rate)
+        return np.array(self.cur.fetchall(), dtype=np.float64).reshape(
+            -1, len(RUNNING_RATE_COLS) + 1
+        )
+
+    def compute_numpy_emisrate(self):
+        """
+        NumPy engine: compute the mvs2014b_erlt_out.running_erlt_intermediate rows in
+        memory with the same single precision weights as the stepwise mode. Run
+        get_hourmix, get_vmtmix, and get_txled first. See
+        ttierlt_v1.running.running_numpy_engine.
+        Returns
+        -------
+        pd.DataFrame()
+            Output rows.
+        """
+        return compute_running_erlt(
+            rate_arr=self.get_rateperdistance_arr(),
+            vmtmix=self.vmtmix,
+            hourmix=self.hourmix,
+            txled=self.txled_df if self.use_txled else None,
+            area_district=self.area_district,
+            map_rd_type=self.MAP_RD_TYPE,
+            map_period_hourid=self.MAP_PERIOD_HOURID,
+            pollutants=self.pollutants,
+        )
+
+    def numpy_agg_emisrate_to_output(self):
+        """
+        NumPy execution mode for the running process. Insert the rows computed by
+        compute_numpy_emisrate into mvs2014b_erlt_out.running_erlt_intermediate
+        instead of aggregate_emisrate_rateperdist, create_indices_before_joins,
+        join_emisrate_vmt_tod_txled, compute_factored_emisrate, and
+        agg_by_rdtype_funcls_avgspd. The emisrate table is not created.
+        """
+        start_time = time.time()
+        result = self.compute_numpy_emisrate()
+        # Python ints/ floats, and None for NULL.
+        result = result.astype(object).where(result.notna(), None)
+        try:
+            self.cur.executemany(
+                self.insert_sql + f"VALUES ({', '.join(['?'] * len(result.columns))})",
+                list(result.itertuples(index=False, name=None)),
+            )
+        except self.backend.integrity_errors as integerityrr:
+            print(integerityrr)
+            print(
+                "Re-create the mvs2014b_erlt_out.running_erlt_intermediate table if you"
+                " want to overwrite it."
+            )
+            raise
+        print(
+            "---numpy_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+        logging.info(
+            "---numpy_agg_emisrate_to_output execution time:  %s seconds---"
+            % (time.time() - start_time)
+        )
+
+    def numpy_agg_emisrate_to_shard(self, shard_dir):
+        """
+        NumPy execution mode writing the output rows to a result shard in shard_dir
+        instead of mvs2014b_erlt_out.running_erlt_intermediate. See
+        numpy_agg_emisrate_to_output and ttierlt_v1.result_shards.
+        """
+        return write_shard(self.compute_numpy_emisrate(), shard_dir, self.db_nm)
+
+    def get_agg_select_sql(self):
+        """
+        SELECT statement that aggregates (sums) the emisrate table to the rows of
+        mvs2014b_erlt_out.running_erlt_intermediate. Used by
+        agg_by_rdtype_funcls_avgspd and agg_by_rdtype_funcls_avgspd_to_shard.
+        """
+        return f"""
+                SELECT Area,yearid,monthid,funclass,avgspeed,
+                {self.pollutant_pivot_sql}
+                FROM {self.emisrate_tbl}
+                GROUP BY Area,yearid,monthid,funclass,avgspeed
+        """
+
     def agg_by_rdtype_funcls_avgspd(
         self, add_seperate_conflicted_copy=False, conflicted_copy_suffix=""
     ):
@@ -375,41 +920,13 @@ class RunningSqlCmds(MovesDb):
         in mvs2014_erlt_conflicted schema.
         """
         start_time = time.time()
-        cmd_insert = """
-                INSERT INTO mvs2014b_erlt_out.running_erlt_intermediate(Area, yearid, 
-                monthid, funclass, avgspeed, 
-                CO, NOX, SO2, NO2, VOC, CO2EQ, PM10, PM25, BENZ, NAPTH, BUTA, FORM, 
-                ACTE, ACROL, ETYB, DPM, POM)
-        """
-        cmd_create_conflicted = (
-            f"CREATE TABLE mvs2014b_erlt_conflicted.running"
+        cmd_insert = self.insert_sql
+        conflicted_tbl = (
+            f"mvs2014b_erlt_conflicted.running"
             f"_{self.district_abb}_{self.analysis_year}_"
             f"{self.anaylsis_month}_{conflicted_copy_suffix}"
         )
-        cmd_common = """
-                SELECT Area,yearid,monthid,funclass,avgspeed,
-                SUM(IF(pollutantid = 2, emisfact, 0)) AS CO,
-                SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,
-                SUM(IF(pollutantid = 31, emisfact, 0)) AS SO2,
-                SUM(IF(pollutantid = 33, emisfact, 0)) AS NO2,
-                SUM(IF(pollutantid = 87, emisfact, 0)) AS VOC,
-                SUM(IF(pollutantid = 98, emisfact, 0)) AS CO2EQ,
-                SUM(IF(pollutantid = 100, emisfact, 0)) AS PM10,
-                SUM(IF(pollutantid = 110, emisfact, 0)) AS PM25,
-                SUM(IF(pollutantid = 20, emisfact, 0)) AS BENZ,
-                SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,
-                SUM(IF(pollutantid = 24, emisfact, 0)) AS BUTA,
-                SUM(IF(pollutantid = 25, emisfact, 0)) AS FORM,
-                SUM(IF(pollutantid = 26, emisfact, 0)) AS ACTE,
-                SUM(IF(pollutantid = 27, emisfact, 0)) AS ACROL,
-                SUM(IF(pollutantid = 41, emisfact, 0)) AS ETYB,
-                SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM,
-                SUM(IF(pollutantid IN (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78,
-                81, 82, 83, 84, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177,
-                178, 181, 182, 183, 184), emisfact, 0)) AS POM
-                FROM emisrate
-                GROUP BY Area,yearid,monthid,funclass,avgspeed
-        """
+        cmd_common = self.get_agg_select_sql()
         try:
             cmd_insert_agg = cmd_insert + cmd_common
             if not add_seperate_conflicted_copy:
@@ -420,7 +937,9 @@ class RunningSqlCmds(MovesDb):
                     f"{self.district_abb}, {self.analysis_year}, "
                     f"{self.anaylsis_month} in mvs2014b_erlt_conflicted for review."
                 )
-                cmd_create_agg = cmd_create_conflicted + cmd_common
+                cmd_create_agg = self.backend.create_table_as_sql(
+                    conflicted_tbl, cmd_common
+                )
                 self.cur.execute(
                     f"DROP TABLE IF EXISTS mvs2014b_erlt_conflicted.running"
                     f"_{self.district_abb}_{self.analysis_year}"
@@ -435,7 +954,7 @@ class RunningSqlCmds(MovesDb):
                 "---agg_by_rdtype_funcls_avgspd execution time:  %s seconds---"
                 % (time.time() - start_time)
             )
-        except mariadb.IntegrityError as integerityrr:
+        except self.backend.integrity_errors as integerityrr:
             print(integerityrr)
             print(
                 "Re-create the mvs2014b_erlt_out.running_erlt_intermediate table if you"
@@ -448,6 +967,16 @@ class RunningSqlCmds(MovesDb):
             )
             raise
 
+    def agg_by_rdtype_funcls_avgspd_to_shard(self, shard_dir):
+        """
+        Write the rows of agg_by_rdtype_funcls_avgspd to a result shard in shard_dir
+        instead of mvs2014b_erlt_out.running_erlt_intermediate. See
+        ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_agg_select_sql()
+        )
+
 
 if __name__ == "__main__":
     path_to_log_dir = os.path.join(PATH_INTERIM_RUNNING, "Log Files")
@@ -0,0 +1,190 @@
+"""
+Running process from the MOVES output lake (ttierlt_v1.moves_lake). Reads the
+rateperdistance rows of a database with column pruning and predicate pushdown, and
+the VMT-mix, hour-mix, and TxLED factors from the lake reference data, and computes
+the rows of mvs2014b_erlt_out.running_erlt_intermediate with the NumPy engine. No
+MariaDB server is needed; the output is written to result shards that can be merged
+into the output table later (ttierlt_v1.result_shards.merge_result_shards).
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import time
+import logging
+import concurrent.futures
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from ttierlt_v1.movesdb import MovesDb
+from ttierlt_v1.moves_lake import (
+    PATH_MOVES_LAKE,
+    read_lake_table,
+    read_lake_ref_data,
+    get_db_filter,
+)
+from ttierlt_v1.pollutants import get_pollutant_ids, get_pollutant_cols
+from ttierlt_v1.result_shards import get_shard_path, write_shard
+from ttierlt_v1.running.running_numpy_engine import (
+    compute_running_erlt,
+    RUNNING_RATE_COLS,
+)
+
+
+def get_lake_rateperdistance_arr(db_nm, lake_dir=PATH_MOVES_LAKE, pollutants=None):
+    """
+    Lake counterpart of RunningSqlCmds.get_rateperdistance_arr: the
+    RUNNING_RATE_COLS and rateperdistance of the rows of db_nm with the MOVES
+    pollutants of the subset and processid not in (18, 19), as a float64 array. NULL
+    rates are NaN.
+    """
+    filter_expr = (
+        get_db_filter(db_nm)
+        & ds.field("pollutantid").isin(list(get_pollutant_ids(pollutants)))
+        & ~ds.field("processid").isin([18, 19])
+    )
+    rate_data = read_lake_table(
+        lake_dir,
+        "rateperdistance",
+        columns=list(RUNNING_RATE_COLS) + ["rateperdistance"],
+        filter_expr=filter_expr,
+    )
+    return np.column_stack(
+        [
+            rate_data[col].to_numpy(zero_copy_only=False).astype(np.float64)
+            for col in rate_data.column_names
+        ]
+    ).reshape(-1, len(RUNNING_RATE_COLS) + 1)
+
+
+def compute_running_erlt_from_lake(db_nm, lake_dir=PATH_MOVES_LAKE, pollutants=None):
+    """
+    Rows of mvs2014b_erlt_out.running_erlt_intermediate for db_nm computed from the
+    lake. Same as RunningSqlCmds.compute_numpy_emisrate.
+    Returns
+    -------
+    pd.DataFrame()
+        Output rows.
+    """
+    moves_db = MovesDb(db_nm, connect=False)
+    vmtmix = read_lake_ref_data(
+        lake_dir,
+        "todmix",
+        (ds.field("TxDOT_Dist") == moves_db.area_district)
+        & (ds.field("Daytype") == "Weekday")
+        & (ds.field("YearID") == moves_db.analysis_year_todmix),
+    )
+    hourmix = read_lake_ref_data(
+        lake_dir, "hourmix", ds.field("District") == moves_db.area_district
+    )
+    txled = None
+    if moves_db.use_txled:
+        txled = read_lake_ref_data(
+            lake_dir, "txled_long", ds.field("yearid") == moves_db.analysis_year
+        )
+        assert len(txled) >= 1, (
+            "No data in txled table. Compare  the analysis year with yearid in "
+            "txled_long."
+        )
+    return compute_running_erlt(
+        rate_arr=get_lake_rateperdistance_arr(db_nm, lake_dir, pollutants),
+        vmtmix=vmtmix,
+        hourmix=hourmix,
+        txled=txled,
+        area_district=moves_db.area_district,
+        map_rd_type=moves_db.MAP_RD_TYPE,
+        map_period_hourid=moves_db.MAP_PERIOD_HOURID,
+        pollutants=pollutants,
+    )
+
+
+def process_db_from_lake(db_nm, lake_dir, shard_dir, pollutants=None):
+    """
+    Write the running output rows of db_nm computed from the lake to a result shard.
+    Databases with a result shard are skipped.
+    Returns
+    -------
+    dict
+        db_nm, process, status (success, skipped, or failed), wall time in seconds,
+        and the error message for failed databases.
+    """
+    start_time = time.time()
+    status = "success"
+    error = None
+    try:
+        if os.path.exists(get_shard_path(shard_dir, db_nm)):
+            status = "skipped"
+        else:
+            write_shard(
+                compute_running_erlt_from_lake(db_nm, lake_dir, pollutants),
+                shard_dir,
+                db_nm,
+            )
+    except Exception as err:
+        status = "failed"
+        error = f"{type(err).__name__}: {err}"
+        logging.exception(f"# Failed processing {db_nm}")
+    wall_time = time.time() - start_time
+    logging.info("---running %s %s in %s seconds---" % (db_nm, status, wall_time))
+    return {
+        "db_nm": db_nm,
+        "process": "running",
+        "status": status,
+        "wall_time_s": wall_time,
+        "error": error,
+    }
+
+
+def lake_batch_run(
+    db_nms_list, shard_dir, lake_dir=PATH_MOVES_LAKE, n_workers=None, pollutants=None
+):
+    """
+    Run the running process on the databases of the lake over a pool of worker
+    processes. The workers only read local Parquet files, so n_workers isn't limited
+    by the MariaDB server.
+    Parameters
+    ----------
+    db_nms_list: list
+        MOVES output database names exported to the lake.
+    shard_dir: str
+        Directory for the result shards.
+    lake_dir: str
+        Lake directory.
+    n_workers: int
+        Number of worker processes. None for os.cpu_count(). n_workers = 1 runs the
+        databases serially in the current process.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS.
+    Returns
+    -------
+    pd.DataFrame()
+        Per-database report with db_nm, process, status, wall_time_s, and error.
+    """
+    get_pollutant_cols(pollutants)
+    batch_start_time = time.time()
+    if n_workers == 1:
+        report = [
+            process_db_from_lake(db_nm, lake_dir, shard_dir, pollutants)
+            for db_nm in db_nms_list
+        ]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+            report = list(
+                executor.map(
+                    process_db_from_lake,
+                    db_nms_list,
+                    [lake_dir] * len(db_nms_list),
+                    [shard_dir] * len(db_nms_list),
+                    [pollutants] * len(db_nms_list),
+                )
+            )
+    print(
+        "---Lake batch execution time with %s workers:  %s seconds ---"
+        % (n_workers, time.time() - batch_start_time)
+    )
+    logging.info(
+        "---Lake batch execution time with %s workers:  %s seconds ---"
+        % (n_workers, time.time() - batch_start_time)
+    )
+    return pd.DataFrame(
+        report, columns=["db_nm", "process", "status", "wall_time_s", "error"]
+    )
@@ -0,0 +1,184 @@
+"""
+NumPy engine for the running process. Computes the rows of
+mvs2014b_erlt_out.running_erlt_intermediate from the filtered rateperdistance rows,
+VMT-mix, hour-mix, and TxLED factors in memory, instead of the UPDATE-JOIN passes on
+the emisrate table. Mimics the stepwise mode: the weights and emisFact are rounded to
+single precision like the FLOAT columns of emisrate, and the sums are in double
+precision in the GROUP BY order.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse
+from ttierlt_v1.pollutants import get_pollutant_cols, get_aggregation_matrix
+
+RUNNING_RATE_COLS = (
+    "yearid",
+    "monthid",
+    "hourid",
+    "roadtypeid",
+    "pollutantid",
+    "sourcetypeid",
+    "fueltypeid",
+    "avgSpeedBinID",
+)
+"""Key columns of the emisrate table; rateperdistance follows in the rate array."""
+
+
+def _sum_like_sql(codes, values, num_groups):
+    """SUM(values) GROUP BY codes: NULLs (NaN) are skipped; all-NULL groups are NULL."""
+    is_null = np.isnan(values)
+    sums = np.bincount(
+        codes, weights=np.where(is_null, 0.0, values), minlength=num_groups
+    )
+    num_non_null = np.bincount(codes, weights=~is_null, minlength=num_groups)
+    sums[num_non_null == 0] = np.nan
+    return sums
+
+
+def _lookup_float32(ref_data, key_cols, val_col, key_arrays):
+    """
+    Emulate UPDATE ... JOIN ref_data SET <FLOAT column> = val_col: look up val_col
+    by key_cols and round to single precision. Unmatched rows are NaN (NULL).
+    """
+    ref_index = pd.MultiIndex.from_frame(ref_data[list(key_cols)])
+    if ref_index.has_duplicates:
+        raise ValueError(f"{list(key_cols)} aren't unique in the {val_col} data.")
+    positions = ref_index.get_indexer(pd.MultiIndex.from_arrays(key_arrays))
+    ref_values = np.asarray(ref_data[val_col], dtype=np.float64).astype(np.float32)
+    return np.where(positions >= 0, ref_values[positions], np.nan).astype(np.float32)
+
+
+def compute_running_erlt(
+    rate_arr,
+    vmtmix,
+    hourmix,
+    txled,
+    area_district,
+    map_rd_type,
+    map_period_hourid,
+    pollutants=None,
+):
+    """
+    Compute the rows of mvs2014b_erlt_out.running_erlt_intermediate for one MOVES
+    output database.
+    Parameters
+    ----------
+    rate_arr: np.array
+        float64 array with the RUNNING_RATE_COLS and rateperdistance columns of the
+        filtered rateperdistance rows.
+    vmtmix: pd.DataFrame()
+        Weekday VMT-mix with Period, MOVES_STcode, MOVES_FTcode, VMX_RDcode, and
+        VMTmix columns.
+    hourmix: pd.DataFrame()
+        Hour-mix with TOD and factor columns.
+    txled: pd.DataFrame()
+        TxLED factors with pollutantid, sourcetypeid, fueltypeid, and txled_fac
+        columns. None if the district doesn't have TxLED.
+    area_district: str
+        Area of the output rows.
+    map_rd_type: dict
+        {roadtypeid: funclass}, e.g., MovesDb.MAP_RD_TYPE.
+    map_period_hourid: dict
+        {period: hourids}, e.g., MovesDb.MAP_PERIOD_HOURID.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS.
+    Returns
+    -------
+    pd.DataFrame()
+        Area, yearid, monthid, funclass, avgspeed, and the pollutant columns sorted by
+        the key columns.
+    """
+    rate_arr = np.asarray(rate_arr, dtype=np.float64).reshape(
+        -1, len(RUNNING_RATE_COLS) + 1
+    )
+    # emisrate: SUM(rateperdistance) by the key columns. np.unique sorts the keys like
+    # the GROUP BY of the INSERT INTO emisrate ... SELECT.
+    emis_keys, emis_codes = np.unique(
+        rate_arr[:, :-1].astype(np.int64), axis=0, return_inverse=True
+    )
+    emis_codes = emis_codes.ravel()
+    erate = _sum_like_sql(emis_codes, rate_arr[:, -1], len(emis_keys))
+    (
+        yearid,
+        monthid,
+        hourid,
+        roadtypeid,
+        pollutantid,
+        sourcetypeid,
+        fueltypeid,
+        avgspeedbinid,
+    ) = emis_keys.T
+    period = np.full(len(emis_keys), None, dtype=object)
+    for period_val, hourid_tuple in map_period_hourid.items():
+        period[np.isin(hourid, hourid_tuple)] = period_val
+    funclass = np.full(len(emis_keys), None, dtype=object)
+    for rdtype, rdtypedesc in map_rd_type.items():
+        funclass[roadtypeid == rdtype] = rdtypedesc
+    avgspeed = np.where(avgspeedbinid == 1, 2.5, (avgspeedbinid - 1) * 5.0)
+    stypemix = _lookup_float32(
+        vmtmix,
+        ("Period", "MOVES_STcode", "MOVES_FTcode", "VMX_RDcode"),
+        "VMTmix",
+        [period, sourcetypeid, fueltypeid, roadtypeid],
+    )
+    hourmix_fac = _lookup_float32(hourmix, ("TOD",), "factor", [hourid])
+    if txled is None:
+        txledfac = np.ones(len(emis_keys), dtype=np.float32)
+    else:
+        txledfac = _lookup_float32(
+            txled,
+            ("pollutantid", "sourcetypeid", "fueltypeid"),
+            "txled_fac",
+            [pollutantid, sourcetypeid, fueltypeid],
+        )
+        txledfac[np.isnan(txledfac)] = 1.0
+    # emisFact = ERate*stypemix*HourMix*txledfac in double precision, stored as FLOAT.
+    emisfact = (
+        (((erate * stypemix) * hourmix_fac) * txledfac)
+        .astype(np.float32)
+        .astype(np.float64)
+    )
+    # Output rows: GROUP BY Area, yearid, monthid, funclass, avgspeed. NULL funclass
+    # sorts first (code -1).
+    funclass_codes, funclass_labels = pd.factorize(funclass, sort=True)
+    out_keys, out_codes = np.unique(
+        np.column_stack(
+            [yearid, monthid, funclass_codes, (avgspeed * 2).astype(np.int64)]
+        ),
+        axis=0,
+        return_inverse=True,
+    )
+    out_codes = out_codes.ravel()
+    out_funclass = np.full(len(out_keys), None, dtype=object)
+    has_funclass = out_keys[:, 2] >= 0
+    out_funclass[has_funclass] = np.asarray(funclass_labels)[out_keys[has_funclass, 2]]
+    out_data = pd.DataFrame(
+        {
+            "Area": area_district,
+            "yearid": out_keys[:, 0],
+            "monthid": out_keys[:, 1],
+            "funclass": out_funclass,
+            "avgspeed": out_keys[:, 3] / 2,
+        }
+    )
+    # SUM(IF(<pollutant condition>, emisfact, 0)) for all the output pollutants: sum
+    # emisfact over the rows of each output row (group_matrix) and pollutant group
+    # (agg_matrix). Like SQL, the sum is NULL only if all the rows of the group are in
+    # the pollutant group and NULL.
+    agg_matrix = get_aggregation_matrix(pollutantid, fueltypeid, pollutants)
+    group_matrix = scipy.sparse.csr_matrix(
+        (np.ones(len(out_codes)), (out_codes, np.arange(len(out_codes)))),
+        shape=(len(out_keys), len(out_codes)),
+    )
+    is_null = np.isnan(emisfact)
+    sums = (
+        group_matrix @ scipy.sparse.diags(np.where(is_null, 0.0, emisfact)) @ agg_matrix
+    ).toarray()
+    num_null = (group_matrix @ scipy.sparse.diags(is_null * 1.0) @ agg_matrix).toarray()
+    num_rows = np.bincount(out_codes, minlength=len(out_keys))
+    sums[num_null == num_rows[:, None]] = np.nan
+    for col, pollutant in enumerate(get_pollutant_cols(pollutants)):
+        out_data[pollutant] = sums[:, col]
+    return out_data
@@ -0,0 +1,288 @@
+"""
+Longest-job-first scheduling of the batch runs. The databases are submitted to the
+worker pool in decreasing order of their estimated cost (historical wall times from
+the run manifest, or the row count of the source table of the process), so the large
+databases (e.g., Houston, Dallas) don't end the run as a long tail on one worker. The
+number of databases in flight adapts to the server load (Threads_running and the rate
+of on-disk temporary tables).
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import time
+import logging
+import concurrent.futures
+import pandas as pd
+from ttierlt_v1.utils import connect_to_server_db
+from ttierlt_v1.run_manifest import RunManifest
+
+PROCESS_SOURCE_TABLES = {
+    "running": "rateperdistance",
+    "starts": "rateperstart",
+    "idling": "movesoutput",
+    "extnidle": "rateperhour",
+}
+"""Source table of the aggregate stage of the emission processes."""
+
+
+def get_source_row_counts(db_nms, process, db_catalog=None):
+    """
+    Row count of the source table of the process in each database, from the database
+    catalog (ttierlt_v1.db_catalog.DbCatalog) if given, otherwise from
+    information_schema.
+    Returns
+    -------
+    dict
+        {db_nm: row count}. Databases without the source table are left out.
+    """
+    source_table = PROCESS_SOURCE_TABLES[process]
+    if db_catalog is not None:
+        db_tables = db_catalog.get_db_tables()
+        row_counts = db_tables.loc[
+            lambda df: df.table_nm.str.lower() == source_table
+        ].set_index("db_nm")["row_count"]
+    else:
+        conn = connect_to_server_db(database_nm=None)
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            SELECT table_schema, table_rows FROM information_schema.tables
+            WHERE table_schema LIKE 'mvs14b_erlt_%_out'
+            AND table_name = '{source_table}';
+        """
+        )
+        row_counts = pd.Series(dict(cur.fetchall()), dtype=float)
+        conn.close()
+    return {
+        db_nm: float(row_counts[db_nm])
+        for db_nm in db_nms
+        if db_nm in row_counts.index and pd.notna(row_counts[db_nm])
+    }
+
+
+def estimate_db_costs(db_nms, wall_times, row_counts):
+    """
+    Estimated wall time (seconds) of each database. Databases with a historical
+    wall time use it; the others are scaled from their row count with the median
+    seconds per row of the databases that have both. Without any overlap, the row
+    counts are the costs. Databases with neither get the median cost.
+    Parameters
+    ----------
+    db_nms: list
+        MOVES output database names.
+    wall_times: dict
+        {db_nm: historical wall time in seconds}.
+    row_counts: dict
+        {db_nm: row count of the source table}.
+    Returns
+    -------
+    dict
+        {db_nm: estimated cost}.
+    """
+    seconds_per_row = pd.Series(
+        {
+            db_nm: wall_times[db_nm] / row_counts[db_nm]
+            for db_nm in wall_times
+            if row_counts.get(db_nm)
+        },
+        dtype=float,
+    )
+    scale = seconds_per_row.median() if len(seconds_per_row) else None
+    costs = {}
+    for db_nm in db_nms:
+        if db_nm in wall_times:
+            costs[db_nm] = wall_times[db_nm]
+        elif db_nm in row_counts and scale is not None:
+            costs[db_nm] = row_counts[db_nm] * scale
+        elif db_nm in row_counts and not wall_times:
+            costs[db_nm] = row_counts[db_nm]
+    median_cost = pd.Series(costs, dtype=float).median() if costs else 1.0
+    return {db_nm: costs.get(db_nm, median_cost) for db_nm in db_nms}
+
+
+def get_db_costs(db_nms, processes, manifest_path=None, db_catalog=None):
+    """
+    Estimated cost of each database for the emission processes (see
+    estimate_db_costs). For several processes, the cost of a database is the cost of
+    its slowest process, as batch_runner.process_db_all runs them concurrently.
+    Parameters
+    ----------
+    db_nms: list
+        MOVES output database names.
+    processes: list-like
+        Emission processes: running, starts, idling, and/ or extnidle.
+    manifest_path: str
+        Run manifest with the stage timings of earlier runs. None to estimate from
+        the row counts only.
+    db_catalog: ttierlt_v1.db_catalog.DbCatalog
+        Catalog for the row counts. Row counts are read from information_schema if
+        None.
+    Returns
+    -------
+    dict
+        {db_nm: estimated cost}.
+    """
+    db_costs = {db_nm: 0.0 for db_nm in db_nms}
+    for process in processes:
+        wall_times = {}
+        if manifest_path is not None:
+            wall_times = RunManifest(manifest_path).get_db_wall_times(process)
+        process_costs = estimate_db_costs(
+            db_nms,
+            wall_times,
+            get_source_row_counts(db_nms, process, db_catalog),
+        )
+        for db_nm, cost in process_costs.items():
+            db_costs[db_nm] = max(db_costs[db_nm], cost)
+    return db_costs
+
+
+class ServerLoadMonitor:
+    """
+    Adapt the number of databases in flight to the load of the MariaDB server. The
+    limit is lowered by one when Threads_running or the rate of on-disk temporary
+    tables (Created_tmp_disk_tables per second) is above its maximum, and raised by
+    one when both are below half of their maximum.
+    Parameters
+    ----------
+    max_threads_running: int
+        Threads_running above which the limit is lowered.
+    max_tmp_disk_tables_per_s: float
+        On-disk temporary tables created per second above which the limit is lowered.
+    poll_interval_s: float
+        Minimum time between two reads of the server status.
+    """
+
+    def __init__(
+        self, max_threads_running=16, max_tmp_disk_tables_per_s=5.0, poll_interval_s=10
+    ):
+        self.max_threads_running = max_threads_running
+        self.max_tmp_disk_tables_per_s = max_tmp_disk_tables_per_s
+        self.poll_interval_s = poll_interval_s
+        self.conn = None
+        self.cur = None
+        self.last_poll = None
+        self.last_tmp_disk_tables = None
+
+    def get_server_status(self):
+        """Threads_running and Created_tmp_disk_tables from SHOW GLOBAL STATUS."""
+        if self.conn is None:
+            self.conn = connect_to_server_db(database_nm=None)
+            self.cur = self.conn.cursor()
+        self.cur.execute(
+            "SHOW GLOBAL STATUS WHERE Variable_name IN "
+            "('Threads_running', 'Created_tmp_disk_tables');"
+        )
+        return {nm: int(value) for nm, value in self.cur.fetchall()}
+
+    def close_conn(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+        self.cur = None
+
+    def get_limit(self, limit, max_limit, min_limit=1):
+        """
+        New limit on the databases in flight given the current limit. The limit is
+        kept if the last poll was less than poll_interval_s ago.
+        """
+        poll_time = time.time()
+        if self.last_poll is not None and (
+            poll_time - self.last_poll < self.poll_interval_s
+        ):
+            return limit
+        server_status = self.get_server_status()
+        threads_running = server_status["Threads_running"]
+        tmp_disk_tables_per_s = 0.0
+        if self.last_poll is not None:
+            tmp_disk_tables_per_s = (
+                server_status["Created_tmp_disk_tables"] - self.last_tmp_disk_tables
+            ) / (poll_time - self.last_poll)
+        self.last_poll = poll_time
+        self.last_tmp_disk_tables = server_status["Created_tmp_disk_tables"]
+        if (
+            threads_running > self.max_threads_running
+            or tmp_disk_tables_per_s > self.max_tmp_disk_tables_per_s
+        ):
+            new_limit = max(min_limit, limit - 1)
+        elif (
+            threads_running < self.max_threads_running / 2
+            and tmp_disk_tables_per_s < self.max_tmp_disk_tables_per_s / 2
+        ):
+            new_limit = min(max_limit, limit + 1)
+        else:
+            new_limit = limit
+        if new_limit != limit:
+            logging.info(
+                f"# Databases in flight: {limit} -> {new_limit} (Threads_running: "
+                f"{threads_running}, on-disk tmp tables/s: "
+                f"{tmp_disk_tables_per_s:.2f})"
+            )
+        return new_limit
+
+
+class BatchScheduler:
+    """
+    Submit the work items of a batch run to a worker pool in decreasing order of
+    cost (longest processing time first), with the number of items in flight
+    limited by the server load monitor.
+    Parameters
+    ----------
+    db_costs: dict
+        {db_nm: estimated cost}; see get_db_costs. Work items without a cost are
+        submitted last, in their original order.
+    load_monitor: ServerLoadMonitor
+        Monitor adapting the number of items in flight. None to keep n_workers items
+        in flight.
+    """
+
+    def __init__(self, db_costs, load_monitor=None):
+        self.db_costs = db_costs
+        self.load_monitor = load_monitor
+
+    def order(self, work_items):
+        """Work items (db_nm first) sorted by decreasing cost."""
+        return sorted(
+            work_items,
+            key=lambda work_item: -self.db_costs.get(work_item[0], float("-inf")),
+        )
+
+    def run(self, submit, work_items, n_workers):
+        """
+        Submit the work items with submit(work_item) -> concurrent.futures.Future and
+        yield the results as they complete.
+        """
+        pending = self.order(work_items)
+        in_flight = set()
+        limit = n_workers
+        try:
+            while pending or in_flight:
+                if self.load_monitor is not None:
+                    limit = self.load_monitor.get_limit(limit, n_workers)
+                while pending and len(in_flight) < limit:
+                    in_flight.add(submit(pending.pop(0)))
+                timeout = None
+                if self.load_monitor is not None:
+                    timeout = self.load_monitor.poll_interval_s
+                done, in_flight = concurrent.futures.wait(
+                    in_flight,
+                    timeout=timeout,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    yield future.result()
+        finally:
+            if self.load_monitor is not None:
+                self.load_monitor.close_conn()
+
+
+def get_batch_scheduler(
+    db_nms, processes, manifest_path=None, db_catalog=None, adaptive=True
+):
+    """
+    BatchScheduler with the costs from get_db_costs and, if adaptive, a
+    ServerLoadMonitor with the default thresholds.
+    """
+    return BatchScheduler(
+        db_costs=get_db_costs(db_nms, processes, manifest_path, db_catalog),
+        load_monitor=ServerLoadMonitor() if adaptive else None,
+    )
@@ -0,0 +1,305 @@
+"""
+SQL backends of the MovesDb pipeline. The *SqlCmds classes run their statements
+through the connection and cursor of a backend, and the MariaDB specific constructs
+(FLUSH TABLES, REPAIR TABLE, @analysis_* session variables, CREATE INDEX IF NOT
+EXISTS, CREATE TABLE ... SELECT, UPDATE ... JOIN, ENGINE=MyISAM) go through the
+dialect hooks of the backend. MariaDbBackend is the production server;
+SqliteBackend is an embedded stand-in (one SQLite file per schema) for running and
+benchmarking the pipeline on a developer machine, e.g., on the synthetic MOVES output
+databases.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import re
+import sqlite3
+import struct
+import mariadb
+from ttierlt_v1.utils import connect_to_server_db, SCRATCH_SCHEMA
+
+
+def sql_literal(value):
+    """SQL literal of a str or number."""
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def _round_float32(value):
+    """value rounded to single precision; None (NULL) stays None."""
+    if value is None:
+        return None
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+class MariaDbBackend:
+    """
+    MariaDB server at MARIA_DB_HOST:MARIA_DB_PORT (ttierlt_v1.utils). The hooks emit
+    the statements the *SqlCmds classes used before the backends were added.
+    """
+
+    name = "mariadb"
+    error = mariadb.Error
+    programming_errors = (mariadb.ProgrammingError,)
+    integrity_errors = (mariadb.IntegrityError,)
+    # MyISAM errors after which the source tables are repaired and the statement is
+    # retried.
+    repair_errors = (mariadb.InternalError, mariadb.OperationalError)
+    # MERGE tables and views over the month databases of a district-year.
+    supports_district_year_tables = True
+    table_options_sql = "ENGINE=MyISAM"
+    output_table_options_sql = "COLLATE='utf8_unicode_ci'\n        ENGINE=MyISAM"
+    collate_sql = " COLLATE 'utf8_unicode_ci'"
+
+    def connect(self, database_nm=None):
+        """Connection to database_nm; see ttierlt_v1.utils.connect_to_server_db."""
+        return connect_to_server_db(database_nm=database_nm)
+
+    def sql_housekeeping(self, cur):
+        cur.execute("SET SQL_SAFE_UPDATES = 0;")
+
+    def set_session_vars(self, cur, session_vars):
+        """SET @<name> = <value> for each item of session_vars."""
+        for var_nm, value in session_vars.items():
+            cur.execute(f"SET @{var_nm} = {sql_literal(value)};")
+
+    def session_var_sql(self, var_nm, value):
+        """SQL referencing the session variable var_nm."""
+        return f"@{var_nm}"
+
+    def float_sql(self, expr):
+        """SQL rounding expr to single precision, like storing it in a FLOAT
+        column."""
+        return f"CAST({expr} AS FLOAT)"
+
+    def flush_tables(self, cur):
+        cur.execute("FLUSH TABLES;")
+
+    def repair_tables(self, cur, tbl_nms):
+        cur.execute(f"REPAIR TABLE {', '.join(tbl_nms)}")
+
+    def create_schema(self, cur, schema_nm):
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {schema_nm};")
+
+    def create_index(self, cur, idx_nm, tbl_nm, cols, unique=False):
+        """CREATE [UNIQUE] INDEX IF NOT EXISTS idx_nm on the columns cols (str) of
+        tbl_nm."""
+        cur.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {idx_nm} "
+            f"ON {tbl_nm} ({cols});"
+        )
+
+    def create_table_as_sql(self, tbl_nm, select_sql):
+        """Statement creating tbl_nm from the rows of select_sql."""
+        return f"CREATE TABLE {tbl_nm}\n{select_sql}"
+
+    def update_join_sql(
+        self, tbl_nm, alias, join_tbl_nm, join_alias, on_sql, set_cols, left_join=False
+    ):
+        """
+        UPDATE of the columns of tbl_nm from the rows of join_tbl_nm matching on_sql.
+        Parameters
+        ----------
+        tbl_nm, alias: str
+            Updated table and its alias in on_sql and set_cols.
+        join_tbl_nm, join_alias: str
+            Joined table and its alias in on_sql and set_cols.
+        on_sql: str
+            Join condition.
+        set_cols: dict
+            {updated column: expression}.
+        left_join: bool
+            True, to set the columns of the unmatched rows to NULL.
+        """
+        set_sql = ", ".join(f"{alias}.{col} = {expr}" for col, expr in set_cols.items())
+        return f"""
+            UPDATE {tbl_nm} {alias}
+            {"LEFT JOIN" if left_join else "JOIN"} {join_tbl_nm} {join_alias} ON
+            {on_sql}
+            SET {set_sql};
+        """
+
+    def get_tables(self, cur, schema_nm):
+        """
+        Tables and views of schema_nm.
+        Returns
+        -------
+        list
+            [(table name, True for views)].
+        """
+        cur.execute(
+            f"""
+            SELECT table_name, table_type FROM information_schema.tables
+            WHERE table_schema = '{schema_nm}';
+        """
+        )
+        return [(tbl_nm, tbl_type == "VIEW") for tbl_nm, tbl_type in cur.fetchall()]
+
+
+class SqliteBackend(MariaDbBackend):
+    """
+    Embedded SQLite stand-in for the MariaDB server. Each schema is the SQLite file
+    <data_dir>/<schema>.sqlite: a connection opens the database file as main and
+    attaches the SHARED_SCHEMAS (reference data, output, conflicted, and scratch
+    schemas), so the schema-qualified table names of the pipeline resolve as on the
+    server.
+    Not supported: the district-year modes (MERGE tables and views over other
+    databases), the reference data cache (use_ref_cache), and merge_result_shards
+    (LOAD DATA); they need MariaDB.
+    Concurrent workers share the scratch schema file, so their writes are serialized;
+    use n_workers = 1 when timing the stages.
+    Parameters
+    ----------
+    data_dir: str
+        Directory of the SQLite files.
+    """
+
+    SHARED_SCHEMAS = (
+        "vmtmix_fy20",
+        "txled_db",
+        "movesdb20181022",
+        "mvs2014b_erlt_out",
+        "mvs2014b_erlt_conflicted",
+        SCRATCH_SCHEMA,
+    )
+    name = "sqlite"
+    error = sqlite3.Error
+    # Missing tables and columns are OperationalErrors in sqlite3.
+    programming_errors = (sqlite3.OperationalError, sqlite3.ProgrammingError)
+    integrity_errors = (sqlite3.IntegrityError,)
+    # SQLite tables aren't repaired; except () catches nothing.
+    repair_errors = ()
+    supports_district_year_tables = False
+    table_options_sql = ""
+    output_table_options_sql = ""
+    collate_sql = ""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def get_schema_path(self, schema_nm):
+        """SQLite file of schema_nm."""
+        return os.path.join(self.data_dir, f"{schema_nm}.sqlite")
+
+    def get_schema_nms(self):
+        """Schemas (SQLite files) in data_dir."""
+        return sorted(
+            re.sub(r"\.sqlite$", "", file_nm)
+            for file_nm in os.listdir(self.data_dir)
+            if file_nm.endswith(".sqlite")
+        )
+
+    def connect(self, database_nm=None):
+        """
+        Autocommit connection with database_nm (an in-memory database if None) as
+        main and the SHARED_SCHEMAS attached. IF(cond, a, b) and FLOAT32(x) (see
+        float_sql) are registered as SQL functions.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        conn = sqlite3.connect(
+            ":memory:" if database_nm is None else self.get_schema_path(database_nm),
+            timeout=60,
+            isolation_level=None,
+        )
+        conn.create_function(
+            "IF", 3, lambda cond, a, b: a if cond else b, deterministic=True
+        )
+        conn.create_function("FLOAT32", 1, _round_float32, deterministic=True)
+        cur = conn.cursor()
+        for schema_nm in self.SHARED_SCHEMAS:
+            if schema_nm != database_nm:
+                self.create_schema(cur, schema_nm)
+        cur.close()
+        return conn
+
+    def sql_housekeeping(self, cur):
+        pass
+
+    def set_session_vars(self, cur, session_vars):
+        """SQLite has no session variables; see session_var_sql."""
+        pass
+
+    def session_var_sql(self, var_nm, value):
+        """The literal value of the session variable."""
+        return sql_literal(value)
+
+    def float_sql(self, expr):
+        """SQLite REAL is double precision, so CAST(... AS FLOAT) doesn't round;
+        FLOAT32 does."""
+        return f"FLOAT32({expr})"
+
+    def flush_tables(self, cur):
+        pass
+
+    def repair_tables(self, cur, tbl_nms):
+        pass
+
+    def create_schema(self, cur, schema_nm):
+        """Attach (and create) the SQLite file of schema_nm."""
+        cur.execute("PRAGMA database_list;")
+        if schema_nm in {row[1] for row in cur.fetchall()}:
+            return
+        cur.execute(
+            f"ATTACH DATABASE ? AS {schema_nm};", (self.get_schema_path(schema_nm),)
+        )
+        cur.execute(f"PRAGMA {schema_nm}.journal_mode=WAL;")
+
+    def create_index(self, cur, idx_nm, tbl_nm, cols, unique=False):
+        """Index names are unique per SQLite schema, so the index is named
+        <idx_nm>_<table> and created in the schema of tbl_nm."""
+        schema_nm, _, tbl = tbl_nm.rpartition(".")
+        schema_prefix = f"{schema_nm}." if schema_nm else ""
+        cur.execute(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+            f"{schema_prefix}{idx_nm}_{tbl} ON {tbl} ({cols});"
+        )
+
+    def create_table_as_sql(self, tbl_nm, select_sql):
+        return f"CREATE TABLE {tbl_nm} AS\n{select_sql}"
+
+    def update_join_sql(
+        self, tbl_nm, alias, join_tbl_nm, join_alias, on_sql, set_cols, left_join=False
+    ):
+        """
+        UPDATE ... FROM (SQLite 3.33+). The unmatched rows keep their value, so
+        left_join only gives NULL for the columns that are still NULL, like the
+        columns the scratch tables create up front (MovesDb.create_scratch_table).
+        """
+        set_sql = ", ".join(f"{col} = {expr}" for col, expr in set_cols.items())
+        return f"""
+            UPDATE {tbl_nm} AS {alias}
+            SET {set_sql}
+            FROM {join_tbl_nm} AS {join_alias}
+            WHERE {on_sql};
+        """
+
+    def get_tables(self, cur, schema_nm):
+        cur.execute(
+            f"SELECT name, type FROM {schema_nm}.sqlite_master "
+            f"WHERE type IN ('table', 'view');"
+        )
+        return [(tbl_nm, tbl_type == "view") for tbl_nm, tbl_type in cur.fetchall()]
+
+
+_SQL_BACKEND = MariaDbBackend()
+
+
+def get_sql_backend():
+    """Backend used by MovesDb when no backend is given. MariaDbBackend by
+    default."""
+    return _SQL_BACKEND
+
+
+def set_sql_backend(backend):
+    """
+    Set the default backend of the process, e.g.,
+    set_sql_backend(SqliteBackend(data_dir)) to run the batch runner on SQLite.
+    Worker processes started with fork inherit the backend.
+    Returns
+    -------
+    The previous backend.
+    """
+    global _SQL_BACKEND
+    previous_backend = _SQL_BACKEND
+    _SQL_BACKEND = backend
+    return previous_backend
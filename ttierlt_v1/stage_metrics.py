@@ -0,0 +1,221 @@
+"""
+Structured timing of the SQL statements and stages run by the *SqlCmds classes. The
+statement and stage timings are written as JSON lines (one file per process) and
+summarized across a batch run to find the slowest stages, statements, and databases.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import os
+import re
+import json
+import glob
+import time
+import pandas as pd
+from ttierlt_v1.utils import SCRATCH_SCHEMA, RUN_ID_LEN
+
+STATEMENT_LABEL_PATTERN = re.compile(
+    r"^(CREATE\s+(?:TABLE|INDEX)(?:\s+IF\s+NOT\s+EXISTS)?"
+    r"|DROP\s+TABLE(?:\s+IF\s+EXISTS)?"
+    r"|INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|DELETE\s+FROM"
+    r"|ALTER\s+TABLE|UPDATE|REPAIR\s+TABLE|CHECKSUM\s+TABLE)\s+([\w.`]+)",
+    flags=re.IGNORECASE,
+)
+SCRATCH_TBL_PATTERN = re.compile(
+    rf"`?{SCRATCH_SCHEMA}`?\.`?(\w+?)_[0-9a-f]{{{RUN_ID_LEN}}}`?(?!\w)"
+)
+"""Scratch table name with the run id, e.g., mvs2014b_erlt_scratch.emisrate_<run id>."""
+
+
+def get_statement_label(statement):
+    """
+    Short label for a SQL statement: the command and the target table, e.g.
+    "CREATE TABLE emisrate". Leading FLUSH TABLES statements and comments are
+    skipped; the number of other statements in a multi-statement string is appended.
+    Scratch tables are labeled without the scratch schema and run id, so that the
+    labels of different runs and databases match.
+    """
+    sub_statements = []
+    for sub_statement in statement.split(";"):
+        sub_statement = " ".join(
+            line.strip()
+            for line in sub_statement.splitlines()
+            if line.strip() and not line.strip().startswith("--")
+        )
+        if sub_statement and sub_statement.upper() != "FLUSH TABLES":
+            sub_statements.append(sub_statement)
+    if not sub_statements:
+        return " ".join(statement.split()).rstrip(";")
+    match = re.match(STATEMENT_LABEL_PATTERN, sub_statements[0])
+    if match:
+        label = f"{' '.join(match.group(1).upper().split())} {match.group(2)}"
+    else:
+        label = " ".join(sub_statements[0].split()[:4])
+    label = re.sub(SCRATCH_TBL_PATTERN, r"\1", label)
+    if len(sub_statements) > 1:
+        label += f" (+{len(sub_statements) - 1} statements)"
+    return label
+
+
+class MetricsSink:
+    """
+    Append timing records as JSON lines to metrics_<pid>.jsonl in metrics_dir. Each
+    worker process writes to its own file.
+    Parameters
+    ----------
+    metrics_dir: str
+        Directory for the metrics files of a batch run.
+    """
+
+    def __init__(self, metrics_dir):
+        self.metrics_dir = metrics_dir
+        os.makedirs(metrics_dir, exist_ok=True)
+
+    @property
+    def path_metrics_file(self):
+        return os.path.join(self.metrics_dir, f"metrics_{os.getpid()}.jsonl")
+
+    def record(self, **fields):
+        with open(self.path_metrics_file, "a") as metrics_file:
+            metrics_file.write(
+                json.dumps({"pid": os.getpid(), "timestamp": time.time(), **fields})
+                + "\n"
+            )
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that records the wall time, rows affected, and label of every
+    execute/ executemany call. Other attributes are passed to the wrapped cursor.
+    Note: pd.read_sql(..., conn) calls (e.g., in get_hourmix, get_vmtmix,
+    compute_numpy_emisrate) use the connection and bypass this cursor; their time is
+    only recorded in the stage records.
+    Parameters
+    ----------
+    cursor: mariadb.cursor
+        Wrapped cursor.
+    metrics_sink: MetricsSink
+        Sink for the statement records.
+    db_nm: str
+        MOVES output database name recorded with each statement.
+    process: str
+        Process recorded with each statement, e.g., RunningSqlCmds.
+    """
+
+    def __init__(self, cursor, metrics_sink, db_nm, process=None):
+        self.cursor = cursor
+        self.metrics_sink = metrics_sink
+        self.db_nm = db_nm
+        self.process = process
+        # Set by MovesDb.run_stage.
+        self.stage = None
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def _timed(self, method, statement, *args, **kwargs):
+        start_time = time.time()
+        status = "success"
+        try:
+            return getattr(self.cursor, method)(statement, *args, **kwargs)
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            self.metrics_sink.record(
+                record_type="statement",
+                process=self.process,
+                db_nm=self.db_nm,
+                stage=self.stage,
+                label=get_statement_label(statement),
+                wall_time_s=time.time() - start_time,
+                rowcount=self.cursor.rowcount,
+                status=status,
+            )
+
+    def execute(self, statement, *args, **kwargs):
+        return self._timed("execute", statement, *args, **kwargs)
+
+    def executemany(self, statement, *args, **kwargs):
+        return self._timed("executemany", statement, *args, **kwargs)
+
+
+def read_metrics(metrics_dir):
+    """Read the metrics records of all processes in metrics_dir into a dataframe."""
+    records = []
+    for path_metrics_file in sorted(glob.glob(os.path.join(metrics_dir, "*.jsonl"))):
+        with open(path_metrics_file) as metrics_file:
+            records.extend(json.loads(line) for line in metrics_file if line.strip())
+    return pd.DataFrame(
+        records,
+        columns=[
+            "pid",
+            "timestamp",
+            "record_type",
+            "process",
+            "db_nm",
+            "stage",
+            "label",
+            "wall_time_s",
+            "rowcount",
+            "status",
+        ],
+    )
+
+
+def summarize_metrics(metrics_dir, top_n=10):
+    """
+    Summarize the metrics of a batch run.
+    Parameters
+    ----------
+    metrics_dir: str
+        Directory with the metrics files.
+    top_n: int
+        Number of slowest databases and statements to keep.
+    Returns
+    -------
+    dict
+        stages: count, total, mean, and max wall time by process and stage, slowest
+        first.
+        databases: total stage wall time by process and database for the top_n
+        slowest databases.
+        statements: count, total, and mean wall time by process, stage, and statement
+        label for the top_n slowest statements.
+    """
+    metrics = read_metrics(metrics_dir)
+    stage_metrics = metrics.loc[metrics.record_type == "stage"]
+    statement_metrics = metrics.loc[metrics.record_type == "statement"]
+    stages = (
+        stage_metrics.groupby(["process", "stage"], dropna=False)
+        .wall_time_s.agg(["count", "sum", "mean", "max"])
+        .rename(columns={"sum": "total"})
+        .sort_values("total", ascending=False)
+        .reset_index()
+    )
+    databases = (
+        stage_metrics.groupby(["process", "db_nm"], dropna=False)
+        .wall_time_s.sum()
+        .nlargest(top_n)
+        .rename("total")
+        .reset_index()
+    )
+    statements = (
+        statement_metrics.groupby(["process", "stage", "label"], dropna=False)
+        .wall_time_s.agg(["count", "sum", "mean"])
+        .rename(columns={"sum": "total"})
+        .nlargest(top_n, "total")
+        .reset_index()
+    )
+    return {"stages": stages, "databases": databases, "statements": statements}
+
+
+def print_metrics_summary(metrics_dir, top_n=10):
+    """Print the summarize_metrics tables."""
+    summary = summarize_metrics(metrics_dir, top_n)
+    with pd.option_context("display.width", 160, "display.max_colwidth", 80):
+        print("---Wall time by stage (seconds)---")
+        print(summary["stages"].to_string(index=False))
+        print(f"---{top_n} slowest databases (seconds)---")
+        print(summary["databases"].to_string(index=False))
+        print(f"---{top_n} slowest statements (seconds)---")
+        print(summary["statements"].to_string(index=False))
+    return summary
@@ -5,56 +5,87 @@ Created on: 01/29/2021
 """
 import time
 import pandas as pd
-import mariadb
 import os
 import numpy as np
 import logging
 from ttierlt_v1.movesdb import MovesDb
-from ttierlt_v1.utils import connect_to_server_db, get_db_nm_list, PATH_INTERIM_STARTS
+from ttierlt_v1.sql_backend import get_sql_backend
+from ttierlt_v1.pollutants import (
+    get_pollutant_cols,
+    get_pollutant_id_sql,
+    get_pollutant_pivot_sql,
+    get_pollutant_insert_cols_sql,
+    get_pollutant_ddl_sql,
+)
+from ttierlt_v1.utils import (
+    get_db_nm_list,
+    get_rate_col_type,
+    PATH_INTERIM_STARTS,
+)
 
+# Final schema of the startrate table. Area, VehicleType, and FuelType are filled by
+# aggregate_startrate_rateperstart; Hourmix, txledfac, and emisFact by the UPDATE-JOIN
+# passes.
+STARTRATE_COL_DEFS = {
+    "yearid": "SMALLINT UNSIGNED",
+    "monthid": "TINYINT UNSIGNED",
+    "hourid": "TINYINT UNSIGNED",
+    "pollutantid": "SMALLINT UNSIGNED",
+    "sourcetypeid": "TINYINT UNSIGNED",
+    "fueltypeid": "TINYINT UNSIGNED",
+    "ERate": "DOUBLE",
+    "Hourmix": "FLOAT",
+    "emisFact": "FLOAT",
+    "Area": "CHAR(25)",
+    "VehicleType": "CHAR(50)",
+    "FuelType": "CHAR(10)",
+    "txledfac": "FLOAT(6)",
+}
+HOURMIX_STARTS_COL_DEFS = {
+    "hourID": "TINYINT UNSIGNED",
+    "sourceTypeID": "TINYINT UNSIGNED",
+    "fuelTypeID": "TINYINT UNSIGNED",
+    "startsPerVehicle": "FLOAT",
+    "sumact": "FLOAT",
+    "hrmix": "FLOAT",
+}
 
-def create_starts_table_in_db(delete_if_exists=False):
+
+def create_starts_table_in_db(
+    delete_if_exists=False, rate_col_type="decimal", pollutants=None, backend=None
+):
     """
     Create  mvs2014b_erlt_out.starts_erlt_intermediate table for storing output.
     Parameters
     ----------
     delete_if_exists: Delete the existing mvs2014b_erlt_out.starts_erlt_intermediate table (if it exists).
+    rate_col_type: Type of the pollutant columns: decimal (DECIMAL(23,19)) or double
+    (DOUBLE). See ttierlt_v1.utils.check_rate_col_type_precision.
+    pollutants: Output pollutant columns; see ttierlt_v1.pollutants. None for
+    POLLUTANT_COLS.
+    backend: SQL backend; see ttierlt_v1.sql_backend. None for get_sql_backend().
     """
     # delete_if_exists: Check if we want to delete the previous stored table
-    conn = connect_to_server_db(database_nm=None)
+    rate_col = get_rate_col_type(rate_col_type)
+    if backend is None:
+        backend = get_sql_backend()
+    conn = backend.connect(database_nm=None)
     cur = conn.cursor()
     if delete_if_exists:
         cur.execute("DROP TABLE  IF EXISTS mvs2014b_erlt_out.starts_erlt_intermediate")
     cur.execute(
-        """
+        f"""
             CREATE TABLE mvs2014b_erlt_out.starts_erlt_intermediate (
-            `Area` CHAR(25) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-            `yearid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-            `monthid` SMALLINT(5) UNSIGNED NULL DEFAULT NULL,
-            `VehicleType` CHAR(50) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-            `FUELTYPE` CHAR(10) NULL DEFAULT NULL COLLATE 'utf8_unicode_ci',
-            `CO` DECIMAL(23,19) NULL DEFAULT NULL,
-            `NOX` DECIMAL(23,19) NULL DEFAULT NULL,
-            `SO2` DECIMAL(23,19) NULL DEFAULT NULL,
-            `NO2` DECIMAL(23,19) NULL DEFAULT NULL,
-            `VOC` DECIMAL(23,19) NULL DEFAULT NULL,
-            `CO2EQ` DECIMAL(23,19) NULL DEFAULT NULL,
-            `PM10` DECIMAL(23,19) NULL DEFAULT NULL,
-            `PM25` DECIMAL(23,19) NULL DEFAULT NULL,
-            `BENZ` DECIMAL(23,19) NULL DEFAULT NULL,
-            `NAPTH` DECIMAL(23,19) NULL DEFAULT NULL,
-            `BUTA` DECIMAL(23,19) NULL DEFAULT NULL,
-            `FORM` DECIMAL(23,19) NULL DEFAULT NULL,
-            `ACTE` DECIMAL(23,19) NULL DEFAULT NULL,
-            `ACROL` DECIMAL(23,19) NULL DEFAULT NULL,
-            `ETYB` DECIMAL(23,19) NULL DEFAULT NULL,
-            `DPM` DECIMAL(23,19) NULL DEFAULT NULL,
-            `POM` DECIMAL(23,19) NULL DEFAULT NULL,
+            `Area` CHAR(25) NULL DEFAULT NULL{backend.collate_sql},
+            `yearid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+            `monthid` SMALLINT UNSIGNED NULL DEFAULT NULL,
+            `VehicleType` CHAR(50) NULL DEFAULT NULL{backend.collate_sql},
+            `FUELTYPE` CHAR(10) NULL DEFAULT NULL{backend.collate_sql},
+            {get_pollutant_ddl_sql(rate_col, pollutants)},
             CONSTRAINT starts_erlt_intermediate_pk PRIMARY KEY (Area, yearid, monthid, 
             vehicletype, fueltype)
         )
-        COLLATE='utf8_unicode_ci'
-        ENGINE=MyISAM;
+        {backend.output_table_options_sql};
     """
     )
     conn.close()
@@ -63,13 +94,30 @@ def create_starts_table_in_db(delete_if_exists=False):
 class StartSqlCmds(MovesDb):
     """
     Class to execute SQL commands for starts emission process.
+    Parameters
+    ----------
+    db_nm_: str
+        MOVES output database name.
+    pollutants: list-like
+        Output pollutants; see ttierlt_v1.pollutants. None for POLLUTANT_COLS. Only
+        the MOVES pollutants of the subset are read from rateperstart.
+    run_id: str
+        Suffix of the scratch tables of this run in the scratch schema; see
+        ttierlt_v1.movesdb.get_run_id. None for a random run id.
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        SQL backend. None for ttierlt_v1.sql_backend.get_sql_backend().
     """
 
-    def __init__(self, db_nm_):
-        super().__init__(db_nm_=db_nm_)
+    def __init__(self, db_nm_, pollutants=None, run_id=None, backend=None):
+        super().__init__(db_nm_=db_nm_, run_id=run_id, backend=backend)
+        self.pollutants = get_pollutant_cols(pollutants)
+        self.pollutant_id_sql = get_pollutant_id_sql(self.pollutants)
+        self.pollutant_pivot_sql = get_pollutant_pivot_sql(self.pollutants)
         self.fueltypedict = {1: "Gasoline", 2: "Diesel"}
         self.head_startrate_df = pd.DataFrame()
         self.hourmix_starts = pd.DataFrame()
+        self.startrate_tbl = self.get_scratch_tbl("startrate")
+        self.hourmix_starts_tbl = self.get_scratch_tbl("hourmix_starts")
         self.created_all_indices = False
 
     def aggregate_startrate_rateperstart(self, debug=True):
@@ -77,7 +125,9 @@ class StartSqlCmds(MovesDb):
         Script creates the required start rate table from MOVES output databases
         Only required pollutants are selected based on the rateperstart output table
         Emission rates are summed overyearid,monthid,hourid,pollutantid,sourcetypeid,
-        fueltypeid.
+        fueltypeid. The table is created with its final schema (STARTRATE_COL_DEFS)
+        and Area, VehicleType (movesdb20181022.sourceusetype), and FuelType are added
+        in the same INSERT ... SELECT.
         Parameters
         ----------
         debug: bool
@@ -89,89 +139,62 @@ class StartSqlCmds(MovesDb):
             startrate if debug=True.
         """
         start_time = time.time()
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute("DROP TABLE  IF EXISTS startrate;")
-        cmd_agg_startrate = """
-                CREATE TABLE startrate (SELECT yearid, monthid,hourid,
-                pollutantid,sourcetypeid,fueltypeid,sum(rateperstart)as ERate 
-                FROM rateperstart
-                WHERE pollutantid in (2,3,31,33,87,98,100,110,20, 23, 185,24,25,26,27,
-                41,68, 69,70,71, 72, 73, 74, 75, 76, 77, 78, 81, 82, 83, 84, 168, 169, 
-                170, 171, 172, 173, 174, 175, 176, 177,178, 181, 182, 183, 184)
-                GROUP BY yearid,monthid,hourid,pollutantid,sourcetypeid,fueltypeid);
-            """
-        try:
-            # FixMe: Make the pollutants a user entered parameter for the class
-            self.cur.execute(cmd_agg_startrate)
-        except mariadb.InternalError as intererr:
-            self.cur.execute("REPAIR TABLE rateperstart")
-            self.cur.execute(cmd_agg_startrate)
-
-        except mariadb.OperationalError as operr:
-            self.cur.execute("REPAIR TABLE rateperstart")
-            self.cur.execute(cmd_agg_startrate)
-
-        self._update_startrate_rateperstart()
-        self._update_sourcetypename_joins()
+        self.create_scratch_table(
+            tbl_nm=self.startrate_tbl,
+            col_defs=STARTRATE_COL_DEFS,
+            insert_cols=(
+                "yearid",
+                "monthid",
+                "hourid",
+                "pollutantid",
+                "sourcetypeid",
+                "fueltypeid",
+                "ERate",
+                "Area",
+                "VehicleType",
+                "FuelType",
+            ),
+            select_sql=f"""
+                SELECT a.yearid, a.monthid, a.hourid, a.pollutantid, a.sourcetypeid,
+                a.fueltypeid, a.ERate, {self.sql_var("analysis_district")} AS Area,
+                b.sourceTypeName AS VehicleType,
+                {self._sql_fueltype_case("a.fueltypeid")} AS FuelType
+                FROM (
+                    SELECT yearid, monthid,hourid,
+                    pollutantid,sourcetypeid,fueltypeid,sum(rateperstart)as ERate 
+                    FROM rateperstart
+                    WHERE pollutantid in ({self.pollutant_id_sql})
+                    GROUP BY yearid,monthid,hourid,pollutantid,sourcetypeid,fueltypeid
+                ) a
+                -- Vehicle type description from the MOVES 2014b database.
+                LEFT JOIN {self.moves2014b_db_nm}.sourceusetype b ON
+                a.sourceTypeID = b.sourceTypeID;
+            """,
+            repair_tbls=("rateperstart",),
+        )
         logging.info(
-            "---aggregate_startrate_rateperstart and _update_startrate_rateperstart "
-            "execution time:  %s seconds "
+            "---aggregate_startrate_rateperstart execution time:  %s seconds "
             "---" % (time.time() - start_time)
         )
         if debug:
             self.head_startrate_df = pd.read_sql(
-                f"SELECT * FROM startrate LIMIT 5", self.conn
+                f"SELECT * FROM {self.startrate_tbl} LIMIT 5", self.conn
             )
             print(
-                "---aggregate_startrate_rateperstart and _update_startrate_rateperstart"
-                " execution time:  %s seconds "
+                "---aggregate_startrate_rateperstart execution time:  %s seconds "
                 "---" % (time.time() - start_time)
             )
             return self.head_startrate_df
         return pd.DataFrame()
 
-    def _update_startrate_rateperstart(self):
-        """
-        # Script to add necessary fields to the startrate table.
-        """
-        cmd_add_additional_fields = """
-            FLUSH TABLES;
-            ALTER TABLE startrate
-            ADD COLUMN Hourmix float,
-            ADD COLUMN emisFact float,
-            ADD COLUMN Area char(25),
-            ADD COLUMN VehicleType char(50),
-            ADD COLUMN FuelType char(10),
-            ADD COLUMN txledfac FLOAT(6);
-            -- End Code with comment.
-        """
-        cmd_set_area = """
-            FLUSH TABLES;
-            UPDATE startrate SET Area =  @analysis_district;
-            -- End Code with comment.
-        """
-        for cmd in cmd_add_additional_fields.split(";") + cmd_set_area.split(";"):
-            self.cur.execute(cmd)
-        for fueltypeid, fueltypenm in self.fueltypedict.items():
-            self.cur.execute("FLUSH TABLES;")
-            cmd_set_fueldesc = f"""
-                UPDATE startrate 
-                SET FuelType = "{fueltypenm}" Where FuelTypeID = {fueltypeid};
-            """
-            self.cur.execute(cmd_set_fueldesc)
-
-    def _update_sourcetypename_joins(self):
-        """Add vehicle type description from the MOVES 2014b database
-        (movesdb20181022)."""
-        self.cur.execute("FLUSH TABLES;")
-        cmd_set_sourcetypenm = f"""
-            -- Script to add vehicle type group to each MOVES sourcetypeid
-            UPDATE startrate a
-            JOIN {self.moves2014b_db_nm}.sourceusetype  b  ON
-            a.sourceTypeID = b.sourceTypeID
-            SET a.VehicleType = b.sourceTypeName;
-        """
-        self.cur.execute(cmd_set_sourcetypenm)
+    def _sql_fueltype_case(self, fueltype_col="fueltypeid"):
+        """SQL CASE expression mapping MOVES fueltypeid to the fuel type description
+        in self.fueltypedict."""
+        when_clauses = " ".join(
+            f"WHEN {fueltypeid} THEN '{fueltypenm}'"
+            for fueltypeid, fueltypenm in self.fueltypedict.items()
+        )
+        return f"CASE {fueltype_col} {when_clauses} END"
 
     def get_hourmix_starts(self):
         """
@@ -180,16 +203,28 @@ class StartSqlCmds(MovesDb):
         Returns
         -------
         """
-        self.cur.execute("FLUSH TABLES;")
-        self.cur.execute("DROP TABLE  IF EXISTS hourmix_starts;")
-        cmd_hourmix_starts = """
-            CREATE TABLE hourmix_starts
-            SELECT hourID,sourceTypeID,fuelTypeID, startsPerVehicle 
-            FROM startspervehicle;
-        """
-        self.cur.execute(cmd_hourmix_starts)
-        self._update_hourmix_starts()
-        self.hourmix_starts = pd.read_sql(f"SELECT * FROM hourmix_starts", self.conn)
+        self.create_scratch_table(
+            tbl_nm=self.hourmix_starts_tbl,
+            col_defs=HOURMIX_STARTS_COL_DEFS,
+            insert_cols=HOURMIX_STARTS_COL_DEFS.keys(),
+            # Daily (24 hours) starts per vehicle (sumact) by vehicle and fuel type,
+            # used to get the proportion of the daily starts in an hour (hrmix).
+            select_sql="""
+                SELECT r.hourID, r.sourceTypeID, r.fuelTypeID, r.startsPerVehicle,
+                grp.sumact, r.startsPerVehicle / grp.sumact AS hrmix
+                FROM startspervehicle r
+                JOIN 
+                (SELECT sourceTypeID, fuelTypeID, SUM(startsPerVehicle) as sumact
+                FROM startspervehicle
+                GROUP BY sourceTypeID, fuelTypeID) AS grp
+                ON                   
+                r.sourceTypeID = grp.sourceTypeID  AND
+                r.fuelTypeID = grp.fuelTypeID;
+            """,
+        )
+        self.hourmix_starts = pd.read_sql(
+            f"SELECT * FROM {self.hourmix_starts_tbl}", self.conn
+        )
         self.test_hourmix_starts()
         return self.hourmix_starts
 
@@ -201,62 +236,36 @@ class StartSqlCmds(MovesDb):
             1,
         )
 
-    def _update_hourmix_starts(self):
-        """Add additional fields to hourmix_starts and add a daily daily (24 hours)
-        starts per vehicle column to hourmix data. This column in then use to get the
-        proportion of starts in an hour a fraction of daily starts.
-        """
-        cmd_add_cols_hourmix_starts = """
-        ALTER TABLE hourmix_starts
-        ADD COLUMN sumact float,
-        ADD COLUMN hrmix float;
-        """
-        self.cur.execute(cmd_add_cols_hourmix_starts)
-        self.cur.execute("FLUSH TABLES;")
-        cmd_add_col_daily_starts_by_veh_fueltype = """
-            UPDATE hourmix_starts as r
-            JOIN 
-            (SELECT sourceTypeID, fuelTypeID, SUM(startsPerVehicle) as sumact
-            FROM hourmix_starts a 
-            GROUP BY sourceTypeID, fuelTypeID) AS grp
-            ON                   
-            r.sourceTypeID = grp.sourceTypeID  AND
-            r.fuelTypeID = grp.fuelTypeID
-            SET r.sumact = grp.sumact;
-        """
-        self.cur.execute(cmd_add_col_daily_starts_by_veh_fueltype)
-        self.cur.execute("FLUSH TABLES;")
-        cmd_get_prop_starts_in_hour_wrt_daily_starts = """
-            UPDATE hourmix_starts
-            SET hrmix = startsPerVehicle / sumact;"""
-        self.cur.execute(cmd_get_prop_starts_in_hour_wrt_daily_starts)
-
     def create_indices_before_joins(self):
         """Create indices for all tables before join to speed-up the join."""
         try:
-            self.cur.execute(
-                """CREATE INDEX IF NOT EXISTS stridx1 
-                ON startrate (hourID, sourcetypeid, fueltypeid);"""
+            self.backend.create_index(
+                self.cur,
+                "stridx1",
+                self.startrate_tbl,
+                "hourID, sourcetypeid, fueltypeid",
             )
-            self.cur.execute(
-                """
-            CREATE INDEX IF NOT EXISTS hrmix_stdx1 
-            ON hourmix_starts (hourID, sourcetypeid, fueltypeid);"""
+            self.backend.create_index(
+                self.cur,
+                "hrmix_stdx1",
+                self.hourmix_starts_tbl,
+                "hourID, sourcetypeid, fueltypeid",
             )
             if self.use_txled:
-                self.cur.execute(
-                    """CREATE INDEX IF NOT EXISTS stridx2 
-                    ON startrate (pollutantid, sourcetypeid, fueltypeid);"""
+                self.backend.create_index(
+                    self.cur,
+                    "stridx2",
+                    self.startrate_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
-                self.cur.execute(
-                    f"""
-                    CREATE INDEX IF NOT EXISTS  txledidx1 
-                    ON txled_long_{self.analysis_year} 
-                    (pollutantid, sourcetypeid, fueltypeid);
-                """
+                self.backend.create_index(
+                    self.cur,
+                    "txledidx1",
+                    self.txled_tbl,
+                    "pollutantid, sourcetypeid, fueltypeid",
                 )
             self.created_all_indices = True
-        except mariadb.ProgrammingError as mdberr:
+        except self.backend.programming_errors as mdberr:
             print(mdberr)
             print(
                 "Run aggregate_startrate_rateperstart, get_hourmix_starts, "
@@ -272,36 +281,43 @@ class StartSqlCmds(MovesDb):
         """
         start_time = time.time()
         if self.created_all_indices:
-            self.cur.execute("FLUSH TABLES;")
+            self.backend.flush_tables(self.cur)
             self.cur.execute(
-                """
-                UPDATE startrate a
-                JOIN hourmix_starts  b  ON
-                a.hourID = b.hourID and
-                a.sourcetypeID = b.sourcetypeID and
-                a.fueltypeID = b.fueltypeID 
-                SET a.Hourmix = b.hrmix;	 
-            """
+                self.backend.update_join_sql(
+                    tbl_nm=self.startrate_tbl,
+                    alias="a",
+                    join_tbl_nm=self.hourmix_starts_tbl,
+                    join_alias="b",
+                    on_sql="""
+                    a.hourID = b.hourID and
+                    a.sourcetypeID = b.sourcetypeID and
+                    a.fueltypeID = b.fueltypeID""",
+                    set_cols={"Hourmix": "b.hrmix"},
+                )
             )
             if self.use_txled:
                 self.cur.execute(
-                    f"""
-                    UPDATE startrate a
-                    LEFT JOIN txled_long_{self.analysis_year}  d  ON
-                    a.pollutantid = d.pollutantid AND
-                    a.sourcetypeid = d.sourcetypeid AND
-                    a.fueltypeid = d.fueltypeid
-                    SET a.txledfac = d.txled_fac;
-                """
+                    self.backend.update_join_sql(
+                        tbl_nm=self.startrate_tbl,
+                        alias="a",
+                        join_tbl_nm=self.txled_tbl,
+                        join_alias="d",
+                        on_sql="""
+                        a.pollutantid = d.pollutantid AND
+                        a.sourcetypeid = d.sourcetypeid AND
+                        a.fueltypeid = d.fueltypeid""",
+                        set_cols={"txledfac": "d.txled_fac"},
+                        left_join=True,
+                    )
                 )
                 self.cur.execute(
                     f"""
-                    UPDATE startrate
+                    UPDATE {self.startrate_tbl}
                     SET txledfac = 1.0 WHERE txledfac IS NULL;
                 """
                 )
             else:
-                self.cur.execute(f"""UPDATE startrate SET txledfac = 1.0;""")
+                self.cur.execute(f"""UPDATE {self.startrate_tbl} SET txledfac = 1.0;""")
         else:
             print(
                 "Run create_indices_before_joins to speed-up joins. Will not run this "
@@ -321,7 +337,22 @@ class StartSqlCmds(MovesDb):
         """Weight the emission rate by time of day starts distribution and TxLED factor
         for counties where TxLED program is active in a county (or majority of county of
         a district.)"""
-        self.cur.execute("""UPDATE startrate SET emisFact = ERate*HourMix*txledfac;""")
+        self.cur.execute(
+            f"""UPDATE {self.startrate_tbl} SET emisFact = ERate*HourMix*txledfac;"""
+        )
+
+    def get_agg_select_sql(self):
+        """
+        SELECT statement that aggregates (sums) the startrate table to the rows of
+        mvs2014b_erlt_out.starts_erlt_intermediate. Used by agg_by_vehtyp_fueltyp and
+        agg_by_vehtyp_fueltyp_to_shard.
+        """
+        return f"""
+            SELECT Area,yearid,monthid,VehicleType,FUELTYPE,
+            {self.pollutant_pivot_sql}
+            FROM {self.startrate_tbl}
+            GROUP BY Area,yearid,monthid,VehicleType,FUELTYPE;
+        """
 
     def agg_by_vehtyp_fueltyp(
         self, add_seperate_conflicted_copy=False, conflicted_copy_suffix=""
@@ -333,41 +364,17 @@ class StartSqlCmds(MovesDb):
         mvs2014_erlt_conflicted schema.
         """
         start_time = time.time()
-        cmd_insert = """
+        cmd_insert = f"""
                 INSERT INTO mvs2014b_erlt_out.starts_erlt_intermediate( Area, yearid, 
                 monthid, VehicleType, FUELTYPE, 
-                CO, NOX, SO2, NO2, VOC, CO2EQ, PM10, PM25, BENZ, NAPTH, BUTA, FORM, 
-                ACTE, ACROL, ETYB, DPM, POM)
+                {get_pollutant_insert_cols_sql(self.pollutants)})
         """
-        cmd_create_conflicted = (
-            f"CREATE TABLE mvs2014b_erlt_conflicted.starts"
+        conflicted_tbl = (
+            f"mvs2014b_erlt_conflicted.starts"
             f"_{self.district_abb}_{self.analysis_year}_"
             f"{self.anaylsis_month}_{conflicted_copy_suffix}"
         )
-        cmd_common = """
-            SELECT Area,yearid,monthid,VehicleType,FUELTYPE,
-            SUM(IF(pollutantid = 2, emisfact, 0)) AS CO,
-            SUM(IF(pollutantid = 3, emisfact, 0)) AS NOX,
-            SUM(IF(pollutantid = 31, emisfact, 0)) AS SO2,
-            SUM(IF(pollutantid = 33, emisfact, 0)) AS NO2,
-            SUM(IF(pollutantid = 87, emisfact, 0)) AS VOC,
-            SUM(IF(pollutantid = 98, emisfact, 0)) AS CO2EQ,
-            SUM(IF(pollutantid = 100, emisfact, 0)) AS PM10,
-            SUM(IF(pollutantid = 110, emisfact, 0)) AS PM25,
-            SUM(IF(pollutantid = 20, emisfact, 0)) AS BENZ,
-            SUM(IF(pollutantid IN (23, 185), emisfact, 0)) AS NAPTH,
-            SUM(IF(pollutantid = 24, emisfact, 0)) AS BUTA,
-            SUM(IF(pollutantid = 25, emisfact, 0)) AS FORM,
-            SUM(IF(pollutantid = 26, emisfact, 0)) AS ACTE,
-            SUM(IF(pollutantid = 27, emisfact, 0)) AS ACROL,
-            SUM(IF(pollutantid = 41, emisfact, 0)) AS ETYB,
-            SUM(IF(pollutantid = 100 AND fueltypeid = 2, emisfact, 0)) AS DPM,
-            SUM(IF(pollutantid IN (68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78,
-            81, 82, 83, 84, 168, 169, 170, 171, 172, 173, 174, 175, 176, 177,
-            178, 181, 182, 183, 184), emisfact, 0)) AS POM
-            FROM startrate
-            GROUP BY Area,yearid,monthid,VehicleType,FUELTYPE;
-        """
+        cmd_common = self.get_agg_select_sql()
         try:
             cmd_insert_agg = cmd_insert + cmd_common
             if not add_seperate_conflicted_copy:
@@ -378,7 +385,9 @@ class StartSqlCmds(MovesDb):
                     f"{self.analysis_year}, "
                     f"{self.anaylsis_month} in mvs2014b_erlt_conflicted for review."
                 )
-                cmd_create_agg = cmd_create_conflicted + cmd_common
+                cmd_create_agg = self.backend.create_table_as_sql(
+                    conflicted_tbl, cmd_common
+                )
                 self.cur.execute(
                     f"DROP TABLE IF EXISTS mvs2014b_erlt_conflicted.starts"
                     f"_{self.district_abb}_{self.analysis_year}"
@@ -393,7 +402,7 @@ class StartSqlCmds(MovesDb):
                 "---agg_by_vehtyp_fueltyp execution time:  %s seconds---"
                 % (time.time() - start_time)
             )
-        except mariadb.IntegrityError as integerityrr:
+        except self.backend.integrity_errors as integerityrr:
             print(integerityrr)
             print(
                 "Re-create the mvs2014b_erlt_out.starts_erlt_intermediate table if you "
@@ -406,6 +415,15 @@ class StartSqlCmds(MovesDb):
             )
             raise
 
+    def agg_by_vehtyp_fueltyp_to_shard(self, shard_dir):
+        """
+        Write the rows of agg_by_vehtyp_fueltyp to a result shard in shard_dir instead
+        of mvs2014b_erlt_out.starts_erlt_intermediate. See ttierlt_v1.result_shards.
+        """
+        return self.write_result_shard(
+            shard_dir=shard_dir, select_sql=self.get_agg_select_sql()
+        )
+
 
 if __name__ == "__main__":
     path_to_log_dir = os.path.join(PATH_INTERIM_STARTS, "Log Files")
@@ -0,0 +1,817 @@
+"""
+Synthetic MOVES output databases for testing and benchmarking the pipeline without the
+production MOVES runs. Creates the county level (cer) and project level (per)
+databases of the district-years of a workload with the MOVES output tables read by
+the emission processes (rateperdistance, rateperstart, rateperhour,
+startspervehicle, movesoutput, and movesactivityoutput), and the matching reference
+data (vmtmix_fy20, txled_db, and the movesdb20181022 tables used by starts and
+extnidle). The key cardinalities follow the MOVES rates runs (24 hours x road types x
+16 speed bins x 13 source types x 2 fuels x the MOVES pollutants of
+ttierlt_v1.pollutants); the rates are seeded random numbers with a plausible shape,
+not MOVES results.
+Created by: Apoorba Bibeka
+Created on: 10/18/2026
+"""
+import itertools
+import zlib
+import time
+import logging
+import numpy as np
+from ttierlt_v1.movesdb import MovesDb
+from ttierlt_v1.pollutants import POLLUTANT_REGISTRY, get_pollutant_ids
+
+SYNTHETIC_DISTRICT_FIPS = {
+    "elp": "48141",
+    "aus": "48453",
+    "bmt": "48245",
+    "crp": "48355",
+    "dal": "48113",
+    "ftw": "48439",
+    "hou": "48201",
+    "wac": "48309",
+    "sat": "48029",
+}
+"""FIPS code of the county of the synthetic databases of each district."""
+SYNTHETIC_YEARS = tuple(range(2020, 2051))
+"""Analysis years of the synthetic databases."""
+MONTH_IDS = tuple(range(1, 13))
+HOUR_IDS = tuple(range(1, 25))
+# On-network road types. MOVES writes the off-network (roadtypeid 1) emissions to
+# rateperstart and rateperhour.
+RUNNING_ROAD_TYPE_IDS = (2, 3, 4, 5)
+AVG_SPEED_BIN_IDS = tuple(range(1, 17))
+SOURCE_TYPE_NMS = {
+    11: "Motorcycle",
+    21: "Passenger Car",
+    31: "Passenger Truck",
+    32: "Light Commercial Truck",
+    41: "Intercity Bus",
+    42: "Transit Bus",
+    43: "School Bus",
+    51: "Refuse Truck",
+    52: "Single Unit Short-haul Truck",
+    53: "Single Unit Long-haul Truck",
+    54: "Motor Home",
+    61: "Combination Short-haul Truck",
+    62: "Combination Long-haul Truck",
+}
+SOURCE_TYPE_IDS = tuple(SOURCE_TYPE_NMS)
+FUEL_TYPE_IDS = (1, 2)
+# Relative VMT of the source types and their diesel share.
+SOURCE_TYPE_VMT_WEIGHTS = {
+    11: 0.5,
+    21: 40,
+    31: 35,
+    32: 8,
+    41: 0.3,
+    42: 0.3,
+    43: 0.4,
+    51: 0.3,
+    52: 3,
+    53: 0.5,
+    54: 0.3,
+    61: 4,
+    62: 7,
+}
+SOURCE_TYPE_DIESEL_SHARE = {
+    11: 0.01,
+    21: 0.02,
+    31: 0.05,
+    32: 0.1,
+    41: 0.95,
+    42: 0.8,
+    43: 0.6,
+    51: 0.95,
+    52: 0.6,
+    53: 0.6,
+    54: 0.3,
+    61: 0.9,
+    62: 0.95,
+}
+# Emission process of the rateperdistance and movesoutput rows of a pollutant; running
+# exhaust (1) otherwise.
+POLLUTANT_PROCESS_IDS = {106: 9, 116: 9, 107: 10, 117: 10}
+# Gasoline refueling displacement (18) and spillage (19) rows; filtered out by the
+# running process.
+REFUELING_PROCESS_IDS = (18, 19)
+REFUELING_POLLUTANT_IDS = (1, 20, 79, 86, 87)
+START_PROCESS_ID = 2
+# Crankcase extended idle (17), extended idle exhaust (90), and APU (91) of the
+# combination long-haul trucks.
+HOTELLING_PROCESS_IDS = (17, 90, 91)
+HOTELLING_SOURCE_TYPE_ID = 62
+# Links of the movesoutput and movesactivityoutput tables: {linkid: roadtypeid}. The
+# county level databases have a link per road type (1: off-network); the project level
+# databases have the off-network idling link, and the hours of the project level
+# MOVES runs (IdlingSqlCmds.PROJECT_HOUR_PERIOD_MAP).
+COUNTY_LINK_ROAD_TYPE_IDS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
+PROJECT_LINK_ROAD_TYPE_IDS = {1: 1}
+PROJECT_HOUR_IDS = (8, 15, 18, 23)
+# Source hours operating (4) and distance traveled (1).
+ACTIVITY_TYPE_IDS = (1, 4)
+TODMIX_YEARS = (2020, 2025, 2030, 2035, 2040, 2045, 2050)
+TODMIX_DAY_TYPES = ("Weekday", "Weekend")
+TXLED_POLLUTANT_IDS = (3,)
+DAY_IDS = (2, 5)
+INSERT_BATCH_ROWS = 200_000
+"""Rows inserted per executemany call."""
+
+MOVES_OUTPUT_COL_DEFS = {
+    "rateperdistance": {
+        "yearid": "SMALLINT",
+        "monthid": "SMALLINT",
+        "hourid": "SMALLINT",
+        "roadtypeid": "SMALLINT",
+        "pollutantid": "SMALLINT",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "avgSpeedBinID": "SMALLINT",
+        "processid": "SMALLINT",
+        "rateperdistance": "FLOAT",
+    },
+    "rateperstart": {
+        "yearid": "SMALLINT",
+        "monthid": "SMALLINT",
+        "hourid": "SMALLINT",
+        "pollutantid": "SMALLINT",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "processid": "SMALLINT",
+        "rateperstart": "FLOAT",
+    },
+    "rateperhour": {
+        "yearid": "SMALLINT",
+        "monthid": "SMALLINT",
+        "hourid": "SMALLINT",
+        "pollutantid": "SMALLINT",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "processid": "SMALLINT",
+        "rateperhour": "FLOAT",
+    },
+    "startspervehicle": {
+        "yearID": "SMALLINT",
+        "hourID": "SMALLINT",
+        "sourceTypeID": "SMALLINT",
+        "fuelTypeID": "SMALLINT",
+        "startsPerVehicle": "FLOAT",
+    },
+    "movesoutput": {
+        "yearid": "SMALLINT",
+        "monthid": "SMALLINT",
+        "hourid": "SMALLINT",
+        "countyid": "INTEGER",
+        "roadtypeid": "SMALLINT",
+        "linkid": "INTEGER",
+        "pollutantid": "SMALLINT",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "processid": "SMALLINT",
+        "emissionquant": "FLOAT",
+    },
+    "movesactivityoutput": {
+        "yearid": "SMALLINT",
+        "monthid": "SMALLINT",
+        "hourid": "SMALLINT",
+        "countyid": "INTEGER",
+        "linkid": "INTEGER",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "activitytypeid": "SMALLINT",
+        "activity": "FLOAT",
+    },
+}
+"""Columns of the synthetic MOVES output tables."""
+COUNTY_LEVEL_TABLES = (
+    "rateperdistance",
+    "rateperstart",
+    "rateperhour",
+    "startspervehicle",
+    "movesoutput",
+    "movesactivityoutput",
+)
+PROJECT_LEVEL_TABLES = ("movesoutput", "movesactivityoutput")
+REF_COL_DEFS = {
+    "vmtmix_fy20.todmix": {
+        "TxDOT_Dist": "VARCHAR(30)",
+        "Daytype": "VARCHAR(10)",
+        "YearID": "SMALLINT",
+        "Period": "VARCHAR(2)",
+        "MOVES_STcode": "SMALLINT",
+        "MOVES_FTcode": "SMALLINT",
+        "VMX_RDcode": "SMALLINT",
+        "VMTmix": "DOUBLE",
+    },
+    "vmtmix_fy20.hourmix": {
+        "District": "VARCHAR(30)",
+        "TOD": "SMALLINT",
+        "factor": "DOUBLE",
+    },
+    "txled_db.txled_long": {
+        "yearid": "SMALLINT",
+        "pollutantid": "SMALLINT",
+        "sourcetypeid": "SMALLINT",
+        "fueltypeid": "SMALLINT",
+        "txled_fac": "DOUBLE",
+    },
+    "movesdb20181022.sourceusetype": {
+        "sourceTypeID": "SMALLINT",
+        "sourceTypeName": "VARCHAR(50)",
+    },
+    "movesdb20181022.hourday": {
+        "hourDayID": "SMALLINT",
+        "dayID": "SMALLINT",
+        "hourID": "SMALLINT",
+    },
+    "movesdb20181022.sourcetypehour": {
+        "sourceTypeID": "SMALLINT",
+        "hourDayID": "SMALLINT",
+        "hotellingdist": "DOUBLE",
+    },
+}
+"""Columns of the synthetic reference data tables."""
+
+
+def get_synthetic_district_years(scale=1):
+    """
+    District-years of a workload: scale district-years, all districts of the first
+    year, then all districts of the next year, and so on.
+    Parameters
+    ----------
+    scale: int
+        Workload scale factor; 1 for one district-year, 10 and 100 for the 10x and
+        100x workloads.
+    Returns
+    -------
+    list
+        [(district abbreviation, year)].
+    """
+    if int(scale) != scale or scale < 1:
+        raise ValueError(f"scale needs to be a positive integer, not {scale}.")
+    district_years = [
+        (district_abb, year)
+        for year in SYNTHETIC_YEARS
+        for district_abb in SYNTHETIC_DISTRICT_FIPS
+    ]
+    if scale > len(district_years):
+        raise ValueError(
+            f"scale is over {len(district_years)}, the number of synthetic "
+            f"district-years."
+        )
+    return district_years[: int(scale)]
+
+
+def get_synthetic_db_nms(scale=1, months=MONTH_IDS, db_types=("county", "project")):
+    """
+    Database names of a workload: for each district-year of
+    get_synthetic_district_years, the county level database of each month and the
+    project level database.
+    """
+    db_nms = []
+    for district_abb, year in get_synthetic_district_years(scale):
+        fips = SYNTHETIC_DISTRICT_FIPS[district_abb]
+        if "county" in db_types:
+            db_nms += [
+                f"mvs14b_erlt_{district_abb}_{fips}_{year}_{month}_cer_out"
+                for month in months
+            ]
+        if "project" in db_types:
+            db_nms.append(f"mvs14b_erlt_{district_abb}_{fips}_{year}_per_out")
+    return db_nms
+
+
+def _get_rng(seed, key):
+    """Generator seeded by seed and key (e.g., a database name), so the data of a
+    database doesn't depend on the other databases of the workload."""
+    return np.random.default_rng([seed, zlib.crc32(key.encode())])
+
+
+def _grid(*dims):
+    """Columns of the cartesian product of dims (first dim varies slowest)."""
+    return [
+        arr.ravel()
+        for arr in np.meshgrid(*[np.asarray(dim) for dim in dims], indexing="ij")
+    ]
+
+
+def _pollutant_scale(rng, pollutant_ids):
+    """Log-normal magnitude of the rates of each pollutant: {pollutantid: scale}."""
+    return dict(
+        zip(pollutant_ids, np.exp(rng.normal(-3, 2.5, size=len(pollutant_ids))))
+    )
+
+
+def _rate_values(rng, pollutantid, sourcetypeid, fueltypeid, pollutant_scale):
+    """Rates by pollutant magnitude, source type, and fuel type, with 10% log-normal
+    noise."""
+    st_factor = np.vectorize(lambda st: 1 + np.log1p(SOURCE_TYPE_VMT_WEIGHTS[st]))
+    return (
+        np.vectorize(pollutant_scale.get)(pollutantid)
+        * np.where(sourcetypeid >= 40, 6.0, 1.0)
+        / st_factor(sourcetypeid)
+        * np.where(fueltypeid == 2, 1.8, 1.0)
+        * rng.lognormal(0, 0.1, size=len(pollutantid))
+    )
+
+
+def _insert_rows(conn, tbl_nm, col_arrs):
+    """Insert the rows of the columns col_arrs ({column: array}) into tbl_nm in
+    batches of INSERT_BATCH_ROWS rows, in one transaction."""
+    cur = conn.cursor()
+    insert_sql = (
+        f"INSERT INTO {tbl_nm} ({', '.join(col_arrs)}) "
+        f"VALUES ({', '.join(['?'] * len(col_arrs))})"
+    )
+    n_rows = len(next(iter(col_arrs.values())))
+    cur.execute("BEGIN;")
+    for start in range(0, n_rows, INSERT_BATCH_ROWS):
+        cur.executemany(
+            insert_sql,
+            list(
+                zip(
+                    *(
+                        arr[start : start + INSERT_BATCH_ROWS].tolist()
+                        for arr in col_arrs.values()
+                    )
+                )
+            ),
+        )
+    conn.commit()
+    return n_rows
+
+
+def _create_table(conn, backend, tbl_nm, col_defs):
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {tbl_nm};")
+    col_defs_sql = ",\n".join(f"{col} {col_type}" for col, col_type in col_defs.items())
+    cur.execute(
+        f"CREATE TABLE {tbl_nm} (\n{col_defs_sql}\n) {backend.table_options_sql};"
+    )
+
+
+def get_rateperdistance_cols(rng, year, month, pollutant_ids, pollutant_scale):
+    """Columns of rateperdistance: the running rows of the on-network road types and
+    speed bins, and the refueling rows of the gasoline vehicles."""
+    (hourid, roadtypeid, pollutantid, sourcetypeid, fueltypeid, avgspeedbinid) = _grid(
+        HOUR_IDS,
+        RUNNING_ROAD_TYPE_IDS,
+        pollutant_ids,
+        SOURCE_TYPE_IDS,
+        FUEL_TYPE_IDS,
+        AVG_SPEED_BIN_IDS,
+    )
+    processid = np.vectorize(lambda pol: POLLUTANT_PROCESS_IDS.get(pol, 1))(pollutantid)
+    # Rates per mile fall with speed (congested traffic) and rise at night with the
+    # colder temperatures.
+    rate = (
+        _rate_values(rng, pollutantid, sourcetypeid, fueltypeid, pollutant_scale)
+        * (1 + 6 / avgspeedbinid)
+        * (1 + 0.05 * np.cos(2 * np.pi * (hourid - 4) / 24))
+    )
+    refuel_pollutant_ids = [
+        pol for pol in REFUELING_POLLUTANT_IDS if pol in set(pollutant_ids)
+    ]
+    if refuel_pollutant_ids:
+        (
+            refuel_hourid,
+            refuel_roadtypeid,
+            refuel_pollutantid,
+            refuel_sourcetypeid,
+            refuel_avgspeedbinid,
+            refuel_processid,
+        ) = _grid(
+            HOUR_IDS,
+            RUNNING_ROAD_TYPE_IDS,
+            refuel_pollutant_ids,
+            SOURCE_TYPE_IDS,
+            AVG_SPEED_BIN_IDS,
+            REFUELING_PROCESS_IDS,
+        )
+        hourid = np.concatenate([hourid, refuel_hourid])
+        roadtypeid = np.concatenate([roadtypeid, refuel_roadtypeid])
+        pollutantid = np.concatenate([pollutantid, refuel_pollutantid])
+        sourcetypeid = np.concatenate([sourcetypeid, refuel_sourcetypeid])
+        fueltypeid = np.concatenate(
+            [fueltypeid, np.ones(len(refuel_hourid), dtype=fueltypeid.dtype)]
+        )
+        avgspeedbinid = np.concatenate([avgspeedbinid, refuel_avgspeedbinid])
+        processid = np.concatenate([processid, refuel_processid])
+        rate = np.concatenate([rate, rng.random(len(refuel_hourid)) * 0.01])
+    return {
+        "yearid": np.full(len(hourid), year),
+        "monthid": np.full(len(hourid), month),
+        "hourid": hourid,
+        "roadtypeid": roadtypeid,
+        "pollutantid": pollutantid,
+        "sourcetypeid": sourcetypeid,
+        "fueltypeid": fueltypeid,
+        "avgSpeedBinID": avgspeedbinid,
+        "processid": processid,
+        "rateperdistance": rate.astype(np.float32),
+    }
+
+
+def get_rateperstart_cols(rng, year, month, pollutant_ids, pollutant_scale):
+    """Columns of rateperstart: start exhaust rows."""
+    hourid, pollutantid, sourcetypeid, fueltypeid = _grid(
+        HOUR_IDS, pollutant_ids, SOURCE_TYPE_IDS, FUEL_TYPE_IDS
+    )
+    rate = _rate_values(rng, pollutantid, sourcetypeid, fueltypeid, pollutant_scale)
+    return {
+        "yearid": np.full(len(hourid), year),
+        "monthid": np.full(len(hourid), month),
+        "hourid": hourid,
+        "pollutantid": pollutantid,
+        "sourcetypeid": sourcetypeid,
+        "fueltypeid": fueltypeid,
+        "processid": np.full(len(hourid), START_PROCESS_ID),
+        # Cold starts emit more in the early morning hours.
+        "rateperstart": (
+            rate * 3 * (1 + 0.2 * np.cos(2 * np.pi * (hourid - 5) / 24))
+        ).astype(np.float32),
+    }
+
+
+def get_rateperhour_cols(rng, year, month, pollutant_ids, pollutant_scale):
+    """Columns of rateperhour: hotelling rows of the combination long-haul trucks."""
+    hourid, pollutantid, fueltypeid, processid = _grid(
+        HOUR_IDS, pollutant_ids, FUEL_TYPE_IDS, HOTELLING_PROCESS_IDS
+    )
+    sourcetypeid = np.full(len(hourid), HOTELLING_SOURCE_TYPE_ID)
+    rate = _rate_values(rng, pollutantid, sourcetypeid, fueltypeid, pollutant_scale)
+    return {
+        "yearid": np.full(len(hourid), year),
+        "monthid": np.full(len(hourid), month),
+        "hourid": hourid,
+        "pollutantid": pollutantid,
+        "sourcetypeid": sourcetypeid,
+        "fueltypeid": fueltypeid,
+        "processid": processid,
+        "rateperhour": (rate * np.where(processid == 17, 0.05, 10)).astype(np.float32),
+    }
+
+
+def get_startspervehicle_cols(rng, year):
+    """Columns of startspervehicle: weekday starts per vehicle, peaking in the AM and
+    PM periods."""
+    hourid, sourcetypeid, fueltypeid = _grid(HOUR_IDS, SOURCE_TYPE_IDS, FUEL_TYPE_IDS)
+    hour_profile = (
+        0.1
+        + np.exp(-(((hourid - 8) / 2) ** 2))
+        + 1.2 * np.exp(-(((hourid - 17.5) / 2.5) ** 2))
+    )
+    return {
+        "yearID": np.full(len(hourid), year),
+        "hourID": hourid,
+        "sourceTypeID": sourcetypeid,
+        "fuelTypeID": fueltypeid,
+        "startsPerVehicle": (
+            hour_profile * rng.lognormal(0, 0.1, size=len(hourid)) * 0.3
+        ).astype(np.float32),
+    }
+
+
+def get_movesoutput_cols(
+    rng,
+    year,
+    months,
+    hour_ids,
+    link_road_type_ids,
+    fips,
+    pollutant_ids,
+    pollutant_scale,
+):
+    """Columns of movesoutput: emissions (grams) of the links of link_road_type_ids
+    ({linkid: roadtypeid})."""
+    monthid, hourid, linkid, pollutantid, sourcetypeid, fueltypeid = _grid(
+        months,
+        hour_ids,
+        tuple(link_road_type_ids),
+        pollutant_ids,
+        SOURCE_TYPE_IDS,
+        FUEL_TYPE_IDS,
+    )
+    rate = _rate_values(rng, pollutantid, sourcetypeid, fueltypeid, pollutant_scale)
+    vmt_weight = np.vectorize(SOURCE_TYPE_VMT_WEIGHTS.get)(sourcetypeid)
+    return {
+        "yearid": np.full(len(hourid), year),
+        "monthid": monthid,
+        "hourid": hourid,
+        "countyid": np.full(len(hourid), int(fips)),
+        "roadtypeid": np.vectorize(link_road_type_ids.get)(linkid),
+        "linkid": linkid,
+        "pollutantid": pollutantid,
+        "sourcetypeid": sourcetypeid,
+        "fueltypeid": fueltypeid,
+        "processid": np.vectorize(lambda pol: POLLUTANT_PROCESS_IDS.get(pol, 1))(
+            pollutantid
+        ),
+        "emissionquant": (rate * vmt_weight * 100).astype(np.float32),
+    }
+
+
+def get_movesactivityoutput_cols(rng, year, months, hour_ids, link_road_type_ids, fips):
+    """
+    Columns of movesactivityoutput: distance (activitytypeid 1) and source hours
+    operating (activitytypeid 4) of the links of link_road_type_ids. The source hours
+    operating of a link, hour, and source type are split over the fuels by the diesel
+    share of the source type, so they sum to 1 over the fuels.
+    """
+    monthid, hourid, linkid, sourcetypeid, fueltypeid, activitytypeid = _grid(
+        months,
+        hour_ids,
+        tuple(link_road_type_ids),
+        SOURCE_TYPE_IDS,
+        FUEL_TYPE_IDS,
+        ACTIVITY_TYPE_IDS,
+    )
+    diesel_share = np.vectorize(SOURCE_TYPE_DIESEL_SHARE.get)(sourcetypeid)
+    fuel_share = np.where(fueltypeid == 2, diesel_share, 1 - diesel_share)
+    distance = (
+        np.vectorize(SOURCE_TYPE_VMT_WEIGHTS.get)(sourcetypeid)
+        * fuel_share
+        * rng.lognormal(3, 0.3, size=len(hourid))
+    )
+    return {
+        "yearid": np.full(len(hourid), year),
+        "monthid": monthid,
+        "hourid": hourid,
+        "countyid": np.full(len(hourid), int(fips)),
+        "linkid": linkid,
+        "sourcetypeid": sourcetypeid,
+        "fueltypeid": fueltypeid,
+        "activitytypeid": activitytypeid,
+        "activity": np.where(activitytypeid == 4, fuel_share, distance).astype(
+            np.float32
+        ),
+    }
+
+
+def get_ref_cols(rng):
+    """Columns of each table of REF_COL_DEFS: {table: {column: array}}."""
+    moves_db = MovesDb(get_synthetic_db_nms(db_types=("project",))[0], connect=False)
+    map_period_hourid = moves_db.MAP_PERIOD_HOURID
+    district_nms = [
+        moves_db.MAP_DISTRICT_ABB_FULL_NM_TXLED[district_abb]["area_district"]
+        for district_abb in SYNTHETIC_DISTRICT_FIPS
+    ]
+    # VMT mix: shares of the source type-fuel type combinations in the VMT of each
+    # district, day type, year, period, and road type (sum to 1).
+    st_ft = list(itertools.product(SOURCE_TYPE_IDS, FUEL_TYPE_IDS))
+    st_ft_weights = np.array(
+        [
+            SOURCE_TYPE_VMT_WEIGHTS[st]
+            * (
+                SOURCE_TYPE_DIESEL_SHARE[st]
+                if ft == 2
+                else 1 - SOURCE_TYPE_DIESEL_SHARE[st]
+            )
+            for st, ft in st_ft
+        ]
+    )
+    todmix_groups = list(
+        itertools.product(
+            district_nms,
+            TODMIX_DAY_TYPES,
+            TODMIX_YEARS,
+            tuple(map_period_hourid),
+            RUNNING_ROAD_TYPE_IDS,
+        )
+    )
+    vmtmix = rng.dirichlet(
+        st_ft_weights / st_ft_weights.sum() * 200 + 1e-3, size=len(todmix_groups)
+    )
+    todmix_rows = [
+        group[:4] + (st, ft, group[4]) for group in todmix_groups for st, ft in st_ft
+    ]
+    todmix_cols = dict(
+        zip(
+            REF_COL_DEFS["vmtmix_fy20.todmix"],
+            [np.array(col) for col in zip(*todmix_rows)] + [vmtmix.ravel()],
+        )
+    )
+    # Hour mix: share of each hour in the VMT of its period (sum to 1 by period).
+    hour_period = {
+        hourid: period
+        for period, hourids in map_period_hourid.items()
+        for hourid in hourids
+    }
+    hourmix_rows = []
+    for district_nm in district_nms:
+        factors = rng.uniform(0.5, 1.5, size=len(HOUR_IDS))
+        period_sums = {
+            period: sum(factors[hourid - 1] for hourid in hourids)
+            for period, hourids in map_period_hourid.items()
+        }
+        hourmix_rows += [
+            (
+                district_nm,
+                hourid,
+                factors[hourid - 1] / period_sums[hour_period[hourid]],
+            )
+            for hourid in HOUR_IDS
+        ]
+    # TxLED: NOx reduction of the diesel vehicles.
+    txled_rows = [
+        (year, pollutantid, st, 2, float(rng.uniform(0.92, 0.95)))
+        for year in SYNTHETIC_YEARS
+        for pollutantid in TXLED_POLLUTANT_IDS
+        for st in SOURCE_TYPE_IDS
+    ]
+    hourday_rows = [
+        (hourid * 10 + day_id, day_id, hourid)
+        for hourid in HOUR_IDS
+        for day_id in DAY_IDS
+    ]
+    # Hotelling hours of the combination long-haul trucks by hour of the day (sum to 1
+    # by day); the other source types don't hotel.
+    hotelling_rows = []
+    for day_id in DAY_IDS:
+        hotellingdist = 1.2 - np.cos(2 * np.pi * (np.array(HOUR_IDS) - 3) / 24)
+        hotellingdist /= hotellingdist.sum()
+        hotelling_rows += [
+            (HOTELLING_SOURCE_TYPE_ID, hourid * 10 + day_id, float(dist))
+            for hourid, dist in zip(HOUR_IDS, hotellingdist)
+        ]
+
+    def rows_to_cols(tbl_nm, rows):
+        return dict(zip(REF_COL_DEFS[tbl_nm], [np.array(col) for col in zip(*rows)]))
+
+    return {
+        "vmtmix_fy20.todmix": todmix_cols,
+        "vmtmix_fy20.hourmix": rows_to_cols("vmtmix_fy20.hourmix", hourmix_rows),
+        "txled_db.txled_long": rows_to_cols("txled_db.txled_long", txled_rows),
+        "movesdb20181022.sourceusetype": rows_to_cols(
+            "movesdb20181022.sourceusetype", list(SOURCE_TYPE_NMS.items())
+        ),
+        "movesdb20181022.hourday": rows_to_cols(
+            "movesdb20181022.hourday", hourday_rows
+        ),
+        "movesdb20181022.sourcetypehour": rows_to_cols(
+            "movesdb20181022.sourcetypehour", hotelling_rows
+        ),
+    }
+
+
+def generate_synthetic_ref_data(backend, seed=0):
+    """Create the REF_COL_DEFS tables (replacing existing tables)."""
+    conn = backend.connect(database_nm=None)
+    try:
+        cur = conn.cursor()
+        for schema_nm in {tbl_nm.split(".")[0] for tbl_nm in REF_COL_DEFS}:
+            backend.create_schema(cur, schema_nm)
+        for tbl_nm, col_arrs in get_ref_cols(_get_rng(seed, "ref")).items():
+            _create_table(conn, backend, tbl_nm, REF_COL_DEFS[tbl_nm])
+            _insert_rows(conn, tbl_nm, col_arrs)
+    finally:
+        conn.close()
+
+
+def generate_synthetic_db(backend, db_nm, pollutants=None, months=MONTH_IDS, seed=0):
+    """
+    Create the synthetic MOVES output database db_nm: the COUNTY_LEVEL_TABLES of a
+    county level database, or the PROJECT_LEVEL_TABLES of a project level database
+    (with the rows of months). Existing tables are replaced.
+    Parameters
+    ----------
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        Backend of the database.
+    db_nm: str
+        MOVES output database name, e.g., mvs14b_erlt_elp_48141_2020_1_cer_out.
+    pollutants: list-like
+        Output pollutants of ttierlt_v1.pollutants whose MOVES pollutants are
+        generated. None for all the pollutants of POLLUTANT_REGISTRY.
+    months: list-like
+        Months of the project level databases.
+    seed: int
+        Random seed.
+    Returns
+    -------
+    dict
+        {table name: rows}.
+    """
+    start_time = time.time()
+    moves_db = MovesDb(db_nm, connect=False)
+    year = moves_db.analysis_year
+    fips = moves_db.db_nm_county_year_month_dict["fips"]
+    month_id = moves_db.db_nm_county_year_month_dict["month_id"]
+    pollutant_ids = get_pollutant_ids(
+        tuple(POLLUTANT_REGISTRY) if pollutants is None else pollutants
+    )
+    rng = _get_rng(seed, db_nm)
+    # Same pollutant magnitudes in all databases.
+    pollutant_scale = _pollutant_scale(_get_rng(seed, "pollutants"), pollutant_ids)
+    # Rows of the month of a county level database, or of months.
+    db_months = (int(month_id),) if month_id else tuple(months)
+    link_hour_ids, link_road_type_ids = (
+        (HOUR_IDS, COUNTY_LINK_ROAD_TYPE_IDS)
+        if month_id
+        else (PROJECT_HOUR_IDS, PROJECT_LINK_ROAD_TYPE_IDS)
+    )
+    tbl_cols = {
+        "rateperdistance": lambda: get_rateperdistance_cols(
+            rng, year, db_months[0], pollutant_ids, pollutant_scale
+        ),
+        "rateperstart": lambda: get_rateperstart_cols(
+            rng, year, db_months[0], pollutant_ids, pollutant_scale
+        ),
+        "rateperhour": lambda: get_rateperhour_cols(
+            rng, year, db_months[0], pollutant_ids, pollutant_scale
+        ),
+        "startspervehicle": lambda: get_startspervehicle_cols(rng, year),
+        "movesoutput": lambda: get_movesoutput_cols(
+            rng,
+            year,
+            db_months,
+            link_hour_ids,
+            link_road_type_ids,
+            fips,
+            pollutant_ids,
+            pollutant_scale,
+        ),
+        "movesactivityoutput": lambda: get_movesactivityoutput_cols(
+            rng, year, db_months, link_hour_ids, link_road_type_ids, fips
+        ),
+    }
+    conn = backend.connect(database_nm=None)
+    try:
+        backend.create_schema(conn.cursor(), db_nm)
+    finally:
+        conn.close()
+    conn = backend.connect(database_nm=db_nm)
+    try:
+        n_rows = {}
+        for tbl_nm in COUNTY_LEVEL_TABLES if month_id else PROJECT_LEVEL_TABLES:
+            _create_table(conn, backend, tbl_nm, MOVES_OUTPUT_COL_DEFS[tbl_nm])
+            n_rows[tbl_nm] = _insert_rows(conn, tbl_nm, tbl_cols[tbl_nm]())
+    finally:
+        conn.close()
+    print(
+        "---generate_synthetic_db %s execution time:  %s seconds---"
+        % (db_nm, time.time() - start_time)
+    )
+    logging.info(
+        "---generate_synthetic_db %s execution time:  %s seconds---"
+        % (db_nm, time.time() - start_time)
+    )
+    return n_rows
+
+
+def generate_synthetic_moves(
+    backend,
+    scale=1,
+    pollutants=None,
+    months=MONTH_IDS,
+    db_types=("county", "project"),
+    seed=0,
+    allow_server=False,
+):
+    """
+    Create the reference data and the synthetic MOVES output databases of a workload
+    (see get_synthetic_db_nms). At scale 1, a county level database has about 2.2
+    million rateperdistance rows with all the pollutants.
+    Parameters
+    ----------
+    backend: ttierlt_v1.sql_backend.MariaDbBackend
+        Backend of the databases, usually a ttierlt_v1.sql_backend.SqliteBackend.
+    scale: int
+        Number of district-years: 1, 10, and 100 for the 1x, 10x, and 100x
+        workloads.
+    pollutants: list-like
+        Output pollutants whose MOVES pollutants are generated; fewer pollutants give
+        smaller databases. None for all the pollutants of POLLUTANT_REGISTRY.
+    months: list-like
+        Months of the county level databases and of the project level database rows.
+    db_types: list-like
+        "county" and/or "project".
+    seed: int
+        Random seed; the same seed gives the same data.
+    allow_server: bool
+        The reference data replaces the vmtmix_fy20, txled_db, and movesdb20181022
+        tables, so a MariaDbBackend is refused unless allow_server is True (use it on
+        a scratch server only).
+    Returns
+    -------
+    dict
+        {database name: {table name: rows}}.
+    """
+    if backend.name == "mariadb" and not allow_server:
+        raise ValueError(
+            "generate_synthetic_moves replaces the reference data tables; use "
+            "allow_server=True to run it on a (scratch) MariaDB server."
+        )
+    start_time = time.time()
+    generate_synthetic_ref_data(backend, seed)
+    n_rows = {
+        db_nm: generate_synthetic_db(backend, db_nm, pollutants, months, seed)
+        for db_nm in get_synthetic_db_nms(scale, months, db_types)
+    }
+    print(
+        "---generate_synthetic_moves execution time:  %s seconds---"
+        % (time.time() - start_time)
+    )
+    logging.info(
+        "---generate_synthetic_moves execution time:  %s seconds---"
+        % (time.time() - start_time)
+    )
+    return n_rows
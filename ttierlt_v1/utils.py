@@ -1,8 +1,14 @@
 import glob
 import sys
+import logging
+import functools
+import threading
+import time
 from pathlib import Path
 import os
 import mariadb
+import pandas as pd
+import numpy as np
 from dotenv import find_dotenv, load_dotenv
 from sqlalchemy import create_engine
 import mysql.connector  # Needed for create_engine to work.
@@ -43,31 +49,145 @@ PATH_PROCESSED_EXTNIDLE = os.path.join(PATH_PROCESSED, "extnidle")
 if not os.path.exists(PATH_PROCESSED_EXTNIDLE):
     os.mkdir(PATH_PROCESSED_EXTNIDLE)
 
+# Column types for the pollutant columns of the output tables, e.g.,
+# mvs2014b_erlt_out.running_erlt_intermediate. See check_rate_col_type_precision for
+# the difference between the two types.
+RATE_COL_TYPES = {"decimal": "DECIMAL(23,19)", "double": "DOUBLE"}
+# Schema of the scratch tables of the *SqlCmds classes (emisrate, startrate, ...).
+# Each run suffixes its scratch tables with its run id (RUN_ID_LEN hex characters), so
+# runs on the same MOVES output database don't clobber each other's tables.
+SCRATCH_SCHEMA = "mvs2014b_erlt_scratch"
+RUN_ID_LEN = 12
+
+MARIA_DB_HOST = "127.0.0.1"
+MARIA_DB_PORT = 3308
+# Connections per connection pool. Each worker process has its own pools, used by the
+# 4 process threads of batch_runner.process_db_all, the reference data cache
+# connection, and the occasional short-lived connection (e.g., merge_result_shards).
+CONNECTION_POOL_SIZE = 8
+# Seconds to wait for a pooled connection when all are in use, and the polling
+# interval. connect_to_server_db fails after the timeout instead of opening
+# connections outside the pool.
+POOL_WAIT_TIMEOUT_S = 300
+POOL_WAIT_INTERVAL_S = 0.1
+# {(pid, user_nm, local_infile): mariadb.ConnectionPool}
+_CONNECTION_POOLS = {}
+# Pools are created under a lock: the threads of a worker (see
+# batch_runner.process_db_all) would otherwise race to create a pool with the same
+# pool_name, and the losers would get a "pool already exists" error.
+_CONNECTION_POOLS_LOCK = threading.Lock()
+
 TEMPLATE_DB_NM = "mvs14b_erlt_elp_48141_2020_1_cer_out"  # Database used for developing the 1st set of SQL queries. It's
 # name would be replaced by other database name as we iterate over the different databases.
 
 
-def connect_to_server_db(database_nm, user_nm="root"):
+@functools.lru_cache(maxsize=None)
+def get_maria_db_password():
+    """
+    MariaDB password from the MARIA_DB_PASSWORD entry of the .env file. find_dotenv
+    walks up the directories, so the password is resolved once per process.
+    """
+    # find .env automagically by walking up directories until it's found
+    dotenv_path = find_dotenv()
+    # load up the entries as environment variables
+    load_dotenv(dotenv_path)
+    return os.environ.get("MARIA_DB_PASSWORD")
+
+
+def get_connection_pool(user_nm="root", local_infile=False):
+    """
+    Connection pool of the current process for the user and local_infile setting.
+    Pools aren't shared with forked worker processes.
+    """
+    pool_key = (os.getpid(), user_nm, local_infile)
+    with _CONNECTION_POOLS_LOCK:
+        if pool_key not in _CONNECTION_POOLS:
+            _CONNECTION_POOLS[pool_key] = mariadb.ConnectionPool(
+                pool_name=f"ttierlt_{os.getpid()}_{user_nm}_{int(local_infile)}",
+                pool_size=CONNECTION_POOL_SIZE,
+                pool_reset_connection=True,
+                user=user_nm,
+                password=get_maria_db_password(),
+                host=MARIA_DB_HOST,
+                port=MARIA_DB_PORT,
+                local_infile=local_infile,
+            )
+        return _CONNECTION_POOLS[pool_key]
+
+
+def get_pooled_connection(user_nm="root", local_infile=False):
+    """
+    Connection from the pool of the current process. Waits up to POOL_WAIT_TIMEOUT_S
+    for a connection to be returned when all pooled connections are in use.
+    """
+    pool = get_connection_pool(user_nm, local_infile)
+    start_time = time.time()
+    is_waiting = False
+    while True:
+        try:
+            conn_ = pool.get_connection()
+        except mariadb.PoolError:
+            conn_ = None
+        if conn_ is not None:
+            return conn_
+        if not is_waiting:
+            logging.warning(
+                "All pooled connections are in use. Waiting for a connection to be "
+                "returned to the pool."
+            )
+            is_waiting = True
+        if time.time() - start_time > POOL_WAIT_TIMEOUT_S:
+            raise mariadb.PoolError(
+                f"No pooled connection was returned within {POOL_WAIT_TIMEOUT_S} "
+                f"seconds; all {CONNECTION_POOL_SIZE} connections are in use."
+            )
+        time.sleep(POOL_WAIT_INTERVAL_S)
+
+
+def connect_to_server_db(database_nm, user_nm="root", local_infile=False, pooled=True):
     """
     Function to connect to a particular database on the server.
+    Pooled connections come from the connection pool of the current process, and
+    conn_.close() returns them to the pool. The pool is per server account rather than
+    per database, as a batch run visits each MOVES output database once; the default
+    database is selected (or cleared, for database_nm=None) when the connection is
+    handed out. The pool is bounded: when all CONNECTION_POOL_SIZE connections are in
+    use, the call waits for one to be returned (see get_pooled_connection).
+    Parameters
+    ----------
+    database_nm: str
+        Database name. None to connect without a default database.
+    user_nm: str
+        User name.
+    local_infile: bool
+        True, to allow LOAD DATA LOCAL INFILE on the connection.
+    pooled: bool
+        True, to get the connection from the connection pool. False, to open a new
+        connection outside the pool.
     Returns
     -------
     conn_: mariadb.connection
         Connection object to access the data in MariaDB Server.
     """
-    # find .env automagically by walking up directories until it's found
-    dotenv_path = find_dotenv()
-    # load up the entries as environment variables
-    load_dotenv(dotenv_path)
     # Connect to MariaDB Platform
     try:
-        conn_ = mariadb.connect(
-            user=user_nm,
-            password=os.environ.get("MARIA_DB_PASSWORD"),
-            host="127.0.0.1",
-            port=3308,
-            database=database_nm,
-        )
+        if pooled:
+            conn_ = get_pooled_connection(user_nm, local_infile)
+            if database_nm is not None:
+                conn_.database = database_nm
+            elif conn_.database:
+                # Clear the default database left by the previous use of the pooled
+                # connection.
+                conn_.change_user(user_nm, get_maria_db_password(), "")
+        else:
+            conn_ = mariadb.connect(
+                user=user_nm,
+                password=get_maria_db_password(),
+                host=MARIA_DB_HOST,
+                port=MARIA_DB_PORT,
+                database=database_nm,
+                local_infile=local_infile,
+            )
     except mariadb.Error as e:
         print(f"Error connecting to MariaDB Platform: {e}")
         sys.exit(1)
@@ -117,16 +237,170 @@ def create_qaqc_output_conflicted_schema():
     conn.close()
 
 
+@functools.lru_cache(maxsize=None)
 def get_engine_to_output_to_db(out_database):
     """
-    Get engine to output data to to out_database using pd.to_sql().
+    Get engine to output data to to out_database using pd.to_sql(). One engine (with
+    its own connection pool) is created per out_database and reused.
     """
-    # find .env automagically by walking up directories until it's found
-    dotenv_path = find_dotenv()
-    # load up the entries as environment variables
-    load_dotenv(dotenv_path)
-    host = "127.0.0.1"
     engine = create_engine(
-        f"mysql+mysqlconnector://root:{os.environ.get('MARIA_DB_PASSWORD')}@{host}/{out_database}"
+        f"mysql+mysqlconnector://root:{get_maria_db_password()}@{MARIA_DB_HOST}/"
+        f"{out_database}"
     )
     return engine
+
+
+def get_rate_col_type(rate_col_type="decimal"):
+    """
+    SQL column type for the pollutant columns of the output tables.
+    Parameters
+    ----------
+    rate_col_type: str
+        decimal: DECIMAL(23,19) (default). double: DOUBLE.
+    Returns
+    -------
+    str
+        SQL column type.
+    """
+    if rate_col_type not in RATE_COL_TYPES:
+        raise ValueError(
+            f"rate_col_type can be either of {list(RATE_COL_TYPES)}; got "
+            f"{rate_col_type}."
+        )
+    return RATE_COL_TYPES[rate_col_type]
+
+
+def read_erlt_table(
+    table_nm,
+    database_nm="mvs2014b_erlt_out",
+    where_clause="",
+    categorical_cols=("Area", "funclass"),
+):
+    """
+    Read a table like mvs2014b_erlt_out.running_erlt_intermediate with float64
+    pollutant columns. pd.read_sql returns DECIMAL columns as object columns of
+    decimal.Decimal; this function converts the DECIMAL columns to DOUBLE on the server
+    (column types from information_schema.columns), so the rates arrive as floats.
+    Parameters
+    ----------
+    table_nm: str
+        Table name.
+    database_nm: str
+        Database with the table.
+    where_clause: str
+        Optional filter, e.g., "WHERE Area = 'El Paso'".
+    categorical_cols: tuple
+        Columns converted to pandas categorical, e.g., Area and funclass.
+    Returns
+    -------
+    pd.DataFrame()
+        Table data.
+    """
+    conn = connect_to_server_db(database_nm=database_nm)
+    cur = conn.cursor()
+    cur.execute(
+        f"""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = '{database_nm}' AND table_name = '{table_nm}'
+        ORDER BY ordinal_position;
+        """
+    )
+    col_types = cur.fetchall()
+    if not col_types:
+        conn.close()
+        raise ValueError(f"{database_nm}.{table_nm} doesn't exist.")
+    # DECIMAL + DOUBLE is evaluated as DOUBLE on the server.
+    select_cols = ", ".join(
+        f"`{col}` + 0E0 AS `{col}`" if data_type.lower() == "decimal" else f"`{col}`"
+        for col, data_type in col_types
+    )
+    cur.execute(f"SELECT {select_cols} FROM {table_nm} {where_clause};")
+    col_nms = [col for col, _ in col_types]
+    data = pd.DataFrame.from_records(cur.fetchall(), columns=col_nms)
+    conn.close()
+    for col, data_type in col_types:
+        if data_type.lower() in ("decimal", "double", "float"):
+            data[col] = data[col].astype(np.float64)
+    for col in categorical_cols:
+        if col in data.columns:
+            data[col] = data[col].astype("category")
+    return data
+
+
+def check_rate_col_type_precision(
+    decimal_table_nm,
+    double_table_nm,
+    key_cols,
+    pollutant_cols,
+    database_nm="mvs2014b_erlt_out",
+    atol=1e-19,
+    rtol=1e-15,
+):
+    """
+    Compare the rates in a table created with rate_col_type="decimal" with the rates
+    in the same table created with rate_col_type="double". The rates are computed as
+    DOUBLE in SQL. DECIMAL(23,19) rounds them to 19 decimal places (values below
+    1e-12, e.g., POM, keep fewer than 7 significant digits), while DOUBLE stores them
+    as computed. The expected difference is at most 0.5e-19 (DECIMAL rounding) plus
+    the DOUBLE rounding of the DECIMAL values: |decimal - double| <= atol + rtol *
+    |double|.
+    Parameters
+    ----------
+    decimal_table_nm: str
+        Table with DECIMAL(23,19) pollutant columns.
+    double_table_nm: str
+        Table with DOUBLE pollutant columns.
+    key_cols: list
+        Columns used to match the rows, e.g., Area, yearid, monthid, funclass, and
+        avgspeed.
+    pollutant_cols: list
+        Pollutant columns.
+    database_nm: str
+        Database with the tables.
+    atol: float
+        Absolute tolerance.
+    rtol: float
+        Relative tolerance.
+    Returns
+    -------
+    pd.DataFrame()
+        Maximum absolute and relative differences by pollutant and whether the
+        differences are within the tolerance.
+    """
+    decimal_data = read_erlt_table(
+        decimal_table_nm, database_nm=database_nm, categorical_cols=()
+    )
+    double_data = read_erlt_table(
+        double_table_nm, database_nm=database_nm, categorical_cols=()
+    )
+    merged_data = decimal_data.merge(
+        double_data,
+        on=list(key_cols),
+        suffixes=("_decimal", "_double"),
+        validate="one_to_one",
+    )
+    assert len(merged_data) == len(decimal_data) == len(double_data), (
+        f"{decimal_table_nm} and {double_table_nm} don't have the same "
+        f"{list(key_cols)}."
+    )
+    precision_check = []
+    for pollutant in pollutant_cols:
+        decimal_vals = merged_data[f"{pollutant}_decimal"].values
+        double_vals = merged_data[f"{pollutant}_double"].values
+        abs_diff = np.abs(decimal_vals - double_vals)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel_diff = np.where(double_vals != 0, abs_diff / np.abs(double_vals), 0)
+        precision_check.append(
+            {
+                "pollutant": pollutant,
+                "max_abs_diff": np.nanmax(abs_diff, initial=0),
+                "max_rel_diff": np.nanmax(rel_diff, initial=0),
+                "within_tolerance": bool(
+                    np.all(
+                        (abs_diff <= atol + rtol * np.abs(double_vals))
+                        | (np.isnan(decimal_vals) & np.isnan(double_vals))
+                    )
+                ),
+            }
+        )
+    return pd.DataFrame(precision_check)
@@ -4,6 +4,8 @@ Created by: Apoorba Bibeka
 Date Created: 01/27/2021
 """
 from scipy.interpolate import interp1d
+import scipy.sparse
+import functools
 import pandas as pd
 import numpy as np
 import os
@@ -12,30 +14,12 @@ from ttierlt_v1.utils import (
     get_engine_to_output_to_db,
     PATH_INTERIM_RUNNING,
 )
+from ttierlt_v1.pollutants import POLLUTANT_COLS
 
 # TODO: Create a module based on the code before and use in for all the processes.
 
 YEAR_LIST = np.arange(2020, 2051, 1)
 AVG_SPEED_LIST = [2.5] + list(range(3, 76))
-POLLUTANT_COLS = (
-    "CO",
-    "NOX",
-    "SO2",
-    "NO2",
-    "CO2EQ",
-    "VOC",
-    "PM10",
-    "PM25",
-    "BENZ",
-    "NAPTH",
-    "BUTA",
-    "FORM",
-    "ACTE",
-    "ACROL",
-    "ETYB",
-    "DPM",
-    "POM",
-)
 
 
 def pivot_df_reindex_for_qaqc(
@@ -77,7 +61,10 @@ def pivot_df_reindex_for_qaqc(
 
 
 def out_yr_spd_interpolated(
-    intermediate_data, interpolation_col_dict, pollutant_cols=POLLUTANT_COLS
+    intermediate_data,
+    interpolation_col_dict,
+    pollutant_cols=POLLUTANT_COLS,
+    engine="numpy",
 ):
     """
     Create empty rows in intermediate_data based on the interpolation_col_dict.
@@ -105,11 +92,46 @@ def out_yr_spd_interpolated(
         dict with interpolation parameters.
     pollutant_cols: list
         List of columns names for pollutants.
+    engine: str
+        numpy (default): interpolate all groups and pollutants with batched NumPy
+        operations. scipy: iterate over the groups and create a
+        scipy.interpolate.interp1d per pollutant. Both engines return identical
+        output. operator: multiply the rates with the cached sparse interpolation
+        matrix (get_interpolation_operator) of the source and target grids. Matches
+        the other engines to floating point rounding.
     Returns
     -------
     pd.DataFrame()
         Dataframe with interpolated values.
     """
+    if engine == "numpy":
+        return _out_yr_spd_interpolated_numpy(
+            intermediate_data, interpolation_col_dict, pollutant_cols
+        )
+    elif engine == "operator":
+        return _out_yr_spd_interpolated_numpy(
+            intermediate_data,
+            interpolation_col_dict,
+            pollutant_cols,
+            interp_func=_interp_with_operator,
+        )
+    elif engine == "scipy":
+        return _out_yr_spd_interpolated_scipy(
+            intermediate_data, interpolation_col_dict, pollutant_cols
+        )
+    else:
+        raise ValueError(
+            f"engine only handles numpy, operator, and scipy; got {engine}."
+        )
+
+
+def _out_yr_spd_interpolated_scipy(
+    intermediate_data, interpolation_col_dict, pollutant_cols=POLLUTANT_COLS
+):
+    """
+    Loop over the groups and create a scipy.interpolate.interp1d per pollutant. See
+    out_yr_spd_interpolated for the parameters.
+    """
     # Iterate over partitioned data based on ["Area", "monthid", "funclass", "avgspeed"]
     # and interpolate the emission
     # rate for odd years.
@@ -164,6 +186,316 @@ def out_yr_spd_interpolated(
     return fin_interpolated_df
 
 
+def _out_yr_spd_interpolated_numpy(
+    intermediate_data,
+    interpolation_col_dict,
+    pollutant_cols=POLLUTANT_COLS,
+    interp_func=None,
+):
+    """
+    Vectorized version of _out_yr_spd_interpolated_scipy. See out_yr_spd_interpolated
+    for the parameters. The rates are put in a dense (group x source x-value x
+    pollutant) array. Groups that have data for the same source x-values are
+    interpolated together with interp_func(x_new, xp, fp). The default
+    _interp_like_np_interp follows np.interp (used by interp1d for float data) step by
+    step, so that the output is bit-for-bit identical to the scipy engine.
+    """
+    if interp_func is None:
+        interp_func = _interp_like_np_interp
+    interpol_col = interpolation_col_dict["interpol_col"]
+    interpol_vals = interpolation_col_dict["interpol_vals"]
+    grpby_cols = list(interpolation_col_dict["grpby_cols"])
+    pollutant_cols = list(pollutant_cols)
+    if interpol_col not in ("yearid", "avgspeed"):
+        raise ValueError(
+            "interpolation_col_dict['interpol_col'] only handles "
+            "yearid and avgspeed. Explicitly code how to handle other "
+            "variables before using this function on other variables."
+        )
+    # groupby drops the rows with missing group keys.
+    intermediate_data = intermediate_data.dropna(subset=grpby_cols)
+    intermediate_data_grps = intermediate_data.groupby(grpby_cols)
+    grp_codes = intermediate_data_grps.ngroup().values
+    grp_keys = intermediate_data_grps.size().index.to_frame(index=False)
+    num_grps = len(grp_keys)
+    interpol_vals_idx = pd.Index(interpol_vals)
+    num_interpol_vals = len(interpol_vals_idx)
+    # Placeholder rows for all the interpol_vals in each group.
+    mux_all_grps = grp_keys.loc[grp_keys.index.repeat(num_interpol_vals)]
+    mux_all_grps[interpol_col] = np.tile(interpol_vals_idx.values, num_grps)
+    mux_all_grps = pd.MultiIndex.from_frame(mux_all_grps)
+    interpolated_df = (
+        intermediate_data.set_index(grpby_cols + [interpol_col])
+        .reindex(mux_all_grps)
+        .reset_index()
+    )
+    interpolated_df.index = np.tile(np.arange(num_interpol_vals), num_grps)
+    if interpol_col == "yearid":
+        x_interpol = np.asarray(intermediate_data.yearid.values, dtype=np.float64)
+        x_new = np.asarray(interpol_vals_idx.values, dtype=np.float64)
+    else:
+        # Use the inverse of average speed for interpolation.
+        x_interpol = np.asarray((1 / intermediate_data.avgspeed).values, np.float64)
+        x_new = np.asarray(1 / interpol_vals_idx.values, dtype=np.float64)
+    y_emisrate = np.asarray(intermediate_data[pollutant_cols].values, np.float64)
+    assert not np.isnan(
+        y_emisrate
+    ).any(), "Interpolated value not matching given value."
+    # Dense (group x source x-value x pollutant) array of the emission rates.
+    x_interpol_unique, x_interpol_pos = np.unique(x_interpol, return_inverse=True)
+    emisrate_arr = np.full(
+        (num_grps, len(x_interpol_unique), len(pollutant_cols)), np.nan
+    )
+    emisrate_arr[grp_codes, x_interpol_pos] = y_emisrate
+    has_x_arr = np.zeros((num_grps, len(x_interpol_unique)), dtype=bool)
+    has_x_arr[grp_codes, x_interpol_pos] = True
+    interpolated_arr = np.empty(
+        (num_grps, num_interpol_vals, len(pollutant_cols)), dtype=np.float64
+    )
+    has_x_patterns, pattern_codes = np.unique(has_x_arr, axis=0, return_inverse=True)
+    for pattern_code, has_x in enumerate(has_x_patterns):
+        grp_idx = np.flatnonzero(pattern_codes.ravel() == pattern_code)
+        interpolated_arr[grp_idx] = interp_func(
+            x_new=x_new,
+            xp=x_interpol_unique[has_x],
+            fp=emisrate_arr[grp_idx][:, has_x, :],
+        )
+    interpolated_df[pollutant_cols] = interpolated_arr.reshape(-1, len(pollutant_cols))
+    return interpolated_df
+
+
+def _interp_like_np_interp(x_new, xp, fp):
+    """
+    np.interp(x_new, xp, fp[i, :, k]) for all i and k in one pass. xp is sorted and
+    unique. Raise ValueError if x_new is outside [xp[0], xp[-1]] like interp1d.
+    Parameters
+    ----------
+    x_new: np.array
+        x-values to interpolate (n_new).
+    xp: np.array
+        x-values with data (n_xp).
+    fp: np.array
+        Data (n_grps x n_xp x n_pollutants).
+    Returns
+    -------
+    np.array
+        Interpolated data (n_grps x n_new x n_pollutants).
+    """
+    _check_interpolation_range(x_new, xp)
+    if len(xp) == 1:
+        return np.repeat(fp, len(x_new), axis=1)
+    # xp[lo] <= x_new < xp[lo + 1]; x_new == xp[-1] uses the last interval.
+    lo = np.clip(np.searchsorted(xp, x_new, side="right") - 1, 0, len(xp) - 2)
+    hi = lo + 1
+    fp_lo = fp[:, lo, :]
+    fp_hi = fp[:, hi, :]
+    slope = (fp_hi - fp_lo) / (xp[hi] - xp[lo])[None, :, None]
+    interpolated = slope * (x_new - xp[lo])[None, :, None] + fp_lo
+    # np.interp retries from the upper end of the interval for nan results (e.g.
+    # inf rates) and falls back to fp_lo for equal end values.
+    is_nan = np.isnan(interpolated)
+    if is_nan.any():
+        interpolated_hi = slope * (x_new - xp[hi])[None, :, None] + fp_hi
+        interpolated = np.where(is_nan, interpolated_hi, interpolated)
+        interpolated = np.where(
+            is_nan & np.isnan(interpolated_hi) & (fp_lo == fp_hi),
+            fp_lo,
+            interpolated,
+        )
+    # np.interp returns the data as is at the x-values with data.
+    interpolated = np.where((x_new == xp[lo])[None, :, None], fp_lo, interpolated)
+    interpolated = np.where((x_new == xp[-1])[None, :, None], fp_hi, interpolated)
+    return interpolated
+
+
+def _check_interpolation_range(x_new, xp):
+    """Raise ValueError if x_new is outside [xp[0], xp[-1]] like interp1d."""
+    x_new = np.asarray(x_new)
+    if (x_new < xp[0]).any():
+        raise ValueError(
+            f"A value ({x_new[np.argmax(x_new < xp[0])]}) in x_new is below "
+            f"the interpolation range's minimum value ({xp[0]})."
+        )
+    if (x_new > xp[-1]).any():
+        raise ValueError(
+            f"A value ({x_new[np.argmax(x_new > xp[-1])]}) in x_new is above "
+            f"the interpolation range's maximum value ({xp[-1]})."
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_interpolation_operator(source_grid, target_grid):
+    """
+    Sparse linear interpolation matrix from the source grid to the target grid. Each
+    row has the weights of the two source x-values around the target x-value (one
+    weight of 1 at the source x-values). The matrices are cached by grid, so they are
+    built once per source-target grid pair, e.g., even years to 2020-2050.
+    Parameters
+    ----------
+    source_grid: tuple
+        Sorted and unique x-values with data. Use the inverse of average speed for
+        speed interpolation.
+    target_grid: tuple
+        x-values to interpolate.
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        len(target_grid) x len(source_grid) interpolation matrix.
+    """
+    xp = np.asarray(source_grid, dtype=np.float64)
+    x_new = np.asarray(target_grid, dtype=np.float64)
+    _check_interpolation_range(x_new, xp)
+    rows = np.arange(len(x_new))
+    if len(xp) == 1:
+        return scipy.sparse.csr_matrix(
+            (np.ones(len(x_new)), (rows, np.zeros(len(x_new), dtype=int))),
+            shape=(len(x_new), 1),
+        )
+    lo = np.clip(np.searchsorted(xp, x_new, side="right") - 1, 0, len(xp) - 2)
+    hi = lo + 1
+    weight_hi = (x_new - xp[lo]) / (xp[hi] - xp[lo])
+    weight_lo = 1 - weight_hi
+    operator = scipy.sparse.csr_matrix(
+        (
+            np.concatenate([weight_lo, weight_hi]),
+            (np.concatenate([rows, rows]), np.concatenate([lo, hi])),
+        ),
+        shape=(len(x_new), len(xp)),
+    )
+    # Drop the zero weights at the source x-values.
+    operator.eliminate_zeros()
+    return operator
+
+
+@functools.lru_cache(maxsize=None)
+def get_yr_spd_interpolation_operator(
+    yr_source_grid, yr_target_grid, spd_source_grid, spd_target_grid
+):
+    """
+    Year and inverse speed interpolation applied together as one operator:
+    kron(year operator, speed operator). Rows are ordered by target year, then target
+    speed; columns by source year, then source speed.
+    """
+    return scipy.sparse.kron(
+        get_interpolation_operator(yr_source_grid, yr_target_grid),
+        get_interpolation_operator(spd_source_grid, spd_target_grid),
+        format="csr",
+    )
+
+
+def _interp_with_operator(x_new, xp, fp):
+    """
+    Interpolate fp (n_grps x n_xp x n_pollutants) from xp to x_new with the cached
+    interpolation matrix. Returns n_grps x n_new x n_pollutants array.
+    """
+    operator = get_interpolation_operator(tuple(xp), tuple(x_new))
+    return _apply_operator(operator, fp)
+
+
+def _apply_operator(operator, fp):
+    """operator (n_new x n_xp) @ fp (n_grps x n_xp x n_pollutants) for all groups."""
+    num_grps, num_xp, num_pollutants = fp.shape
+    interpolated = operator @ fp.transpose(1, 0, 2).reshape(num_xp, -1)
+    return interpolated.reshape(-1, num_grps, num_pollutants).transpose(1, 0, 2)
+
+
+def out_yr_spd_interpolated_combined(
+    intermediate_data,
+    grpby_cols=("Area", "monthid", "funclass"),
+    year_vals=YEAR_LIST,
+    avgspeed_vals=AVG_SPEED_LIST,
+    pollutant_cols=POLLUTANT_COLS,
+):
+    """
+    Interpolate the emission rates to year_vals and avgspeed_vals (using the inverse
+    of average speed) in one pass with the year and speed interpolation operator
+    (get_yr_spd_interpolation_operator). Same rates as out_yr_spd_interpolated on
+    yearid followed by out_yr_spd_interpolated on avgspeed, up to floating point
+    rounding.
+    Parameters
+    ----------
+    intermediate_data: pd.DataFrame()
+        Dataframes created from the tables similar to
+        mvs2014b_erlt_out.running_erlt_intermediate.
+    grpby_cols: list
+        Columns other than yearid and avgspeed that form the groups.
+    year_vals: list
+        Years in the output.
+    avgspeed_vals: list
+        Average speeds in the output.
+    pollutant_cols: list
+        List of columns names for pollutants.
+    Returns
+    -------
+    pd.DataFrame()
+        grpby_cols, yearid, avgspeed, and pollutant_cols; sorted by grpby_cols,
+        yearid, and avgspeed in the order of avgspeed_vals.
+    """
+    grpby_cols = list(grpby_cols)
+    pollutant_cols = list(pollutant_cols)
+    intermediate_data = intermediate_data.dropna(subset=grpby_cols)
+    intermediate_data_grps = intermediate_data.groupby(grpby_cols)
+    grp_codes = intermediate_data_grps.ngroup().values
+    grp_keys = intermediate_data_grps.size().index.to_frame(index=False)
+    num_grps = len(grp_keys)
+    yr_target = tuple(np.asarray(year_vals, dtype=np.float64))
+    spd_target = tuple(1 / np.asarray(avgspeed_vals, dtype=np.float64))
+    yr_source, yr_pos = np.unique(
+        np.asarray(intermediate_data.yearid.values, dtype=np.float64),
+        return_inverse=True,
+    )
+    spd_source, spd_pos = np.unique(
+        np.asarray((1 / intermediate_data.avgspeed).values, dtype=np.float64),
+        return_inverse=True,
+    )
+    # Dense (group x source year x source inverse speed x pollutant) array.
+    emisrate_arr = np.full(
+        (num_grps, len(yr_source), len(spd_source), len(pollutant_cols)), np.nan
+    )
+    emisrate_arr[grp_codes, yr_pos, spd_pos] = np.asarray(
+        intermediate_data[pollutant_cols].values, dtype=np.float64
+    )
+    has_x_arr = np.zeros((num_grps, len(yr_source), len(spd_source)), dtype=bool)
+    has_x_arr[grp_codes, yr_pos, spd_pos] = True
+    interpolated_arr = np.empty(
+        (num_grps, len(yr_target) * len(spd_target), len(pollutant_cols))
+    )
+    has_x_patterns, pattern_codes = np.unique(
+        has_x_arr.reshape(num_grps, -1), axis=0, return_inverse=True
+    )
+    for pattern_code, has_x in enumerate(has_x_patterns):
+        has_x = has_x.reshape(len(yr_source), len(spd_source))
+        has_yr, has_spd = has_x.any(axis=1), has_x.any(axis=0)
+        if not np.array_equal(has_x, np.outer(has_yr, has_spd)):
+            raise ValueError(
+                "Some groups don't have data for all speeds in all years. Use "
+                "out_yr_spd_interpolated on yearid and then on avgspeed."
+            )
+        grp_idx = np.flatnonzero(pattern_codes.ravel() == pattern_code)
+        operator = get_yr_spd_interpolation_operator(
+            tuple(yr_source[has_yr]),
+            yr_target,
+            tuple(spd_source[has_spd]),
+            spd_target,
+        )
+        fp = emisrate_arr[grp_idx][:, has_yr][:, :, has_spd]
+        interpolated_arr[grp_idx] = _apply_operator(
+            operator, fp.reshape(len(grp_idx), -1, len(pollutant_cols))
+        )
+    num_out_rows = len(yr_target) * len(spd_target)
+    interpolated_df = grp_keys.loc[grp_keys.index.repeat(num_out_rows)].reset_index(
+        drop=True
+    )
+    interpolated_df["yearid"] = np.tile(
+        np.repeat(np.asarray(year_vals), len(spd_target)), num_grps
+    )
+    interpolated_df["avgspeed"] = np.tile(
+        np.asarray(avgspeed_vals), len(yr_target) * num_grps
+    )
+    interpolated_df[pollutant_cols] = interpolated_arr.reshape(-1, len(pollutant_cols))
+    return interpolated_df
+
+
 def agg_rates_over_yr(
     data,
     grpby_cols=("Area", "yearid", "funclass", "avgspeed"),